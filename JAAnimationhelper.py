@@ -0,0 +1,164 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Writing whole F-Curves at once, instead of one keyframe_insert per frame and channel.
+
+import bpy
+import numpy as np
+import numpy.typing as npt
+from typing import Generator, Iterable, Tuple, Union
+
+# value of keyframe_points' "interpolation" for 'LINEAR', as expected by foreach_set
+KEYFRAME_INTERPOLATION_LINEAR = 1
+# how many frames reduceKeyframesSteps processes between reporting its progress
+REDUCE_KEYFRAMES_STEP_FRAMES = 1 << 10
+
+
+# the datablock's action, creating and assigning a new one if it has none
+def ensureAction(datablock: Union[bpy.types.Object, bpy.types.Key], name: str) -> bpy.types.Action:
+    animationData = datablock.animation_data or datablock.animation_data_create()
+    assert animationData is not None
+    if animationData.action is None:
+        animationData.action = bpy.data.actions.new(name)
+    return animationData.action
+
+
+# the action's F-Curve animating datablock's dataPath[index], which is created if necessary.
+# the action must be assigned to the datablock.
+def ensureFCurve(action: bpy.types.Action, datablock: bpy.types.ID, dataPath: str, index: int = 0) -> bpy.types.FCurve:
+    # Blender 4.4 introduced slotted actions, the old API is gone in 5.0
+    if hasattr(action, "fcurve_ensure_for_datablock"):
+        return action.fcurve_ensure_for_datablock(datablock, dataPath, index=index)
+    return action.fcurves.find(dataPath, index=index) or action.fcurves.new(dataPath, index=index)  # pyright: ignore [reportAttributeAccessIssue]
+
+
+# a new action for datablocks of the given type (e.g. 'OBJECT'), which doesn't need to be assigned to anything while
+# newFCurve fills it, so nothing gets evaluated until assignAction
+def newAction(name: str, idType: str) -> bpy.types.Action:
+    action = bpy.data.actions.new(name)
+    if hasattr(action, "slots"):
+        # a single slot, on a single layer with a single keyframe strip, like fcurve_ensure_for_datablock would set up
+        slot = action.slots.new(id_type=idType, name=name)  # pyright: ignore [reportArgumentType]
+        action.layers.new("Layer").strips.new(type='KEYFRAME').channelbag(slot, ensure=True)  # pyright: ignore [reportAttributeAccessIssue]
+    return action
+
+
+# a new F-Curve animating dataPath[index] in an action created by newAction
+def newFCurve(action: bpy.types.Action, dataPath: str, index: int = 0) -> bpy.types.FCurve:
+    if not hasattr(action, "slots"):
+        return action.fcurves.new(dataPath, index=index)
+    return action.layers[0].strips[0].channelbag(action.slots[0]).fcurves.new(dataPath, index=index)  # pyright: ignore [reportAttributeAccessIssue]
+
+
+# makes the datablock play an action created by newAction
+def assignAction(datablock: Union[bpy.types.Object, bpy.types.Key], action: bpy.types.Action) -> None:
+    animationData = datablock.animation_data or datablock.animation_data_create()
+    assert animationData is not None
+    animationData.action = action
+    # unlike the legacy API, this doesn't pick the slot by itself
+    if hasattr(action, "slots"):
+        animationData.action_slot = action.slots[0]
+
+
+# the F-Curves of the action animating the datablock, which the action must be assigned to
+def actionFCurves(action: bpy.types.Action, datablock: Union[bpy.types.Object, bpy.types.Key]) -> Iterable[bpy.types.FCurve]:
+    if not hasattr(action, "layers"):
+        return action.fcurves  # pyright: ignore [reportAttributeAccessIssue]
+    # slotted actions keep them in a channelbag per slot, on the strips of the layers
+    animationData = datablock.animation_data
+    slot = animationData.action_slot if animationData is not None else None
+    if slot is None:
+        return []
+    for layer in action.layers:
+        for strip in layer.strips:
+            channelbag = strip.channelbag(slot)  # pyright: ignore [reportAttributeAccessIssue]
+            if channelbag is not None:
+                return channelbag.fcurves
+    return []
+
+
+# replaces all of the F-Curve's keyframes at once, with linear interpolation
+def setKeyframes(fcurve: bpy.types.FCurve, frames: npt.ArrayLike, values: npt.ArrayLike) -> None:
+    co = np.empty((np.size(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    points = fcurve.keyframe_points
+    points.clear()
+    points.add(len(co))
+    points.foreach_set("co", co.ravel())  # pyright: ignore [reportArgumentType]
+    points.foreach_set("interpolation", np.full(len(co), KEYFRAME_INTERPOLATION_LINEAR, dtype=np.int32))  # pyright: ignore [reportArgumentType]
+    fcurve.update()
+
+
+# which of the samples (numFrames, numChannels), one per frame, to keep as linearly interpolated keyframes, and the
+# keyframes' values, so that no sample is further than tolerance (per channel) from the resulting curve. A channel that never
+# changes by more than that keeps a single key, a straight run just its ends. Like the swing door algorithm, this narrows down
+# the range of slopes a line from the last key may have while passing within tolerance of every sample since; once that range
+# is empty, the previous frame becomes a key on such a line. All channels are processed at once, frame by frame.
+def reduceKeyframes(values: np.ndarray, tolerance: npt.ArrayLike) -> Tuple[np.ndarray, np.ndarray]:
+    steps = reduceKeyframesSteps(values, tolerance)
+    try:
+        while True:
+            next(steps)
+    except StopIteration as e:
+        return e.value
+
+
+# reduceKeyframes, yielding the fraction of frames processed every REDUCE_KEYFRAMES_STEP_FRAMES frames
+def reduceKeyframesSteps(values: np.ndarray, tolerance: npt.ArrayLike) -> Generator[float, None, Tuple[np.ndarray, np.ndarray]]:
+    numFrames, numChannels = values.shape
+    tolerance = np.broadcast_to(np.asarray(tolerance, dtype=np.float64), (numChannels,))
+    keep = np.zeros(values.shape, dtype=bool)
+    keyValues = values.astype(np.float64)
+    if numFrames == 0:
+        return keep, keyValues
+    keep[0] = True
+    keyFrame = np.zeros(numChannels)
+    keyValue = keyValues[0].copy()
+    minSlope = np.full(numChannels, -np.inf)
+    maxSlope = np.full(numChannels, np.inf)
+    for frame in range(1, numFrames):
+        if frame % REDUCE_KEYFRAMES_STEP_FRAMES == 0:
+            yield frame / numFrames
+        distance = frame - keyFrame
+        lower = np.maximum(minSlope, (values[frame] - keyValue - tolerance) / distance)
+        upper = np.minimum(maxSlope, (values[frame] - keyValue + tolerance) / distance)
+        broken = lower > upper
+        if broken.any():
+            # the previous frame becomes a key, on the line through the slopes so far that's closest to its sample
+            previous = frame - 1
+            slope = np.clip((values[previous] - keyValue) / (previous - keyFrame), minSlope, maxSlope)
+            newKey = keyValue + slope * (previous - keyFrame)
+            keep[previous] |= broken
+            keyValues[previous] = np.where(broken, newKey, keyValues[previous])
+            keyFrame = np.where(broken, previous, keyFrame)
+            keyValue = np.where(broken, newKey, keyValue)
+            lower = np.where(broken, values[frame] - keyValue - tolerance, lower)
+            upper = np.where(broken, values[frame] - keyValue + tolerance, upper)
+        minSlope, maxSlope = lower, upper
+    last = numFrames - 1
+    slope = np.clip((values[last] - keyValue) / np.maximum(last - keyFrame, 1), minSlope, maxSlope)
+    keep[last] = True
+    keyValues[last] = np.where(keyFrame < last, keyValue + slope * (last - keyFrame), keyValues[last])
+    # channels that stay within tolerance of a single value only need that one key
+    low, high = values.min(axis=0), values.max(axis=0)
+    constant = high - low <= 2 * tolerance
+    keep[:, constant] = False
+    keep[0, constant] = True
+    keyValues[0, constant] = ((low + high) / 2)[constant]
+    return keep, keyValues
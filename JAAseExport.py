@@ -1,45 +1,47 @@
 # ASE Export Functionality
 
 import bpy
+import numpy as np
 
 
-class Vertex:
-    # co: mathutils.Vector (3d)
-    # uv: pair
-    def __init__(self, co, uv):
-        self.co = co
-        self.uv = uv
+# rows get formatted and written this many at a time
+WRITE_CHUNK_ROWS = 1 << 16
+
+
+# writes template % row for every row, in large chunks
+def writeRows(file, template, rows):
+    for start in range(0, len(rows), WRITE_CHUNK_ROWS):
+        file.write("".join([template % tuple(row) for row in rows[start:start + WRITE_CHUNK_ROWS].tolist()]))
+
+
+# rows prefixed with their index
+def indexed(rows):
+    return np.column_stack([np.arange(len(rows)), rows])
 
 
 class Surface:
-    # verts: list of Vertex
-    # tris: list of vertexIndex (number)
-    def __init__(self, verts, tris, materialIndex):
-        self.verts = verts
+    # co: (numVerts, 3) world space positions
+    # uvs: (numVerts, 2)
+    # tris: (numTris, 3) vertex indices
+    def __init__(self, co, uvs, tris, materialIndex):
+        self.co = co
+        self.uvs = uvs
         self.tris = tris
         self.materialIndex = materialIndex
 
     def saveToFile(self, file):
         # if the type of numVertices/numTriangles changes, changes to LevelExporter.readMesh will be required as well (limit check)
         file.write("*GEOMOBJECT\t{{\n\t*MESH\t{{\n\t\t*TIMEVALUE\t0\n\t\t*MESH_NUMVERTEX\t{}\n\t\t*MESH_NUMFACES\t{}\n\t\t*MESH_VERTEX_LIST\t{{\n".format(
-            len(self.verts), len(self.tris)))
-        for i, vert in enumerate(self.verts):
-            file.write(
-                "\t\t\t*MESH_VERTEX\t{index}\t{co[0]:.8f}\t{co[1]:.8f}\t{co[2]:.8f}\n".format(index=i, co=vert.co))
+            len(self.co), len(self.tris)))
+        writeRows(file, "\t\t\t*MESH_VERTEX\t%d\t%.8f\t%.8f\t%.8f\n", indexed(self.co))
         file.write("\t\t}\n\t\t*MESH_FACE_LIST\t{\n")
-        for i, tri in enumerate(self.tris):
-            file.write(
-                "\t\t\t*MESH_FACE\t{index}\tA:\t{tri[0]}\tB:\t{tri[1]}\tC:\t{tri[2]}\tAB:\t1\tBC:\t1\tCA:\t1\t*MESH_SMOOTHING\t0\t*MESH_MTLID\t0\n".format(index=i, tri=tri))
+        writeRows(file, "\t\t\t*MESH_FACE\t%d\tA:\t%d\tB:\t%d\tC:\t%d\tAB:\t1\tBC:\t1\tCA:\t1\t*MESH_SMOOTHING\t0\t*MESH_MTLID\t0\n", indexed(self.tris))
         file.write(
-            "\t\t}}\n\t\t*MESH_NUMTVERTEX\t{}\n\t\t*MESH_TVERTLIST\t{{\n".format(len(self.verts)))
-        for i, vert in enumerate(self.verts):
-            file.write(
-                "\t\t\t*MESH_TVERT\t{index}\t{uv[0]:.7f}\t{uv[1]:.7f}\n".format(index=i, uv=vert.uv))
+            "\t\t}}\n\t\t*MESH_NUMTVERTEX\t{}\n\t\t*MESH_TVERTLIST\t{{\n".format(len(self.uvs)))
+        writeRows(file, "\t\t\t*MESH_TVERT\t%d\t%.7f\t%.7f\n", indexed(self.uvs))
         file.write(
             "\t\t}}\n\t\t*MESH_NUMTVFACES\t{}\n\t\t*MESH_TFACELIST\t{{\n".format(len(self.tris)))
-        for i, tri in enumerate(self.tris):
-            file.write(
-                "\t\t\t*MESH_TFACE\t{index}\t{tri[0]}\t{tri[1]}\t{tri[2]}\n".format(index=i, tri=tri))
+        writeRows(file, "\t\t\t*MESH_TFACE\t%d\t%d\t%d\t%d\n", indexed(self.tris))
         file.write(
             "\t\t}}\n\t}}\n\t*MATERIAL_REF\t{}\n}}\n".format(self.materialIndex))
         return True
@@ -51,52 +53,51 @@ class ModelExporter:
         self.materialIndices = {}
 
     def export(self, filename):
-        # We work on layer 0
-        prevLayer0State = bpy.context.scene.layers[0]
-
         # read objects
         if not self.readObjects():
-            bpy.context.scene.layers[0] = prevLayer0State
             return
 
-        bpy.context.scene.layers[0] = prevLayer0State
-
         # save to file
-        with open(filename, "w") as file:
-            self.saveToFile(file)
-            file.close()
-            return
-
-        self.reportError("Could not open \"{}\" for writing!".format(filename))
+        try:
+            with open(filename, "w") as file:
+                self.saveToFile(file)
+        except IOError:
+            self.reportError("Could not open \"{}\" for writing!".format(filename))
 
     def readObjects(self):
         self.surfaces = []
+        depsgraph = bpy.context.evaluated_depsgraph_get()
         # go through all objects in the scene
         for obj in bpy.context.scene.objects:
             # mesh entities are geometry
             if obj.type == 'MESH':
-                if not self.readGeometry(obj):
+                if not self.readGeometry(obj, depsgraph):
                     return False
         return True
 
-    def readGeometry(self, obj):
+    def readGeometry(self, obj, depsgraph):
         if bpy.context.mode != 'OBJECT':
             self.reportError("Must be in Object Mode to export!")
             return False
 
         print("Processing geometry object \"{}\"...".format(obj.name))
 
-        bpy.ops.object.select_all(action='DESELECT')
-
         success = True
-        mesh = obj.to_mesh(bpy.context.scene, True, 'PREVIEW')
-        # only export meshes with faces
-        if len(mesh.polygons) > 0:
-            # let's just use the first material, it's the user's job to separate by material.
-            material = obj.material_slots[0]
-            if not self.readMesh(obj, mesh, material):
-                success = False
-        bpy.data.meshes.remove(mesh)
+        evaluated = obj.evaluated_get(depsgraph)
+        mesh = evaluated.to_mesh()
+        try:
+            # only export meshes with faces
+            if len(mesh.polygons) > 0:
+                # let's just use the first material, it's the user's job to separate by material.
+                material = obj.material_slots[0].material if len(obj.material_slots) > 0 else None
+                if material is None:
+                    self.reportError(
+                        "Object \"{}\" has no material!".format(obj.name))
+                    success = False
+                elif not self.readMesh(obj, mesh, material):
+                    success = False
+        finally:
+            evaluated.to_mesh_clear()
 
         print("Done.")
 
@@ -104,40 +105,40 @@ class ModelExporter:
 
     def readMesh(self, obj, mesh, material):
         # make sure there's a uv map
-        if len(mesh.uv_layers) == 0:
-            self.reportError(
-                "Mesh of object \"{}\" has no UV map!".format(obj.name))
-            return False
-        uv_layer = mesh.uv_layers[0]
-        uv_loops = uv_layer.data
-        if len(uv_loops) == 0:
+        if len(mesh.uv_layers) == 0 or len(mesh.uv_layers[0].data) == 0:
             self.reportError(
                 "Mesh of object \"{}\" has no UV map!".format(obj.name))
             return False
 
-        # a single vertex may have multiple uv coordinates (since they're per face)
-        # I need to export that as multiple vertices, so I use this:
-        # { blender vertex index : [ blender uv loop index ] }
-        exportIndexLookup = {}
-        verts = []
-        # also adds the vertex to verts, if necessary
-
-        def getExportIndex(vertexIndex, loopIndex):
-            uv = uv_loops[loopIndex].uv.to_tuple()
-            indices = exportIndexLookup.get(vertexIndex)
-            if not indices:
-                exportIndexLookup[vertexIndex] = indices = {}
-            index = indices.get(uv)
-            if not index:
-                verts.append(Vertex(obj.matrix_world *
-                             mesh.vertices[vertexIndex].co, uv))
-                index = len(verts) - 1
-                indices[uv] = index
-            return index
-
-        # the polys may get new vertex indices due to vertex splitting due to different UVs - this is all done by this beautiful list comprehension.
-        tris = [[getExportIndex(vertIndex, loopIndex) for vertIndex, loopIndex in zip(
-            poly.vertices, poly.loop_indices)] for poly in mesh.polygons]
+        # vertices in world space, in one go
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+        loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loopVerts)
+        loopUVs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        mesh.uv_layers[0].data.foreach_get("uv", loopUVs)
+        loopUVs = loopUVs.reshape(-1, 2)
+
+        mesh.calc_loop_triangles()
+        triLoops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("loops", triLoops)
+
+        # a single vertex may have multiple uv coordinates (since they're per face),
+        # so each distinct vertex/uv combination becomes its own vertex, numbered in order of appearance.
+        keys = np.empty(len(triLoops), dtype=[("vertex", np.int32), ("u", np.float32), ("v", np.float32)])
+        keys["vertex"] = loopVerts[triLoops]
+        keys["u"] = loopUVs[triLoops, 0]
+        keys["v"] = loopUVs[triLoops, 1]
+        _, firstUse, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(firstUse)
+        # unique index -> export index
+        exportIndex = np.empty(len(order), dtype=np.int64)
+        exportIndex[order] = np.arange(len(order))
+        firstLoops = triLoops[firstUse[order]]
+        tris = exportIndex[inverse.ravel()].reshape(-1, 3)
 
         materialIndex = None
         if material in self.materialIndices:
@@ -145,9 +146,8 @@ class ModelExporter:
         else:
             materialIndex = len(self.materialIndices)
             self.materialIndices[material] = materialIndex
-        print("surface makin'")
         # append surface to list of surfaces
-        self.surfaces.append(Surface(verts, tris, materialIndex))
+        self.surfaces.append(Surface(co[loopVerts[firstLoops]], loopUVs[firstLoops], tris, materialIndex))
 
         return True
 
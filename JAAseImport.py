@@ -1,11 +1,180 @@
 
 from .mod_reload import reload_modules
-reload_modules(locals(), __package__, [], [".casts"])  # nopep8
+reload_modules(locals(), __package__, [], [])  # nopep8
 
-from .casts import bpy_generic_cast
-
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 import bpy
+import mmap
+import numpy as np
+import numpy.typing as npt
+import os
+import re
+import warnings
+
+### Parsing ###
+
+# The file is parsed from a memory map rather than read into a string, so apart from the tokens only the mesh arrays
+# take up memory. Those get parsed from the mesh list sections a chunk at a time.
+FileData = Union[bytes, mmap.mmap]
+
+# a token is one of:
+# - a string in quotes (group 1), possibly unterminated at the end of the file
+# - one of {, } or *
+# - everything up to (and excluding) the next whitespace, {, }, * or "
+TOKEN_RE = re.compile(rb'"([^"]*)"?|[{}*]|[^\s{}*"]+')
+
+
+# the mesh list sections consist of rows like "*MESH_VERTEX <index> <x> <y> <z>".
+# those are parsed straight into a (rows, columns) array instead of a Block per row, dropping the index.
+# section name -> row name, type, columns
+ROW_SECTIONS: Dict[str, Tuple[str, npt.DTypeLike, int]] = {
+    "mesh_vertex_list": ("MESH_VERTEX", np.float32, 3),
+    "mesh_tvertlist": ("MESH_TVERT", np.float32, 2),
+    "mesh_tfacelist": ("MESH_TFACE", np.int32, 3),
+}
+# "*MESH_FACE <index>: A: <a> B: <b> C: <c> AB: 1 BC: 1 CA: 1 *MESH_SMOOTHING 0 *MESH_MTLID 0", of which only a, b and c matter
+FACE_SECTION = "mesh_face_list"
+FACE_ROW_RE = re.compile(rb"\*MESH_FACE\b", re.IGNORECASE)
+FACE_RE = re.compile(rb"\*MESH_FACE\s+\S+\s+A:\s*(\S+)\s+B:\s*(\S+)\s+C:\s*(\S+)", re.IGNORECASE)
+# roughly how many bytes of a mesh list section get parsed at once
+ROW_CHUNK_SIZE = 1 << 20
+
+
+class Block:
+    def __init__(self):
+        self.name = ""
+        self.parameters: List[str] = []
+        self.children: List[Block] = []
+        # for the mesh list sections, instead of children
+        self.rows: Optional[np.ndarray] = None
+
+
+class ASESyntaxError(RuntimeError):
+    def __init__(self, msg):
+        self.message = msg
+
+    def __str__(self):
+        return repr(self.message)
+
+
+# the (start, end) offsets of the chunks of the section between start and end, each ending before a *
+def sectionChunks(data: FileData, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    while start < end:
+        chunkEnd = data.find(b"*", min(start + ROW_CHUNK_SIZE, end), end)
+        if chunkEnd == -1:
+            chunkEnd = end
+        yield start, chunkEnd
+        start = chunkEnd
+
+
+def parseRows(data: FileData, start: int, end: int, rowName: str, dtype: npt.DTypeLike, columns: int) -> np.ndarray:
+    rowRE = re.compile(r"\*{}\b".format(rowName).encode(), re.IGNORECASE)
+    parts: List[np.ndarray] = []
+    for chunkStart, chunkEnd in sectionChunks(data, start, end):
+        numbers, numRows = rowRE.subn(b" ", data[chunkStart:chunkEnd])
+        try:
+            # older NumPy versions only warn about garbage
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", DeprecationWarning)
+                values = np.fromstring(numbers, dtype=dtype, sep=" ")
+        except (ValueError, DeprecationWarning):
+            raise ASESyntaxError("Invalid File: *{} with non-numeric values!".format(rowName))
+        if numRows == 0 and values.size == 0:
+            continue
+        # some exporters write a third texture coordinate
+        if numRows == 0 or values.size % numRows != 0 or values.size // numRows < columns + 1:
+            raise ASESyntaxError("Invalid File: *{} with too few arguments!".format(rowName))
+        parts.append(values.reshape(numRows, -1)[:, 1:columns + 1].copy())
+    if len(parts) == 0:
+        return np.zeros((0, columns), dtype=dtype)
+    return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+
+def parseFaces(data: FileData, start: int, end: int) -> np.ndarray:
+    parts: List[np.ndarray] = [np.zeros((0, 3), dtype=np.int32)]
+    for chunkStart, chunkEnd in sectionChunks(data, start, end):
+        faces = FACE_RE.findall(data, chunkStart, chunkEnd)
+        if len(faces) != len(FACE_ROW_RE.findall(data, chunkStart, chunkEnd)):
+            raise ASESyntaxError("Invalid File: *MESH_FACE with too few arguments!")
+        try:
+            parts.append(np.array(faces, dtype=np.int32).reshape(-1, 3))
+        except ValueError:
+            raise ASESyntaxError("Invalid File: *MESH_FACE with non-numeric vertex index!")
+    return np.concatenate(parts)
+
+
+# Gets blocks - or should the be called Nodes? Basically stuff like this:
+# *MATERIAL_REF 0
+# and this:
+# *GEOMOBJECT { ... }
+# returns the top level ones, with the "children" part of those filled in.
+# Scans the whole text in one go, keeping the enclosing blocks on a stack instead of recursing.
+# The mesh list sections get their "rows" filled in instead, see ROW_SECTIONS.
+def parseBlocks(data: FileData) -> List[Block]:
+    blocks: List[Block] = []
+    # the enclosing blocks' sibling lists and the blocks themselves
+    stack: List[Tuple[List[Block], Block]] = []
+    siblings = blocks
+    # the block that following parameters belong to
+    block: Optional[Block] = None
+    tokens = TOKEN_RE.finditer(data)
+    while True:
+        match = next(tokens, None)
+        if match is None:
+            break
+        token = match.group(0).decode("utf-8", "replace")
+        isString = match.group(1) is not None
+        if isString:
+            if len(token) == 1 or token[-1] != '"':
+                print("Warning: Unterminated String!")
+            token = match.group(1).decode("utf-8", "replace")
+        if not isString and token == "*":
+            # read block name
+            nameMatch = next(tokens, None)
+            if nameMatch is None:
+                raise ASESyntaxError("Invalid File: Unexpected end of file!")
+            name = nameMatch.group(0).decode("utf-8", "replace")
+            if nameMatch.group(1) is not None:
+                name = nameMatch.group(1).decode("utf-8", "replace")
+            elif name in ["{", "}", "*"]:
+                raise ASESyntaxError("Invalid File: Unexpected {}!".format(name))
+            block = Block()
+            block.name = name
+            siblings.append(block)
+        elif not isString and token == "{":
+            if block is None:
+                raise ASESyntaxError("Invalid File: * expected, got {}".format(token))
+            sectionName = block.name.lower()
+            if sectionName in ROW_SECTIONS or sectionName == FACE_SECTION:
+                # rows follow, which contain no nested blocks
+                end = data.find(b"}", match.end())
+                if end == -1:
+                    raise ASESyntaxError("Invalid File: Block not properly closed!")
+                if sectionName == FACE_SECTION:
+                    block.rows = parseFaces(data, match.end(), end)
+                else:
+                    block.rows = parseRows(data, match.end(), end, *ROW_SECTIONS[sectionName])
+                # continue after the closing }, more parameters may follow
+                tokens = TOKEN_RE.finditer(data, end + 1)
+                continue
+            # children follow
+            stack.append((siblings, block))
+            siblings = block.children
+            block = None
+        elif not isString and token == "}":
+            if len(stack) == 0:
+                # unmatched, ignore the rest of the file
+                return blocks
+            # more parameters may follow the children
+            siblings, block = stack.pop()
+        elif block is None:
+            raise ASESyntaxError("Invalid File: * expected, got {}".format(token))
+        else:
+            block.parameters.append(token)
+    if len(stack) > 0:
+        raise ASESyntaxError("Invalid File: Block not properly closed!")
+    return blocks
+
 
 ### The new operator ###
 
@@ -29,123 +198,19 @@ class Operator(bpy.types.Operator):
         return {'RUNNING_MODAL'}
 
     def ImportStart(self):
-        whitespace = set(" \t\n")
-
         def error(msg):
             self.report({'ERROR'}, msg)
 
-        def skipWhitespace(file):
-            prevPos = file.tell()
-            c = file.read(1)
-            while c in whitespace:
-                prevPos = file.tell()
-                c = file.read(1)
-            if c != "":
-                file.seek(prevPos)
-
-        # reads everything up to (and excluding) the next whitespace or {, } or *, returns that, cursor is before the whitespace
-        # or, if the next token starts with {, } or * returns just that
-        def readToken(file):
-            skipWhitespace(file)
-            token = ""
-            isString = False
-            while True:
-                prevPos = file.tell()
-                c = file.read(1)
-                if c == "\"":
-                    if isString:
-                        return token
-                    else:
-                        if token == "":
-                            isString = True
-                            continue
-                        else:  # treat " in mid-token as token's end
-                            file.seek(prevPos)
-                            return token
-                if c in whitespace and not isString:
-                    file.seek(prevPos)
-                    return token
-                if c in ["{", "}", "*"] and not isString:
-                    if token == "":
-                        return c
-                    else:
-                        file.seek(prevPos)
-                        return token
-                elif c == "":
-                    if isString:
-                        print("Warning: Unterminated String!")
-                    return token
-                else:
-                    token = token + c
-
-        class Block:
-            def __init__(self):
-                self.name = ""
-                self.parameters = []
-                self.children = []
-
-        class ASESyntaxError(RuntimeError):
-            def __init__(self, msg):
-                self.message = msg
-
-            def __str__(self):
-                return repr(self.message)
-
-        # Gets blocks - or should the be called Nodes? Basically stuff like this:
-        # *MATERIAL_REF 0
-        # and this:
-        # *GEOMOBJECT { ... }
-        # returns all of them on the same level, and recursively fills the "children" part of those
-        def getBlocks(file):
-            blocks = []
-            while True:
-                prevPos = file.tell()
-                token = readToken(file)
-                if token == "":
-                    return blocks
-                elif token == "}":
-                    file.seek(prevPos)
-                    return blocks
-                elif token != "*":
-                    raise ASESyntaxError(
-                        "Invalid File: * expected, got {}".format(token))
-                # else: Token == *
-                # read block name
-                block = Block()
-                blocks.append(block)
-                block.name = readToken(file)
-                if block.name == "":
-                    raise ASESyntaxError(
-                        "Invalid File: Unexpected end of file!")
-                elif block.name in ["{", "}", "*"]:
-                    raise ASESyntaxError(
-                        "Invalid File: Unexpected {}!".format(block.name))
-                # read block parameters, i.e. stuff that follows, and children, if any
-                parametersOver = False
-                while not parametersOver:
-                    prevPos = file.tell()
-                    nextToken = readToken(file)
-                    if nextToken == "":  # EOF
-                        return blocks
-                    elif nextToken in ["}", "*"]:  # end of block
-                        file.seek(prevPos)
-                        parametersOver = True
-                    elif nextToken == "{":  # children follow
-                        block.children = getBlocks(file)
-                        nextToken = readToken(file)
-                        if nextToken != "}":
-                            raise ASESyntaxError(
-                                "Invalid File: Block not properly closed!")
-                    else:
-                        block.parameters.append(nextToken)
-
-        # open file
-        filename = self.properties.filepath
-        file = open(filename)
-
         # read file
+        filename = self.properties.filepath
         try:
-            blocks = getBlocks(file)
+            with open(filename, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    # can't be mapped
+                    blocks = []
+                else:
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        blocks = parseBlocks(data)
         except ASESyntaxError as err:
             error(err.message)
             return
@@ -205,13 +270,29 @@ class Operator(bpy.types.Operator):
         class Object:
             def __init__(self, index):
                 self.mat_ref = -1
-                self.vertices = []  # flat list of coordinates
-                self.faces = []  # flat list of indices
-                self.tvertices = []  # list of uv pairs
-                self.tfaces = []  # list of tvertex index triples
+                self.vertices = np.zeros((0, 3), dtype=np.float32)
+                self.faces = np.zeros((0, 3), dtype=np.int32)  # vertex index triples
+                self.tvertices = np.zeros((0, 2), dtype=np.float32)  # uv pairs
+                self.tfaces = np.zeros((0, 3), dtype=np.int32)  # tvertex index triples
                 self.index = index  # index of this object's GEOMOBJECT entry
 
             def toBlender(self, materials: List[bpy.types.Material]):
+                numVerts = len(self.vertices)
+                numTris = len(self.faces)
+                if np.any((self.faces < 0) | (self.faces >= numVerts)):
+                    error(
+                        "Invalid file: FACELIST references non-existing VERTEX in GEOMOBJECT {}".format(self.index))
+                    return
+                invalidTVerts = self.tfaces[(self.tfaces < 0) | (self.tfaces >= len(self.tvertices))]
+                if len(invalidTVerts) > 0:
+                    error(
+                        "Invalid file: TFACELIST references non-existing TVERT {} in GEOMOBJECT {}".format(invalidTVerts[0], self.index))
+                    return
+                if len(self.tfaces) > numTris:
+                    error(
+                        "Invalid file: TFACELIST of GEOMOBJECT {} too long.".format(self.index))
+                    return
+
                 # create mesh
 
                 mesh = bpy.data.meshes.new("ASEMesh")
@@ -223,42 +304,26 @@ class Operator(bpy.types.Operator):
 
                 # add vertices
 
-                numVerts = len(self.vertices) // 3
                 mesh.vertices.add(numVerts)
-                mesh.vertices.foreach_set("co", self.vertices)
+                mesh.vertices.foreach_set("co", self.vertices.ravel())
 
                 # add faces
 
-                numTris = len(self.faces) // 3
                 mesh.polygons.add(numTris)
                 # loops are the per-face-vertex-settings in one long flat list
                 mesh.loops.add(numTris * 3)
                 # so we need to set where in that list a face's settings start...
                 mesh.polygons.foreach_set(
-                    "loop_start", range(0, numTris * 3, 3))
+                    "loop_start", np.arange(0, numTris * 3, 3, dtype=np.int32))
                 # ... and how many there are.
-                mesh.polygons.foreach_set("loop_total", (3,) * numTris)
-                mesh.loops.foreach_set("vertex_index", self.faces)
-
-                mesh.uv_layers.new()  # creates a new uv_layer
-                # FIXME "Argument of type "slice" cannot be assigned to parameter "key" of type" -> I should probably drop the [:]?
-                uv_loops = mesh.uv_layers.active.data[:]
-                for poly, tface in zip(mesh.polygons, self.tfaces):
-                    poly = bpy_generic_cast(bpy.types.MeshPolygon, poly)
-                    for ofs, tvertIndex in enumerate(tface):
-                        tvert = None
-                        try:
-                            tvert = self.tvertices[tvertIndex]
-                        except IndexError:
-                            error(
-                                "Invalid file: TFACELIST references non-existing TVERT {} in GEOMOBJECT {}".format(tvertIndex, self.index))
-                            return
-                        try:
-                            uv_loops[poly.loop_start + ofs].uv = tvert
-                        except IndexError:
-                            error(
-                                "Invalid file: TFACELIST of GEOMOBJECT {} too long.".format(self.index))
-                            return
+                mesh.polygons.foreach_set("loop_total", np.full(numTris, 3, dtype=np.int32))
+                mesh.loops.foreach_set("vertex_index", self.faces.ravel())
+
+                # per loop, faces without tface keep 0, 0
+                uvs = np.zeros((numTris * 3, 2), dtype=np.float32)
+                uvs[:len(self.tfaces) * 3] = self.tvertices[self.tfaces.ravel()]
+                uv_layer = mesh.uv_layers.new()  # creates a new uv_layer
+                uv_layer.data.foreach_set("uv", uvs.ravel())
 
                 mesh.update()
                 mesh.validate()
@@ -271,17 +336,6 @@ class Operator(bpy.types.Operator):
 
         objects: List[Object] = []
 
-        # if the last index is 0, blender assumes that to be the end...
-        # or does it? Maybe it does, but changing the order screws UV up and that
-        def fixOrder(face):
-            if face[-1] == 0:
-                print(
-                    "There might be a missing face on this model. If that's the case, tell me to fix the importer, it's my fault.")
-                return face  # do nothing for now...
-                face.insert(0, face[-1])
-                del face[-1]
-            return face
-
         objIndex = -1
         for block in blocks:
             if block.name.lower() == "geomobject":
@@ -295,46 +349,33 @@ class Operator(bpy.types.Operator):
                         error("*GEOMOBJECT with no/multiple *MESH and/or *MAT_REF")
                         return
                     mesh = meshes[0]
-                    vertex_lists = [
-                        child for child in mesh.children if child.name.lower() == "mesh_vertex_list"]
-                    face_lists = [
-                        child for child in mesh.children if child.name.lower() == "mesh_face_list"]
-                    tvert_lists = [
-                        child for child in mesh.children if child.name.lower() == "mesh_tvertlist"]
-                    tface_lists = [
-                        child for child in mesh.children if child.name.lower() == "mesh_tfacelist"]
+
+                    # the lists' rows have already been read into arrays while parsing
+                    def getRows(name):
+                        return [child.rows for child in mesh.children if child.name.lower() == name and child.rows is not None]
+                    vertex_lists = getRows("mesh_vertex_list")
+                    face_lists = getRows("mesh_face_list")
+                    tvert_lists = getRows("mesh_tvertlist")
+                    tface_lists = getRows("mesh_tfacelist")
                     if len(vertex_lists) != 1 or len(face_lists) != 1 or len(tvert_lists) != 1 or len(tface_lists) != 1:
                         error(
                             "Invalid *MESH with no/multiple *MESH_VERTEX_LIST/*MESH_FACE_LIST/*MESH_TVERTLIST/*MESH_TFACELIST")
                         return
 
-                    print("TVerts:", len(tvert_lists[0].children))
+                    print("TVerts:", len(tvert_lists[0]))
 
                     object = Object(objIndex)
                     object.mat_ref = int(mat_refs[0].parameters[0])
-                    # list comprehension yay!
-
-                    # get vertices
-                    # basically: [ float(vertex_lists[0].children[n].parameters[1]), float(vertex_lists[0].children[n].parameters[2]), float(vertex_lists[0].children[n].parameters[3]), float(vertex_lists[0].children[n+1].parameters[1]), ... ] for those n... where children[n].name == "MESH_VERTEX"
-                    object.vertices = [float(vert.parameters[i]) for vert in vertex_lists[0].children if vert.name.lower(
-                    ) == "mesh_vertex" for i in [1, 2, 3]]
-
-                    # get faces (one flat list of indices)
-                    faces = [fixOrder([int(face.parameters[2]), int(face.parameters[4]), int(
-                        face.parameters[6])]) for face in face_lists[0].children if face.name.lower() == "mesh_face"]
-                    # flatten
-                    object.faces = [face[i]
-                                    for face in faces for i in range(3)]
-
-                    # get tvertices (list of uv-pairs)
-                    # object.tvertices = [ float( vert.parameters[ i ] ) for vert in tvert_lists[0].children if vert.name.lower() == "mesh_tvert" for i in [ 1, 2 ] ]
-                    object.tvertices = [[float(vert.parameters[i]) for i in [
-                        1, 2]] for vert in tvert_lists[0].children if vert.name.lower() == "mesh_tvert"]
-
-                    # get tfaces (list of index-triples)
-                    # object.tfaces = [ fixOrder( [ int( face.parameters[ 1 ] ), int( face.parameters[ 2 ] ), int( face.parameters[ 3 ] ) ] ) for face in tface_lists[0].children if face.name.lower() == "mesh_tface" ]
-                    object.tfaces = [[int(face.parameters[1]), int(face.parameters[2]), int(
-                        face.parameters[3])] for face in tface_lists[0].children if face.name.lower() == "mesh_tface"]
+                    object.vertices = vertex_lists[0]
+                    object.faces = face_lists[0]
+                    object.tvertices = tvert_lists[0]
+                    object.tfaces = tface_lists[0]
+
+                    # if the last index is 0, blender assumes that to be the end...
+                    # or does it? Maybe it does, but changing the order screws UV up and that
+                    if np.any(object.faces[:, 2] == 0):
+                        print(
+                            "There might be a missing face on this model. If that's the case, tell me to fix the importer, it's my fault.")
                     objects.append(object)
                 except IndexError as err:
                     print(err)
@@ -347,7 +388,7 @@ class Operator(bpy.types.Operator):
             bpy.ops.object.mode_set(mode='OBJECT')
         for object in objects:
             object.toBlender(materials)
-        bpy.context.scene.update()  # since new objects have been linked
+        bpy.context.view_layer.update()  # since new objects have been linked
 
 
 def menu_func(self, context):
@@ -0,0 +1,108 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# The animation.cfg file naming the animations in a .gla, without any Blender dependencies like
+# JAG2GLAFormat. Each line is "name start length loop fps", // starts a comment.
+
+import os
+import re
+from typing import Dict, List, Sequence
+
+# the name animation.cfg files have, next to the .gla they describe
+FILENAME = "animation.cfg"
+
+
+class AnimationConfigError(Exception):
+    pass
+
+
+class AnimationConfigEntry:
+    def __init__(self, name: str, start: int, length: int, loop: int = 0, fps: int = 20):
+        self.name = name
+        # first frame in the .gla
+        self.start = start
+        self.length = length
+        # -1 for no looping, 0 for looping all frames, otherwise the number of frames at the end to loop
+        self.loop = loop
+        # negative to play backwards
+        self.fps = fps
+
+
+def parse(text: str) -> List[AnimationConfigEntry]:
+    entries: List[AnimationConfigEntry] = []
+    for lineNumber, line in enumerate(text.splitlines(), 1):
+        fields = line.split("//", 1)[0].split()
+        if len(fields) == 0:
+            continue
+        if len(fields) < 3:
+            raise AnimationConfigError(f"line {lineNumber}: expected name, start, length, loop and fps")
+        try:
+            numbers = [int(field) for field in fields[1:5]]
+        except ValueError:
+            raise AnimationConfigError(f"line {lineNumber}: start, length, loop and fps must be integers")
+        entries.append(AnimationConfigEntry(fields[0], *numbers))
+    return entries
+
+
+def load(filepath: str) -> List[AnimationConfigEntry]:
+    with open(filepath, "r") as file:
+        return parse(file.read())
+
+
+# the text of an animation.cfg listing the entries, starting with the given comment
+def toText(entries: Sequence[AnimationConfigEntry], comment: str) -> str:
+    maxLen = max([23] + [len(entry.name) for entry in entries])  # maximum name length, default minimum is 24
+    pattern = "{:<" + str(maxLen) + "} {:<7} {:<7} {:<7} {}\n"
+    lines = [f"// {comment}\n", pattern.format("// name", "start", "length", "loop", "fps")]
+    lines.extend(pattern.format(entry.name, entry.start, entry.length, entry.loop, entry.fps) for entry in entries)
+    return "".join(lines)
+
+
+def save(filepath: str, entries: Sequence[AnimationConfigEntry], comment: str) -> None:
+    with open(filepath, "w") as file:
+        file.write(toText(entries, comment))
+
+
+# the animation.cfg belonging to the .gla at the given path
+def pathForGLA(glaFilepath: str) -> str:
+    return os.path.join(os.path.dirname(glaFilepath), FILENAME)
+
+
+# animation names as typed by the user, separated by commas and/or whitespace
+def splitNames(text: str) -> List[str]:
+    return [name for name in re.split(r"[\s,]+", text) if name]
+
+
+# the entries with the given names (case-insensitively, like the game), in the order they appear in the .gla
+def select(entries: Sequence[AnimationConfigEntry], names: Sequence[str]) -> List[AnimationConfigEntry]:
+    entriesByName: Dict[str, AnimationConfigEntry] = {entry.name.upper(): entry for entry in entries}
+    missing = [name for name in names if name.upper() not in entriesByName]
+    if missing:
+        raise AnimationConfigError("Unknown animation{} {}".format("s" if len(missing) > 1 else "", ", ".join(missing)))
+    selected = {entriesByName[name.upper()].name: entriesByName[name.upper()] for name in names}
+    return sorted(selected.values(), key=lambda entry: entry.start)
+
+
+# the entries moved next to each other starting at frame 0, as they are once only their frames are read
+def consecutive(entries: Sequence[AnimationConfigEntry]) -> List[AnimationConfigEntry]:
+    result: List[AnimationConfigEntry] = []
+    start = 0
+    for entry in entries:
+        result.append(AnimationConfigEntry(entry.name, start, entry.length, entry.loop, entry.fps))
+        start += entry.length
+    return result
@@ -17,564 +17,576 @@
 # ##### END GPL LICENSE BLOCK #####
 
 from .mod_reload import reload_modules
-reload_modules(locals(), __package__, ["JAStringhelper", "JAG2Constants", "JAG2Math", "MrwProfiler", "JAG2Panels"], [".casts", ".error_types"])  # nopep8
+reload_modules(locals(), __package__, ["JAAnimationhelper", "JAG2AnimationConfig", "JAG2Constants", "JAG2GLAFormat", "JAG2Math", "MrwProfiler", "JAG2Panels"], [".casts", ".error_types"])  # nopep8
 
-from . import JAStringhelper
+from . import JAAnimationhelper
+from . import JAG2AnimationConfig
 from . import JAG2Constants
+from . import JAG2GLAFormat
 from . import JAG2Math
 from . import MrwProfiler
 from . import JAG2Panels
-from .casts import optional_cast, downcast, bpy_generic_cast, matrix_getter_cast, matrix_overload_cast, vector_getter_cast, vector_overload_cast
-from .error_types import ErrorMessage, NoError, ensureListIsGapless
+from .casts import optional_cast, downcast, bpy_generic_cast, matrix_getter_cast, matrix_overload_cast, vector_getter_cast
+from .error_types import ErrorMessage, NoError
+from .JAG2AnimationConfig import AnimationConfigEntry, AnimationConfigError
+from .JAG2GLAFormat import GLAFormatError, MatrixArray, MdxaAnimation, MdxaBone, MdxaHeader, MdxaSkel
 
-from typing import BinaryIO, Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, Generator, List, Optional, Sequence, Tuple, TypeVar
+from collections import OrderedDict
 from enum import Enum
-import struct
 import bpy
+import os
+import time
 import mathutils
+import numpy as np
 
-PROFILE = False
 # show progress & remaining time every 30 seconds.
 PROGRESS_UPDATE_INTERVAL = 30
 
+# Changes a GLA bone's rotation matrix (X+ = front) to blender style (Y+ = front) when multiplied
+# from the right - the inverse of JAG2Math.BlenderBoneRotToGLA, for arrays of matrices.
+GLA_TO_BLENDER_BONE = np.array([
+    [0, 1, 0, 0],
+    [0, 0, -1, 0],
+    [-1, 0, 0, 0],
+    [0, 0, 0, 1],
+], dtype=np.float64)
+# and back, like JAG2Math.BlenderBoneRotToGLA
+BLENDER_TO_GLA_BONE = GLA_TO_BLENDER_BONE.T.copy()
+
+
+# The long-running parts of an import are generators yielding their progress (0 to 1) every now and then and returning
+# their result at the end. finishSteps runs them all at once, a modal operator can spread them over timer events
+# instead, to keep Blender responsive (see JAG2Operators.ModalImport).
+StepsResult = TypeVar("StepsResult")
+Steps = Generator[float, None, StepsResult]
+
+
+# runs the steps to completion, printing the progress & remaining time every PROGRESS_UPDATE_INTERVAL seconds
+def finishSteps(steps: Steps[StepsResult]) -> StepsResult:
+    nextProgressDisplayTime = time.time() + PROGRESS_UPDATE_INTERVAL
+    lastProgress = 0.0
+    while True:
+        try:
+            progress = next(steps)
+        except StopIteration as e:
+            return e.value
+        if time.time() >= nextProgressDisplayTime:
+            # only take the progress since the last update into account since the speed varies.
+            timeRemaining = PROGRESS_UPDATE_INTERVAL * (1 - progress) / max(progress - lastProgress, 1e-6)
+            print("{:.2%} - remaining time: ca. {:.0f}m {:.0f}s".format(progress, timeRemaining // 60, timeRemaining % 60))
+            lastProgress = progress
+            nextProgressDisplayTime = time.time() + PROGRESS_UPDATE_INTERVAL
+
+
+# the steps, with their progress mapped to start..end, to make them part of bigger steps
+def progressBetween(steps: Steps[StepsResult], start: float, end: float) -> Steps[StepsResult]:
+    while True:
+        try:
+            progress = next(steps)
+        except StopIteration as e:
+            return e.value
+        yield start + (end - start) * progress
+
+
+def toBlenderMatrix(mat: np.ndarray) -> mathutils.Matrix:
+    rows = mat.tolist()
+    if len(rows) == 3:
+        rows.append([0, 0, 0, 1])
+    return mathutils.Matrix(rows)
+
+
+def fromBlenderMatrix(mat: mathutils.Matrix) -> MatrixArray:
+    return np.array([list(row) for row in mat], dtype=np.float64)  # pyright: ignore [reportArgumentType]  # vector is iterable
+
+
+# how many distinct frames analyzeBoneConnections computes the bone transforms of at once, to limit its memory use:
+# 128 bytes per frame and bone, so about 37MB for _humanoid-jk2.gla's 72 bones
+CONNECT_ANALYSIS_CHUNK_FRAMES = 1 << 12
+
+
+# which bones may be auto-connected to their parents, worked out for the whole skeleton before any Blender bone exists
+class BoneConnectAnalysis:
+    def __init__(self, parents: np.ndarray, numChildren: np.ndarray, headDrift: np.ndarray):
+        # each bone's parent once the PARENT_CHANGES are applied, -1 for the root
+        self.parents = parents
+        # how many children each bone has once the PARENT_CHANGES are applied
+        self.numChildren = numChildren
+        # how far each bone's head moves away from where it sits at rest relative to its parent, over all frames
+        self.headDrift = headDrift
+
+    # whether auto-connecting the bone to its parent would faithfully reproduce its animation
+    def canConnect(self, boneIndex: int) -> bool:
+        return bool(self.headDrift[boneIndex] <= JAG2Constants.BONE_TRANSLATION_ERROR_MARGIN)
+
+
+# a connected bone is rigidly attached to its parent - its head, expressed in the parent's own current local frame,
+# never moves from where it sits at rest; only its own rotation can vary. So for every bone, this re-expresses its head
+# in its (possibly changed) parent's frame, in every frame of the animation, and records the furthest that drifts from
+# the bind-pose-relative position. If it does, the bone needs independent translation that use_connect can't represent.
+# All bones are handled at once with the forward kinematics of MdxaAnimation.computeBoneTransforms; identical
+# frames have identical drifts, so only distinct ones are computed. Without animation data there's nothing to check
+# against, so it's fine to connect.
+def analyzeBoneConnections(skeleton: MdxaSkel, skeletonFixes: JAG2Constants.SkeletonFixes, animation: Optional[MdxaAnimation]) -> BoneConnectAnalysis:
+    numBones = len(skeleton.bones)
+    parents = np.array([bone.parent for bone in skeleton.bones], dtype=np.intp)
+    for boneIndex, parentIndex in JAG2Constants.PARENT_CHANGES[skeletonFixes].items():
+        if boneIndex < numBones:
+            parents[boneIndex] = parentIndex
+    # a parent that doesn't exist is a hierarchy problem skeletonToBlender reports
+    children = np.flatnonzero((parents >= 0) & (parents < numBones))
+    childParents = parents[children]
+    numChildren = np.bincount(childParents, minlength=numBones)
+    headDrift = np.zeros(numBones)
+    if animation is None or animation.numFrames == 0 or len(children) == 0:
+        return BoneConnectAnalysis(parents, numChildren, headDrift)
 
-def readString(file: BinaryIO) -> str:
-    return JAStringhelper.decode(struct.unpack("64s", file.read(JAG2Constants.MAX_QPATH))[0])
-
-
-class MdxaHeader:
-
-    def __init__(self):
-        self.name = ""
-        self.scale = 1  # does not seem to be used by Jedi Academy anyway - or is it? I need it in import!
-        self.numFrames = -1
-        self.ofsFrames = -1
-        self.numBones = -1
-        self.ofsCompBonePool = -1
-        # this is also MdxaSkelOffsets.baseOffset + MdxaSkelOffsets.boneOffsets[0] - probably a historic leftover
-        self.ofsSkel = -1
-        self.ofsEnd = -1
-
-    def loadFromFile(self, file: BinaryIO) -> Tuple[bool, ErrorMessage]:
-        # check ident
-        ident, = struct.unpack("4s", file.read(4))
-        if ident != JAG2Constants.GLA_IDENT:
-            print("File does not start with ", JAG2Constants.GLA_IDENT,
-                  " but ", ident, " - no GLA!")
-            return False, ErrorMessage("Is no GLA file, incorrect file identifier!")
-        version, = struct.unpack("i", file.read(4))
-        if version != JAG2Constants.GLA_VERSION:
-            return False, ErrorMessage(f"Wrong gla file version! {version} should be {JAG2Constants.GLA_VERSION}")
-        self.name = readString(file)
-        self.scale, self.numFrames, self.ofsFrames, self.numBones, self.ofsCompBonePool, self.ofsSkel, self.ofsEnd = struct.unpack(
-            "f6i", file.read(7 * 4))
-        print("Scale: {:.3f}".format(self.scale))
-        return True, NoError
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        file.write(struct.pack("4si64sf6i", JAG2Constants.GLA_IDENT, JAG2Constants.GLA_VERSION, self.name.encode(
-        ), self.scale, self.numFrames, self.ofsFrames, self.numBones, self.ofsCompBonePool, self.ofsSkel, self.ofsEnd))
-
-
-class MdxaBoneOffsets:
-
-    def __init__(self):
-        self.baseOffset: int = 2 * 4 + 64 + 4 * 7  # sizeof header
-        self.boneOffsets: List[int] = []
-
-    # fail-safe (except for exceptions)
-    def loadFromFile(self, file: BinaryIO, numBones: int):
-        assert (self.baseOffset == file.tell())
-        for i in range(numBones):
-            self.boneOffsets.append(struct.unpack("i", file.read(4))[0])
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        assert (file.tell() == self.baseOffset)  # must be after header
-        for offset in self.boneOffsets:
-            file.write(struct.pack("i", offset))
-
-# originally called MdxaSkel_t, but I find that name misleading
-
-
-# whether auto-connecting boneIndex to parentIndex would faithfully reproduce its animation: a
-# connected bone is rigidly attached to its parent - its head, expressed in the parent's own
-# current local frame, never moves from where it sits at rest; only its own rotation can vary.
-# So this checks whether the bone's head, re-expressed in the parent's frame each frame, ever
-# drifts from that bind-pose-relative position. If it does, the bone needs independent
-# translation that use_connect can't represent. transformsPerFrame is
-# MdxaAnimation.computeAbsoluteFrameTransforms's output; an empty list (no animation data
-# available) means there's nothing to check against, so it's fine to connect.
-def _boneCanConnect(transformsPerFrame: List[Dict[int, "mathutils.Matrix"]], allBones: List["MdxaBone"], boneIndex: int, parentIndex: int) -> bool:
     # rest pose is just the frame where the compressed offset is identity, so put it through the
-    # same GLABoneRotToBlender conversion computeAbsoluteFrameTransforms applies to every other
-    # frame's combined (offset @ basePoseMat) - otherwise the two are in different coordinate
-    # conventions and every comparison shows a large constant offset instead of a real signal.
-    childBase = allBones[boneIndex].basePoseMat.toBlender()
-    parentBase = allBones[parentIndex].basePoseMat.toBlender()
-    JAG2Math.GLABoneRotToBlender(childBase)
-    JAG2Math.GLABoneRotToBlender(parentBase)
-    restRelativeHead = vector_overload_cast(parentBase.inverted() @ mathutils.Vector(childBase.translation))  # pyright: ignore [reportArgumentType]  # vector supports slices
-    for transforms in transformsPerFrame:
-        parentTransform = transforms[parentIndex]
-        childHead = mathutils.Vector(transforms[boneIndex].translation)  # pyright: ignore [reportArgumentType]  # vector supports slices
-        relativeHead = vector_overload_cast(parentTransform.inverted() @ childHead)
-        if (relativeHead - restRelativeHead).length > JAG2Constants.BONE_TRANSLATION_ERROR_MARGIN:
-            return False
-    return True
-
-
-class MdxaBone:
-    def __init__(self):
-        self.name = ""
-        self.flags: int = 0
-        self.parent: int = -1
-        self.basePoseMat = JAG2Math.Matrix()
-        self.basePoseMatInv = JAG2Math.Matrix()
-        self.numChildren = 0
-        self.children: List[int] = []
-        # not saved, filled by loadBonesFromFile() and when loaded from blender
-        self.index: int = -1
-
-    def getSize(self) -> int:
-        return struct.calcsize("64sIi12f12fi{}i".format(self.numChildren))
-
-    def loadFromFile(self, file: BinaryIO) -> None:
-        self.name = readString(file)
-        self.flags, self.parent = struct.unpack("Ii", file.read(2 * 4))
-        self.basePoseMat.loadFromFile(file)
-        self.basePoseMatInv.loadFromFile(file)
-        self.numChildren, = struct.unpack("i", file.read(4))
-        for _ in range(self.numChildren):
-            self.children.append(struct.unpack("i", file.read(4))[0])
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        file.write(struct.pack(
-            "64sIi", self.name.encode(), self.flags, self.parent))
-        self.basePoseMat.saveToFile(file)
-        self.basePoseMatInv.saveToFile(file)
-        file.write(struct.pack("i", self.numChildren))
-        assert (len(self.children) == self.numChildren)
-        for child in self.children:
-            file.write(struct.pack("i", child))
-
-    def loadFromBlender(self, editbone: bpy.types.EditBone, boneIndicesByName: Dict[str, int], bones: List["MdxaBone"], objLocalMat: mathutils.Matrix) -> None:
-        # set name
-        self.name = editbone.name
-
-        # add index to dictionary
-        boneIndicesByName[self.name] = self.index
-
-        # parent is -1 by default - change if there is one.
-        if editbone.parent != None:
-            self.parent = boneIndicesByName[editbone.parent.name]
-            parent = bones[self.parent]
-            parent.numChildren += 1
-            parent.children.append(self.index)
-
-        # save (inverted) base pose matrix
-        mat = matrix_overload_cast(objLocalMat @ matrix_getter_cast(editbone.matrix))
-        # must not be used for blender-internal calculations anymore!
-        JAG2Math.BlenderBoneRotToGLA(mat)
-        matInv = mat.inverted()
-        self.basePoseMat.fromBlender(mat)
-        self.basePoseMatInv.fromBlender(matInv)
-
-    # blenderBonesSoFar is a dictionary of boneIndex -> BlenderBone
-    # allBones is the list of all MdxaBones
-    # use it to set up hierarchy and add yourself once done.
-    def saveToBlender(self, armature: bpy.types.Armature, blenderBonesSoFar: Dict[int, bpy.types.EditBone], allBones: List["MdxaBone"], skeletonFixes: JAG2Constants.SkeletonFixes, transformsPerFrame: List[Dict[int, "mathutils.Matrix"]]) -> None:
-        # create bone
-        bone = armature.edit_bones.new(self.name)
-
-        # set position
-        mat = self.basePoseMat.toBlender()
-        pos = mathutils.Vector(mat.translation)  # pyright: ignore [reportArgumentType]  # vector supports slices
-        bone.head = pos
-        # head is offset a bit.
-        # X points towards next bone.
-        x_axis = mathutils.Vector(mat.col[0][0:3])  # pyright: ignore [reportArgumentType]  # vector supports slices
-        bone.tail = pos + x_axis * JAG2Constants.BONELENGTH
-        # set roll
-        y_axis = -mathutils.Vector(mat.col[1][0:3])  # pyright: ignore [reportArgumentType]  # vector supports slices
-        bone.align_roll(y_axis)
-
-        # set parent, if any, keeping in mind it might be overwritten
-        parentIndex = self.parent
-        parentChanges = JAG2Constants.PARENT_CHANGES[skeletonFixes]
-        if self.index in parentChanges:
-            parentIndex = parentChanges[self.index]
-        if parentIndex != -1:
-            blenderParent = blenderBonesSoFar[parentIndex]
-            bone.parent = blenderParent
-
-            # how many children does the parent have?
-            numParentChildren = allBones[parentIndex].numChildren
-            # we actually need to take into account the hierarchy changes.
-            # so for any bone that used to have this parent but does not anymore, remove one
-            for mdxaBone in allBones:
-                # if a bone gets its parent changed, and it used to be "my" parent, my parent has one child less.
-                if mdxaBone.parent == parentIndex and mdxaBone.index in parentChanges:
-                    numParentChildren -= 1
-            assert (numParentChildren >= 0)
-            # and for any bone that got this as the parent, add one child.
-            for _, newParentIndex in parentChanges.items():
-                if newParentIndex == parentIndex:
-                    numParentChildren += 1
-            assert (numParentChildren > 0)  # at least this bone is child.
-
-            # if this is the only child of its parent or has priority: Connect the parent to this.
-            if numParentChildren == 1 or self.name in JAG2Constants.PRIORITY_BONES[skeletonFixes]:
-                # but only if that doesn't rotate the bone (much) - check this first since it's
-                # much cheaper than _boneCanConnect below (which loops over every frame)
-                # so calculate the directions...
-                oldDir = vector_getter_cast(blenderParent.tail) - vector_getter_cast(blenderParent.head)
-                newDir = pos - blenderParent.head
-                oldDir.normalize()
-                newDir.normalize()
-                dotProduct = oldDir.dot(newDir)
-                # ... and compare them using the dot product, which is the cosine of the angle between two unit vectors
-                if dotProduct > JAG2Constants.BONE_ANGLE_ERROR_MARGIN:
-                    # and only if the animation doesn't need this bone to translate independently
-                    # of its parent - use_connect rigidly locks the head to the parent's tail,
-                    # which would silently clip such translation on reimport.
-                    if _boneCanConnect(transformsPerFrame, allBones, self.index, parentIndex):
-                        blenderParent.tail = pos
-                        bone.use_connect = True
-
-        # save to created bones
-        blenderBonesSoFar[self.index] = bone
-
-
-class MdxaSkel:
-    def __init__(self):
-        self.bones: List[MdxaBone] = []
-        self.armature = None
-        self.armatureObject = None
-
-    def loadFromFile(self, file: BinaryIO, offsets: MdxaBoneOffsets):
-        for i, offset in enumerate(offsets.boneOffsets):
-            file.seek(offsets.baseOffset + offset)
-            bone = MdxaBone()
-            bone.loadFromFile(file)
-            bone.index = i
-            self.bones.append(bone)
-
-    def saveToFile(self, file: BinaryIO, header: MdxaHeader):
-        assert (file.tell() == header.ofsSkel)
-        for bone in self.bones:
-            bone.saveToFile(file)
-
-    def fitsArmature(self, armature) -> Tuple[bool, ErrorMessage]:
-        for bone in self.bones:
-            if not bone.name in armature.bones:
-                return False, ErrorMessage(f"Bone {bone.name} not found in existing skeleton_root armature!")
-        return True, NoError
-
-    def saveToBlender(self, scene_root: bpy.types.Object, skeletonFixes: JAG2Constants.SkeletonFixes, animation: Optional["MdxaAnimation"] = None) -> Tuple[bool, ErrorMessage]:
-        # computed once up front (not per-bone) since it doesn't depend on Blender bone state -
-        # see MdxaBone.saveToBlender/_boneCanConnect for why it's needed.
-        transformsPerFrame = animation.computeAbsoluteFrameTransforms(self) if animation is not None else []
-
-        #  Creation
-        # create armature
-        self.armature = bpy.data.armatures.new("skeleton_root")
-        # create object
-        self.armature_object = bpy.data.objects.new(
-            "skeleton_root", self.armature)
-        # set parent
-        self.armature_object.parent = scene_root
-        # link object to scene
-        assert bpy.context.scene is not None
-        bpy.context.scene.collection.objects.link(self.armature_object)
-
-        #  Set the armature as active and go to edit mode to add bones
-        assert bpy.context.view_layer is not None
-        bpy.context.view_layer.objects.active = self.armature_object
-        bpy.ops.object.mode_set(mode='EDIT')
-        # list of indices of already created bones - only those bones with this as parent will be added
-        createdBonesIndices = [-1]
-        # bones yet to be created
-        uncreatedBones = list(self.bones)
-        parentChanges = JAG2Constants.PARENT_CHANGES[skeletonFixes]
-        # Blender EditBones so far by index
-        blenderEditBones: Dict[int, bpy.types.EditBone] = {}
-        while len(uncreatedBones) > 0:
-            # whether a new bone was created this time - if not, there's a hierarchy problem
-            createdBone = False
-            newUncreatedBones = []
-            for bone in uncreatedBones:
-                # only create those bones whose parent has already been created.
-                if bone.index in parentChanges:
-                    parent = parentChanges[bone.index]
-                else:
-                    parent = bone.parent
-                if parent in createdBonesIndices:
-                    bone.saveToBlender(
-                        self.armature, blenderEditBones, self.bones, skeletonFixes, transformsPerFrame)
-                    createdBonesIndices.append(bone.index)
-                    createdBone = True
-                else:
-                    newUncreatedBones.append(bone)
-            uncreatedBones = newUncreatedBones
-            if not createdBone:
-                bpy.ops.object.mode_set(mode='OBJECT')
-                return False, ErrorMessage("gla has hierarchy problems!")
-        # leave armature edit mode
-        bpy.ops.object.mode_set(mode='OBJECT')
-        return True, NoError
-
-
-class MdxaFrame:
-    def __init__(self):
-        self.boneIndices: List[int] = []
-
-    # returns the highest referenced index - not nice from a design standpoint but saves space, which is probably good.
-    def loadFromFile(self, file, numBones):
-        maxIndex = 0
-        for i in range(numBones):
-            # bone indices are only 3 bytes long - with 20k+ frames 25% less is quite a bit, reportedly.
-            index, = struct.unpack("I", file.read(3) + b"\0")
-            maxIndex = max(maxIndex, index)
-            self.boneIndices.append(index)
-        return maxIndex
-
-    def saveToFile(self, file):
-        for index in self.boneIndices:
-            # only write the first 3 bytes of the packed number
-            file.write(struct.pack("I", index)[:3])
-
-
-class MdxaBonePool:
-    def __init__(self):
-        # during import, this is a list of CompBone objects
-        # during exports, it's a list of 14-byte-objects (compressed bones)
-        self.bones: List[JAG2Math.CompBone] | List[bytes] = []
-
-    def loadFromFile(self, file, numCompBones):
-        for i in range(numCompBones):
-            compBone = JAG2Math.CompBone.loadFromFile(file)
-            downcast(List[JAG2Math.CompBone], self.bones).append(compBone)
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        for bone in downcast(List[bytes], self.bones):
-            file.write(bone)
-
-# Frames & Compressed Bone Pool
-
-
-class MdxaAnimation:
-    def __init__(self):
-        self.frames: List[MdxaFrame] = []
-        self.bonePool = MdxaBonePool()
-
-    def loadFromFile(self, file: BinaryIO, header: MdxaHeader, startFrame: int, numFrames: int) -> Tuple[bool, ErrorMessage]:
-        # read frames
-        if file.tell() != header.ofsFrames:
-            print("Info: Frames in .gla not encountered when expected (at ", file.tell(), " instead of ", header.ofsFrames,
-                  "), seeking correct position. There could be a bug in the importer (bad) or the file could be unusual - but not necessarily wrong (no problem).", sep="")
-            file.seek(header.ofsFrames)
-
-        # prepare frame start/end settings
-        if numFrames == -1:
-            assert (startFrame == 0)
-            numFrames = header.numFrames
+    # same GLA_TO_BLENDER_BONE conversion every other frame's combined (offset @ basePoseMat) gets -
+    # otherwise the two are in different coordinate conventions and every comparison shows a
+    # large constant offset instead of a real signal.
+    restPoses = skeleton.getBasePoses() @ GLA_TO_BLENDER_BONE
+    restRelativeHeads = np.linalg.solve(restPoses[childParents], restPoses[children, :, 3:])[..., 0]
+    poolMatrices = JAG2GLAFormat.decompressBones(animation.bonePool)
+    rows = np.unique(animation.frames, axis=0)
+    for start in range(0, len(rows), CONNECT_ANALYSIS_CHUNK_FRAMES):
+        transforms = MdxaAnimation.computeBoneTransforms(rows[start:start + CONNECT_ANALYSIS_CHUNK_FRAMES], skeleton, poolMatrices) @ GLA_TO_BLENDER_BONE
+        relativeHeads = np.linalg.solve(transforms[:, childParents], transforms[:, children, :, 3:])[..., 0]
+        drift = np.linalg.norm(relativeHeads - restRelativeHeads, axis=-1).max(axis=0)
+        headDrift[children] = np.maximum(headDrift[children], drift)
+    return BoneConnectAnalysis(parents, numChildren, headDrift)
+
+
+# creates a bone from an editbone whose parent (if any) has already been added to bones.
+def boneFromBlender(editbone: bpy.types.EditBone, index: int, boneIndicesByName: Dict[str, int], bones: List[MdxaBone], objLocalMat: mathutils.Matrix) -> MdxaBone:
+    bone = MdxaBone()
+    bone.index = index
+    # set name
+    bone.name = editbone.name
+
+    # add index to dictionary
+    boneIndicesByName[bone.name] = bone.index
+
+    # parent is -1 by default - change if there is one.
+    if editbone.parent != None:
+        bone.parent = boneIndicesByName[editbone.parent.name]
+        bones[bone.parent].children.append(bone.index)
+
+    # save (inverted) base pose matrix
+    mat = matrix_overload_cast(objLocalMat @ matrix_getter_cast(editbone.matrix))
+    # must not be used for blender-internal calculations anymore!
+    JAG2Math.BlenderBoneRotToGLA(mat)
+    bone.basePoseMat = fromBlenderMatrix(mat)[:3].astype(np.float32)
+    bone.basePoseMatInv = fromBlenderMatrix(mat.inverted())[:3].astype(np.float32)
+    return bone
+
+
+# blenderBonesSoFar is a dictionary of boneIndex -> BlenderBone
+# use it to set up hierarchy and add the bone once done.
+def _boneToBlender(bone: MdxaBone, armature: bpy.types.Armature, blenderBonesSoFar: Dict[int, bpy.types.EditBone], skeletonFixes: JAG2Constants.SkeletonFixes, connections: BoneConnectAnalysis) -> None:
+    # create bone
+    editBone = armature.edit_bones.new(bone.name)
+
+    # set position
+    mat = toBlenderMatrix(bone.basePoseMat)
+    pos = mathutils.Vector(mat.translation)  # pyright: ignore [reportArgumentType]  # vector supports slices
+    editBone.head = pos
+    # head is offset a bit.
+    # X points towards next bone.
+    x_axis = mathutils.Vector(mat.col[0][0:3])  # pyright: ignore [reportArgumentType]  # vector supports slices
+    editBone.tail = pos + x_axis * JAG2Constants.BONELENGTH
+    # set roll
+    y_axis = -mathutils.Vector(mat.col[1][0:3])  # pyright: ignore [reportArgumentType]  # vector supports slices
+    editBone.align_roll(y_axis)
+
+    # set parent, if any, keeping in mind it might have been changed
+    parentIndex = int(connections.parents[bone.index])
+    if parentIndex != -1:
+        blenderParent = blenderBonesSoFar[parentIndex]
+        editBone.parent = blenderParent
+
+        # if this is the only child of its parent (after the hierarchy changes) or has priority: Connect the parent to this.
+        if connections.numChildren[parentIndex] == 1 or bone.name in JAG2Constants.PRIORITY_BONES[skeletonFixes]:
+            # but only if that doesn't rotate the bone (much)
+            # so calculate the directions...
+            oldDir = vector_getter_cast(blenderParent.tail) - vector_getter_cast(blenderParent.head)
+            newDir = pos - blenderParent.head
+            oldDir.normalize()
+            newDir.normalize()
+            dotProduct = oldDir.dot(newDir)
+            # ... and compare them using the dot product, which is the cosine of the angle between two unit vectors
+            if dotProduct > JAG2Constants.BONE_ANGLE_ERROR_MARGIN:
+                # and only if the animation doesn't need this bone to translate independently
+                # of its parent - use_connect rigidly locks the head to the parent's tail,
+                # which would silently clip such translation on reimport.
+                if connections.canConnect(bone.index):
+                    blenderParent.tail = pos
+                    editBone.use_connect = True
+
+    # save to created bones
+    blenderBonesSoFar[bone.index] = editBone
+
+
+def fitsArmature(skeleton: MdxaSkel, armature) -> Tuple[bool, ErrorMessage]:
+    for bone in skeleton.bones:
+        if not bone.name in armature.bones:
+            return False, ErrorMessage(f"Bone {bone.name} not found in existing skeleton_root armature!")
+    return True, NoError
+
+
+# creates the skeleton_root armature object
+def skeletonToBlender(skeleton: MdxaSkel, scene_root: bpy.types.Object, skeletonFixes: JAG2Constants.SkeletonFixes, animation: Optional[MdxaAnimation] = None) -> Tuple[Optional[bpy.types.Object], ErrorMessage]:
+    # computed once up front (not per-bone) since it doesn't depend on Blender bone state -
+    # see _boneToBlender/analyzeBoneConnections for why it's needed.
+    with MrwProfiler.span("analyzing bone connections"):
+        try:
+            connections = analyzeBoneConnections(skeleton, skeletonFixes, animation)
+        except GLAFormatError as e:
+            return None, ErrorMessage(str(e))
+
+    #  Creation
+    # create armature
+    armature = bpy.data.armatures.new("skeleton_root")
+    # create object
+    armature_object = bpy.data.objects.new(
+        "skeleton_root", armature)
+    # set parent
+    armature_object.parent = scene_root
+    # link object to scene
+    assert bpy.context.scene is not None
+    bpy.context.scene.collection.objects.link(armature_object)
+
+    #  Set the armature as active and go to edit mode to add bones
+    assert bpy.context.view_layer is not None
+    bpy.context.view_layer.objects.active = armature_object
+    bpy.ops.object.mode_set(mode='EDIT')
+    # indices of already created bones - only those bones with this as parent will be added
+    createdBonesIndices = {-1}
+    # bones yet to be created
+    uncreatedBones = list(skeleton.bones)
+    # Blender EditBones so far by index
+    blenderEditBones: Dict[int, bpy.types.EditBone] = {}
+    while len(uncreatedBones) > 0:
+        # whether a new bone was created this time - if not, there's a hierarchy problem
+        createdBone = False
+        newUncreatedBones = []
+        for bone in uncreatedBones:
+            # only create those bones whose parent has already been created.
+            if connections.parents[bone.index] in createdBonesIndices:
+                _boneToBlender(bone, armature, blenderEditBones, skeletonFixes, connections)
+                createdBonesIndices.add(bone.index)
+                createdBone = True
+            else:
+                newUncreatedBones.append(bone)
+        uncreatedBones = newUncreatedBones
+        if not createdBone:
+            bpy.ops.object.mode_set(mode='OBJECT')
+            return None, ErrorMessage("gla has hierarchy problems!")
+    # leave armature edit mode
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return armature_object, NoError
+
+
+# live playback computes poses this many frames at a time, and keeps this many of those blocks around
+LIVE_PLAYBACK_BLOCK_FRAMES = 64
+LIVE_PLAYBACK_CACHED_BLOCKS = 64
+# poses of this many frames get computed at once when keyframing an animation, to limit memory use and so a modal
+# import gets control back often enough
+POSE_CHUNK_FRAMES = 1 << 10
+# when reducing keyframes, how far the keyed curves may stray from the animation: half of what the .gla can store, so the
+# reduced animation exports to nearly the same compressed bones
+KEYFRAME_LOCATION_TOLERANCE = JAG2Constants.COMPBONE_LOCATION_QUANTUM / 2
+KEYFRAME_ROTATION_TOLERANCE = 0.5 / JAG2GLAFormat.COMPBONE_QUAT_STEPS_PER_UNIT
+
+
+# turns frames of the animation into pose bone locations and rotations for the given armature object
+class PoseSolver:
+    def __init__(self, skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object):
+        self.skeleton = skeleton
+        self.animation = animation
+        self.poolMatrices = JAG2GLAFormat.decompressBones(animation.bonePool)
+
+        assert armatureObject.pose is not None
+        armature = downcast(bpy.types.Armature, armatureObject.data)
+        # the pose bone of each GLA bone
+        self.poseBoneIndices = np.array([armatureObject.pose.bones.find(bone.name) for bone in skeleton.bones], dtype=np.int64)
+        # the GLA bones, followed by the bones they're parented to in Blender that aren't part of the GLA, like the
+        # control bones of a rig the animation gets imported onto, and their parents in turn
+        bones = [armature.bones[bone.name] for bone in skeleton.bones]
+        indexByName = {bone.name: index for index, bone in enumerate(bones)}
+        for bone in bones:
+            if bone.parent is not None and bone.parent.name not in indexByName:
+                indexByName[bone.parent.name] = len(bones)
+                bones.append(bone.parent)
+        # parents as set up in Blender, which may differ from the GLA's (see JAG2Constants.PARENT_CHANGES);
+        # -1 conveniently picks the identity matrix appended to the bones below
+        self.parents = np.array([-1 if bone.parent is None else indexByName[bone.parent.name] for bone in bones], dtype=np.int64)
+        rest = np.empty((len(bones) + 1, 4, 4))
+        rest[:-1] = [fromBlenderMatrix(matrix_getter_cast(bone.matrix_local)) for bone in bones]
+        rest[-1] = np.eye(4)
+        # the rest poses relative to the parents'
+        self.relativeRest = np.linalg.inv(rest[self.parents]) @ rest[:-1]
+        self.invRelativeRest = np.linalg.inv(self.relativeRest)
+        # Blender ignores the location of connected bones
+        self.connected = [bone.use_connect for bone in bones]
+        # the bones that aren't part of the GLA keep their current pose
+        self.otherBases = [fromBlenderMatrix(matrix_getter_cast(armatureObject.pose.bones[bone.name].matrix_basis)) for bone in bones[len(skeleton.bones):]]
+        for basis, bone in zip(self.otherBases, bones[len(skeleton.bones):]):
+            if bone.use_connect:
+                basis[:3, 3] = 0
+        # parents first
+        self.hierarchyOrder: List[int] = []
+        added = {-1}
+        while len(self.hierarchyOrder) < len(bones):
+            for index, parent in enumerate(self.parents.tolist()):
+                if parent in added and index not in added:
+                    self.hierarchyOrder.append(index)
+                    added.add(index)
+
+    # the local pose channels that put the bones where the frames have them, as if each pose bone's matrix had been set in
+    # hierarchy order: a pose bone's matrix is its parent's matrix @ its rest pose relative to the parent's @ its
+    # matrix_basis, of which only location and rotation are kept, so each bone depends on its parent's actual pose.
+    def computePoses(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # identical frames (holds, loops) pose identically, so only the distinct ones get solved
+        rows, rowOfFrame = np.unique(self.animation.frames[frames], axis=0, return_inverse=True)
+        MrwProfiler.count("identical frames skipped", len(frames) - len(rows))
+        numFrames, numBones = len(rows), len(self.skeleton.bones)
+        transforms = MdxaAnimation.computeBoneTransforms(rows, self.skeleton, self.poolMatrices) @ GLA_TO_BLENDER_BONE
+        locations = np.empty((numFrames, numBones, 3))
+        rotations = np.empty((numFrames, numBones, 4))
+        # the resulting pose bone matrices, and the identity matrix the roots' parent index -1 picks
+        poses = np.empty((numFrames, len(self.parents) + 1, 4, 4))
+        poses[:, -1] = np.eye(4)
+        for index in self.hierarchyOrder:
+            parentPose = poses[:, self.parents[index]]
+            if index >= numBones:
+                poses[:, index] = parentPose @ self.relativeRest[index] @ self.otherBases[index - numBones]
+                continue
+            basis = self.invRelativeRest[index] @ np.linalg.inv(parentPose) @ transforms[:, index]
+            locations[:, index] = basis[:, :3, 3]
+            rotations[:, index] = JAG2GLAFormat.matricesToQuaternions(basis)
+            poses[:, index] = parentPose @ self.relativeRest[index] @ JAG2GLAFormat.quaternionsToMatrices(
+                rotations[:, index], np.zeros(3) if self.connected[index] else locations[:, index])
+        rowOfFrame = rowOfFrame.ravel()
+        return locations[rowOfFrame], rotations[rowOfFrame]
+
+    # computePoses for any number of frames, a chunk at a time
+    def computeAllPosesSteps(self, frames: np.ndarray) -> Steps[Tuple[np.ndarray, np.ndarray]]:
+        numFrames, numBones = len(frames), len(self.skeleton.bones)
+        locations = np.empty((numFrames, numBones, 3))
+        rotations = np.empty((numFrames, numBones, 4))
+        for start in range(0, numFrames, POSE_CHUNK_FRAMES):
+            end = min(start + POSE_CHUNK_FRAMES, numFrames)
+            locations[start:end], rotations[start:end] = self.computePoses(frames[start:end])
+            yield end / numFrames
+        return locations, rotations
+
+    # keyframes the animation frames at the scene frames into a new action, without touching the armature - the action
+    # still needs to be assigned (see JAAnimationhelper.assignAction) or put on an NLA strip.
+    # reduceKeyframes only keeps the keys linear interpolation can't stand in for (see JAAnimationhelper.reduceKeyframes).
+    def createAction(self, name: str, animationFrames: np.ndarray, sceneFrames: np.ndarray, reduceKeyframes: bool = False) -> bpy.types.Action:
+        return finishSteps(self.createActionSteps(name, animationFrames, sceneFrames, reduceKeyframes))
+
+    def createActionSteps(self, name: str, animationFrames: np.ndarray, sceneFrames: np.ndarray, reduceKeyframes: bool = False) -> Steps[bpy.types.Action]:
+        # roughly how the time is spent
+        posesEnd, reductionEnd = (0.5, 0.8) if reduceKeyframes else (0.7, 0.7)
+        locations, rotations = yield from progressBetween(self.computeAllPosesSteps(animationFrames), 0, posesEnd)
+        # keep neighbouring frames in the same hemisphere so the interpolation takes the short way
+        flips = np.sum(rotations[1:] * rotations[:-1], axis=-1) < 0
+        signs = np.concatenate([np.ones((1,) + flips.shape[1:]), np.cumprod(np.where(flips, -1, 1), axis=0)])
+        rotations *= signs[..., np.newaxis]
+
+        # location x, y, z and rotation w, x, y, z of each bone
+        numFrames, numBones = locations.shape[:2]
+        channels = np.concatenate([locations, rotations], axis=-1).reshape(numFrames, numBones * 7)
+        if reduceKeyframes:
+            tolerance = np.tile([KEYFRAME_LOCATION_TOLERANCE] * 3 + [KEYFRAME_ROTATION_TOLERANCE] * 4, numBones)
+            keep, channels = yield from progressBetween(JAAnimationhelper.reduceKeyframesSteps(channels, tolerance), posesEnd, reductionEnd)
         else:
-            print("Reading {} frames, starting at {}".format(
-                numFrames, startFrame))
-        if startFrame >= header.numFrames:
-            print("Warning: StartFrame beyond existing frames, using last one")
-            startFrame = header.numFrames - 1
-            numFrames = 1
-        if startFrame + numFrames > header.numFrames:
-            print("Warning: Trying to import more frames than there are, fixing")
-            numFrames = header.numFrames - startFrame
-        # skip first startFrame frames
-        # 1 = from current position
-        file.seek(startFrame * 3 * header.numBones, 1)
-
-        # read (remaining) frames
-        maxIndex = -1
-        for i in range(numFrames):
-            frame = MdxaFrame()
-            # loadFromFile returns highest read index
-            maxIndex = max(maxIndex, frame.loadFromFile(file, header.numBones))
-            self.frames.append(frame)
-
-        # read compressed bone pool
-        # see if we reached it yet
-        curPos = file.tell()
-        if curPos != header.ofsCompBonePool:
-            # we're not yet there. If we're off by 0-3 bytes, it's because 32-bit-alignment is forced. Silently seek correct position. Otherwise: warn (and seek correct position, too)
-            # if we're only importing some frames, we may or may not be there yet, of course, so don't warn.
-            if curPos > header.ofsCompBonePool or (header.ofsCompBonePool > curPos + 3 and numFrames == header.numFrames):
-                print("Info: Bone Pool in .gla not encountered when expected (at ", file.tell(), " instead of ", header.ofsCompBonePool,
-                      "), seeking correct position. There could be a bug in the importer (bad) or the file could be unusual - but not necessarily wrong (no problem).", sep="")
-            file.seek(header.ofsCompBonePool)
-        # there's one more object than the highest index since those start at 0
-        self.bonePool.loadFromFile(file, maxIndex + 1)
-
-        # file should be over now, bone pool is usually the last thing. I'm not sure it has to be, but so far it has always been.
-        if file.tell() != header.ofsEnd and numFrames == header.numFrames:
-            print(
-                "Info: .gla Bone Pool read but file not over yet - this likely indicates a problem.")
-        return True, NoError
-
-    # bones in parent-first order - shared by saveToBlender and computeAbsoluteFrameTransforms.
-    @staticmethod
-    def _hierarchyOrder(skeleton: MdxaSkel) -> List[int]:
-        hierarchyOrder: List[int] = []
-        while len(hierarchyOrder) < len(skeleton.bones):
-            addedSomething = False
-            for bone in skeleton.bones:
-                if bone.index in hierarchyOrder:
-                    continue
-                if bone.parent != -1 and bone.parent not in hierarchyOrder:
-                    continue
-                hierarchyOrder.append(bone.index)
-                addedSomething = True
-            assert (addedSomething)
-        return hierarchyOrder
-
-    # for each frame, each bone's absolute (armature-space, Blender-convention) posed transform,
-    # via the same forward-kinematics math applied to actual Blender pose bones in saveToBlender
-    # below - but pure Python, so it can run before any Blender armature exists (used to decide
-    # auto-connect behavior ahead of bone creation, see MdxaBone.saveToBlender/_boneCanConnect).
-    # Memory: measured against real production skeletons (headless Blender, resource.getrusage
-    # RSS) - _humanoid-ja.gla (53 bones, 21376 frames) costs ~193MB for the returned structure,
-    # _humanoid-jk2.gla (72 bones, 17278 frames) ~196MB - both well under 1GB, and it's transient:
-    # the caller (MdxaSkel.saveToBlender) only keeps this in a local variable for the duration of
-    # bone creation, not for the lifetime of the import.
-    def computeAbsoluteFrameTransforms(self, skeleton: MdxaSkel) -> List[Dict[int, mathutils.Matrix]]:
-        if not self.frames:
-            return []
-        hierarchyOrder = self._hierarchyOrder(skeleton)
-        basePoses = [bone.basePoseMat.toBlender() for bone in skeleton.bones]
-        compBones = downcast(List[JAG2Math.CompBone], self.bonePool.bones)
-        result: List[Dict[int, mathutils.Matrix]] = []
-        for frame in self.frames:
-            absoluteOffsets: Dict[int, mathutils.Matrix] = {}
-            transforms: Dict[int, mathutils.Matrix] = {}
-            for index in hierarchyOrder:
-                bone = skeleton.bones[index]
-                offset = compBones[frame.boneIndices[index]].matrix
-                if bone.parent != -1:
-                    offset = matrix_overload_cast(absoluteOffsets[bone.parent] @ offset)
-                absoluteOffsets[index] = offset
-                transformation = matrix_overload_cast(offset @ basePoses[index])
-                JAG2Math.GLABoneRotToBlender(transformation)
-                transforms[index] = transformation
-            result.append(transforms)
-        return result
-
-    def saveToFile(self, file: BinaryIO, header: MdxaHeader):
-        assert (file.tell() == header.ofsFrames)
-        for frame in self.frames:
-            frame.saveToFile(file)
-        # add padding if not 32 bit aligned (due to 3-byte-indices)
-        if file.tell() % 4 != 0:
-            # from_what = 1 -> from current position
-            file.seek(4 - (file.tell() % 4), 1)
-        assert (file.tell() == header.ofsCompBonePool)
-        self.bonePool.saveToFile(file)
-
-    def saveToBlender(self, skeleton: MdxaSkel, armature: bpy.types.Object, scale):
-        import time
-        startTime = time.time()
-        #   Bone Position Set Order
-        # bones have to be set in hierarchical order - their position depends on their parent's absolute position, after all.
-        # so this is the order in which bones have to be processed.
-        hierarchyOrder = self._hierarchyOrder(skeleton)
-        # for going leaf to root
-
-        #   Blender PoseBones list
-        assert armature.pose is not None
-        bones: List[bpy.types.PoseBone] = []
-        for info in skeleton.bones:  # is ordered by index
-            bones.append(armature.pose.bones[info.name])
-
-        basePoses: List[mathutils.Matrix] = []
-        for bone in skeleton.bones:
-            basePoses.append(bone.basePoseMat.toBlender())
-
-        #   Prepare animation
-        scene = bpy.context.scene
-        assert scene is not None
-        scene.frame_start = 0
-        numFrames = len(self.frames)
-        scene.frame_end = numFrames - 1
-
-        if scale == 0:
-            # if True:
-            scale = 1
+            keep = np.ones(channels.shape, dtype=bool)
+
+        action = JAAnimationhelper.newAction(name, 'OBJECT')
+        for index, bone in enumerate(self.skeleton.bones):
+            dataPath = 'pose.bones["{}"]'.format(bpy.utils.escape_identifier(bone.name))
+            for channel, (propertyName, component) in enumerate([("location", component) for component in range(3)] +
+                                                           [("rotation_quaternion", component) for component in range(4)]):
+                column = index * 7 + channel
+                JAAnimationhelper.setKeyframes(JAAnimationhelper.newFCurve(action, dataPath + "." + propertyName, component),
+                                               sceneFrames[keep[:, column]], channels[keep[:, column], column])
+            yield reductionEnd + (1 - reductionEnd) * (index + 1) / numBones
+        MrwProfiler.count("frames keyframed", len(sceneFrames))
+        MrwProfiler.count("keyframes", int(np.count_nonzero(keep)))
+        return action
+
+
+# Instead of baking keyframes, keeps the decoded animation in memory and poses the armature from it
+# whenever the current frame changes (see _livePlaybackHandler), so even huge animations can be
+# scrubbed through right after import, and only the parts that are needed get baked.
+class LivePlayback(PoseSolver):
+    def __init__(self, skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object, firstFrame: int):
+        super().__init__(skeleton, animation, armatureObject)
+        # scene frame showing the first animation frame
+        self.firstFrame = firstFrame
+        # block index -> (locations, rotations) of its frames, least recently used first
+        self.cache: OrderedDict[int, Tuple[np.ndarray, np.ndarray]] = OrderedDict()
+
+    # locations (numBones, 3) and rotation quaternions (numBones, 4) of the pose bones in the given animation frame
+    def pose(self, frame: int) -> Tuple[np.ndarray, np.ndarray]:
+        block, offset = divmod(frame, LIVE_PLAYBACK_BLOCK_FRAMES)
+        poses = self.cache.get(block)
+        if poses is None:
+            start = block * LIVE_PLAYBACK_BLOCK_FRAMES
+            poses = self.computePoses(np.arange(start, min(start + LIVE_PLAYBACK_BLOCK_FRAMES, self.animation.numFrames)))
+            self.cache[block] = poses
+            if len(self.cache) > LIVE_PLAYBACK_CACHED_BLOCKS:
+                self.cache.popitem(last=False)
+            MrwProfiler.count("live playback blocks computed")
         else:
-            scale = 1 / scale
-        scaleMatrix = mathutils.Matrix([
-            [scale, 0, 0, 0],
-            [0, scale, 0, 0],
-            [0, 0, scale, 0],
-            [0, 0, 0, 1]
-        ])
-
-        # show progress every 1000 steps, but at least 10 times)
-        progressStep = min(1000, round(numFrames / 10))
-        nextProgressDisplayTime = time.time() + PROGRESS_UPDATE_INTERVAL
-        lastFrameNum = 0
-
-        #   Export animation
-        for frameNum, frame in enumerate(self.frames):
-            # show progress bar / remaining time
-            if time.time() >= nextProgressDisplayTime:
-                numProcessedFrames = frameNum - lastFrameNum
-                framesRemaining = numFrames - frameNum
-                # only take the frames since the last update into account since the speed varies.
-                # speed's roughly inversely proportional to the current frame number so I could use that to predict remaining time...
-                timeRemaining = PROGRESS_UPDATE_INTERVAL * framesRemaining / numProcessedFrames
-
-                print("Frame {}/{} - {:.2%} - remaining time: ca. {:.0f}m {:.0f}s".format(
-                    frameNum, numFrames, frameNum / numFrames, timeRemaining // 60, timeRemaining % 60))
-
-                lastFrameNum = frameNum
-                nextProgressDisplayTime = time.time() + PROGRESS_UPDATE_INTERVAL
-
-            # set current frame
-            scene.frame_set(frameNum)
-
-            # absolute offset matrices by bone index
-            offsets: Dict[int, mathutils.Matrix] = {}
-            for index in hierarchyOrder:
-                bpy.ops.object.mode_set(mode='POSE', toggle=False)
-                mdxaBone = skeleton.bones[index]
-                assert (mdxaBone.index == index)
-                bonePoolIndex = frame.boneIndices[index]
-                # get offset transformation matrix, relative to parent
-                offset = downcast(List[JAG2Math.CompBone], self.bonePool.bones)[bonePoolIndex].matrix
-                # turn into absolute offset matrix (already is if this is top level bone)
-                if mdxaBone.parent != -1:
-                    offset = matrix_overload_cast(offsets[mdxaBone.parent] @ offset)
-                # save this absolute offset for use by children
-                offsets[index] = offset
-                # calculate the actual position
-                transformation = matrix_overload_cast(offset @ basePoses[index])
-                # flip axes as required for blender bone
-                JAG2Math.GLABoneRotToBlender(transformation)
-
-                pose_bone = bones[index]
-                # pose_bone.matrix = transformation * scaleMatrix
-                pose_bone.matrix = transformation
-                # in the _humanoid face, the scale gets changed. that messes the re-export up. FIXME: understand why. Is there a problem?
-                pose_bone.scale = [1, 1, 1]
-                pose_bone.keyframe_insert('location')
-                pose_bone.keyframe_insert('rotation_quaternion')
-                # hackish way to force the matrix to update. FIXME: this seems to slow the process down a lot
-                bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-
-        scene.frame_current = 1
+            self.cache.move_to_end(block)
+        return poses[0][offset], poses[1][offset]
+
+    def animationFrame(self, sceneFrame: int) -> int:
+        return min(max(sceneFrame - self.firstFrame, 0), self.animation.numFrames - 1)
+
+    def apply(self, armatureObject: bpy.types.Object, sceneFrame: int) -> None:
+        assert armatureObject.pose is not None
+        locations, rotations = self.pose(self.animationFrame(sceneFrame))
+        poseBones = armatureObject.pose.bones
+        # bones that aren't in the GLA keep their pose
+        allLocations = np.empty((len(poseBones), 3), dtype=np.float32)
+        poseBones.foreach_get("location", allLocations.ravel())  # pyright: ignore [reportArgumentType]
+        allRotations = np.empty((len(poseBones), 4), dtype=np.float32)
+        poseBones.foreach_get("rotation_quaternion", allRotations.ravel())  # pyright: ignore [reportArgumentType]
+        allLocations[self.poseBoneIndices] = locations
+        allRotations[self.poseBoneIndices] = rotations
+        poseBones.foreach_set("location", allLocations.ravel())  # pyright: ignore [reportArgumentType]
+        poseBones.foreach_set("rotation_quaternion", allRotations.ravel())  # pyright: ignore [reportArgumentType]
+        armatureObject.update_tag()
+
+    # keyframes the scene frames startFrame to endFrame into a new action, which gets assigned to the armature
+    def bake(self, armatureObject: bpy.types.Object, startFrame: int, endFrame: int, reduceKeyframes: bool = False) -> bpy.types.Action:
+        sceneFrames = np.arange(startFrame, endFrame + 1)
+        action = self.createAction("{} {}-{}".format(armatureObject.name, startFrame, endFrame),
+                                   np.clip(sceneFrames - self.firstFrame, 0, self.animation.numFrames - 1), sceneFrames, reduceKeyframes)
+        JAAnimationhelper.assignAction(armatureObject, action)
+        # several ranges may get baked, don't lose the earlier ones when the file is saved
+        action.use_fake_user = True
+        return action
+
+
+# keyframes the whole animation into a new action with the given name, which the armature plays afterwards. Any
+# action it played before is kept, so several animations can be imported onto the same armature.
+def animationToAction(skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object, name: str, reduceKeyframes: bool = False) -> bpy.types.Action:
+    return finishSteps(animationToActionSteps(skeleton, animation, armatureObject, name, reduceKeyframes))
+
+
+def animationToActionSteps(skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object, name: str, reduceKeyframes: bool = False) -> Steps[bpy.types.Action]:
+    scene = bpy.context.scene
+    assert scene is not None
+    scene.frame_start = 0
+    scene.frame_end = animation.numFrames - 1
+    frames = np.arange(animation.numFrames)
+    action = yield from PoseSolver(skeleton, animation, armatureObject).createActionSteps(name, frames, frames, reduceKeyframes)
+    if armatureObject.animation_data is not None and armatureObject.animation_data.action is not None:
+        armatureObject.animation_data.action.use_fake_user = True
+    JAAnimationhelper.assignAction(armatureObject, action)
+    return action
+
+
+# one action per named animation, each on its own NLA strip where the animation starts (in the
+# loaded frames). Timeline markers get added separately by addAnimationMarkers.
+def namedAnimationsToBlender(skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object, animations: Sequence[AnimationConfigEntry],
+                             reduceKeyframes: bool = False) -> None:
+    finishSteps(namedAnimationsToBlenderSteps(skeleton, animation, armatureObject, animations, reduceKeyframes))
+
+
+def namedAnimationsToBlenderSteps(skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object, animations: Sequence[AnimationConfigEntry],
+                                  reduceKeyframes: bool = False) -> Steps[None]:
+    scene = bpy.context.scene
+    assert scene is not None
+    scene.frame_start = 0
+    scene.frame_end = animation.numFrames - 1
+    solver = PoseSolver(skeleton, animation, armatureObject)
+    animationData = armatureObject.animation_data or armatureObject.animation_data_create()
+    assert animationData is not None
+    # an active action would override the strips, keep it around without playing it
+    if animationData.action is not None:
+        animationData.action.use_fake_user = True
+        animationData.action = None
+    track = animationData.nla_tracks.new()
+    track.name = "GLA animations"
+    numFrames = max(sum(entry.length for entry in animations), 1)
+    framesDone = 0
+    for entry in animations:
+        frames = np.arange(entry.start, entry.start + entry.length)
+        action = yield from progressBetween(solver.createActionSteps(entry.name, frames, frames, reduceKeyframes),
+                                            framesDone / numFrames, (framesDone + entry.length) / numFrames)
+        framesDone += entry.length
+        strip = track.strips.new(entry.name, entry.start, action)
+        # strips are at least a frame long, and where two touch, the earlier one wins
+        if entry.length == 1:
+            strip.scale = 0.5
+
+
+# labels the animations with timeline markers, the way GLAMetaExport reads them
+def addAnimationMarkers(animations: Sequence[AnimationConfigEntry]) -> None:
+    scene = bpy.context.scene
+    assert scene is not None
+    for entry in animations:
+        scene.timeline_markers.new(entry.name, frame=entry.start)
+
+
+# armature object name -> its live playback
+livePlaybacks: Dict[str, LivePlayback] = {}
+
+
+# not persistent: the animations aren't saved, so loading another file ends live playback.
+def _livePlaybackHandler(scene: bpy.types.Scene, *args) -> None:
+    for name, playback in list(livePlaybacks.items()):
+        armatureObject = bpy.data.objects.get(name)
+        if armatureObject is None or armatureObject.type != 'ARMATURE':
+            del livePlaybacks[name]
+            continue
+        # baked keyframes take over, live playback resumes once the action is unassigned
+        if armatureObject.animation_data is not None and armatureObject.animation_data.action is not None:
+            continue
+        playback.apply(armatureObject, scene.frame_current)
+
+
+def startLivePlayback(skeleton: MdxaSkel, animation: MdxaAnimation, armatureObject: bpy.types.Object) -> LivePlayback:
+    scene = bpy.context.scene
+    assert scene is not None
+    scene.frame_start = 0
+    scene.frame_end = animation.numFrames - 1
+    if _livePlaybackHandler not in bpy.app.handlers.frame_change_pre:
+        # loading a file removed the handler, any remaining playbacks belong to objects of the previous file
+        livePlaybacks.clear()
+        bpy.app.handlers.frame_change_pre.append(_livePlaybackHandler)
+    playback = LivePlayback(skeleton, animation, armatureObject, 0)
+    livePlaybacks[armatureObject.name] = playback
+    # an existing action would override the live pose, keep it around without playing it
+    if armatureObject.animation_data is not None and armatureObject.animation_data.action is not None:
+        armatureObject.animation_data.action.use_fake_user = True
+        armatureObject.animation_data.action = None
+    playback.apply(armatureObject, scene.frame_current)
+    return playback
+
+
+# ends all live playback, e.g. when the addon gets unregistered
+def stopLivePlayback() -> None:
+    livePlaybacks.clear()
+    # after a reload of this module, the handler is a different function with the same name
+    for handler in list(bpy.app.handlers.frame_change_pre):
+        if getattr(handler, "__name__", None) == _livePlaybackHandler.__name__ and getattr(handler, "__module__", None) == __name__:
+            bpy.app.handlers.frame_change_pre.remove(handler)
 
 
 class AnimationLoadMode(Enum):
     NONE = 'NONE'
     ALL = 'ALL'
     RANGE = 'RANGE'
+    # the animations with the given names in the animation.cfg next to the .gla
+    NAMED = 'NAMED'
 
 
 class GLA:
@@ -583,7 +595,6 @@ class GLA:
         # whether this is the automatic default skeleton
         self.isDefault = False  # TODO replace with `skeleton_object is None`
         self.header = MdxaHeader()
-        self.boneOffsets = MdxaBoneOffsets()
         self.skeleton = MdxaSkel()
         self.boneIndexByName: Dict[str, int] = {}
         # boneNameByIndex = {} #just use bones[index].name
@@ -591,8 +602,10 @@ class GLA:
         self.skeleton_armature: Optional[bpy.types.Armature] = None
         self.skeleton_object: Optional[bpy.types.Object] = None
         self.animation = MdxaAnimation()
+        # the animations loaded by name, with their start relative to the loaded frames
+        self.animationConfig: List[AnimationConfigEntry] = []
 
-    def loadFromFile(self, filepath_abs: str, loadAnimation: AnimationLoadMode, startFrame: int, numFrames: int) -> Tuple[bool, ErrorMessage]:
+    def loadFromFile(self, filepath_abs: str, loadAnimation: AnimationLoadMode, startFrame: int, numFrames: int, animationNames: Sequence[str] = ()) -> Tuple[bool, ErrorMessage]:
         print("Loading {}...".format(filepath_abs))
         try:
             file: BinaryIO = open(filepath_abs, mode="rb")
@@ -600,36 +613,52 @@ class GLA:
             print("Could not open file: {}".format(filepath_abs))
             return False, ErrorMessage("Could not open file!")
         profiler = MrwProfiler.SimpleProfiler(True)
-        # load header
-        profiler.start("reading header")
-        success, message = self.header.loadFromFile(file)
-        if not success:
-            return False, message
-        profiler.stop("reading header")
-        # load offsets (directly after header, always)
-        profiler.start("reading bone hierarchy")
-        self.boneOffsets.loadFromFile(file, self.header.numBones)
-        # load bones
-        self.skeleton.loadFromFile(file, self.boneOffsets)
-        # build lookup map
-        for bone in self.skeleton.bones:
-            self.boneIndexByName[bone.name] = bone.index
-        profiler.stop("reading bone hierarchy")
-        if loadAnimation != AnimationLoadMode.NONE:
-            profiler.start("reading animations")
-            if loadAnimation == AnimationLoadMode.ALL:
-                success, message = self.animation.loadFromFile(
-                    file, self.header, 0, -1)
-            else:
-                assert (loadAnimation == AnimationLoadMode.RANGE)
-                success, message = self.animation.loadFromFile(
-                    file, self.header, startFrame, numFrames)
-            if not success:
-                return False, message
-            profiler.stop("reading animations")
+        with file:
+            try:
+                # load header
+                profiler.start("reading header")
+                self.header.loadFromFile(file)
+                profiler.stop("reading header")
+                # load bones (offsets directly after header, always)
+                profiler.start("reading bone hierarchy")
+                self.skeleton.loadFromFile(file, self.header)
+                # build lookup map
+                self.boneIndexByName = self.skeleton.getBoneIndexByName()
+                profiler.stop("reading bone hierarchy")
+                if loadAnimation != AnimationLoadMode.NONE:
+                    profiler.start("reading animations")
+                    if loadAnimation == AnimationLoadMode.ALL:
+                        self.animation.loadFromFile(file, self.header, 0, -1)
+                    elif loadAnimation == AnimationLoadMode.NAMED:
+                        success, message = self._loadNamedAnimations(file, filepath_abs, animationNames)
+                        if not success:
+                            return False, message
+                    else:
+                        assert (loadAnimation == AnimationLoadMode.RANGE)
+                        self.animation.loadFromFile(file, self.header, startFrame, numFrames)
+                    profiler.stop("reading animations")
+            except GLAFormatError as e:
+                return False, ErrorMessage(str(e))
         return True, NoError
 
-    def loadFromBlender(self, gla_filepath_rel: str, gla_reference_abs: str) -> Tuple[bool, ErrorMessage]:
+    # reads only the frames of the given animations, which get laid out one after the other
+    def _loadNamedAnimations(self, file: BinaryIO, filepath_abs: str, animationNames: Sequence[str]) -> Tuple[bool, ErrorMessage]:
+        if len(animationNames) == 0:
+            return False, ErrorMessage("No animation names given!")
+        configPath = JAG2AnimationConfig.pathForGLA(filepath_abs)
+        try:
+            entries = JAG2AnimationConfig.select(JAG2AnimationConfig.load(configPath), animationNames)
+        except OSError:
+            return False, ErrorMessage(f"Could not read {configPath}!")
+        except AnimationConfigError as e:
+            return False, ErrorMessage(f"{configPath}: {e}")
+        self.animation.loadFrameRanges(file, self.header, [(entry.start, entry.length) for entry in entries])
+        self.animationConfig = JAG2AnimationConfig.consecutive(entries)
+        return True, NoError
+
+    # with snapBones, compressed bones differing by at most one step can share their bone pool entry (see
+    # JAG2GLAFormat.snapCompressedBones)
+    def loadFromBlender(self, gla_filepath_rel: str, gla_reference_abs: str, snapBones: bool = False) -> Tuple[bool, ErrorMessage]:
         # fill out header name
         self.header.name = gla_filepath_rel
 
@@ -667,14 +696,9 @@ class GLA:
             self.boneIndexByName = referenceGLA.boneIndexByName
             # will be changed, but reference is discarded later anyway
             self.skeleton = referenceGLA.skeleton
-            self.boneOffsets = referenceGLA.boneOffsets
-            self.header.ofsFrames = referenceGLA.header.ofsFrames
-            self.header.ofsSkel = referenceGLA.header.ofsSkel
-            self.header.numBones = referenceGLA.header.numBones
 
             # verify all bones exist
-            success, message = self.skeleton.fitsArmature(
-                self.skeleton_armature)
+            success, message = fitsArmature(self.skeleton, self.skeleton_armature)
             if not success:
                 return False, ErrorMessage(f"Armature does not fit reference: {message}")
 
@@ -692,17 +716,8 @@ class GLA:
                 for bone in bonesToAdd:
                     # add bones whose parents have already been added
                     if bone.parent == None or bone.parent.name in self.boneIndexByName:
-                        # create this bone
-                        newBone = MdxaBone()
-
-                        # set its index (will be appended, hence the size)
-                        newBone.index = len(self.skeleton.bones)
-
-                        # read the rest from the editbone
-                        newBone.loadFromBlender(
-                            bone, self.boneIndexByName, self.skeleton.bones, localMat)
-
-                        # append bone
+                        # create this bone, its index is its position in the list
+                        newBone = boneFromBlender(bone, len(self.skeleton.bones), self.boneIndexByName, self.skeleton.bones, localMat)
                         self.skeleton.bones.append(newBone)
                         addedSomething = True
                     else:
@@ -711,121 +726,66 @@ class GLA:
                 if addedSomething == False:
                     return False, ErrorMessage("Hierarchy error, failed to find bone parent (most likely a bug, actually)")
 
-            # calculate bone file position offsets
-            # first bone starts after the bone offsets
-            offset = 4 * len(self.skeleton.bones)
-            self.header.ofsSkel = offset + \
-                self.boneOffsets.baseOffset  # save first bones position
-            for bone in self.skeleton.bones:
-                self.boneOffsets.boneOffsets.append(offset)
-                offset += bone.getSize()
-
-            self.header.ofsFrames = self.boneOffsets.baseOffset + \
-                offset  # frames start after last bone
-            self.header.numBones = len(self.skeleton.bones)
+        self.header.numBones = len(self.skeleton.bones)
 
         #   retrieve animations
 
         print("Compressing animation...")
+        profiler = MrwProfiler.SimpleProfiler(True)
+        profiler.start("compressing animation")
 
         # enter pose mode
         bpy.ops.object.mode_set(mode='POSE')
 
-        # create a dictionary containing the indices of already added compressed bones - lookup should be faster than a linear search through the existing compressed bones (at the cost of more RAM usage - that's ok)
-        compBoneIndices = {}
-
         scene = bpy.context.scene
         assert scene is not None
         assert self.skeleton_object.pose is not None
 
+        # Blender bones in index order
+        baseBones = [bpy_generic_cast(bpy.types.Bone, self.skeleton_armature.bones[bone.name]) for bone in self.skeleton.bones]
+        poseBones = [bpy_generic_cast(bpy.types.PoseBone, self.skeleton_object.pose.bones[bone.name]) for bone in self.skeleton.bones]
+        parents = self.skeleton.getParents()
+        numBones = len(self.skeleton.bones)
+
+        # the base poses don't change from frame to frame; axes changed from blender style to gla style
+        basePoses = np.array([fromBlenderMatrix(matrix_overload_cast(localMat @ matrix_getter_cast(basebone.matrix_local))) for basebone in baseBones]).reshape(numBones, 4, 4) @ BLENDER_TO_GLA_BONE
+
+        numFrames = scene.frame_end - scene.frame_start + 1
+        compressedFrames = np.empty((numFrames, numBones, 7), dtype=np.uint16)
+        poseMatrices = np.empty((1, numBones, 4, 4))
+
         # for each frame:
-        for curFrame in range(scene.frame_start, scene.frame_end + 1):
+        for frameIndex, curFrame in enumerate(range(scene.frame_start, scene.frame_end + 1)):
             # progress bar-ish thing
             if curFrame % 10 == 0:
                 print("Compressing frame {}...".format(curFrame))
 
-            frame = MdxaFrame()
             scene.frame_set(curFrame)
-            # scene.frame_current = curFrame
-
-            # bone offsets need to be calculated in hierarchical order, but written in index order
-            # so calculate first:
-            # these get written to the GLA
-            relativeBoneOffsets: List[Optional[mathutils.Matrix]] = [None] * self.header.numBones
-
-            # these are for calculating
-            absoluteBoneOffsets: List[Optional[mathutils.Matrix]] = [None] * self.header.numBones
-
-            unprocessed = list(range(self.header.numBones))
-            # FIXME: instead of doing this once per frame, cache the correct processing order
-            while len(unprocessed) > 0:
-                # make sure we're not looping infinitely (shouldn't be possible)
-                progressed = False
-
-                newUnprocessed: List[int] = []
-                for index in unprocessed:
-                    bone = self.skeleton.bones[index]
-                    basebone = bpy_generic_cast(bpy.types.Bone, self.skeleton_armature.bones[bone.name])
-                    posebone = bpy_generic_cast(bpy.types.PoseBone, self.skeleton_object.pose.bones[bone.name])
-
-                    basePoseMat = matrix_overload_cast(localMat @ matrix_getter_cast(basebone.matrix_local))
-                    poseMat = matrix_overload_cast(localMat @ matrix_getter_cast(posebone.matrix))
-
-                    # change rotation axes from blender style to gla style
-                    JAG2Math.BlenderBoneRotToGLA(basePoseMat)
-                    JAG2Math.BlenderBoneRotToGLA(poseMat)
-                    if bone.parent == -1:
-                        relativeBoneOffsets[index] = absoluteBoneOffsets[index] = matrix_overload_cast(poseMat @ basePoseMat.inverted())
-
-                        progressed = True
-
-                    elif bone.parent not in unprocessed:
-                        # just what the if checks
-                        assert absoluteBoneOffsets[bone.parent] is not None
-                        # each offset should only be calculated once.
-                        assert absoluteBoneOffsets[index] is None
-
-                        relativeBoneOffsets[index] = matrix_overload_cast(optional_cast(mathutils.Matrix, absoluteBoneOffsets[bone.parent]).inverted() @ matrix_overload_cast(poseMat @ basePoseMat.inverted()))
-                        absoluteBoneOffsets[index] = matrix_overload_cast(optional_cast(mathutils.Matrix, absoluteBoneOffsets[bone.parent]) @ optional_cast(mathutils.Matrix, relativeBoneOffsets[index]))
 
-                        progressed = True
-
-                    else:
-                        newUnprocessed.append(index)
-                unprocessed = newUnprocessed
-
-                assert (progressed)
-
-            gaplessRelativeBoneOffsets, err = ensureListIsGapless(relativeBoneOffsets)
-            if gaplessRelativeBoneOffsets is None:
-                return False, ErrorMessage(f"internal error: did not calculate all bone transformations: {err}")
-            # then write precalculated offsets:
-            for offset in gaplessRelativeBoneOffsets:
-
-                # compress that offset
-                compOffset = JAG2Math.CompBone.compress(offset)
-
-                try:
-                    # try to use existing compressed bone offset
-                    index = compBoneIndices[compOffset]
-                    frame.boneIndices.append(index)
-                except KeyError:
-                    # if this offset is not yet part of the pool, add it
-                    index = len(self.animation.bonePool.bones)
-                    downcast(List[bytes], self.animation.bonePool.bones).append(compOffset)
-                    frame.boneIndices.append(index)
-                    compBoneIndices[compOffset] = index
-
-            self.animation.frames.append(frame)
-
-        self.header.numFrames = scene.frame_end - scene.frame_start + 1
-        # enforce 32 bit alignment after 3-byte-indices
-        framesSize = 3 * self.header.numFrames * self.header.numBones
-        if framesSize % 4 != 0:
-            framesSize += 4 - (framesSize % 4)
-        self.header.ofsCompBonePool = self.header.ofsFrames + framesSize
-        self.header.ofsEnd = self.header.ofsCompBonePool + \
-            len(self.animation.bonePool.bones) * 14
+            for index, posebone in enumerate(poseBones):
+                poseMatrices[0, index] = fromBlenderMatrix(matrix_overload_cast(localMat @ matrix_getter_cast(posebone.matrix)))
+
+            # offsets relative to the parents' get written to the GLA
+            relativeBoneOffsets = JAG2GLAFormat.computeRelativeOffsets(poseMatrices @ BLENDER_TO_GLA_BONE, parents, basePoses)
+            try:
+                compressedFrames[frameIndex] = JAG2GLAFormat.compressBones(relativeBoneOffsets[0])
+            except GLAFormatError as e:
+                return False, ErrorMessage(f"{e} (frame {curFrame})")
+
+        # identical offsets are shared via the bone pool
+        self.animation = MdxaAnimation.fromCompressedFrames(compressedFrames, snapBones)
+        self.header.numFrames = numFrames
+        numCompBones = compressedFrames.size // 7
+        poolSize = len(self.animation.bonePool)
+        print("Bone pool: {} entries for {} compressed bones ({:.1%} reused), {} instead of {} bytes".format(
+            poolSize, numCompBones, 1 - poolSize / max(numCompBones, 1), poolSize * JAG2GLAFormat.COMPBONE_SIZE, numCompBones * JAG2GLAFormat.COMPBONE_SIZE))
+        if snapBones:
+            unsnapped, _ = JAG2GLAFormat.deduplicateCompressedBones(compressedFrames.reshape(-1, 7))
+            print("Snapping similar bones saved {} entries ({} bytes)".format(
+                len(unsnapped) - poolSize, (len(unsnapped) - poolSize) * JAG2GLAFormat.COMPBONE_SIZE))
+        MrwProfiler.count("frames", numFrames)
+        MrwProfiler.count("compressed bones", poolSize)
+        profiler.stop("compressing animation")
 
         return True, NoError
 
@@ -835,14 +795,24 @@ class GLA:
         except IOError:
             print("Could not open file: ", filepath_abs, sep="")
             return False, ErrorMessage("Could not open file!")
-        self.header.saveToFile(file)
-        self.boneOffsets.saveToFile(file)
-        self.skeleton.saveToFile(file, self.header)
-        self.animation.saveToFile(file, self.header)
-        assert (file.tell() == self.header.ofsEnd)
+        glaFile = JAG2GLAFormat.GLAFile()
+        glaFile.header = self.header
+        glaFile.skeleton = self.skeleton
+        glaFile.animation = self.animation
+        with file, MrwProfiler.span("writing gla"):
+            try:
+                glaFile.saveToFile(file)
+            except GLAFormatError as e:
+                return False, ErrorMessage(str(e))
         return True, NoError
 
-    def saveToBlender(self, scene_root: bpy.types.Object, useAnimation: bool, skeletonFixes: JAG2Constants.SkeletonFixes) -> Tuple[bool, ErrorMessage]:
+    def saveToBlender(self, scene_root: bpy.types.Object, useAnimation: bool, skeletonFixes: JAG2Constants.SkeletonFixes, livePlayback: bool = False,
+                      reduceKeyframes: bool = False) -> Tuple[bool, ErrorMessage]:
+        return finishSteps(self.saveToBlenderSteps(scene_root, useAnimation, skeletonFixes, livePlayback, reduceKeyframes))
+
+    # saveToBlender, a part of the animation at a time
+    def saveToBlenderSteps(self, scene_root: bpy.types.Object, useAnimation: bool, skeletonFixes: JAG2Constants.SkeletonFixes, livePlayback: bool = False,
+                           reduceKeyframes: bool = False) -> Steps[Tuple[bool, ErrorMessage]]:
         print("Applying skeleton/skeleton to Blender")
         profiler = MrwProfiler.SimpleProfiler(True)
         # default skeleton = no skeleton.
@@ -864,13 +834,10 @@ class GLA:
             print("Found skeleton_root armature, trying to use it.")
             self.skeleton_armature = bpy.data.armatures["skeleton_root"]
 
-        # for profiling, possibly
-        global g_temp
         # if we found an existing armature, we need to make sure it's linked to an object and valid
         if self.skeleton_armature:
             # see if the armature fits
-            success, message = self.skeleton.fitsArmature(
-                self.skeleton_armature)
+            success, message = fitsArmature(self.skeleton, self.skeleton_armature)
             if not success:
                 return False, message
 
@@ -892,21 +859,7 @@ class GLA:
 
             # add animations, if any
             if useAnimation:
-                profiler.start("applying animations")
-                # go to object mode
-                assert bpy.context.view_layer is not None
-                bpy.context.view_layer.objects.active = self.skeleton_object
-                bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-                if PROFILE:
-                    import cProfile
-                    print("=== Profile start ===")
-                    cProfile.runctx(
-                        "self.animation.saveToBlender(self.skeleton, self.skeleton_object, self.header.scale)", globals(), locals())
-                    print("=== Profile stop ===")
-                else:
-                    self.animation.saveToBlender(
-                        self.skeleton, self.skeleton_object, self.header.scale)
-                profiler.stop("applying animations")
+                return (yield from self._animationToBlenderSteps(profiler, livePlayback, reduceKeyframes))
 
             # that's all
             return True, NoError
@@ -915,31 +868,38 @@ class GLA:
 
         # create armature
         profiler.start("creating armature")
-        success, message = self.skeleton.saveToBlender(
-            scene_root, skeletonFixes, self.animation)
-        if not success:
+        skeleton_object, message = skeletonToBlender(
+            self.skeleton, scene_root, skeletonFixes, self.animation)
+        if skeleton_object is None:
             return False, message
-        self.skeleton_armature = self.skeleton.armature
-        self.skeleton_object = self.skeleton.armature_object
+        self.skeleton_object = skeleton_object
+        self.skeleton_armature = downcast(bpy.types.Armature, skeleton_object.data)
         self.skeleton_object.g2_prop.scale = self.header.scale * 100  # pyright: ignore [reportAttributeAccessIssue]
         JAG2Panels.markG2Configured(self.skeleton_object)
         profiler.stop("creating armature")
 
         # add animations, if any
         if useAnimation:
-            profiler.start("applying animations")
-            # go to object mode
-            assert bpy.context.view_layer is not None
-            bpy.context.view_layer.objects.active = self.skeleton_object
-            bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-            if PROFILE:
-                import cProfile
-                print("=== Profile start ===")
-                cProfile.runctx(
-                    "self.animation.saveToBlender(self.skeleton, self.skeleton_object, self.header.scale)", globals(), locals())
-                print("=== Profile stop ===")
+            return (yield from self._animationToBlenderSteps(profiler, livePlayback, reduceKeyframes))
+        return True, NoError
+
+    def _animationToBlenderSteps(self, profiler: MrwProfiler.SimpleProfiler, livePlayback: bool, reduceKeyframes: bool) -> Steps[Tuple[bool, ErrorMessage]]:
+        assert self.skeleton_object is not None
+        profiler.start("applying animations")
+        # go to object mode
+        assert bpy.context.view_layer is not None
+        bpy.context.view_layer.objects.active = self.skeleton_object
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+        try:
+            if livePlayback:
+                startLivePlayback(self.skeleton, self.animation, self.skeleton_object)
+            elif self.animationConfig:
+                yield from namedAnimationsToBlenderSteps(self.skeleton, self.animation, self.skeleton_object, self.animationConfig, reduceKeyframes)
             else:
-                self.animation.saveToBlender(
-                    self.skeleton, self.skeleton_object, self.header.scale)
-            profiler.stop("applying animations")
+                yield from animationToActionSteps(self.skeleton, self.animation, self.skeleton_object,
+                                                  os.path.basename(self.header.name) or self.skeleton_object.name + "Action", reduceKeyframes)
+            addAnimationMarkers(self.animationConfig)
+        except GLAFormatError as e:
+            return False, ErrorMessage(str(e))
+        profiler.stop("applying animations")
         return True, NoError
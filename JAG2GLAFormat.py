@@ -0,0 +1,564 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# The .gla file format, without any Blender dependencies: this only uses Python and NumPy, so it
+# also works outside of Blender, e.g. in worker processes or tests. JAG2GLA translates between
+# these structures and Blender data.
+
+if __package__:
+    from .mod_reload import reload_modules
+    reload_modules(locals(), __package__, ["JAStringhelper", "JAG2Constants", "MrwProfiler"], [])  # nopep8
+
+    from . import JAStringhelper
+    from . import JAG2Constants
+    from . import MrwProfiler
+else:
+    # loaded as a top-level module, outside of Blender
+    import JAStringhelper
+    import JAG2Constants
+    import MrwProfiler
+
+from typing import BinaryIO, Dict, List, Sequence, Tuple
+import struct
+import numpy as np
+
+# per frame and bone, an index into the bone pool
+FrameArray = np.ndarray
+# compressed bones, 7 uint16 each: quaternion w, x, y, z and location x, y, z
+BonePoolArray = np.ndarray
+# 4x4 transformation matrices, float64
+MatrixArray = np.ndarray
+
+COMPBONE_SIZE = 14
+# bone pool indices are only 3 bytes long - with 20k+ frames 25% less is quite a bit, reportedly.
+FRAME_INDEX_SIZE = 3
+# quaternion components are mapped from -2..2 to 0..65535
+COMPBONE_QUAT_STEPS_PER_UNIT = 16383
+
+
+class GLAFormatError(Exception):
+    pass
+
+
+class MdxaHeader:
+    FORMAT = "4si64sf6i"
+
+    def __init__(self):
+        self.name = ""
+        self.scale = 1  # does not seem to be used by Jedi Academy anyway - or is it? I need it in import!
+        self.numFrames = -1
+        self.ofsFrames = -1
+        self.numBones = -1
+        self.ofsCompBonePool = -1
+        # this is also the size of the header + the bone offsets, i.e. where the first bone starts - probably a historic leftover
+        self.ofsSkel = -1
+        self.ofsEnd = -1
+
+    def loadFromFile(self, file: BinaryIO) -> None:
+        data = file.read(self.getSize())
+        if len(data) != self.getSize():
+            raise GLAFormatError("File too short for a GLA header!")
+        ident, version, name, self.scale, self.numFrames, self.ofsFrames, self.numBones, self.ofsCompBonePool, self.ofsSkel, self.ofsEnd = struct.unpack(
+            self.FORMAT, data)
+        if ident != JAG2Constants.GLA_IDENT:
+            print("File does not start with ", JAG2Constants.GLA_IDENT,
+                  " but ", ident, " - no GLA!")
+            raise GLAFormatError("Is no GLA file, incorrect file identifier!")
+        if version != JAG2Constants.GLA_VERSION:
+            raise GLAFormatError(f"Wrong gla file version! {version} should be {JAG2Constants.GLA_VERSION}")
+        self.name = JAStringhelper.decode(name)
+        print("Scale: {:.3f}".format(self.scale))
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        file.write(struct.pack(self.FORMAT, JAG2Constants.GLA_IDENT, JAG2Constants.GLA_VERSION, self.name.encode(
+        ), self.scale, self.numFrames, self.ofsFrames, self.numBones, self.ofsCompBonePool, self.ofsSkel, self.ofsEnd))
+
+    # fill the counts and offsets for a file with the given skeleton, number of frames and bone pool size
+    def calculateOffsets(self, skeleton: "MdxaSkel", numFrames: int, numCompBones: int) -> None:
+        self.numBones = len(skeleton.bones)
+        self.numFrames = numFrames
+        self.ofsSkel = MdxaHeader.getSize() + 4 * self.numBones
+        # frames start after last bone
+        self.ofsFrames = MdxaHeader.getSize() + skeleton.getSize()
+        self.ofsCompBonePool = self.ofsFrames + getFramesSize(numFrames * self.numBones)
+        self.ofsEnd = self.ofsCompBonePool + numCompBones * COMPBONE_SIZE
+
+    @classmethod
+    def getSize(cls) -> int:
+        return struct.calcsize(cls.FORMAT)
+
+
+class MdxaBone:
+    FORMAT = "64sIi12f12fi"
+
+    def __init__(self):
+        self.name = ""
+        self.flags: int = 0
+        self.parent: int = -1
+        # 3x4 matrices, rows first - the same layout as in the file
+        self.basePoseMat = np.eye(3, 4, dtype=np.float32)
+        self.basePoseMatInv = np.eye(3, 4, dtype=np.float32)
+        self.children: List[int] = []
+        # not saved, filled by MdxaSkel.loadFromFile() and when loaded from blender
+        self.index: int = -1
+
+    @property
+    def numChildren(self) -> int:
+        return len(self.children)
+
+    def getSize(self) -> int:
+        return struct.calcsize(self.FORMAT) + 4 * self.numChildren
+
+    def loadFromFile(self, file: BinaryIO) -> None:
+        size = struct.calcsize(self.FORMAT)
+        data = file.read(size)
+        if len(data) != size:
+            raise GLAFormatError("Unexpected end of file while reading bones!")
+        values = struct.unpack(self.FORMAT, data)
+        self.name = JAStringhelper.decode(values[0])
+        self.flags, self.parent = values[1:3]
+        self.basePoseMat = np.array(values[3:15], dtype=np.float32).reshape(3, 4)
+        self.basePoseMatInv = np.array(values[15:27], dtype=np.float32).reshape(3, 4)
+        numChildren = values[27]
+        self.children = list(struct.unpack(f"{numChildren}i", file.read(4 * numChildren)))
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        file.write(struct.pack(self.FORMAT, self.name.encode(), self.flags, self.parent,
+                   *self.basePoseMat.ravel().tolist(), *self.basePoseMatInv.ravel().tolist(), self.numChildren))
+        file.write(struct.pack(f"{self.numChildren}i", *self.children))
+
+    # the base pose as a 4x4 matrix, for calculations
+    def getBasePose(self) -> MatrixArray:
+        mat = np.eye(4)
+        mat[:3] = self.basePoseMat
+        return mat
+
+# originally called MdxaSkel_t, but I find that name misleading
+
+
+class MdxaSkel:
+    def __init__(self):
+        self.bones: List[MdxaBone] = []
+
+    # bone offsets come directly after the header and are relative to its end
+    def loadFromFile(self, file: BinaryIO, header: MdxaHeader) -> None:
+        baseOffset = MdxaHeader.getSize()
+        file.seek(baseOffset)
+        boneOffsets = struct.unpack(f"{header.numBones}i", file.read(4 * header.numBones))
+        for i, offset in enumerate(boneOffsets):
+            file.seek(baseOffset + offset)
+            bone = MdxaBone()
+            bone.loadFromFile(file)
+            bone.index = i
+            self.bones.append(bone)
+
+    # returns the offsets of the bones, relative to the end of the header, as saved in the file.
+    def getBoneOffsets(self) -> List[int]:
+        # first bone starts after the bone offsets
+        offset = 4 * len(self.bones)
+        boneOffsets: List[int] = []
+        for bone in self.bones:
+            boneOffsets.append(offset)
+            offset += bone.getSize()
+        return boneOffsets
+
+    # size of bone offsets and bones
+    def getSize(self) -> int:
+        return 4 * len(self.bones) + sum(bone.getSize() for bone in self.bones)
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        assert (file.tell() == MdxaHeader.getSize())
+        boneOffsets = self.getBoneOffsets()
+        file.write(struct.pack(f"{len(boneOffsets)}i", *boneOffsets))
+        for bone in self.bones:
+            bone.saveToFile(file)
+
+    def getBoneIndexByName(self) -> Dict[str, int]:
+        return {bone.name: bone.index for bone in self.bones}
+
+    def getParents(self) -> List[int]:
+        return [bone.parent for bone in self.bones]
+
+    def getBasePoses(self) -> MatrixArray:
+        if not self.bones:
+            return np.zeros((0, 4, 4))
+        return np.stack([bone.getBasePose() for bone in self.bones])
+
+    # bone indices in parent-first order
+    def getHierarchyOrder(self) -> List[int]:
+        hierarchyOrder: List[int] = []
+        added = [False] * len(self.bones)
+        while len(hierarchyOrder) < len(self.bones):
+            addedSomething = False
+            for bone in self.bones:
+                if added[bone.index]:
+                    continue
+                if bone.parent != -1 and not added[bone.parent]:
+                    continue
+                hierarchyOrder.append(bone.index)
+                added[bone.index] = True
+                addedSomething = True
+            if not addedSomething:
+                raise GLAFormatError("gla has hierarchy problems!")
+        return hierarchyOrder
+
+
+# turns compressed bones (..., 7) into 4x4 offset matrices (..., 4, 4)
+def decompressBones(compBones: BonePoolArray) -> MatrixArray:
+    # map quaternion values from 0..65535 to -2..2
+    quat = compBones[..., :4] / COMPBONE_QUAT_STEPS_PER_UNIT - 2
+    # map location from 0..65535 to -512..512 (511.984375)
+    loc = compBones[..., 4:] / JAG2Constants.COMPBONE_LOCATION_STEPS_PER_UNIT - 512
+    return quaternionsToMatrices(quat, loc)
+
+
+# 4x4 matrices (..., 4, 4) rotating by the quaternions (w, x, y, z) (..., 4) and translating by loc (..., 3)
+def quaternionsToMatrices(quat: np.ndarray, loc: np.ndarray) -> MatrixArray:
+    w, x, y, z = np.moveaxis(quat, -1, 0)
+    # the quaternions are not quite normalized; like mathutils.Quaternion.to_matrix(), don't normalize them either.
+    matrices = np.zeros(quat.shape[:-1] + (4, 4))
+    matrices[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    matrices[..., 0, 1] = 2 * (x * y - w * z)
+    matrices[..., 0, 2] = 2 * (x * z + w * y)
+    matrices[..., 1, 0] = 2 * (x * y + w * z)
+    matrices[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    matrices[..., 1, 2] = 2 * (y * z - w * x)
+    matrices[..., 2, 0] = 2 * (x * z - w * y)
+    matrices[..., 2, 1] = 2 * (y * z + w * x)
+    matrices[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    matrices[..., :3, 3] = loc
+    matrices[..., 3, 3] = 1
+    return matrices
+
+
+# returns unit quaternions (w, x, y, z) with w >= 0 for the rotation part of the given matrices (..., 4, 4)
+def matricesToQuaternions(matrices: MatrixArray) -> np.ndarray:
+    m = matrices[..., :3, :3]
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    trace = m00 + m11 + m22
+    # pick the numerically most stable of the four possible formulas for each matrix
+    case = np.argmax(np.stack([trace, m00, m11, m22], axis=-1), axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # case 0: w is largest
+        s = np.sqrt(np.maximum(1 + trace, 0)) * 2
+        q0 = np.stack([s / 4, (m[..., 2, 1] - m[..., 1, 2]) / s, (m[..., 0, 2] - m[..., 2, 0]) / s, (m[..., 1, 0] - m[..., 0, 1]) / s], axis=-1)
+        # case 1: x is largest
+        s = np.sqrt(np.maximum(1 + m00 - m11 - m22, 0)) * 2
+        q1 = np.stack([(m[..., 2, 1] - m[..., 1, 2]) / s, s / 4, (m[..., 0, 1] + m[..., 1, 0]) / s, (m[..., 0, 2] + m[..., 2, 0]) / s], axis=-1)
+        # case 2: y is largest
+        s = np.sqrt(np.maximum(1 - m00 + m11 - m22, 0)) * 2
+        q2 = np.stack([(m[..., 0, 2] - m[..., 2, 0]) / s, (m[..., 0, 1] + m[..., 1, 0]) / s, s / 4, (m[..., 1, 2] + m[..., 2, 1]) / s], axis=-1)
+        # case 3: z is largest
+        s = np.sqrt(np.maximum(1 - m00 - m11 + m22, 0)) * 2
+        q3 = np.stack([(m[..., 1, 0] - m[..., 0, 1]) / s, (m[..., 0, 2] + m[..., 2, 0]) / s, (m[..., 1, 2] + m[..., 2, 1]) / s, s / 4], axis=-1)
+    quat = np.choose(case[..., np.newaxis], [q0, q1, q2, q3])
+    quat /= np.linalg.norm(quat, axis=-1, keepdims=True)
+    # q and -q are the same rotation, use the one with positive w like mathutils does
+    quat *= np.where(quat[..., :1] < 0, -1, 1)
+    return quat
+
+
+# returns the 14 byte compressed representation (..., 7) of the given matrices (..., 4, 4) (no scale) as saved in the compBonePool
+def compressBones(matrices: MatrixArray) -> BonePoolArray:
+    quat = canonicalizeQuaternionSigns(np.rint((matricesToQuaternions(matrices) + 2) * COMPBONE_QUAT_STEPS_PER_UNIT))
+    loc = np.rint((matrices[..., :3, 3] + 512) * JAG2Constants.COMPBONE_LOCATION_STEPS_PER_UNIT)
+    if np.any(loc < 0) or np.any(loc > 0xffff):
+        raise GLAFormatError("Bones must not move more than 512 units relative to their parent!")
+    return np.concatenate([quat, loc], axis=-1).astype(np.uint16)
+
+
+# q and -q are the same rotation, so of the quantized quaternions (..., 4) those whose first non-zero component is
+# negative get flipped, and equal rotations compress equally. matricesToQuaternions already makes w positive, but
+# that doesn't help once it rounds to 0.
+def canonicalizeQuaternionSigns(quat: np.ndarray) -> np.ndarray:
+    zero = 2 * COMPBONE_QUAT_STEPS_PER_UNIT
+    steps = quat - zero
+    nonZero = steps != 0
+    first = np.take_along_axis(steps, np.argmax(nonZero, axis=-1)[..., np.newaxis], axis=-1)
+    flip = first < 0
+    MrwProfiler.count("quaternion signs flipped", int(np.count_nonzero(flip)))
+    return np.where(flip, zero - steps, quat)
+
+
+# replaces the compressed bones (numCompBones, 7) by fewer distinct ones, each at most one step away in every component:
+# sorted, neighbours get merged into runs as long as the run spans at most one step per component, and each run is
+# replaced by its first entry. Loses up to one step of precision.
+def snapCompressedBones(compBones: BonePoolArray) -> BonePoolArray:
+    if len(compBones) == 0:
+        return compBones
+    # big endian, so the bytes sort like the numbers
+    records = np.ascontiguousarray(compBones, dtype=">u2").view(np.dtype((np.void, COMPBONE_SIZE))).ravel()
+    records, inverse = np.unique(records, return_inverse=True)
+    unique = records.view(">u2").reshape(-1, 7).astype(np.uint16)
+    # a run can only go on where neighbours are at most one step apart
+    close = np.all(np.abs(np.diff(unique.astype(np.int64), axis=0)) <= 1, axis=1).tolist()
+    rows = unique.tolist()
+    runStart = np.arange(len(rows))
+    start, low, high = 0, rows[0], rows[0]
+    for index in range(1, len(rows)):
+        if close[index - 1]:
+            newLow, newHigh = list(map(min, low, rows[index])), list(map(max, high, rows[index]))
+            if all(h - l <= 1 for l, h in zip(newLow, newHigh)):
+                runStart[index], low, high = start, newLow, newHigh
+                continue
+        start, low, high = index, rows[index], rows[index]
+    return unique[runStart[inverse.ravel()]]
+
+
+# Frames & Compressed Bone Pool
+
+
+class MdxaAnimation:
+    def __init__(self):
+        # bone pool index per frame and bone
+        self.frames: FrameArray = np.zeros((0, 0), dtype=np.uint32)
+        # compressed bones, see decompressBones/compressBones
+        self.bonePool: BonePoolArray = np.zeros((0, 7), dtype=np.uint16)
+
+    @property
+    def numFrames(self) -> int:
+        return self.frames.shape[0]
+
+    # builds the bone pool from per-frame compressed bones (numFrames, numBones, 7), reusing identical entries, and
+    # with snap, nearly identical ones (see snapCompressedBones)
+    @staticmethod
+    def fromCompressedFrames(compressed: BonePoolArray, snap: bool = False) -> "MdxaAnimation":
+        animation = MdxaAnimation()
+        numFrames, numBones = compressed.shape[:2]
+        flat = compressed.reshape(-1, 7)
+        if snap:
+            flat = snapCompressedBones(flat)
+        animation.bonePool, indices = deduplicateCompressedBones(flat)
+        animation.frames = indices.reshape(numFrames, numBones)
+        return animation
+
+    def loadFromFile(self, file: BinaryIO, header: MdxaHeader, startFrame: int, numFrames: int) -> None:
+        # prepare frame start/end settings
+        if numFrames == -1:
+            assert (startFrame == 0)
+            numFrames = header.numFrames
+        else:
+            print("Reading {} frames, starting at {}".format(
+                numFrames, startFrame))
+        if startFrame >= header.numFrames:
+            print("Warning: StartFrame beyond existing frames, using last one")
+            startFrame = header.numFrames - 1
+            numFrames = 1
+        if startFrame + numFrames > header.numFrames:
+            print("Warning: Trying to import more frames than there are, fixing")
+            numFrames = header.numFrames - startFrame
+
+        # read the requested frames
+        frameSize = FRAME_INDEX_SIZE * header.numBones
+        file.seek(header.ofsFrames + startFrame * frameSize)
+        data = file.read(numFrames * frameSize)
+        if len(data) != numFrames * frameSize:
+            raise GLAFormatError("Unexpected end of file while reading frames!")
+        self.frames = decodeFrames(data, numFrames, header.numBones)
+        MrwProfiler.count("frames read", numFrames)
+
+        self.bonePool = MdxaAnimation._loadBonePool(file, header, self.frames)
+
+        # file should be over now, bone pool is usually the last thing. I'm not sure it has to be, but so far it has always been.
+        if file.tell() != header.ofsEnd and numFrames == header.numFrames:
+            print(
+                "Info: .gla Bone Pool read but file not over yet - this likely indicates a problem.")
+
+    # reads only the given (start, length) frame ranges, one after the other, seeking past the rest.
+    # the bone pool only keeps the entries these frames use, see compactBonePool.
+    def loadFrameRanges(self, file: BinaryIO, header: MdxaHeader, ranges: Sequence[Tuple[int, int]]) -> None:
+        frameSize = FRAME_INDEX_SIZE * header.numBones
+        parts: List[FrameArray] = []
+        for start, length in ranges:
+            if start < 0 or length < 0 or start + length > header.numFrames:
+                raise GLAFormatError(f"Frames {start} to {start + length - 1} are beyond the {header.numFrames} frames in the file!")
+            file.seek(header.ofsFrames + start * frameSize)
+            data = file.read(length * frameSize)
+            if len(data) != length * frameSize:
+                raise GLAFormatError("Unexpected end of file while reading frames!")
+            parts.append(decodeFrames(data, length, header.numBones))
+        frames = np.concatenate(parts) if parts else np.zeros((0, header.numBones), dtype=np.uint32)
+        MrwProfiler.count("frames read", len(frames))
+
+        self.frames = frames
+        self.bonePool = MdxaAnimation._loadBonePool(file, header, frames)
+        self.compactBonePool()
+
+    # drops the bone pool entries no frame uses and merges identical ones, keeping the order of the rest, so the
+    # indices are numbered without gaps
+    def compactBonePool(self) -> None:
+        used, inverse = np.unique(self.frames, return_inverse=True)
+        self.bonePool, indices = deduplicateCompressedBones(self.bonePool[used])
+        self.frames = indices[inverse].reshape(self.frames.shape)
+
+    # reads the compressed bone pool up to the highest entry the frames use - there's one more object than the
+    # highest index since those start at 0
+    @staticmethod
+    def _loadBonePool(file: BinaryIO, header: MdxaHeader, frames: FrameArray) -> BonePoolArray:
+        numCompBones = int(frames.max()) + 1 if frames.size > 0 else 0
+        file.seek(header.ofsCompBonePool)
+        data = file.read(numCompBones * COMPBONE_SIZE)
+        if len(data) != numCompBones * COMPBONE_SIZE:
+            raise GLAFormatError("Unexpected end of file while reading the bone pool, or frames reference bones beyond it!")
+        MrwProfiler.count("compressed bones read", numCompBones)
+        return np.frombuffer(data, dtype="<u2").reshape(numCompBones, 7).astype(np.uint16)
+
+    # size of the frames, including padding
+    def getFramesSize(self) -> int:
+        return getFramesSize(self.frames.size)
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        file.write(encodeFrames(self.frames))
+        # add padding if not 32 bit aligned (due to 3-byte-indices)
+        file.write(bytes(-file.tell() % 4))
+        file.write(self.bonePool.astype("<u2").tobytes())
+
+    # for each of the given frames (numFrames, numBones), each bone's absolute offset from its base
+    # pose, i.e. the offsets of its ancestors applied to its own, as (numFrames, numBones, 4, 4).
+    # poolMatrices is decompressBones(self.bonePool), so it can be reused across calls.
+    @staticmethod
+    def computeAbsoluteOffsets(frames: FrameArray, skeleton: MdxaSkel, poolMatrices: MatrixArray) -> MatrixArray:
+        result = np.empty(frames.shape + (4, 4))
+        for index, (chains, offsets) in MdxaAnimation._computeChainOffsets(frames, skeleton, poolMatrices).items():
+            result[:, index] = offsets[chains]
+        return result
+
+    # like computeAbsoluteOffsets, but the resulting (GLA style) bone transformations relative
+    # to the skeleton, i.e. the absolute offsets applied to the base poses.
+    @staticmethod
+    def computeBoneTransforms(frames: FrameArray, skeleton: MdxaSkel, poolMatrices: MatrixArray) -> MatrixArray:
+        result = np.empty(frames.shape + (4, 4))
+        basePoses = skeleton.getBasePoses()
+        for index, (chains, offsets) in MdxaAnimation._computeChainOffsets(frames, skeleton, poolMatrices).items():
+            result[:, index] = (offsets @ basePoses[index])[chains]
+        return result
+
+    # a bone's absolute offset only depends on the bone pool indices of it and its ancestors, which repeat a lot:
+    # in holds, loops, and for bones that don't move. So it only gets computed once per distinct chain of indices
+    # from the root down. Returns, per bone index in hierarchy order, the chain of each frame (numFrames,) and the
+    # absolute offset per chain (numChains, 4, 4).
+    @staticmethod
+    def _computeChainOffsets(frames: FrameArray, skeleton: MdxaSkel, poolMatrices: MatrixArray) -> Dict[int, Tuple[np.ndarray, MatrixArray]]:
+        result: Dict[int, Tuple[np.ndarray, MatrixArray]] = {}
+        for index in skeleton.getHierarchyOrder():
+            parent = skeleton.bones[index].parent
+            if parent != -1 and len(result[parent][1]) == len(frames):
+                # every frame has its own chain already, so there's nothing to share further down
+                chains = first = np.arange(len(frames))
+            else:
+                # the parent's chain and this bone's pool index identify this bone's chain
+                keys = frames[:, index].astype(np.int64)
+                if parent != -1:
+                    keys += result[parent][0] * len(poolMatrices)
+                _, first, chains = np.unique(keys, return_index=True, return_inverse=True)
+                chains = chains.ravel()
+            offsets = poolMatrices[frames[first, index]]
+            if parent != -1:
+                parentChains, parentOffsets = result[parent]
+                offsets = parentOffsets[parentChains[first]] @ offsets
+            result[index] = (chains, offsets)
+            MrwProfiler.count("bone transforms reused", len(frames) - len(first))
+        return result
+
+
+# the inverse of MdxaAnimation.computeBoneTransforms: turns (GLA style) bone transformations
+# (numFrames, numBones, 4, 4) into offsets relative to the parent's, ready for compressBones.
+def computeRelativeOffsets(transforms: MatrixArray, parents: Sequence[int], basePoses: MatrixArray) -> MatrixArray:
+    absoluteOffsets = transforms @ np.linalg.inv(basePoses)
+    relativeOffsets = absoluteOffsets.copy()
+    for index, parent in enumerate(parents):
+        if parent != -1:
+            relativeOffsets[:, index] = np.linalg.inv(absoluteOffsets[:, parent]) @ absoluteOffsets[:, index]
+    return relativeOffsets
+
+
+# the unique compressed bones (numCompBones, 7) -> (bone pool, index into it per compressed bone), numbering the pool
+# entries in order of first use, like a sequential search would
+def deduplicateCompressedBones(compBones: BonePoolArray) -> Tuple[BonePoolArray, np.ndarray]:
+    flat = np.ascontiguousarray(compBones, dtype=np.uint16)
+    if len(flat) == 0:
+        return np.zeros((0, 7), dtype=np.uint16), np.zeros(0, dtype=np.uint32)
+    # view each 14-byte record as a single value so np.unique can compare them as a whole
+    records = flat.view(np.dtype((np.void, COMPBONE_SIZE))).ravel()
+    _, firstOccurrence, inverse = np.unique(records, return_index=True, return_inverse=True)
+    order = np.argsort(firstOccurrence)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return flat[firstOccurrence[order]], rank[inverse.ravel()].astype(np.uint32)
+
+
+# size of the given number of pool indices in the file, including padding
+def getFramesSize(numIndices: int) -> int:
+    size = numIndices * FRAME_INDEX_SIZE
+    # enforce 32 bit alignment after 3-byte-indices
+    return size + (-size % 4)
+
+
+# 3-byte little endian pool indices -> (numFrames, numBones) array
+def decodeFrames(data: bytes, numFrames: int, numBones: int) -> FrameArray:
+    raw = np.frombuffer(data, dtype=np.uint8, count=numFrames * numBones * FRAME_INDEX_SIZE).reshape(numFrames, numBones, FRAME_INDEX_SIZE).astype(np.uint32)
+    return raw[..., 0] | (raw[..., 1] << 8) | (raw[..., 2] << 16)
+
+
+def encodeFrames(frames: FrameArray) -> bytes:
+    if frames.size > 0 and int(frames.max()) >= 1 << (8 * FRAME_INDEX_SIZE):
+        raise GLAFormatError("Too many compressed bones, indices don't fit into 3 bytes!")
+    # only write the first 3 bytes of each packed number
+    return np.ascontiguousarray(frames, dtype="<u4").view(np.uint8).reshape(frames.shape + (4,))[..., :FRAME_INDEX_SIZE].tobytes()
+
+
+class GLAFile:
+    def __init__(self):
+        self.header = MdxaHeader()
+        self.skeleton = MdxaSkel()
+        self.animation = MdxaAnimation()
+
+    # startFrame/numFrames select the frames to read, numFrames = -1 means all of them; with
+    # loadAnimation False, only header and skeleton get read.
+    @staticmethod
+    def loadFromFile(file: BinaryIO, loadAnimation: bool = True, startFrame: int = 0, numFrames: int = -1) -> "GLAFile":
+        gla = GLAFile()
+        gla.header.loadFromFile(file)
+        gla.skeleton.loadFromFile(file, gla.header)
+        if loadAnimation:
+            gla.animation.loadFromFile(file, gla.header, startFrame, numFrames)
+        return gla
+
+    @staticmethod
+    def load(filepath: str, loadAnimation: bool = True, startFrame: int = 0, numFrames: int = -1) -> "GLAFile":
+        with open(filepath, "rb") as file:
+            return GLAFile.loadFromFile(file, loadAnimation, startFrame, numFrames)
+
+    # fill the counts and offsets in the header based on the rest
+    def calculateHeaderOffsets(self) -> None:
+        numBones = len(self.skeleton.bones)
+        if self.animation.frames.size > 0 and self.animation.frames.shape[1] != numBones:
+            raise GLAFormatError(f"Animation has {self.animation.frames.shape[1]} bones per frame, but there are {numBones} bones!")
+        self.header.calculateOffsets(self.skeleton, self.animation.numFrames, len(self.animation.bonePool))
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        self.calculateHeaderOffsets()
+        self.header.saveToFile(file)
+        self.skeleton.saveToFile(file)
+        assert (file.tell() == self.header.ofsFrames)
+        self.animation.saveToFile(file)
+        assert (file.tell() == self.header.ofsEnd)
+
+    def save(self, filepath: str) -> None:
+        with open(filepath, "wb") as file:
+            self.saveToFile(file)
@@ -0,0 +1,209 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Appending the animations of .gla files to one with the same skeleton, e.g. new animations to _humanoid.gla,
+# without Blender. The frames are copied from file to file with their bone pool indices remapped into a single
+# pool without duplicates, so nothing gets re-sampled or re-compressed. The animation.cfg files next to the
+# inputs are combined, moving the animations of the appended files behind the ones before.
+#
+# From the command line: python JAG2GLAMerge.py base.gla new.gla [more.gla ...] -o merged.gla
+
+if __package__:
+    from .mod_reload import reload_modules
+    reload_modules(locals(), __package__, ["JAG2AnimationConfig", "JAG2GLAFormat"], [])  # nopep8
+
+    from . import JAG2AnimationConfig
+    from . import JAG2GLAFormat
+else:
+    # loaded as a top-level module, outside of Blender
+    import JAG2AnimationConfig
+    import JAG2GLAFormat
+
+from contextlib import ExitStack
+from typing import BinaryIO, List, Optional, Sequence
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# how many frames get copied at once; the frames are never all in memory at the same time
+MERGE_CHUNK_FRAMES = 1 << 12
+# how far the base poses of the skeletons may differ
+BASE_POSE_TOLERANCE = 1e-4
+
+
+class GLAMergeError(Exception):
+    pass
+
+
+# an input file, with the bone pool and the animation.cfg read
+class MergeSource:
+    def __init__(self, filepath: str, file: BinaryIO):
+        self.filepath = filepath
+        self.file = file
+        self.header = JAG2GLAFormat.MdxaHeader()
+        self.header.loadFromFile(file)
+        self.skeleton = JAG2GLAFormat.MdxaSkel()
+        self.skeleton.loadFromFile(file, self.header)
+        self.bonePool = readBonePool(file, self.header)
+        # the column of each of the base skeleton's bones in this file's frames
+        self.boneOrder = np.arange(self.header.numBones)
+        configPath = JAG2AnimationConfig.pathForGLA(filepath)
+        self.animationConfig: Optional[List[JAG2AnimationConfig.AnimationConfigEntry]] = None
+        if os.path.isfile(configPath):
+            try:
+                self.animationConfig = JAG2AnimationConfig.load(configPath)
+            except JAG2AnimationConfig.AnimationConfigError as e:
+                raise GLAMergeError(f"{configPath}: {e}")
+
+
+# the entire bone pool of the file
+def readBonePool(file: BinaryIO, header: JAG2GLAFormat.MdxaHeader) -> JAG2GLAFormat.BonePoolArray:
+    numCompBones = (header.ofsEnd - header.ofsCompBonePool) // JAG2GLAFormat.COMPBONE_SIZE
+    file.seek(header.ofsCompBonePool)
+    data = file.read(numCompBones * JAG2GLAFormat.COMPBONE_SIZE)
+    if numCompBones < 0 or len(data) != numCompBones * JAG2GLAFormat.COMPBONE_SIZE:
+        raise JAG2GLAFormat.GLAFormatError("Unexpected end of file while reading the bone pool!")
+    return np.frombuffer(data, dtype="<u2").reshape(numCompBones, 7).astype(np.uint16)
+
+
+# the column of each of base's bones in the other skeleton's frames, which must have the same bones with the same
+# parents and base poses, in any order
+def matchSkeleton(base: JAG2GLAFormat.MdxaSkel, other: JAG2GLAFormat.MdxaSkel) -> np.ndarray:
+    otherIndices = other.getBoneIndexByName()
+    missing = [bone.name for bone in base.bones if bone.name not in otherIndices]
+    if missing or len(other.bones) != len(base.bones):
+        raise GLAMergeError("Skeletons have different bones: {}".format(", ".join(missing) or f"{len(other.bones)} instead of {len(base.bones)}"))
+    for bone in base.bones:
+        otherBone = other.bones[otherIndices[bone.name]]
+        parent = base.bones[bone.parent].name if bone.parent != -1 else None
+        otherParent = other.bones[otherBone.parent].name if otherBone.parent != -1 else None
+        if parent != otherParent:
+            raise GLAMergeError(f"Bone {bone.name} has the parent {otherParent} instead of {parent}")
+        if not np.allclose(bone.basePoseMat, otherBone.basePoseMat, atol=BASE_POSE_TOLERANCE):
+            raise GLAMergeError(f"Bone {bone.name} has a different base pose")
+    return np.array([otherIndices[bone.name] for bone in base.bones], dtype=np.intp)
+
+
+# the animation.cfg entries of all sources, each source's moved behind the frames of those before it
+def mergeAnimationConfigs(sources: Sequence[MergeSource]) -> List[JAG2AnimationConfig.AnimationConfigEntry]:
+    entries: List[JAG2AnimationConfig.AnimationConfigEntry] = []
+    sourceByName = {}
+    offset = 0
+    for source in sources:
+        if source.animationConfig is None:
+            print(f"Warning: {source.filepath} has no {JAG2AnimationConfig.FILENAME}, its animations will have no names")
+        for entry in source.animationConfig or []:
+            previous = sourceByName.setdefault(entry.name.upper(), source.filepath)
+            if previous != source.filepath:
+                raise GLAMergeError(f"Animation {entry.name} is in both {previous} and {source.filepath}")
+            entries.append(JAG2AnimationConfig.AnimationConfigEntry(entry.name, entry.start + offset, entry.length, entry.loop, entry.fps))
+        offset += source.header.numFrames
+    return entries
+
+
+# writes outputFilepath containing the frames of baseFilepath followed by those of each of appendFilepaths, and an
+# animation.cfg next to it if any of the inputs have one
+def merge(baseFilepath: str, appendFilepaths: Sequence[str], outputFilepath: str) -> None:
+    starttime = time.perf_counter()
+    inputFilepaths = [baseFilepath, *appendFilepaths]
+    outputConfigPath = JAG2AnimationConfig.pathForGLA(outputFilepath)
+    for filepath in inputFilepaths:
+        # the inputs are still being read while the output is written
+        if os.path.exists(outputFilepath) and os.path.samefile(filepath, outputFilepath):
+            raise GLAMergeError(f"Can't overwrite the input {filepath}, please choose another output file")
+        if os.path.abspath(JAG2AnimationConfig.pathForGLA(filepath)) == os.path.abspath(outputConfigPath):
+            raise GLAMergeError(f"The output's {JAG2AnimationConfig.FILENAME} would replace that of {filepath}, please choose another directory")
+
+    with ExitStack() as stack:
+        sources: List[MergeSource] = []
+        for filepath in inputFilepaths:
+            try:
+                sources.append(MergeSource(filepath, stack.enter_context(open(filepath, "rb"))))
+            except (GLAMergeError, JAG2GLAFormat.GLAFormatError) as e:
+                raise GLAMergeError(f"{filepath}: {e}")
+        base = sources[0]
+        for source in sources[1:]:
+            try:
+                source.boneOrder = matchSkeleton(base.skeleton, source.skeleton)
+            except GLAMergeError as e:
+                raise GLAMergeError(f"{source.filepath} does not fit {base.filepath}: {e}")
+        entries = mergeAnimationConfigs(sources)
+
+        # the pools are small compared to the frames, so they're simply deduplicated all at once
+        bonePool, indices = JAG2GLAFormat.deduplicateCompressedBones(np.concatenate([source.bonePool for source in sources]))
+        remaps = np.split(indices, np.cumsum([len(source.bonePool) for source in sources])[:-1])
+        if len(bonePool) > 1 << (8 * JAG2GLAFormat.FRAME_INDEX_SIZE):
+            raise GLAMergeError(f"The merged bone pool has {len(bonePool)} entries, more than the file format can index!")
+
+        header = JAG2GLAFormat.MdxaHeader()
+        header.name = base.header.name
+        header.scale = base.header.scale
+        numFrames = sum(source.header.numFrames for source in sources)
+        header.calculateOffsets(base.skeleton, numFrames, len(bonePool))
+
+        with open(outputFilepath, "wb") as file:
+            header.saveToFile(file)
+            base.skeleton.saveToFile(file)
+            assert (file.tell() == header.ofsFrames)
+            for source, remap in zip(sources, remaps):
+                copyFrames(source, remap, file)
+            file.write(bytes(-file.tell() % 4))
+            file.write(bonePool.astype("<u2").tobytes())
+            assert (file.tell() == header.ofsEnd)
+
+    if entries:
+        JAG2AnimationConfig.save(outputConfigPath, entries, "Animation Data merged from " + ", ".join(os.path.basename(path) for path in inputFilepaths))
+    numCompBones = sum(len(source.bonePool) for source in sources)
+    print(f"Merged {len(sources)} files into {outputFilepath} in {time.perf_counter() - starttime:.3f} seconds: {numFrames} frames, "
+          f"{len(bonePool)} of {numCompBones} compressed bones left after removing duplicates, {len(entries)} named animations")
+
+
+# appends the source's frames to the file, with the bone pool indices replaced by remap[index]
+def copyFrames(source: MergeSource, remap: np.ndarray, file: BinaryIO) -> None:
+    numBones = source.header.numBones
+    frameSize = JAG2GLAFormat.FRAME_INDEX_SIZE * numBones
+    source.file.seek(source.header.ofsFrames)
+    for start in range(0, source.header.numFrames, MERGE_CHUNK_FRAMES):
+        count = min(MERGE_CHUNK_FRAMES, source.header.numFrames - start)
+        data = source.file.read(count * frameSize)
+        if len(data) != count * frameSize:
+            raise JAG2GLAFormat.GLAFormatError(f"{source.filepath}: Unexpected end of file while reading frames!")
+        frames = JAG2GLAFormat.decodeFrames(data, count, numBones)
+        if frames.size > 0 and int(frames.max()) >= len(remap):
+            raise JAG2GLAFormat.GLAFormatError(f"{source.filepath}: Frames reference bones beyond the bone pool!")
+        file.write(JAG2GLAFormat.encodeFrames(remap[frames[:, source.boneOrder]]))
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(description="Appends the animations of Ghoul 2 animation files (.gla) to one with the same skeleton.")
+    parser.add_argument("base", help="the .gla whose animations come first, e.g. _humanoid.gla")
+    parser.add_argument("append", nargs="+", help=".gla files whose animations are appended, in this order")
+    parser.add_argument("-o", "--output", required=True, help="the .gla to write, with its animation.cfg next to it")
+    args = parser.parse_args(argv)
+    try:
+        merge(args.base, args.append, args.output)
+    except (OSError, GLAMergeError, JAG2GLAFormat.GLAFormatError, JAG2AnimationConfig.AnimationConfigError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,126 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# Copying a range of frames, or some of the animations listed in the animation.cfg, out of a .gla into a smaller
+# one without Blender. Only the selected frames get read, and the bone pool only keeps the entries they use,
+# numbered without gaps. Without a selection, all frames are kept, which compacts a file with unused or duplicate
+# bone pool entries.
+#
+# From the command line:
+#   python JAG2GLASlice.py _humanoid.gla -o sliced.gla --animations "BOTH_STAND1, BOTH_RUN1"
+#   python JAG2GLASlice.py _humanoid.gla -o sliced.gla --frames 100 250
+#   python JAG2GLASlice.py bloated.gla -o compacted.gla
+
+if __package__:
+    from .mod_reload import reload_modules
+    reload_modules(locals(), __package__, ["JAG2AnimationConfig", "JAG2GLAFormat"], [])  # nopep8
+
+    from . import JAG2AnimationConfig
+    from . import JAG2GLAFormat
+else:
+    # loaded as a top-level module, outside of Blender
+    import JAG2AnimationConfig
+    import JAG2GLAFormat
+
+from typing import List, Optional, Sequence, Tuple
+import argparse
+import os
+import sys
+import time
+
+
+class GLASliceError(Exception):
+    pass
+
+
+# the animation.cfg entries that lie entirely within the frames start..start+length-1, moved to start at 0
+def entriesInRange(entries: Sequence[JAG2AnimationConfig.AnimationConfigEntry], start: int, length: int) -> List[JAG2AnimationConfig.AnimationConfigEntry]:
+    result: List[JAG2AnimationConfig.AnimationConfigEntry] = []
+    for entry in entries:
+        if entry.start >= start and entry.start + entry.length <= start + length:
+            result.append(JAG2AnimationConfig.AnimationConfigEntry(entry.name, entry.start - start, entry.length, entry.loop, entry.fps))
+        elif entry.start < start + length and entry.start + entry.length > start:
+            print(f"Warning: animation {entry.name} is only partially within the frames, leaving it out of the {JAG2AnimationConfig.FILENAME}")
+    return result
+
+
+# writes outputFilepath with the given (start, length) frames or named animations of inputFilepath, or all of its
+# frames if neither is given, and the matching animation.cfg next to it if the input has one
+def sliceGLA(inputFilepath: str, outputFilepath: str, frames: Optional[Tuple[int, int]] = None, animationNames: Sequence[str] = ()) -> None:
+    starttime = time.perf_counter()
+    if frames is not None and animationNames:
+        raise GLASliceError("Select either frames or animations, not both")
+    configPath = JAG2AnimationConfig.pathForGLA(inputFilepath)
+    outputConfigPath = JAG2AnimationConfig.pathForGLA(outputFilepath)
+    sameFile = os.path.exists(outputFilepath) and os.path.samefile(inputFilepath, outputFilepath)
+    selected = frames is not None or len(animationNames) > 0
+    # compacting a file in place leaves the animations where they are, anything else changes them
+    if os.path.abspath(configPath) == os.path.abspath(outputConfigPath) and (selected or not sameFile):
+        raise GLASliceError(f"The output's {JAG2AnimationConfig.FILENAME} would replace that of {inputFilepath}, please choose another directory")
+    try:
+        entries = JAG2AnimationConfig.load(configPath) if os.path.isfile(configPath) else None
+    except JAG2AnimationConfig.AnimationConfigError as e:
+        raise GLASliceError(f"{configPath}: {e}")
+    if animationNames and entries is None:
+        raise GLASliceError(f"Animations can only be selected by name with a {JAG2AnimationConfig.FILENAME} next to {inputFilepath}")
+
+    # the file is read entirely before the output is written, so it may be the same file
+    with open(inputFilepath, "rb") as file:
+        gla = JAG2GLAFormat.GLAFile.loadFromFile(file, loadAnimation=False)
+        numFrames = gla.header.numFrames
+        numCompBones = (gla.header.ofsEnd - gla.header.ofsCompBonePool) // JAG2GLAFormat.COMPBONE_SIZE
+        if animationNames:
+            assert entries is not None
+            try:
+                selectedEntries = JAG2AnimationConfig.select(entries, animationNames)
+            except JAG2AnimationConfig.AnimationConfigError as e:
+                raise GLASliceError(f"{configPath}: {e}")
+            ranges = [(entry.start, entry.length) for entry in selectedEntries]
+            entries = JAG2AnimationConfig.consecutive(selectedEntries)
+        else:
+            ranges = [frames or (0, numFrames)]
+            if entries is not None:
+                entries = entriesInRange(entries, *ranges[0])
+        gla.animation.loadFrameRanges(file, gla.header, ranges)
+    gla.save(outputFilepath)
+
+    if entries is not None and not sameFile:
+        JAG2AnimationConfig.save(outputConfigPath, entries, "Animation Data sliced from " + os.path.basename(inputFilepath))
+    print(f"Wrote {gla.animation.numFrames} of {numFrames} frames to {outputFilepath} in {time.perf_counter() - starttime:.3f} seconds, "
+          f"keeping {len(gla.animation.bonePool)} of {numCompBones} compressed bones")
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(description="Copies frames or animations of a Ghoul 2 animation file (.gla) into a new one, "
+                                     "dropping the compressed bones they don't use. Copies everything if nothing is selected.")
+    parser.add_argument("input", help="the .gla to copy from")
+    parser.add_argument("-o", "--output", required=True, help="the .gla to write, with its animation.cfg next to it")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--frames", nargs=2, type=int, metavar=("START", "LENGTH"), help="the range of frames to copy, starting at 0")
+    selection.add_argument("--animations", metavar="NAMES", help="names of animations in the animation.cfg next to the input, separated by commas or spaces")
+    args = parser.parse_args(argv)
+    try:
+        sliceGLA(args.input, args.output, (args.frames[0], args.frames[1]) if args.frames else None, JAG2AnimationConfig.splitNames(args.animations or ""))
+    except (OSError, GLASliceError, JAG2GLAFormat.GLAFormatError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
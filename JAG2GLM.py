@@ -18,23 +18,26 @@
 
 
 from .mod_reload import reload_modules
-reload_modules(locals(), __package__, ["JAStringhelper", "JAFilesystem", "JAG2Constants", "JAG2GLA", "JAMaterialmanager", "MrwProfiler", "JAG2Panels"], [".casts", ".error_types"])  # nopep8
+reload_modules(locals(), __package__, ["JAStringhelper", "JAFilesystem", "JAG2Constants", "JAG2GLA", "JAG2GLAFormat", "JAG2GLMFormat", "JAMaterialmanager", "MrwProfiler", "JAG2Panels"], [".casts", ".error_types"])  # nopep8
 
 from dataclasses import dataclass
-from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple, cast
-import struct
+from typing import Dict, List, Optional, Tuple
 from . import JAStringhelper
 from . import JAFilesystem
 from . import JAG2Constants
 from . import JAG2GLA
+from . import JAG2GLAFormat
+from . import JAG2GLMFormat
 from . import JAMaterialmanager
 from . import MrwProfiler
 from . import JAG2Panels
-from .casts import optional_cast, downcast, bpy_generic_cast, unpack_cast, matrix_getter_cast, vector_getter_cast, vector_overload_cast
+from .casts import optional_cast, downcast, bpy_generic_cast, matrix_getter_cast, vector_getter_cast, vector_overload_cast
 from .error_types import ErrorMessage, NoError, ensureListIsGapless
+from .JAG2GLMFormat import GLMFormatError, MdxmHeader, MdxmLOD, MdxmSurface, MdxmSurfaceData, MdxmSurfaceDataCollection
 
 import bpy
 import mathutils
+import numpy as np
 
 
 BoneIndexMap = Dict[str, int]
@@ -42,29 +45,16 @@ BoneIndexMap = Dict[str, int]
 
 def buildBoneIndexLookupMap(gla_filepath_abs: str) -> Tuple[Optional[BoneIndexMap], ErrorMessage]:
     print("Loading gla file for bone name -> bone index lookup")
-    # open file
+    # read header and skeleton
     try:
-        file = open(gla_filepath_abs, mode="rb")
+        gla = JAG2GLAFormat.GLAFile.load(gla_filepath_abs, loadAnimation=False)
     except IOError:
         print("Could not open ", gla_filepath_abs, sep="")
         return None, ErrorMessage("Could not open gla file for bone index lookup!")
-    # read header
-    header = JAG2GLA.MdxaHeader()
-    success, message = header.loadFromFile(file)
-    if not success:
-        return None, message
-    # read offsets
-    boneOffsets = JAG2GLA.MdxaBoneOffsets()
-    # cannot fail (except with exception)
-    boneOffsets.loadFromFile(file, header.numBones)
-    # read skeleton
-    skeleton = JAG2GLA.MdxaSkel()
-    skeleton.loadFromFile(file, boneOffsets)
+    except JAG2GLAFormat.GLAFormatError as e:
+        return None, ErrorMessage(str(e))
     # build lookup map
-    boneIndices: Dict[str, int] = {}
-    for bone in skeleton.bones:
-        boneIndices[bone.name] = bone.index
-    return boneIndices, NoError
+    return gla.skeleton.getBoneIndexByName(), NoError
 
 
 def getName(object: bpy.types.Object) -> str:
@@ -139,216 +129,81 @@ def getBoneWeights(vertex: bpy.types.MeshVertex, meshObject: bpy.types.Object, a
     return weights
 
 
-class MdxmHeader:
-
-    def __init__(self):
-        self.name = ""
-        self.animName = b""
-        self.numBones: int = -1
-        self.numLODs: int = -1
-        self.ofsLODs: int = -1
-        self.numSurfaces: int = -1
-        self.ofsSurfHierarchy: int = -1
-        self.ofsEnd: int = -1
-
-    def loadFromFile(self, file: BinaryIO) -> Tuple[bool, ErrorMessage]:
-        # ident check
-        ident, = unpack_cast(Tuple[bytes], struct.unpack("4s", file.read(4)))
-        if ident != JAG2Constants.GLM_IDENT:
-            print("File does not start with ", JAG2Constants.GLM_IDENT,
-                  " but ", ident, " - no GLM!")
-            return False, ErrorMessage("Is no GLM file!")
-        # version check
-        version, = unpack_cast(Tuple[int], struct.unpack("i", file.read(4)))
-        if version != JAG2Constants.GLM_VERSION:
-            return False, ErrorMessage(f"Wrong glm file version! ({version} should be {JAG2Constants.GLM_VERSION})")
-        # read data
-        self.name, self.animName = unpack_cast(
-            Tuple[bytes, bytes],
-            struct.unpack("64s64s", file.read(JAG2Constants.MAX_QPATH * 2)))
-        # 4x is 4 ignored bytes - the animIndex which is only used ingame
-        self.numBones, self.numLODs, self.ofsLODs, self.numSurfaces, self.ofsSurfHierarchy, self.ofsEnd = unpack_cast(
-            Tuple[int, int, int, int, int, int],
-            struct.unpack("4x6i", file.read(4 * 7)))
-        return True, NoError
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        # 0 is animIndex, only used ingame
-        file.write(struct.pack("4si64s64s7i", JAG2Constants.GLM_IDENT, JAG2Constants.GLM_VERSION, self.name, self.animName,
-                   0, self.numBones, self.numLODs, self.ofsLODs, self.numSurfaces, self.ofsSurfHierarchy, self.ofsEnd))
-
-    def print(self) -> None:
-        print("== GLM Header ==\nname: {self.name}\nanimName: {self.animName}\nnumBones: {self.numBones}\nnumLODs: {self.numLODs}\nnumSurfaces: {self.numSurfaces}".format(
-            self=self))
-
-    @staticmethod
-    def getSize() -> int:
-        # 2 ints, 2 string, 7 ints
-        return 2 * 4 + 2 * 64 + 7 * 4
-
-# offsets of the surface data
-
-
-class MdxmSurfaceDataOffsets:
-    def __init__(self):
-        self.baseOffset = MdxmHeader.getSize()  # always directly after the header
-        self.offsets: List[int] = []
-
-    def loadFromFile(self, file: BinaryIO, numSurfaces: int) -> None:
-        assert (self.baseOffset == file.tell())
-        for i in range(numSurfaces):
-            self.offsets.append(struct.unpack("i", file.read(4))[0])
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        for offset in self.offsets:
-            file.write(struct.pack("i", offset))
-
-    def calculateOffsets(self, surfaceDataCollection: "MdxmSurfaceDataCollection") -> None:
-        offset = 4 * len(surfaceDataCollection.surfaces)
-        for surfaceData in surfaceDataCollection.surfaces:
-            self.offsets.append(offset)
-            offset += surfaceData.getSize()
-
-    # returns the size of this in bytes (when written to file)
-    def getSize(self) -> int:
-        return 4 * len(self.offsets)
-
-# originally called mdxmSurfaceHierarchy_t, I think that name is misleading (but mine's not too good, either)
-
-
-class MdxmSurfaceData:
-    def __init__(self):
-        self.name = b""
-        self.flags = -1
-        self.shader = b""
-        self.parentIndex = -1
-        self.numChildren = -1
-        self.children: List[int] = []
-        self.index = -1  # filled by MdxmSurfaceHierarchy.loadFromFile, not saved
-
-    def loadFromFile(self, file: BinaryIO) -> None:
-        self.name, self.flags, self.shader = unpack_cast(
-            Tuple[bytes, int, bytes],
-            struct.unpack(
-                "64sI64s", file.read(64 + 4 + 64)))
-        # ignoring shaderIndex which is only used ingame
-        self.parentIndex, self.numChildren = unpack_cast(
-            Tuple[int, int],
-            struct.unpack(
-                "4x2i", file.read(3 * 4)))
-        for i in range(self.numChildren):
-            self.children.append(struct.unpack("i", file.read(4))[0])
-
-    def loadFromBlender(self, object: bpy.types.Object, surfaceIndexMap: Dict[str, int]) -> Tuple[bool, ErrorMessage]:
-        self.name: bytes = getName(object).encode()
-        self.shader: bytes = object.g2_prop.shader.encode()  # pyright: ignore [reportAttributeAccessIssue]
-        # set flags
-        self.flags = 0
-        if object.g2_prop.off:  # pyright: ignore [reportAttributeAccessIssue]
-            self.flags |= JAG2Constants.SURFACEFLAG_OFF
-        if object.g2_prop.tag:  # pyright: ignore [reportAttributeAccessIssue]
-            self.flags |= JAG2Constants.SURFACEFLAG_TAG
-        # set parent
-        if object.parent != None and getName(object.parent) in surfaceIndexMap:
-            self.parentIndex = surfaceIndexMap[getName(object.parent)]
-        # set children
-        self.numChildren = 0
-        for child in object.children:
-            if child.type == 'MESH':  # working around non-mesh garbage in the hierarchy would be too much trouble, everything below that is ignored
-                if not JAG2Panels.hasG2MeshProperties(child):
-                    return False, ErrorMessage(f"{child.name} has no Ghoul 2 properties set!")
-                childName = getName(child)
-                if childName not in surfaceIndexMap:
-                    surfaceIndexMap[childName] = len(surfaceIndexMap)
-                self.children.append(surfaceIndexMap[childName])
-                self.numChildren += 1
-        return True, NoError
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        # 0 is the shader index, only used ingame
-        file.write(struct.pack("64sI64s3i", self.name, self.flags,
-                   self.shader, 0, self.parentIndex, self.numChildren))
-        for i in range(self.numChildren):
-            file.write(struct.pack("i", self.children[i]))
-
-    def getSize(self) -> int:
-        # string, int, string, 4 ints
-        return 64 + 4 + 64 + 3 * 4 + 4 * self.numChildren
+def surfaceDataFromBlender(object: bpy.types.Object, index: int, surfaceIndexMap: Dict[str, int]) -> Tuple[Optional[MdxmSurfaceData], ErrorMessage]:
+    surfaceData = MdxmSurfaceData()
+    surfaceData.index = index
+    surfaceData.name = getName(object).encode()
+    surfaceData.shader = object.g2_prop.shader.encode()  # pyright: ignore [reportAttributeAccessIssue]
+    # set flags
+    surfaceData.flags = 0
+    if object.g2_prop.off:  # pyright: ignore [reportAttributeAccessIssue]
+        surfaceData.flags |= JAG2Constants.SURFACEFLAG_OFF
+    if object.g2_prop.tag:  # pyright: ignore [reportAttributeAccessIssue]
+        surfaceData.flags |= JAG2Constants.SURFACEFLAG_TAG
+    # set parent
+    if object.parent != None and getName(object.parent) in surfaceIndexMap:
+        surfaceData.parentIndex = surfaceIndexMap[getName(object.parent)]
+    # set children
+    for child in object.children:
+        if child.type == 'MESH':  # working around non-mesh garbage in the hierarchy would be too much trouble, everything below that is ignored
+            if not JAG2Panels.hasG2MeshProperties(child):
+                return None, ErrorMessage(f"{child.name} has no Ghoul 2 properties set!")
+            childName = getName(child)
+            if childName not in surfaceIndexMap:
+                surfaceIndexMap[childName] = len(surfaceIndexMap)
+            surfaceData.children.append(surfaceIndexMap[childName])
+    return surfaceData, NoError
 
 # all the surface hierarchy/shader/name/flag/... information entries (MdxmSurfaceInfo)
 
 
-class MdxmSurfaceDataCollection:
-    def __init__(self):
-        self.surfaces: List[MdxmSurfaceData] = []
-
-    def loadFromFile(self, file: BinaryIO, surfaceInfoOffsets: MdxmSurfaceDataOffsets) -> None:
-        for i, offset in enumerate(surfaceInfoOffsets.offsets):
-            file.seek(surfaceInfoOffsets.baseOffset + offset)
-            surfaceInfo = MdxmSurfaceData()
-            surfaceInfo.loadFromFile(file)
-            surfaceInfo.index = i
-            self.surfaces.append(surfaceInfo)
-
-    def loadFromBlender(self, rootObject: bpy.types.Object, surfaceIndexMap: Dict[str, int]) -> Tuple[bool, ErrorMessage]:
-        visitedChildren: Dict[str, bpy.types.Object] = {}
-        surfaces: List[Optional[MdxmSurfaceData]] = []
-
-        def addChildren(object: bpy.types.Object) -> Tuple[bool, ErrorMessage]:
-            for child in object.children:
-                # only meshes supported in hierarchy, I couldn't always use the parent otherwise
-                if child.type != 'MESH':
-                    print(
-                        f"Warning: {child.name} is no mesh, neither it nor its children will be exported!")
-                elif not JAG2Panels.hasG2MeshProperties(child):
-                    return False, ErrorMessage(f"{child.name} has no Ghoul 2 properties set! (Also, the exporter should've detected this earlier.)")
-                else:
-                    # assign the child an index, if it doesn't have one already
-                    name = getName(child)
-                    if (dupe := visitedChildren.get(name)) is not None:
-                        return False, ErrorMessage(f"Objects \"{child.name}\" and \"{dupe.name}\" share G2 name \"{name}\"")
-                    visitedChildren[name] = child
-
-                    if (index := surfaceIndexMap.get(name)) is None:
-                        index = len(surfaceIndexMap)
-                        surfaceIndexMap[name] = index
-
-                    # create the surface
-                    surface = MdxmSurfaceData()
-                    surface.index = index
-                    success, message = surface.loadFromBlender(
-                        child, surfaceIndexMap)
-                    if not success:
-                        return False, message
+def surfaceDataCollectionFromBlender(rootObject: bpy.types.Object, surfaceIndexMap: Dict[str, int]) -> Tuple[Optional[MdxmSurfaceDataCollection], ErrorMessage]:
+    visitedChildren: Dict[str, bpy.types.Object] = {}
+    surfaces: List[Optional[MdxmSurfaceData]] = []
 
-                    # extend the surface list to include the index, if necessary
-                    if index >= len(self.surfaces):
-                        surfaces.extend(
-                            [None] * (index + 1 - len(surfaces)))
-                    surfaces[index] = surface
-
-                    success, message = addChildren(child)
-                    if not success:
-                        return False, message
-            return True, NoError
-        success, message = addChildren(rootObject)
-        if not success:
-            return False, message
-        gaplessSurfaces, err = ensureListIsGapless(surfaces)
-        if gaplessSurfaces is None:
-            return False, ErrorMessage(f"Internal error during hierarchy creation! (Missing Surfaces: {err})")
-        self.surfaces = gaplessSurfaces
+    def addChildren(object: bpy.types.Object) -> Tuple[bool, ErrorMessage]:
+        for child in object.children:
+            # only meshes supported in hierarchy, I couldn't always use the parent otherwise
+            if child.type != 'MESH':
+                print(
+                    f"Warning: {child.name} is no mesh, neither it nor its children will be exported!")
+            elif not JAG2Panels.hasG2MeshProperties(child):
+                return False, ErrorMessage(f"{child.name} has no Ghoul 2 properties set! (Also, the exporter should've detected this earlier.)")
+            else:
+                # assign the child an index, if it doesn't have one already
+                name = getName(child)
+                if (dupe := visitedChildren.get(name)) is not None:
+                    return False, ErrorMessage(f"Objects \"{child.name}\" and \"{dupe.name}\" share G2 name \"{name}\"")
+                visitedChildren[name] = child
+
+                if (index := surfaceIndexMap.get(name)) is None:
+                    index = len(surfaceIndexMap)
+                    surfaceIndexMap[name] = index
+
+                # create the surface
+                surface, message = surfaceDataFromBlender(child, index, surfaceIndexMap)
+                if surface is None:
+                    return False, message
+
+                # extend the surface list to include the index, if necessary
+                if index >= len(surfaces):
+                    surfaces.extend(
+                        [None] * (index + 1 - len(surfaces)))
+                surfaces[index] = surface
+
+                success, message = addChildren(child)
+                if not success:
+                    return False, message
         return True, NoError
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        for surfaceInfo in self.surfaces:
-            surfaceInfo.saveToFile(file)
-
-    def getSize(self) -> int:
-        size = 0
-        for surface in self.surfaces:
-            size += surface.getSize()
-        return size
+    success, message = addChildren(rootObject)
+    if not success:
+        return None, message
+    gaplessSurfaces, err = ensureListIsGapless(surfaces)
+    if gaplessSurfaces is None:
+        return None, ErrorMessage(f"Internal error during hierarchy creation! (Missing Surfaces: {err})")
+    collection = MdxmSurfaceDataCollection()
+    collection.surfaces = gaplessSurfaces
+    return collection, NoError
 
 
 @dataclass
@@ -360,610 +215,312 @@ class ImportMetadata:
     boneNames: Dict[int, str]
 
 
-class MdxmVertex:
+# collects a surface's vertices from Blender, to be turned into MdxmSurface arrays at the end
+class SurfaceVertices:
     def __init__(self):
-        self.co: List[float] = []
-        self.normal: List[float] = []
-        self.uv: List[float] = []
-        self.numWeights = 1
-        self.weights: List[float] = []
-        self.boneIndices: List[int] = []
-
-    # doesn't load UV since that comes later
-    def loadFromFile(self, file):
-        self.normal.extend(struct.unpack("3f", file.read(3 * 4)))
-        self.co.extend(struct.unpack("3f", file.read(3 * 4)))
-        # this is a packed structure that contains all kinds of things...
-        packedStuff, = unpack_cast(
-            Tuple[int],
-            struct.unpack("I", file.read(4)))
-        # this is not the complete weights, parts of it are in the packed stuff
-        weights: List[int] = []
-        weights.extend(struct.unpack("4B", file.read(4)))
-        # packedStuff bits 31 & 30: weight count
-        self.numWeights = (packedStuff >> 30) + 1
-        # packedStuff bits 29 & 28: nothing
-        # packedStuff bits 20f, 22f, 24f, 26f: weight overflow
-        totalWeight = 0
-        for i in range(self.numWeights):
-            # add overflow bits to the weight (MSBs!)
-            recomposed_weight = weights[i] | (
-                ((packedStuff >> (20 + 2 * i)) & 0b11) << 8)
-            # convert to float (0..1023 -> 0.0..1.0)
-            normalized_weight = recomposed_weight / 1023
-            if i + 1 < self.numWeights:
-                totalWeight += normalized_weight
-                self.weights.append(normalized_weight)
-            else:  # i+1 == self.numWeights:
-                self.weights.append(1 - totalWeight)
-        # packedStuff 0-19: bone indices, 5 bit each
-        for i in range(self.numWeights):
-            self.boneIndices.append((packedStuff >> (5 * i)) & 0b11111)
-
-    # index: this surface's index
-    # does not save UV (comes later)
-    def saveToFile(self, file: BinaryIO) -> None:
-        assert (len(self.weights) == self.numWeights)
-        #  pack the stuff that needs packing
-        # num weights
-        packedStuff = (self.numWeights - 1) << 30
-        weights = [0, 0, 0, 0]
-        for index, weight in enumerate(self.weights):
-            # convert weight to 10 bit integer
-            weight = round(weight * 1023)
-            # lower 8 bits
-            weights[index] = weight & 0xff
-            # higher 2 bits
-            hiWeight = (weight & 0x300) >> 8
-            packedStuff |= hiWeight << (20 + 2 * index)
-            # bone index - 5 bits
-            boneIndex = (self.boneIndices[index]) & 0b11111
-            packedStuff |= boneIndex << (5 * index)
-        assert (packedStuff < 1 << 32)
-        file.write(struct.pack("6fI4B", self.normal[0], self.normal[1], self.normal[2], self.co[0],
-                   self.co[1], self.co[2], packedStuff, weights[0], weights[1], weights[2], weights[3]))
+        self.co: List[List[float]] = []
+        self.normals: List[List[float]] = []
+        self.uvs: List[List[float]] = []
+        self.numWeights: List[int] = []
+        self.weights: List[List[float]] = []
+        self.boneIndices: List[List[int]] = []
+        # I'm taking the world matrix in case the object is not at the origin, but I really want the coordinates in scene_root-space, so I'm using that, too.
+        self.rootMat = matrix_getter_cast(bpy_generic_cast(bpy.types.Object, bpy.data.objects["scene_root"]).matrix_world).inverted()
 
     # vertex :: Blender MeshVertex
     # uv :: [int, int] (blender style, will be y-flipped)
     # boneIndices :: { string -> int } (bone name -> index, may be changed)
-    def loadFromBlender(self, vertex: bpy.types.MeshVertex, uv: List[float], normal: mathutils.Vector, boneIndices: Dict[str, int], meshObject: bpy.types.Object, armatureObject: Optional[bpy.types.Object]) -> Tuple[bool, ErrorMessage]:
-        # I'm taking the world matrix in case the object is not at the origin, but I really want the coordinates in scene_root-space, so I'm using that, too.
-        rootMat = matrix_getter_cast(bpy_generic_cast(bpy.types.Object, bpy.data.objects["scene_root"]).matrix_world).inverted()
-        co = vector_overload_cast(rootMat @ vector_overload_cast(matrix_getter_cast(meshObject.matrix_world) @ vector_getter_cast(vertex.co)))
-        normal = vector_overload_cast(rootMat.to_quaternion() @ vector_overload_cast(matrix_getter_cast(meshObject.matrix_world).to_quaternion() @ normal))
-        for i in range(3):
-            self.co.append(co[i])
-            self.normal.append(normal[i])
-
-        self.uv = [uv[0], 1 - uv[1]]  # flip Y
+    def add(self, vertex: bpy.types.MeshVertex, uv: List[float], normal: mathutils.Vector, boneIndices: Dict[str, int], meshObject: bpy.types.Object, armatureObject: Optional[bpy.types.Object]) -> Tuple[bool, ErrorMessage]:
+        co = vector_overload_cast(self.rootMat @ vector_overload_cast(matrix_getter_cast(meshObject.matrix_world) @ vector_getter_cast(vertex.co)))
+        normal = vector_overload_cast(self.rootMat.to_quaternion() @ vector_overload_cast(matrix_getter_cast(meshObject.matrix_world).to_quaternion() @ normal))
 
         # weight/bone indices
-
-        assert (len(self.weights) == 0)
+        vertexWeights: List[float] = []
+        vertexBoneIndices: List[int] = []
         if armatureObject == None:  # default skeleton
-            self.weights.append(1.0)
-            self.boneIndices.append(0)
-            self.numWeights = 1
+            vertexWeights.append(1.0)
+            vertexBoneIndices.append(0)
         else:
-            weights = None
             try:
-                weights = getBoneWeights(vertex, meshObject, armatureObject, 4)
+                weights = getBoneWeights(vertex, meshObject, armatureObject, JAG2GLMFormat.MAX_WEIGHTS)
             except GetBoneWeightException as e:
                 return False, ErrorMessage(f"Could not retrieve vertex bone weights: {e}")
-            self.numWeights = len(weights)
             for boneName, weight in weights.items():
-                self.weights.append(weight)
+                vertexWeights.append(weight)
                 if boneName in boneIndices:
-                    self.boneIndices.append(boneIndices[boneName])
+                    vertexBoneIndices.append(boneIndices[boneName])
                 else:
                     index = len(boneIndices)
                     boneIndices[boneName] = index
-                    self.boneIndices.append(index)
+                    vertexBoneIndices.append(index)
                     if len(boneIndices) > 32:
                         return False, ErrorMessage(f"More than 32 bones! ({len(boneIndices)})")
 
-        assert (len(self.weights) == self.numWeights)
-
+        self.co.append([co[0], co[1], co[2]])
+        self.normals.append([normal[0], normal[1], normal[2]])
+        self.uvs.append([uv[0], 1 - uv[1]])  # flip Y
+        self.numWeights.append(len(vertexWeights))
+        # unused slots are 0
+        padding = [0] * (JAG2GLMFormat.MAX_WEIGHTS - len(vertexWeights))
+        self.weights.append(vertexWeights + padding)
+        self.boneIndices.append(vertexBoneIndices + padding)
         return True, NoError
 
+    def __len__(self) -> int:
+        return len(self.co)
 
-class MdxmTriangle:
-    def __init__(self, indices: Optional[List[int]] = None):
-        # order gets reversed during load/save
-        self.indices = [] if indices is None else indices
+    def saveToSurface(self, surface: MdxmSurface) -> None:
+        surface.co = np.array(self.co, dtype=np.float32).reshape(-1, 3)
+        surface.normals = np.array(self.normals, dtype=np.float32).reshape(-1, 3)
+        surface.uvs = np.array(self.uvs, dtype=np.float32).reshape(-1, 2)
+        surface.numWeights = np.array(self.numWeights, dtype=np.uint8)
+        surface.weights = np.array(self.weights, dtype=np.float32).reshape(-1, JAG2GLMFormat.MAX_WEIGHTS)
+        surface.boneIndices = np.array(self.boneIndices, dtype=np.uint8).reshape(-1, JAG2GLMFormat.MAX_WEIGHTS)
 
-    def loadFromFile(self, file: BinaryIO) -> None:
-        self.indices.extend(struct.unpack("3i", file.read(3 * 4)))
-        # flip CW/CCW
-        self.indices[0], self.indices[2] = self.indices[2], self.indices[0]
-        # make sure last index is not 0, eeekadoodle or something...
-        if self.indices[2] == 0:
-            self.indices[0], self.indices[1], self.indices[2] = self.indices[2], self.indices[0], self.indices[1]
 
-    def saveToFile(self, file: BinaryIO) -> None:
-        # triangles are flipped because otherwise they'd face the wrong way.
-        file.write(struct.pack(
-            "3i", self.indices[2], self.indices[1], self.indices[0]))
+# in Blender, triangles are counter-clockwise, so the order gets reversed during load/save
+def _trianglesToBlender(triangles: np.ndarray) -> np.ndarray:
+    # flip CW/CCW
+    result = triangles[:, ::-1].copy()
+    # make sure last index is not 0, eeekadoodle or something...
+    lastIsZero = result[:, 2] == 0
+    result[lastIsZero] = result[lastIsZero][:, [2, 0, 1]]
+    return result
 
-    # "for x in triangle" support
-    def __getitem__(self, index: int) -> int:
-        return self.indices[index]
 
+def _trianglesFromBlender(triangles: np.ndarray) -> np.ndarray:
+    # triangles are flipped because otherwise they'd face the wrong way.
+    return np.ascontiguousarray(triangles[:, ::-1], dtype=np.int32)
 
-class MdxmSurface:
-    def __init__(self):
-        self.index = -1
-        self.numVerts = -1
-        self.ofsVerts = -1
-        self.numTriangles = -1
-        self.ofsTriangles = -1
-        self.numBoneReferences = -1
-        self.ofsBoneReferences = -1
-        self.ofsEnd = -1  # = size
-        self.vertices: List[MdxmVertex] = []
-        self.triangles: List[MdxmTriangle] = []
-        # integers: bone indices. maximum of 32, thus can be stored in 5 bit in vertices, saves space.
-        self.boneReferences: List[int] = []
-
-    def loadFromFile(self, file) -> None:
-        startPos = file.tell()
-        #  load surface header
-        # in the beginning I ignore the ident, which is usually 0 and shouldn't matter
-        self.index, ofsHeader, self.numVerts, self.ofsVerts, self.numTriangles, self.ofsTriangles, self.numBoneReferences, self.ofsBoneReferences, self.ofsEnd = unpack_cast(
-            Tuple[int, int, int, int, int, int, int, int, int],
-            struct.unpack(
-                "4x9i", file.read(10 * 4)))
-        assert (ofsHeader == -startPos)
-
-        #  load vertices
-        file.seek(startPos + self.ofsVerts)
-        for i in range(self.numVerts):
-            vert = MdxmVertex()
-            vert.loadFromFile(file)
-            self.vertices.append(vert)
-
-        # uv textures come later
-        for vert in self.vertices:
-            vert.uv.extend(struct.unpack("2f", file.read(2 * 4)))
-
-        #  load triangles
-        file.seek(startPos + self.ofsTriangles)
-        for i in range(self.numTriangles):
-            t = MdxmTriangle()
-            t.loadFromFile(file)
-            self.triangles.append(t)
-
-        #  load bone references
-        file.seek(startPos + self.ofsBoneReferences)
-        assert (len(self.boneReferences) == 0)
-        self.boneReferences.extend(struct.unpack(
-            str(self.numBoneReferences) + "i", file.read(4 * self.numBoneReferences)))
 
-        print(
-            f"surface {self.index}: numBoneReferences: {self.numBoneReferences}")
-        for i, boneRef in enumerate(self.boneReferences):
-            print(f"bone ref {i}: {boneRef}")
-
-        if file.tell() != startPos + self.ofsEnd:
-            print(
-                "Warning: Surface structure unordered (bone references not last) or read error")
-            file.seek(startPos + self.ofsEnd)
-
-    def loadFromBlender(self, object: bpy.types.Object, surfaceData: MdxmSurfaceData, boneIndexMap: Optional[BoneIndexMap], armatureObject: Optional[bpy.types.Object]) -> Tuple[bool, ErrorMessage]:
-        if object.type != 'MESH':
-            return False, ErrorMessage(f"Object {object.name} is not of type Mesh!")
-        mesh: bpy.types.Mesh = downcast(bpy.types.Object, object.evaluated_get(
-            bpy.context.evaluated_depsgraph_get())).to_mesh()
-
-        boneIndices: Dict[str, int] = {}
-
-        # This is a tag, use a simpler export procedure
-        if surfaceData.flags & JAG2Constants.SURFACEFLAG_TAG:
-            print(f"{object.name} is a tag")
-            for face in mesh.polygons:
-                if len(face.vertices) != 3:
-                    return False, ErrorMessage(f"Non-triangle tag found: {object.name}!")
-            for vi in mesh.vertices:
-                vi = bpy_generic_cast(bpy.types.MeshVertex, vi)
-                vert = MdxmVertex()
-                success, message = vert.loadFromBlender(
-                    vi, [0, 0], mathutils.Vector(), boneIndices, object, armatureObject)
-                if not success:
-                    return False, ErrorMessage(f"Mesh {mesh.name} has invalid vertex: {message}")
-                self.vertices.append(vert)
-            self.triangles = [MdxmTriangle(
-                [face.vertices[0], face.vertices[1], face.vertices[2]]) for face in mesh.polygons]
-
-            self.numVerts = len(mesh.vertices)
-            self.numTriangles = len(mesh.polygons)
+def surfaceFromBlender(object: bpy.types.Object, index: int, surfaceData: MdxmSurfaceData, boneIndexMap: Optional[BoneIndexMap], armatureObject: Optional[bpy.types.Object]) -> Tuple[Optional[MdxmSurface], ErrorMessage]:
+    if object.type != 'MESH':
+        return None, ErrorMessage(f"Object {object.name} is not of type Mesh!")
+    mesh: bpy.types.Mesh = downcast(bpy.types.Object, object.evaluated_get(
+        bpy.context.evaluated_depsgraph_get())).to_mesh()
 
-        # This is not a tag, do normal things
-        else:
-
-            uv_layer = mesh.uv_layers.active
-            uv_layer_data = None
-            if (not uv_layer or not (uv_layer_data := uv_layer.data)) and len(mesh.polygons) > 0:
-                return False, ErrorMessage("No UV coordinates found!")
-
-            protoverts = []
-
-            for face in mesh.polygons:
-                triangle = []
-                if len(face.vertices) != 3:
-                    return False, ErrorMessage("Non-triangle face found!")
-                # len(mesh.polygons) > 0 here (this loop is iterating it), so the check above guarantees uv_layer_data is set
-                assert uv_layer_data is not None
-                for i in range(3):
-                    loop = bpy_generic_cast(bpy.types.MeshLoop, mesh.loops[face.loop_start + i])
-                    v = loop.vertex_index
-                    u = uv_layer_data[loop.index].uv
-                    n = vector_getter_cast(loop.normal if mesh.has_custom_normals else bpy_generic_cast(bpy.types.MeshVertex, mesh.vertices[loop.vertex_index]).normal)
-
-                    proto_found = -1
-                    for j in range(len(protoverts)):
-                        proto = protoverts[j]
-                        if proto[0] == v and proto[1] == u and abs(proto[2][0] - n[0]) < 0.05 and abs(proto[2][1] - n[1]) < 0.05 and abs(proto[2][2] - n[2]) < 0.05:
-                            proto_found = j
-                            break
-
-                    if proto_found >= 0:
-                        triangle.append(proto_found)
-                    else:
-                        vertex = MdxmVertex()
-                        uv_arg: List[float] = u  # pyright: ignore [reportAssignmentType]  # vector supports slices
-                        success, message = vertex.loadFromBlender(
-                            mesh.vertices[v], uv_arg, n, boneIndices, object, armatureObject)
-                        if not success:
-                            return False, ErrorMessage(f"Surface has invalid vertex: {message}")
-                        protoverts.append((v, u, n))
-                        self.vertices.append(vertex)
-                        triangle.append(len(protoverts) - 1)
-                self.triangles.append(MdxmTriangle(triangle))
-
-            self.numVerts = len(protoverts)
-            self.numTriangles = len(mesh.polygons)
-
-            if self.numVerts > 1000:
-                print(f"Warning: {object.name} has over 1000 vertices ({self.numVerts})")
-
-        assert (len(self.vertices) == self.numVerts)
-        assert (len(self.triangles) == self.numTriangles)
-
-        # fill bone references
-        if boneIndexMap is None:  # default skeleton
-            self.boneReferences = [0]
-        else:
-            boneReferences: List[Optional[int]] = [None] * len(boneIndices)
-            for boneName, index in boneIndices.items():
-                boneReferences[index] = boneIndexMap[boneName]
-            gaplessBoneReferences, err = ensureListIsGapless(boneReferences)
-            if gaplessBoneReferences is None:
-                return False, ErrorMessage(f"bug: boneIndexMap left gaps: {err}")
-            self.boneReferences = gaplessBoneReferences
-
-        self._calculateOffsets()
-        return True, NoError
-
-    # if a surface does not exist on a lower LOD, an empty one gets created
-    def makeEmpty(self):
-        self.numVerts = 0
-        self.numTriangles = 0
-        self.numBoneReferences = 0
-        self._calculateOffsets()
-
-    def saveToFile(self, file):
-        startPos = file.tell()
-        #  write header (= this)
-        # 0 = ident
-        file.write(struct.pack("10i", 0, self.index, -startPos, self.numVerts, self.ofsVerts,
-                   self.numTriangles, self.ofsTriangles, self.numBoneReferences, self.ofsBoneReferences, self.ofsEnd))
-
-        # I don't know if triangles *have* to come first, but when I export they do, hence the assertions.
-
-        #  write triangles
-        assert (file.tell() == startPos + self.ofsTriangles)
-        for tri in self.triangles:
-            tri.saveToFile(file)
-
-        #  write vertices
-        assert (file.tell() == startPos + self.ofsVerts)
-        # write packed part
-        for vert in self.vertices:
-            vert.saveToFile(file)
-        # write UVs
-        for vert in self.vertices:
-            file.write(struct.pack("2f", vert.uv[0], vert.uv[1]))
-
-        #  write bone indices
-        assert (file.tell() == startPos + self.ofsBoneReferences)
-        for ref in self.boneReferences:
-            file.write(struct.pack("i", ref))
-
-        assert (file.tell() == startPos + self.ofsEnd)
-
-    # returns the created object
-    def saveToBlender(self, data: ImportMetadata, lodLevel: int):
-        #  retrieve metadata (same across LODs)
-        surfaceData = data.surfaceDataCollection.surfaces[self.index]
-        # blender won't let us create multiple things with the same name, so we add a LOD-suffix
-        name = JAStringhelper.decode(surfaceData.name)
-        blenderName = name + "_" + str(lodLevel)
-
-        #  create mesh
-        mesh = bpy.data.meshes.new(blenderName)
-
-        mesh_triangles = [triangle.indices for triangle in self.triangles]
-        mesh.from_pydata(
-            [v.co for v in self.vertices],
-            [],
-            mesh_triangles
-            )
-
-        material = data.materialManager.getMaterial(name, surfaceData.shader)
-        if material == None:
-            material = bpy.data.materials.new(
-                name=JAStringhelper.decode(surfaceData.shader))
-        mesh.materials.append(material)
-
-        # this is probably actually bullshit, since vertex order is what determines a tag, not index order! I think.
-        """
-		# if this is a tag, changing the index order is not such a good idea. So let's change the vertex order, too!
-		if len( self.vertices ) == 3 and len( self.triangles ) == 1 and self.triangles[0].indices[2] == 0:
-			indexmap = { 0 : 2, 1 : 0, 2 : 1 }
-			self.vertices = [ self.vertices[ indexmap[ i ] ] for i in range( 3 ) ]
-			self.triangles[0].indices = [ indexmap[ self.triangles[0][ i ] ] for i in range( 3 ) ]
-		"""
-        for poly in mesh.polygons:
-            poly.use_smooth = True
-        mesh.normals_split_custom_set_from_vertices([v.normal for v in self.vertices])
-
-        flat_uvs = []
-        for triangle in mesh_triangles:
-            for i in triangle:
-                flat_uvs.append(self.vertices[i].uv[0])
-                flat_uvs.append(1 - self.vertices[i].uv[1])
-
-        uv_layer = mesh.uv_layers.new(do_init=False, name="UVMap")
-        uv_layer.data.foreach_set("uv", flat_uvs)
-
-        mesh.validate()
-        mesh.update()
-
-        #  create object
-        obj = bpy.data.objects.new(blenderName, mesh)
-
-        # in the case of the default skeleton, no weighting is needed.
-        if not data.gla.isDefault:
-
-            #  create armature modifier
-            armatureModifier = downcast(bpy.types.ArmatureModifier, obj.modifiers.new("armature", 'ARMATURE'))
-            armatureModifier.object = optional_cast(bpy.types.Object, data.gla.skeleton_object)
-            armatureModifier.use_bone_envelopes = False  # only use vertex groups by default
-
-            #  create vertex groups (indices will match)
-            for index in self.boneReferences:
-                if index not in data.boneNames:
-                    raise Exception(
-                        "Bone Index {} not in LookupTable!".format(index))
-                obj.vertex_groups.new(name=data.boneNames[index])
-
-            # set weights
-            for vertIndex, vert in enumerate(self.vertices):
-                for weightIndex in range(vert.numWeights):
-                    obj.vertex_groups[vert.boneIndices[weightIndex]].add(
-                        [vertIndex], vert.weights[weightIndex], 'ADD')
-
-        # link object to scene
-        assert bpy.context.scene is not None
-        bpy.context.scene.collection.objects.link(obj)
-
-        # make object active - needed for this smoothing operator and possibly for material adding later
-        assert bpy.context.view_layer is not None
-        bpy.context.view_layer.objects.active = obj
-
-        # set ghoul2 specific properties
-        obj.g2_prop.name = name  # pyright: ignore [reportAttributeAccessIssue]
-        obj.g2_prop.shader = surfaceData.shader.decode()  # pyright: ignore [reportAttributeAccessIssue]
-        obj.g2_prop.tag = not not (surfaceData.flags & JAG2Constants.SURFACEFLAG_TAG)  # pyright: ignore [reportAttributeAccessIssue]
-        obj.g2_prop.off = not not (surfaceData.flags & JAG2Constants.SURFACEFLAG_OFF)  # pyright: ignore [reportAttributeAccessIssue]
-        JAG2Panels.markG2Configured(obj)
-
-        # return object so hierarchy etc. can be set
-        return obj
-
-    # fill offset and number variables
-    def _calculateOffsets(self):
-        offset = 10 * 4  # header: 4 ints
-        # triangles
-        self.ofsTriangles = offset
-        self.numTriangles = len(self.triangles)
-        offset += 3 * 4 * self.numTriangles  # 3 ints
-        # vertices
-        self.ofsVerts = offset
-        self.numVerts = len(self.vertices)
-        offset += 10 * 4 * self.numVerts  # 6 floats co/normal, 8 bytes packed, 2 floats UV
-        # bone references
-        self.ofsBoneReferences = offset
-        self.numBoneReferences = len(self.boneReferences)
-        offset += 4 * self.numBoneReferences  # 1 int each
-        # that's all the content, so we've got total size now.
-        self.ofsEnd = offset
-
-
-class MdxmLOD:
-    def __init__(self, surfaceOffsets: List[int], level: int, surfaces: List[MdxmSurface], ofsEnd: int):
-        self.surfaceOffsets = surfaceOffsets
-        self.level = level
-        self.surfaces = surfaces
-        self.ofsEnd = ofsEnd  # = size
-
-    @staticmethod
-    def loadFromFile(file: BinaryIO, level: int, header: MdxmHeader) -> "MdxmLOD":
-        startPos = file.tell()
-        ofsEnd, = unpack_cast(Tuple[int], struct.unpack("i", file.read(4)))
-        # surface offsets - they're relative to a structure after the one containing ofsEnd, so I need to add sizeof(int) to them later.
-        surfaceOffsets = unpack_cast(List[int], list(struct.unpack(f"{header.numSurfaces}i", file.read(4 * header.numSurfaces))))
-        surfaces: List[MdxmSurface] = []
-        for surfaceIndex, offset in enumerate(surfaceOffsets):
-            if file.tell() != startPos + 4 + offset:
-                print("Warning: Surface not completely read or unordered")
-                file.seek(startPos + offset + 4)
-            surface = MdxmSurface()
-            surface.loadFromFile(file)
-            assert (surface.index == surfaceIndex)
-            surfaces.append(surface)
-        assert (file.tell() == startPos + ofsEnd)
-        return MdxmLOD(
-            surfaceOffsets=surfaceOffsets,
-            level=level,
-            surfaces=surfaces,
-            ofsEnd=ofsEnd,
+    surface = MdxmSurface(index)
+    vertices = SurfaceVertices()
+    boneIndices: Dict[str, int] = {}
+    triangles: List[List[int]] = []
+
+    # This is a tag, use a simpler export procedure
+    if surfaceData.flags & JAG2Constants.SURFACEFLAG_TAG:
+        print(f"{object.name} is a tag")
+        for face in mesh.polygons:
+            if len(face.vertices) != 3:
+                return None, ErrorMessage(f"Non-triangle tag found: {object.name}!")
+        for vi in mesh.vertices:
+            vi = bpy_generic_cast(bpy.types.MeshVertex, vi)
+            success, message = vertices.add(
+                vi, [0, 0], mathutils.Vector((0, 0, 0)), boneIndices, object, armatureObject)
+            if not success:
+                return None, ErrorMessage(f"Mesh {mesh.name} has invalid vertex: {message}")
+        triangles = [[face.vertices[0], face.vertices[1], face.vertices[2]] for face in mesh.polygons]
+
+    # This is not a tag, do normal things
+    else:
+
+        uv_layer = mesh.uv_layers.active
+        uv_layer_data = None
+        if (not uv_layer or not (uv_layer_data := uv_layer.data)) and len(mesh.polygons) > 0:
+            return None, ErrorMessage("No UV coordinates found!")
+
+        protoverts = []
+
+        for face in mesh.polygons:
+            triangle = []
+            if len(face.vertices) != 3:
+                return None, ErrorMessage("Non-triangle face found!")
+            # len(mesh.polygons) > 0 here (this loop is iterating it), so the check above guarantees uv_layer_data is set
+            assert uv_layer_data is not None
+            for i in range(3):
+                loop = bpy_generic_cast(bpy.types.MeshLoop, mesh.loops[face.loop_start + i])
+                v = loop.vertex_index
+                u = uv_layer_data[loop.index].uv
+                n = vector_getter_cast(loop.normal if mesh.has_custom_normals else bpy_generic_cast(bpy.types.MeshVertex, mesh.vertices[loop.vertex_index]).normal)
+
+                proto_found = -1
+                for j in range(len(protoverts)):
+                    proto = protoverts[j]
+                    if proto[0] == v and proto[1] == u and abs(proto[2][0] - n[0]) < 0.05 and abs(proto[2][1] - n[1]) < 0.05 and abs(proto[2][2] - n[2]) < 0.05:
+                        proto_found = j
+                        break
+
+                if proto_found >= 0:
+                    triangle.append(proto_found)
+                else:
+                    uv_arg: List[float] = u  # pyright: ignore [reportAssignmentType]  # vector supports slices
+                    success, message = vertices.add(
+                        mesh.vertices[v], uv_arg, n, boneIndices, object, armatureObject)
+                    if not success:
+                        return None, ErrorMessage(f"Surface has invalid vertex: {message}")
+                    protoverts.append((v, u, n))
+                    triangle.append(len(protoverts) - 1)
+            triangles.append(triangle)
+
+        MrwProfiler.count("vertices welded", len(mesh.loops) - len(protoverts))
+
+        if len(protoverts) > 1000:
+            print(f"Warning: {object.name} has over 1000 vertices ({len(protoverts)})")
+
+    vertices.saveToSurface(surface)
+    surface.triangles = _trianglesFromBlender(np.array(triangles, dtype=np.int32).reshape(-1, 3))
+    MrwProfiler.count("vertices", surface.numVerts)
+    MrwProfiler.count("triangles", surface.numTriangles)
+
+    # fill bone references
+    if boneIndexMap is None:  # default skeleton
+        surface.boneReferences = np.array([0], dtype=np.int32)
+    else:
+        boneReferences: List[Optional[int]] = [None] * len(boneIndices)
+        for boneName, index in boneIndices.items():
+            boneReferences[index] = boneIndexMap[boneName]
+        gaplessBoneReferences, err = ensureListIsGapless(boneReferences)
+        if gaplessBoneReferences is None:
+            return None, ErrorMessage(f"bug: boneIndexMap left gaps: {err}")
+        surface.boneReferences = np.array(gaplessBoneReferences, dtype=np.int32)
+
+    return surface, NoError
+
+
+# returns the created object
+def surfaceToBlender(surface: MdxmSurface, data: ImportMetadata, lodLevel: int) -> bpy.types.Object:
+    #  retrieve metadata (same across LODs)
+    surfaceData = data.surfaceDataCollection.surfaces[surface.index]
+    # blender won't let us create multiple things with the same name, so we add a LOD-suffix
+    name = JAStringhelper.decode(surfaceData.name)
+    blenderName = name + "_" + str(lodLevel)
+
+    #  create mesh
+    MrwProfiler.count("vertices", surface.numVerts)
+    MrwProfiler.count("triangles", surface.numTriangles)
+    mesh = bpy.data.meshes.new(blenderName)
+
+    mesh_triangles = _trianglesToBlender(surface.triangles)
+    mesh.from_pydata(
+        surface.co,  # pyright: ignore [reportArgumentType]  # any sequence of vectors works
+        [],
+        mesh_triangles  # pyright: ignore [reportArgumentType]
         )
 
-    def saveToFile(self, file: BinaryIO) -> None:
-        startPos = file.tell()
-        # write ofsEnd
-        file.write(struct.pack("i", self.ofsEnd))
-        # write surface offsets
-        for offset in self.surfaceOffsets:
-            file.write(struct.pack("i", offset))
-        # write surfaces
-        for surface in self.surfaces:
-            surface.saveToFile(file)
-        # that's it, should've reached end.
-        assert (file.tell() == startPos + self.ofsEnd)
-
-    @staticmethod
-    def loadFromBlender(level: int, model_root: bpy.types.Object, surfaceIndexMap: Dict[str, int], surfaceDataCollection: MdxmSurfaceDataCollection, boneIndexMap: Optional[BoneIndexMap], armatureObject: Optional[bpy.types.Object]) -> Tuple[Optional["MdxmLOD"], ErrorMessage]:
-        # self.level gets set by caller
-
-        # create dictionary of available objects
-        def addChildren(dict, object):
-            for child in object.children:
-                if child.type == 'MESH' and JAG2Panels.hasG2MeshProperties(child):
-                    dict[getName(child)] = child
-                addChildren(dict, child)
-        available = {}
-        addChildren(available, model_root)
-
-        surfaces: List[Optional[MdxmSurface]] = [None] * len(surfaceIndexMap)
-        # for each required surface:
-        for name, index in surfaceIndexMap.items():
-            # create surface
-            surf = MdxmSurface()
-            # set correct index
-            surf.index = index
-            # if it is available:
-            if name in available:
-                surfaceData = surfaceDataCollection.surfaces[index]
-                # load from blender
-                success, message = surf.loadFromBlender(
-                    available[name], surfaceData, boneIndexMap, armatureObject)
-                if not success:
-                    return None, ErrorMessage(f"could not load surface {name}: {message}")
-            # not available?
-            else:
-                # create empty one
-                surf.makeEmpty()
-            # add surface to list
-            surfaces[index] = surf
-        gaplessSurfaces, err = ensureListIsGapless(surfaces)
-        if gaplessSurfaces is None:
-            return None, ErrorMessage(f"internal error: surface index map incomplete: {err}")
-        return MdxmLOD(
-            surfaceOffsets=[],  # FIXME: avoid this invalid state
-            level=level,
-            surfaces=gaplessSurfaces,
-            ofsEnd=-1,  # FIXME: avoid this invalid state
-        ), NoError
-
-    def saveToBlender(self, data: ImportMetadata, root: bpy.types.Object):
-        # 1st pass: create objects
-        objects = []
-        for surface in self.surfaces:
-            if surface is not None:
-                obj = surface.saveToBlender(data, self.level)
-                objects.append(obj)
-        # 2nd pass: set parent relations
-        for i, obj in enumerate(objects):
-            parentIndex = data.surfaceDataCollection.surfaces[i].parentIndex
-            parent = root
-            if parentIndex != -1:
-                parent = objects[parentIndex]
-            obj.parent = parent
-
-    # fills self.surfaceOffsets and self.ofsEnd based on self.surfaces (must be initialized)
-    def calculateOffsets(self, myOffset):
-        self.surfaceOffsets = []
-        # ofsEnd is in front of offsets, but they are relative to their start
-        offset = 4 * len(self.surfaces)
-        for surface in self.surfaces:
-            self.surfaceOffsets.append(offset)
-            offset += surface.ofsEnd  # = size
-        # memory required for ofsEnd
-        self.ofsEnd = offset + 4
-
-    def getSize(self):
-        # ofsEnd + surface offsets
-        size = 4 + 4 * len(self.surfaces)
-        for surface in self.surfaces:
-            size += surface.ofsEnd
-        return size
-
-
-class MdxmLODCollection:
-    def __init__(self):
-        self.LODs: List[MdxmLOD] = []
-
-    def loadFromFile(self, file: BinaryIO, header: MdxmHeader) -> None:
-        for i in range(header.numLODs):
-            startPos = file.tell()
-            curLOD = MdxmLOD.loadFromFile(file, i, header)
-            if file.tell() != startPos + curLOD.ofsEnd:
-                print("Warning: Internal reading error or LODs not tightly packed!")
-                file.seek(startPos + curLOD.ofsEnd)
-            self.LODs.append(curLOD)
-
-    def loadFromBlender(self, rootObjects: List[bpy.types.Object], surfaceIndexMap: Dict[str, int], surfaceDataCollection: MdxmSurfaceDataCollection, boneIndexMap: Optional[BoneIndexMap], armatureObject: Optional[bpy.types.Object]) -> Tuple[bool, ErrorMessage]:
-        for lodLevel, model_root in enumerate(rootObjects):
-            lod, message = MdxmLOD.loadFromBlender(
-                lodLevel, model_root, surfaceIndexMap, surfaceDataCollection, boneIndexMap, armatureObject)
-            if lod is None:
-                return False, ErrorMessage(f"loading LOD {lodLevel} from Blender: {message}")
-            self.LODs.append(lod)
-        return True, NoError
-
-    def calculateOffsets(self, ofsLODs):
-        offset = ofsLODs
-        for lod in self.LODs:
-            lod.calculateOffsets(offset)
-            offset += lod.getSize()
-
-    def saveToFile(self, file: BinaryIO) -> None:
-        for LOD in self.LODs:
-            LOD.saveToFile(file)
-
-    def saveToBlender(self, data: ImportMetadata):
-        for i, LOD in enumerate(self.LODs):
-            root = bpy.data.objects.new("model_root_" + str(i), None)
-            root.parent = data.scene_root
-            assert bpy.context.scene is not None
-            bpy.context.scene.collection.objects.link(root)
-            LOD.saveToBlender(data, root)
-
-    def getSize(self):
-        size = 0
-        for LOD in self.LODs:
-            size += LOD.ofsEnd
-        return size
+    material = data.materialManager.getMaterial(name, surfaceData.shader)
+    if material == None:
+        material = bpy.data.materials.new(
+            name=JAStringhelper.decode(surfaceData.shader))
+    mesh.materials.append(material)
+
+    mesh.polygons.foreach_set("use_smooth", np.ones(len(mesh.polygons), dtype=bool))
+    mesh.normals_split_custom_set_from_vertices(surface.normals)  # pyright: ignore [reportArgumentType]
+
+    # per loop, flipping Y
+    uvs = surface.uvs[mesh_triangles.ravel()]
+    uvs[:, 1] = 1 - uvs[:, 1]
+
+    uv_layer = mesh.uv_layers.new(do_init=False, name="UVMap")
+    uv_layer.data.foreach_set("uv", uvs.ravel())
+
+    mesh.validate()
+    mesh.update()
+
+    #  create object
+    obj = bpy.data.objects.new(blenderName, mesh)
+
+    # in the case of the default skeleton, no weighting is needed.
+    if not data.gla.isDefault:
+
+        #  create armature modifier
+        armatureModifier = downcast(bpy.types.ArmatureModifier, obj.modifiers.new("armature", 'ARMATURE'))
+        armatureModifier.object = optional_cast(bpy.types.Object, data.gla.skeleton_object)
+        armatureModifier.use_bone_envelopes = False  # only use vertex groups by default
+
+        #  create vertex groups (indices will match)
+        for index in surface.boneReferences.tolist():
+            if index not in data.boneNames:
+                raise Exception(
+                    "Bone Index {} not in LookupTable!".format(index))
+            obj.vertex_groups.new(name=data.boneNames[index])
+
+        # set weights, one call per group and distinct weight rather than per vertex
+        used = np.arange(JAG2GLMFormat.MAX_WEIGHTS) < surface.numWeights[:, np.newaxis]
+        vertIndices, slots = np.nonzero(used)
+        batches: Dict[Tuple[int, float], List[int]] = {}
+        for vertIndex, group, weight in zip(vertIndices.tolist(), surface.boneIndices[vertIndices, slots].tolist(), surface.weights[vertIndices, slots].tolist()):
+            batches.setdefault((group, weight), []).append(vertIndex)
+        for (group, weight), groupVertIndices in batches.items():
+            obj.vertex_groups[group].add(groupVertIndices, weight, 'ADD')
+
+    # link object to scene
+    assert bpy.context.scene is not None
+    bpy.context.scene.collection.objects.link(obj)
+
+    # make object active - needed for this smoothing operator and possibly for material adding later
+    assert bpy.context.view_layer is not None
+    bpy.context.view_layer.objects.active = obj
+
+    # set ghoul2 specific properties
+    obj.g2_prop.name = name  # pyright: ignore [reportAttributeAccessIssue]
+    obj.g2_prop.shader = surfaceData.shader.decode()  # pyright: ignore [reportAttributeAccessIssue]
+    obj.g2_prop.tag = not not (surfaceData.flags & JAG2Constants.SURFACEFLAG_TAG)  # pyright: ignore [reportAttributeAccessIssue]
+    obj.g2_prop.off = not not (surfaceData.flags & JAG2Constants.SURFACEFLAG_OFF)  # pyright: ignore [reportAttributeAccessIssue]
+    JAG2Panels.markG2Configured(obj)
+
+    # return object so hierarchy etc. can be set
+    return obj
+
+
+def lodFromBlender(level: int, model_root: bpy.types.Object, surfaceIndexMap: Dict[str, int], surfaceDataCollection: MdxmSurfaceDataCollection, boneIndexMap: Optional[BoneIndexMap], armatureObject: Optional[bpy.types.Object]) -> Tuple[Optional[MdxmLOD], ErrorMessage]:
+    # create dictionary of available objects
+    def addChildren(dict, object):
+        for child in object.children:
+            if child.type == 'MESH' and JAG2Panels.hasG2MeshProperties(child):
+                dict[getName(child)] = child
+            addChildren(dict, child)
+    available = {}
+    addChildren(available, model_root)
+
+    surfaces: List[Optional[MdxmSurface]] = [None] * len(surfaceIndexMap)
+    # for each required surface:
+    for name, index in surfaceIndexMap.items():
+        # if it is available:
+        if name in available:
+            surfaceData = surfaceDataCollection.surfaces[index]
+            # load from blender
+            surf, message = surfaceFromBlender(
+                available[name], index, surfaceData, boneIndexMap, armatureObject)
+            if surf is None:
+                return None, ErrorMessage(f"could not load surface {name}: {message}")
+        # not available? if a surface does not exist on a lower LOD, an empty one gets created
+        else:
+            surf = MdxmSurface(index)
+        # add surface to list
+        surfaces[index] = surf
+    gaplessSurfaces, err = ensureListIsGapless(surfaces)
+    if gaplessSurfaces is None:
+        return None, ErrorMessage(f"internal error: surface index map incomplete: {err}")
+    return MdxmLOD(level, gaplessSurfaces), NoError
+
+
+def lodToBlender(lod: MdxmLOD, data: ImportMetadata, root: bpy.types.Object) -> None:
+    # 1st pass: create objects
+    objects = []
+    for surface in lod.surfaces:
+        obj = surfaceToBlender(surface, data, lod.level)
+        objects.append(obj)
+    # 2nd pass: set parent relations
+    for i, obj in enumerate(objects):
+        parentIndex = data.surfaceDataCollection.surfaces[i].parentIndex
+        parent = root
+        if parentIndex != -1:
+            parent = objects[parentIndex]
+        obj.parent = parent
 
 
 class GLM:
     def __init__(self):
         self.header = MdxmHeader()
-        self.surfaceDataOffsets = MdxmSurfaceDataOffsets()
         self.surfaceDataCollection = MdxmSurfaceDataCollection()
-        self.LODCollection = MdxmLODCollection()
+        self.LODs: List[MdxmLOD] = []
 
     def loadFromFile(self, filepath_abs: str) -> Tuple[bool, ErrorMessage]:
         print(f"Loading {filepath_abs}...")
@@ -974,31 +531,31 @@ class GLM:
         except IOError as e:
             print(f"Could not open file: {filepath_abs}")
             return False, ErrorMessage(f"Could not open file: {e}")
-        profiler.start("reading header")
-        success, message = self.header.loadFromFile(file)
-        if not success:
-            return False, message
-        profiler.stop("reading header")
-
-        # self.header.print()
-
-        # load surface hierarchy offsets
-        profiler.start("reading surface hierarchy")
-        self.surfaceDataOffsets.loadFromFile(file, self.header.numSurfaces)
-
-        # load surfaces' information - seeks positon using surfaceDataOffsets
-        self.surfaceDataCollection.loadFromFile(file, self.surfaceDataOffsets)
-        profiler.stop("reading surface hierarchy")
-
-        # load LODs
-        profiler.start("reading surfaces")
-        file.seek(self.header.ofsLODs)
-        self.LODCollection.loadFromFile(file, self.header)
-        profiler.stop("reading surfaces")
-
-        # should be at the end now, if the structures are in the expected order.
-        if file.tell() != self.header.ofsEnd:
-            print("Warning: File not completely read or LODs not last structure in file. The former would be a problem, the latter wouldn't.")
+        with file:
+            try:
+                profiler.start("reading header")
+                self.header.loadFromFile(file)
+                profiler.stop("reading header")
+
+                # self.header.print()
+
+                # load surfaces' information
+                profiler.start("reading surface hierarchy")
+                self.surfaceDataCollection.loadFromFile(file, self.header)
+                profiler.stop("reading surface hierarchy")
+
+                # load LODs
+                profiler.start("reading surfaces")
+                file.seek(self.header.ofsLODs)
+                for level in range(self.header.numLODs):
+                    self.LODs.append(MdxmLOD.loadFromFile(file, level, self.header.numSurfaces))
+                profiler.stop("reading surfaces")
+            except GLMFormatError as e:
+                return False, ErrorMessage(str(e))
+
+            # should be at the end now, if the structures are in the expected order.
+            if file.tell() != self.header.ofsEnd:
+                print("Warning: File not completely read or LODs not last structure in file. The former would be a problem, the latter wouldn't.")
         return True, NoError
 
     def loadFromBlender(self, glm_filepath_rel: str, gla_filepath_rel: str, basepath: str) -> Tuple[bool, ErrorMessage]:
@@ -1039,39 +596,38 @@ class GLM:
         #   load from Blender
 
         # find all available LODs
-        self.header.numLODs = 0
         rootObjects: List[bpy.types.Object] = []
-        while f"model_root_{self.header.numLODs}" in bpy.data.objects:
+        while f"model_root_{len(rootObjects)}" in bpy.data.objects:
             rootObjects.append(
-                bpy.data.objects[f"model_root_{self.header.numLODs}"])
-            self.header.numLODs += 1
+                bpy.data.objects[f"model_root_{len(rootObjects)}"])
         print(
-            f"Found {self.header.numLODs} model_root objects, i.e. LOD levels")
+            f"Found {len(rootObjects)} model_root objects, i.e. LOD levels")
 
-        if self.header.numLODs == 0:
+        if len(rootObjects) == 0:
             return False, ErrorMessage("Could not find model_root_0 object")
 
+        profiler = MrwProfiler.SimpleProfiler(True)
         # build hierarchy from first LOD
+        profiler.start("reading surface hierarchy")
         surfaceIndexMap: Dict[str, int] = {}  # surface name -> index
-        success, message = self.surfaceDataCollection.loadFromBlender(
+        surfaceDataCollection, message = surfaceDataCollectionFromBlender(
             rootObjects[0], surfaceIndexMap)
-        if not success:
+        if surfaceDataCollection is None:
             return False, message
-        self.surfaceDataOffsets.calculateOffsets(self.surfaceDataCollection)
+        self.surfaceDataCollection = surfaceDataCollection
 
-        self.header.numSurfaces = len(self.surfaceDataCollection.surfaces)
-        print(f"{self.header.numSurfaces} surfaces found")
+        print(f"{len(self.surfaceDataCollection.surfaces)} surfaces found")
+        profiler.stop("reading surface hierarchy")
 
         # load all LODs
-        success, message = self.LODCollection.loadFromBlender(
-            rootObjects, surfaceIndexMap, self.surfaceDataCollection, boneIndexMap, skeleton_object)
-        if not success:
-            return False, message
-
-        self.LODCollection.calculateOffsets(self.header.ofsLODs)
-
-        #   calculate offsets etc.4
-        self._calculateHeaderOffsets()
+        profiler.start("reading surfaces")
+        for lodLevel, model_root in enumerate(rootObjects):
+            lod, message = lodFromBlender(
+                lodLevel, model_root, surfaceIndexMap, self.surfaceDataCollection, boneIndexMap, skeleton_object)
+            if lod is None:
+                return False, ErrorMessage(f"loading LOD {lodLevel} from Blender: {message}")
+            self.LODs.append(lod)
+        profiler.stop("reading surfaces")
         return True, NoError
 
     def saveToFile(self, filepath_abs: str) -> Tuple[bool, ErrorMessage]:
@@ -1083,36 +639,22 @@ class GLM:
         except IOError:
             print("Failed to open file for writing: ", filepath_abs, sep="")
             return False, ErrorMessage("Could not open file!")
-        # save header
-        self.header.saveToFile(file)
-        # save surface data offsets
-        self.surfaceDataOffsets.saveToFile(file)
-        # save surface ("hierarchy") data
-        self.surfaceDataCollection.saveToFile(file)
-        # save LODs to file
-        self.LODCollection.saveToFile(file)
+        glmFile = JAG2GLMFormat.GLMFile()
+        glmFile.header = self.header
+        glmFile.surfaceDataCollection = self.surfaceDataCollection
+        glmFile.LODs = self.LODs
+        with file, MrwProfiler.span("writing glm"):
+            try:
+                glmFile.saveToFile(file)
+            except GLMFormatError as e:
+                return False, ErrorMessage(str(e))
         return True, NoError
 
-    # calculates the offsets & counts saved in the header based on the rest
-    def _calculateHeaderOffsets(self):
-        # offset of "after header"
-        baseOffset = MdxmHeader.getSize()
-        # offset of "after hierarchy offset list"
-        self.header.numSurfaces = len(self.surfaceDataOffsets.offsets)
-        baseOffset += 4 * self.header.numSurfaces
-        # first "hierarchy" entry comes here
-        self.header.ofsSurfHierarchy = baseOffset
-        baseOffset += self.surfaceDataCollection.getSize()
-        # first LOD comes here
-        self.header.ofsLODs = baseOffset
-        baseOffset += self.LODCollection.getSize()
-        # that's everything, we've reached the end.
-        self.header.ofsEnd = baseOffset
-
     # basepath: ../GameData/.../
     # gla: JAG2GLA.GLA object - the Skeleton (for weighting purposes)
     # scene_root: "scene_root" object in Blender
-    def saveToBlender(self, basepath: str, gla: JAG2GLA.GLA, scene_root: bpy.types.Object, skin_rel: str, guessTextures: bool) -> Tuple[bool, ErrorMessage]:
+    # deferTextures: leave the image nodes empty and load the textures in the background
+    def saveToBlender(self, basepath: str, gla: JAG2GLA.GLA, scene_root: bpy.types.Object, skin_rel: str, guessTextures: bool, deferTextures: bool = False) -> Tuple[bool, ErrorMessage]:
         if gla.header.numBones != self.header.numBones:
             return False, ErrorMessage(f"Bone number mismatch - gla has {gla.header.numBones} bones, model uses {self.header.numBones}. Maybe you're trying to load a jk2 model with the jk3 skeleton or vice-versa?")
         print("creating model...")
@@ -1127,11 +669,16 @@ class GLM:
             boneNames={bone.index: bone.name for bone in gla.skeleton.bones}
         )
         success, message = data.materialManager.init(
-            basepath, skin_rel, guessTextures)
+            basepath, skin_rel, guessTextures, deferTextures)
         if not success:
             return False, message
 
-        self.LODCollection.saveToBlender(data)
+        for i, lod in enumerate(self.LODs):
+            root = bpy.data.objects.new("model_root_" + str(i), None)
+            root.parent = data.scene_root
+            assert bpy.context.scene is not None
+            bpy.context.scene.collection.objects.link(root)
+            lodToBlender(lod, data, root)
         profiler.stop("creating surfaces")
         return True, NoError
 
@@ -0,0 +1,385 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+# The .glm file format, without any Blender dependencies (see JAG2GLAFormat). JAG2GLM translates
+# between these structures and Blender data.
+
+if __package__:
+    from .mod_reload import reload_modules
+    reload_modules(locals(), __package__, ["JAG2Constants"], [])  # nopep8
+
+    from . import JAG2Constants
+else:
+    # loaded as a top-level module, outside of Blender
+    import JAG2Constants
+
+from typing import BinaryIO, List
+import struct
+import numpy as np
+
+# the part of a vertex that comes before the UVs
+VERTEX_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("co", "<f4", (3,)),
+    # bits 0-19: bone indices, 5 bit each; bits 20-27: weight overflow, 2 bit each; bits 30 & 31: weight count - 1
+    ("packed", "<u4"),
+    # lower 8 bits of the 10 bit weights
+    ("weights", "u1", (4,)),
+])
+UV_DTYPE = np.dtype(("<f4", (2,)))
+MAX_WEIGHTS = 4
+
+
+class GLMFormatError(Exception):
+    pass
+
+
+def _read(file: BinaryIO, size: int) -> bytes:
+    data = file.read(size)
+    if len(data) != size:
+        raise GLMFormatError("Unexpected end of file!")
+    return data
+
+
+class MdxmHeader:
+    FORMAT = "4si64s64s7i"
+
+    def __init__(self):
+        self.name = b""
+        self.animName = b""
+        self.numBones: int = -1
+        self.numLODs: int = -1
+        self.ofsLODs: int = -1
+        self.numSurfaces: int = -1
+        self.ofsSurfHierarchy: int = -1
+        self.ofsEnd: int = -1
+
+    def loadFromFile(self, file: BinaryIO) -> None:
+        # ignoring the animIndex which is only used ingame
+        ident, version, self.name, self.animName, _, self.numBones, self.numLODs, self.ofsLODs, self.numSurfaces, self.ofsSurfHierarchy, self.ofsEnd = struct.unpack(
+            self.FORMAT, _read(file, self.getSize()))
+        # ident check
+        if ident != JAG2Constants.GLM_IDENT:
+            print("File does not start with ", JAG2Constants.GLM_IDENT,
+                  " but ", ident, " - no GLM!")
+            raise GLMFormatError("Is no GLM file!")
+        # version check
+        if version != JAG2Constants.GLM_VERSION:
+            raise GLMFormatError(f"Wrong glm file version! ({version} should be {JAG2Constants.GLM_VERSION})")
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        # 0 is animIndex, only used ingame
+        file.write(struct.pack(self.FORMAT, JAG2Constants.GLM_IDENT, JAG2Constants.GLM_VERSION, self.name, self.animName,
+                   0, self.numBones, self.numLODs, self.ofsLODs, self.numSurfaces, self.ofsSurfHierarchy, self.ofsEnd))
+
+    def print(self) -> None:
+        print("== GLM Header ==\nname: {self.name}\nanimName: {self.animName}\nnumBones: {self.numBones}\nnumLODs: {self.numLODs}\nnumSurfaces: {self.numSurfaces}".format(
+            self=self))
+
+    @classmethod
+    def getSize(cls) -> int:
+        return struct.calcsize(cls.FORMAT)
+
+# originally called mdxmSurfaceHierarchy_t, I think that name is misleading (but mine's not too good, either)
+
+
+class MdxmSurfaceData:
+    FORMAT = "64sI64s3i"
+
+    def __init__(self):
+        self.name = b""
+        self.flags = 0
+        self.shader = b""
+        self.parentIndex = -1
+        self.children: List[int] = []
+        self.index = -1  # filled by MdxmSurfaceDataCollection.loadFromFile, not saved
+
+    @property
+    def numChildren(self) -> int:
+        return len(self.children)
+
+    def loadFromFile(self, file: BinaryIO) -> None:
+        # ignoring shaderIndex which is only used ingame
+        self.name, self.flags, self.shader, _, self.parentIndex, numChildren = struct.unpack(
+            self.FORMAT, _read(file, struct.calcsize(self.FORMAT)))
+        self.children = list(struct.unpack(f"{numChildren}i", _read(file, 4 * numChildren)))
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        # 0 is the shader index, only used ingame
+        file.write(struct.pack(self.FORMAT, self.name, self.flags,
+                   self.shader, 0, self.parentIndex, self.numChildren))
+        file.write(struct.pack(f"{self.numChildren}i", *self.children))
+
+    def getSize(self) -> int:
+        # string, int, string, 3 ints, children
+        return struct.calcsize(self.FORMAT) + 4 * self.numChildren
+
+# all the surface hierarchy/shader/name/flag/... information entries, preceded by their offsets
+
+
+class MdxmSurfaceDataCollection:
+    def __init__(self):
+        self.surfaces: List[MdxmSurfaceData] = []
+
+    # the offsets come directly after the header, and are relative to its end
+    def loadFromFile(self, file: BinaryIO, header: MdxmHeader) -> None:
+        baseOffset = MdxmHeader.getSize()
+        file.seek(baseOffset)
+        offsets = struct.unpack(f"{header.numSurfaces}i", _read(file, 4 * header.numSurfaces))
+        for i, offset in enumerate(offsets):
+            file.seek(baseOffset + offset)
+            surfaceData = MdxmSurfaceData()
+            surfaceData.loadFromFile(file)
+            surfaceData.index = i
+            self.surfaces.append(surfaceData)
+
+    def getOffsets(self) -> List[int]:
+        offset = 4 * len(self.surfaces)
+        offsets: List[int] = []
+        for surfaceData in self.surfaces:
+            offsets.append(offset)
+            offset += surfaceData.getSize()
+        return offsets
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        offsets = self.getOffsets()
+        file.write(struct.pack(f"{len(offsets)}i", *offsets))
+        for surfaceData in self.surfaces:
+            surfaceData.saveToFile(file)
+
+    # including the offsets
+    def getSize(self) -> int:
+        return 4 * len(self.surfaces) + sum(surfaceData.getSize() for surfaceData in self.surfaces)
+
+
+class MdxmSurface:
+    HEADER_FORMAT = "10i"
+
+    def __init__(self, index: int = -1):
+        self.index = index
+        # per vertex
+        self.co = np.zeros((0, 3), dtype=np.float32)
+        self.normals = np.zeros((0, 3), dtype=np.float32)
+        # as saved in the file, i.e. V points down
+        self.uvs = np.zeros((0, 2), dtype=np.float32)
+        # 1 to 4
+        self.numWeights = np.zeros(0, dtype=np.uint8)
+        # indices into boneReferences, unused ones are 0
+        self.boneIndices = np.zeros((0, MAX_WEIGHTS), dtype=np.uint8)
+        # add up to 1, unused ones are 0
+        self.weights = np.zeros((0, MAX_WEIGHTS), dtype=np.float32)
+        # vertex indices, in the order they are saved in (which is clockwise)
+        self.triangles = np.zeros((0, 3), dtype=np.int32)
+        # integers: bone indices. maximum of 32, thus can be stored in 5 bit in vertices, saves space.
+        self.boneReferences = np.zeros(0, dtype=np.int32)
+
+    @property
+    def numVerts(self) -> int:
+        return len(self.co)
+
+    @property
+    def numTriangles(self) -> int:
+        return len(self.triangles)
+
+    @property
+    def numBoneReferences(self) -> int:
+        return len(self.boneReferences)
+
+    def loadFromFile(self, file: BinaryIO) -> None:
+        startPos = file.tell()
+        #  load surface header
+        # in the beginning I ignore the ident, which is usually 0 and shouldn't matter
+        _, self.index, ofsHeader, numVerts, ofsVerts, numTriangles, ofsTriangles, numBoneReferences, ofsBoneReferences, ofsEnd = struct.unpack(
+            self.HEADER_FORMAT, _read(file, struct.calcsize(self.HEADER_FORMAT)))
+        if ofsHeader != -startPos:
+            print(f"Warning: Surface {self.index} has incorrect header offset {ofsHeader}, expected {-startPos}")
+
+        #  load vertices, followed by the UVs
+        file.seek(startPos + ofsVerts)
+        self.decodeVertices(np.frombuffer(_read(file, numVerts * VERTEX_DTYPE.itemsize), dtype=VERTEX_DTYPE))
+        self.uvs = np.frombuffer(_read(file, numVerts * UV_DTYPE.itemsize), dtype="<f4").reshape(numVerts, 2).astype(np.float32)
+
+        #  load triangles
+        file.seek(startPos + ofsTriangles)
+        self.triangles = np.frombuffer(_read(file, numTriangles * 3 * 4), dtype="<i4").reshape(numTriangles, 3).astype(np.int32)
+
+        #  load bone references
+        file.seek(startPos + ofsBoneReferences)
+        self.boneReferences = np.frombuffer(_read(file, numBoneReferences * 4), dtype="<i4").astype(np.int32)
+
+        if file.tell() != startPos + ofsEnd:
+            print(
+                "Warning: Surface structure unordered (bone references not last) or read error")
+            file.seek(startPos + ofsEnd)
+
+    def decodeVertices(self, vertices: np.ndarray) -> None:
+        self.normals = vertices["normal"].astype(np.float32)
+        self.co = vertices["co"].astype(np.float32)
+        packed = vertices["packed"].astype(np.uint32)
+        slots = np.arange(MAX_WEIGHTS, dtype=np.uint32)
+        # packedStuff bits 31 & 30: weight count
+        self.numWeights = ((packed >> 30) + 1).astype(np.uint8)
+        used = slots < self.numWeights[:, np.newaxis]
+        # packedStuff 0-19: bone indices, 5 bit each
+        self.boneIndices = np.where(used, (packed[:, np.newaxis] >> (5 * slots)) & 0b11111, 0).astype(np.uint8)
+        # the weights are split: the lower 8 bits are separate, packedStuff bits 20f, 22f, 24f, 26f contain the MSBs
+        recomposedWeights = vertices["weights"].astype(np.uint32) | (((packed[:, np.newaxis] >> (20 + 2 * slots)) & 0b11) << 8)
+        # convert to float (0..1023 -> 0.0..1.0); the last weight is implied, so they add up to 1
+        weights = np.where(slots < self.numWeights[:, np.newaxis] - 1, recomposedWeights / 1023, 0)
+        lastWeight = 1 - weights.sum(axis=1)
+        weights[np.arange(len(weights)), self.numWeights.astype(np.intp) - 1] = lastWeight
+        self.weights = weights.astype(np.float32)
+
+    def encodeVertices(self) -> np.ndarray:
+        vertices = np.zeros(self.numVerts, dtype=VERTEX_DTYPE)
+        vertices["normal"] = self.normals
+        vertices["co"] = self.co
+        slots = np.arange(MAX_WEIGHTS, dtype=np.uint32)
+        used = slots < self.numWeights[:, np.newaxis]
+        # convert weight to 10 bit integer
+        weights = np.where(used, np.rint(self.weights.astype(np.float64) * 1023), 0).astype(np.uint32)
+        # lower 8 bits
+        vertices["weights"] = weights & 0xff
+        #  pack the stuff that needs packing: num weights, higher 2 bits of the weights, 5 bit bone indices
+        packed = (self.numWeights.astype(np.uint32) - 1) << 30
+        packed |= np.bitwise_or.reduce(((weights & 0x300) >> 8) << (20 + 2 * slots), axis=1)
+        boneIndices = np.where(used, self.boneIndices.astype(np.uint32) & 0b11111, 0)
+        packed |= np.bitwise_or.reduce(boneIndices << (5 * slots), axis=1)
+        vertices["packed"] = packed
+        return vertices
+
+    def getSize(self) -> int:
+        # header, triangles (3 ints), vertices (6 floats co/normal, 8 bytes packed, 2 floats UV), bone references
+        return struct.calcsize(self.HEADER_FORMAT) + 3 * 4 * self.numTriangles + (VERTEX_DTYPE.itemsize + UV_DTYPE.itemsize) * self.numVerts + 4 * self.numBoneReferences
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        startPos = file.tell()
+        # I don't know if triangles *have* to come first, but when I export they do.
+        ofsTriangles = struct.calcsize(self.HEADER_FORMAT)
+        ofsVerts = ofsTriangles + 3 * 4 * self.numTriangles
+        ofsBoneReferences = ofsVerts + (VERTEX_DTYPE.itemsize + UV_DTYPE.itemsize) * self.numVerts
+        ofsEnd = ofsBoneReferences + 4 * self.numBoneReferences
+        # 0 = ident
+        file.write(struct.pack(self.HEADER_FORMAT, 0, self.index, -startPos, self.numVerts, ofsVerts,
+                   self.numTriangles, ofsTriangles, self.numBoneReferences, ofsBoneReferences, ofsEnd))
+        file.write(self.triangles.astype("<i4").tobytes())
+        file.write(self.encodeVertices().tobytes())
+        file.write(self.uvs.astype("<f4").tobytes())
+        file.write(self.boneReferences.astype("<i4").tobytes())
+        assert (file.tell() == startPos + ofsEnd)
+
+
+class MdxmLOD:
+    def __init__(self, level: int, surfaces: List[MdxmSurface]):
+        self.level = level
+        self.surfaces = surfaces
+
+    @staticmethod
+    def loadFromFile(file: BinaryIO, level: int, numSurfaces: int) -> "MdxmLOD":
+        startPos = file.tell()
+        ofsEnd, = struct.unpack("i", _read(file, 4))
+        # surface offsets - they're relative to a structure after the one containing ofsEnd, so I need to add sizeof(int) to them later.
+        surfaceOffsets = struct.unpack(f"{numSurfaces}i", _read(file, 4 * numSurfaces))
+        surfaces: List[MdxmSurface] = []
+        for surfaceIndex, offset in enumerate(surfaceOffsets):
+            if file.tell() != startPos + 4 + offset:
+                print("Warning: Surface not completely read or unordered")
+                file.seek(startPos + offset + 4)
+            surface = MdxmSurface()
+            surface.loadFromFile(file)
+            if surface.index != surfaceIndex:
+                raise GLMFormatError(f"LOD {level}: surface {surfaceIndex} has index {surface.index}!")
+            surfaces.append(surface)
+        if file.tell() != startPos + ofsEnd:
+            print("Warning: Internal reading error or LODs not tightly packed!")
+            file.seek(startPos + ofsEnd)
+        return MdxmLOD(level, surfaces)
+
+    def getSize(self) -> int:
+        # ofsEnd + surface offsets + surfaces
+        return 4 + 4 * len(self.surfaces) + sum(surface.getSize() for surface in self.surfaces)
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        startPos = file.tell()
+        # write ofsEnd (= size)
+        file.write(struct.pack("i", self.getSize()))
+        # write surface offsets - ofsEnd is in front of them, but they are relative to their start
+        offset = 4 * len(self.surfaces)
+        for surface in self.surfaces:
+            file.write(struct.pack("i", offset))
+            offset += surface.getSize()
+        # write surfaces
+        for surface in self.surfaces:
+            surface.saveToFile(file)
+        # that's it, should've reached end.
+        assert (file.tell() == startPos + self.getSize())
+
+
+class GLMFile:
+    def __init__(self):
+        self.header = MdxmHeader()
+        self.surfaceDataCollection = MdxmSurfaceDataCollection()
+        self.LODs: List[MdxmLOD] = []
+
+    @staticmethod
+    def loadFromFile(file: BinaryIO) -> "GLMFile":
+        glm = GLMFile()
+        glm.header.loadFromFile(file)
+        # load surfaces' information
+        glm.surfaceDataCollection.loadFromFile(file, glm.header)
+        # load LODs
+        file.seek(glm.header.ofsLODs)
+        for level in range(glm.header.numLODs):
+            glm.LODs.append(MdxmLOD.loadFromFile(file, level, glm.header.numSurfaces))
+        # should be at the end now, if the structures are in the expected order.
+        if file.tell() != glm.header.ofsEnd:
+            print("Warning: File not completely read or LODs not last structure in file. The former would be a problem, the latter wouldn't.")
+        return glm
+
+    @staticmethod
+    def load(filepath: str) -> "GLMFile":
+        with open(filepath, "rb") as file:
+            return GLMFile.loadFromFile(file)
+
+    # calculates the offsets & counts saved in the header based on the rest
+    def calculateHeaderOffsets(self) -> None:
+        self.header.numSurfaces = len(self.surfaceDataCollection.surfaces)
+        self.header.numLODs = len(self.LODs)
+        for lod in self.LODs:
+            if len(lod.surfaces) != self.header.numSurfaces:
+                raise GLMFormatError(f"LOD {lod.level} has {len(lod.surfaces)} surfaces instead of {self.header.numSurfaces}!")
+        # first "hierarchy" entry comes after the header and the hierarchy offsets
+        self.header.ofsSurfHierarchy = MdxmHeader.getSize() + 4 * self.header.numSurfaces
+        # first LOD comes after the hierarchy
+        self.header.ofsLODs = MdxmHeader.getSize() + self.surfaceDataCollection.getSize()
+        # that's everything, we've reached the end.
+        self.header.ofsEnd = self.header.ofsLODs + sum(lod.getSize() for lod in self.LODs)
+
+    def saveToFile(self, file: BinaryIO) -> None:
+        self.calculateHeaderOffsets()
+        self.header.saveToFile(file)
+        # save surface ("hierarchy") data, including offsets
+        self.surfaceDataCollection.saveToFile(file)
+        assert (file.tell() == self.header.ofsLODs)
+        for lod in self.LODs:
+            lod.saveToFile(file)
+        assert (file.tell() == self.header.ofsEnd)
+
+    def save(self, filepath: str) -> None:
+        with open(filepath, "wb") as file:
+            self.saveToFile(file)
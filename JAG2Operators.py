@@ -17,16 +17,21 @@
 # ##### END GPL LICENSE BLOCK #####
 
 from .mod_reload import reload_modules
-reload_modules(locals(), __package__, ["JAG2Scene", "JAG2GLA", "JAFilesystem", "JAG2Panels"], [".JAG2Constants"])  # nopep8
+reload_modules(locals(), __package__, ["JAG2AnimationConfig", "JAG2Scene", "JAG2GLA", "JAFilesystem", "JAG2Panels", "MrwProfiler"], [".JAG2Constants"])  # nopep8
 
 import bpy
-from typing import Set, Tuple, cast
+import functools
+import time
+from typing import Callable, Set, Tuple, TypeVar, cast
+from . import JAG2AnimationConfig
 from . import JAG2Scene
 from . import JAG2GLA
 from . import JAFilesystem
 from . import JAG2Panels
+from . import MrwProfiler
 from .JAG2Constants import SkeletonFixes
 from .casts import OperatorReturnItems
+from .error_types import ErrorMessage
 
 
 def GetPaths(basepath, filepath) -> Tuple[str, str]:
@@ -38,7 +43,129 @@ def GetPaths(basepath, filepath) -> Tuple[str, str]:
     return basepath, filepath
 
 
-class GLMImport(bpy.types.Operator):
+PROFILE_ITEMS = [
+    (MrwProfiler.ProfileMode.OFF.value, "Off", "Don't profile (unless the JA_PROFILE environment variable says so)", 0),
+    (MrwProfiler.ProfileMode.SUMMARY.value, "Summary", "Print a table of where the time went to the console", 1),
+    (MrwProfiler.ProfileMode.TRACE.value, "Trace", "Write a Chrome trace (<file>.trace.json) to view in chrome://tracing or ui.perfetto.dev", 2),
+]
+
+
+ExecuteT = TypeVar("ExecuteT", bound=Callable[..., Set[OperatorReturnItems]])
+
+
+# decorator for execute(), profiles it according to the operator's profile property
+def profiled(execute: ExecuteT) -> ExecuteT:
+    @functools.wraps(execute)
+    def profiledExecute(self: bpy.types.Operator, context: bpy.types.Context) -> Set[OperatorReturnItems]:
+        mode = MrwProfiler.ProfileMode[self.profile]  # pyright: ignore [reportAttributeAccessIssue]
+        with MrwProfiler.profiling(mode, self.filepath + ".trace.json"):  # pyright: ignore [reportAttributeAccessIssue]
+            return execute(self, context)
+    return cast(ExecuteT, profiledExecute)
+
+
+# how long a modal import works on each timer event before handing control back to Blender, and how often it continues
+MODAL_IMPORT_STEP_SECONDS = 0.1
+MODAL_IMPORT_TIMER_INTERVAL = 0.01
+
+
+# Base of the import operators. When started from the menu with keepResponsive, the rest of the import (see
+# JAG2Scene.Scene.saveToBlenderSteps) runs a part at a time on timer events instead of all at once, showing the
+# progress in the status bar and on the cursor. Blender stays responsive in the meantime, and pressing Esc cancels
+# the import, removing everything it added so far (see JAG2Scene.ImportRollback). Only one import can run at a time,
+# since they'd change the same frame range and animations, and cancelling one couldn't tell whose change it undoes.
+class ModalImport(bpy.types.Operator):
+    # whether invoke() started the operator, i.e. a user rather than a script that expects the import to be done
+    _invoked = False
+    # whether a modal import is running
+    _running = False
+
+    def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
+        self._invoked = True
+        # show file selection window
+        wm = context.window_manager
+        assert wm is not None
+        wm.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def runImport(self, context: bpy.types.Context, steps: JAG2GLA.Steps[Tuple[bool, ErrorMessage]]) -> Set[OperatorReturnItems]:
+        if ModalImport._running:
+            steps.close()
+            self.report({'ERROR'}, "Another import is still running, wait for it to finish or press Esc to cancel it")
+            return {'CANCELLED'}
+        wm = context.window_manager
+        # timers never fire without an event loop, and a profile ends when execute() returns
+        if not (self.keepResponsive and self._invoked) or bpy.app.background or MrwProfiler.isProfiling() or wm is None or context.window is None:  # pyright: ignore [reportAttributeAccessIssue]
+            success, message = JAG2GLA.finishSteps(steps)
+            if not success:
+                self.report({'ERROR'}, message)
+            return {'FINISHED'}
+        # nothing has been changed yet, the steps only start running on the first timer event
+        self._steps = steps
+        self._rollback = JAG2Scene.ImportRollback()
+        self._timer = wm.event_timer_add(MODAL_IMPORT_TIMER_INTERVAL, window=context.window)
+        wm.modal_handler_add(self)
+        ModalImport._running = True
+        wm.progress_begin(0, 100)
+        self._showProgress(context, 0)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
+        if event.type == 'ESC' and event.value == 'PRESS':
+            self._steps.close()
+            self._rollback.restore()
+            self._end(context)
+            self.report({'WARNING'}, "Import cancelled")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        deadline = time.perf_counter() + MODAL_IMPORT_STEP_SECONDS
+        progress = 0.0
+        try:
+            # only what the import itself does, not what the user does in between
+            with self._rollback.recording():
+                while time.perf_counter() < deadline:
+                    progress = next(self._steps)
+        except StopIteration as e:
+            self._end(context)
+            success, message = e.value
+            if not success:
+                self.report({'ERROR'}, message)
+            return {'FINISHED'}
+        except Exception:
+            # e.g. the user deleted the armature in the meantime - don't leave half an import behind
+            self._rollback.restore()
+            self._end(context)
+            raise
+        self._showProgress(context, progress)
+        return {'RUNNING_MODAL'}
+
+    # called instead of modal() when Blender ends the import, e.g. when loading another file or quitting. There's
+    # nothing to roll back to in a newly loaded file, so the import just stops.
+    def cancel(self, context: bpy.types.Context) -> None:
+        # also called when the file browser gets closed, before there's anything to stop
+        if not hasattr(self, "_timer"):
+            return
+        self._steps.close()
+        self._end(context)
+
+    def _showProgress(self, context: bpy.types.Context, progress: float) -> None:
+        wm = context.window_manager
+        assert wm is not None
+        wm.progress_update(int(progress * 100))
+        if context.workspace is not None:
+            context.workspace.status_text_set(f"{self.bl_label}: {progress:.0%} - press Esc to cancel")
+
+    def _end(self, context: bpy.types.Context) -> None:
+        wm = context.window_manager
+        assert wm is not None
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        if context.workspace is not None:
+            context.workspace.status_text_set(None)
+        ModalImport._running = False
+
+
+class GLMImport(ModalImport):
     '''Import GLM Operator.'''
     bl_idname = "import_scene.glm"
     bl_label = "Import JA Ghoul 2 Model (.glm)"
@@ -53,6 +180,8 @@ class GLMImport(bpy.types.Operator):
         name="Skin", description="The skin to load (modelname_<skin>.skin), leave empty to load none (use file internal paths)", default="default")  # pyright: ignore [reportInvalidTypeForm]
     guessTextures: bpy.props.BoolProperty(
         name="Guess Textures", description="Many models try to force you to use the skin. Enable this to try to circumvent that. (Usually works well, but skins should be preferred.)", default=False)  # pyright: ignore [reportInvalidTypeForm]
+    deferTextures: bpy.props.BoolProperty(
+        name="Load Textures in Background", description="Create the materials right away but load their textures afterwards, a few at a time, so the import finishes sooner. (Has no effect when running in background mode.)", default=False)  # pyright: ignore [reportInvalidTypeForm]
     basepath: bpy.props.StringProperty(
         name="Base Path", description="The base folder relative to which paths should be interpreted. Leave empty to let the importer guess (needs /GameData/ in filepath).", default="")  # pyright: ignore [reportInvalidTypeForm]
     glaOverride: bpy.props.StringProperty(
@@ -67,13 +196,24 @@ class GLMImport(bpy.types.Operator):
     loadAnimations: bpy.props.EnumProperty(name="animations", description="Whether to import all animations, some animations or only a range from the .gla. (Importing huge animations takes forever.)", default='NONE', items=[
         (JAG2GLA.AnimationLoadMode.NONE.value, "None", "Don't import animations.", 0),
         (JAG2GLA.AnimationLoadMode.ALL.value, "All", "Import all animations", 1),
-        (JAG2GLA.AnimationLoadMode.RANGE.value, "Range", "Import a certain range of frames", 2)
+        (JAG2GLA.AnimationLoadMode.RANGE.value, "Range", "Import a certain range of frames", 2),
+        (JAG2GLA.AnimationLoadMode.NAMED.value, "Named", "Import the animations with the given names, as listed in the animation.cfg next to the .gla", 3)
     ])  # pyright: ignore [reportInvalidTypeForm, reportArgumentType]
+    animationNames: bpy.props.StringProperty(
+        name="Animation names", description="If animations are imported by name, the names as listed in the animation.cfg next to the .gla, separated by commas or spaces, e.g. BOTH_STAND1, BOTH_RUN1", default="")  # pyright: ignore [reportInvalidTypeForm]
     startFrame: bpy.props.IntProperty(
         name="Start frame", description="If only a range of frames of the animation is to be imported, this is the first.", min=0)  # pyright: ignore [reportInvalidTypeForm]
     numFrames: bpy.props.IntProperty(
         name="number of frames", description="If only a range of frames of the animation is to be imported, this is the total number of frames to import", min=1)  # pyright: ignore [reportInvalidTypeForm]
-
+    livePlayback: bpy.props.BoolProperty(
+        name="Live Playback", description="Don't bake keyframes, pose the armature straight from the animation whenever the frame changes instead. Only lasts until Blender is closed; use Bake Live GLA Playback to keep frame ranges.", default=False)  # pyright: ignore [reportInvalidTypeForm]
+    reduceKeyframes: bpy.props.BoolProperty(
+        name="Reduce Keyframes", description="Only keyframe what linear interpolation can't reproduce to within the precision of the .gla: still bones get a single keyframe, steady movements just their ends", default=False)  # pyright: ignore [reportInvalidTypeForm]
+    keepResponsive: bpy.props.BoolProperty(
+        name="Keep Blender Responsive", description="Put the animation into Blender a part at a time, showing the progress in the status bar. Press Esc to cancel the import", default=True)  # pyright: ignore [reportInvalidTypeForm]
+    profile: bpy.props.EnumProperty(name="Profiling", description="Measure where the time goes, to find performance problems", default='OFF', items=PROFILE_ITEMS)  # pyright: ignore [reportInvalidTypeForm, reportArgumentType]
+
+    @profiled
     def execute(self, context: bpy.types.Context) -> Set[OperatorReturnItems]:
         print("\n== GLM Import ==\n")
         # initialize paths
@@ -96,7 +236,7 @@ class GLMImport(bpy.types.Operator):
             glafile = cast(str, self.glaOverride)
         loadAnimations = JAG2GLA.AnimationLoadMode[self.loadAnimations]
         success, message = scene.loadFromGLA(
-            glafile, loadAnimations, cast(int, self.startFrame), cast(int, self.numFrames))
+            glafile, loadAnimations, cast(int, self.startFrame), cast(int, self.numFrames), JAG2AnimationConfig.splitNames(self.animationNames))
         if not success:
             self.report({'ERROR'}, message)
             return {'FINISHED'}
@@ -104,21 +244,13 @@ class GLMImport(bpy.types.Operator):
         skin = ""
         if self.skin != "":
             skin = filepath + "_" + self.skin
-        success, message = scene.saveToBlender(
-            scale, skin, self.guessTextures, loadAnimations != JAG2GLA.AnimationLoadMode.NONE, SkeletonFixes[self.skeletonFixes])
-        if not success:
-            self.report({'ERROR'}, message)
-        return {'FINISHED'}
-
-    def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
-        # show file selection window
-        wm = context.window_manager
-        assert wm is not None
-        wm.fileselect_add(self)
-        return {'RUNNING_MODAL'}
+        return self.runImport(context, scene.saveToBlenderSteps(
+            scale, skin, self.guessTextures, loadAnimations != JAG2GLA.AnimationLoadMode.NONE, SkeletonFixes[self.skeletonFixes],
+            # timers never fire without an event loop
+            self.deferTextures and not bpy.app.background, self.livePlayback, self.reduceKeyframes))
 
 
-class GLAImport(bpy.types.Operator):
+class GLAImport(ModalImport):
     '''Import GLA Operator.'''
     bl_idname = "import_scene.gla"
     bl_label = "Import JA Ghoul 2 Skeleton (.gla)"
@@ -142,13 +274,24 @@ class GLAImport(bpy.types.Operator):
     loadAnimations: bpy.props.EnumProperty(name="animations", description="Whether to import all animations, some animations or only a range from the .gla. (Importing huge animations takes forever.)", default='NONE', items=[
         (JAG2GLA.AnimationLoadMode.NONE.value, "None", "Don't import animations.", 0),
         (JAG2GLA.AnimationLoadMode.ALL.value, "All", "Import all animations", 1),
-        (JAG2GLA.AnimationLoadMode.RANGE.value, "Range", "Import a certain range of frames", 2)
+        (JAG2GLA.AnimationLoadMode.RANGE.value, "Range", "Import a certain range of frames", 2),
+        (JAG2GLA.AnimationLoadMode.NAMED.value, "Named", "Import the animations with the given names, as listed in the animation.cfg next to the .gla", 3)
     ])  # pyright: ignore [reportInvalidTypeForm, reportArgumentType]
+    animationNames: bpy.props.StringProperty(
+        name="Animation names", description="If animations are imported by name, the names as listed in the animation.cfg next to the .gla, separated by commas or spaces, e.g. BOTH_STAND1, BOTH_RUN1", default="")  # pyright: ignore [reportInvalidTypeForm]
     startFrame: bpy.props.IntProperty(
         name="Start frame", description="If only a range of frames of the animation is to be imported, this is the first.", min=0)  # pyright: ignore [reportInvalidTypeForm]
     numFrames: bpy.props.IntProperty(
         name="number of frames", description="If only a range of frames of the animation is to be imported, this is the total number of frames to import", min=1)  # pyright: ignore [reportInvalidTypeForm]
-
+    livePlayback: bpy.props.BoolProperty(
+        name="Live Playback", description="Don't bake keyframes, pose the armature straight from the animation whenever the frame changes instead. Only lasts until Blender is closed; use Bake Live GLA Playback to keep frame ranges.", default=False)  # pyright: ignore [reportInvalidTypeForm]
+    reduceKeyframes: bpy.props.BoolProperty(
+        name="Reduce Keyframes", description="Only keyframe what linear interpolation can't reproduce to within the precision of the .gla: still bones get a single keyframe, steady movements just their ends", default=False)  # pyright: ignore [reportInvalidTypeForm]
+    keepResponsive: bpy.props.BoolProperty(
+        name="Keep Blender Responsive", description="Put the animation into Blender a part at a time, showing the progress in the status bar. Press Esc to cancel the import", default=True)  # pyright: ignore [reportInvalidTypeForm]
+    profile: bpy.props.EnumProperty(name="Profiling", description="Measure where the time goes, to find performance problems", default='OFF', items=PROFILE_ITEMS)  # pyright: ignore [reportInvalidTypeForm, reportArgumentType]
+
+    @profiled
     def execute(self, context: bpy.types.Context) -> Set[OperatorReturnItems]:
         print("\n== GLA Import ==\n")
         # de-percentagionise scale
@@ -162,22 +305,14 @@ class GLAImport(bpy.types.Operator):
         scene = JAG2Scene.Scene(basepath)
         loadAnimations = JAG2GLA.AnimationLoadMode[self.loadAnimations]
         success, message = scene.loadFromGLA(
-            filepath, loadAnimations, self.startFrame, self.numFrames)
+            filepath, loadAnimations, self.startFrame, self.numFrames, JAG2AnimationConfig.splitNames(self.animationNames))
         if not success:
             self.report({'ERROR'}, message)
             return {'FINISHED'}
         # output to blender
-        success, message = scene.saveToBlender(
-            scale, "", False, loadAnimations != JAG2GLA.AnimationLoadMode.NONE, SkeletonFixes[self.skeletonFixes])
-        if not success:
-            self.report({'ERROR'}, message)
-        return {'FINISHED'}
-
-    def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
-        wm = context.window_manager
-        assert wm is not None
-        wm.fileselect_add(self)
-        return {'RUNNING_MODAL'}
+        return self.runImport(context, scene.saveToBlenderSteps(
+            scale, "", False, loadAnimations != JAG2GLA.AnimationLoadMode.NONE, SkeletonFixes[self.skeletonFixes],
+            livePlayback=self.livePlayback, reduceKeyframes=self.reduceKeyframes))
 
 
 class GLMExport(bpy.types.Operator):
@@ -196,7 +331,9 @@ class GLMExport(bpy.types.Operator):
         name="Base Path", description="The base folder relative to which paths should be interpreted. Leave empty to let the exporter guess (needs /GameData/ in filepath).", default="")  # pyright: ignore [reportInvalidTypeForm]
     gla: bpy.props.StringProperty(
         name=".gla name", description="Name of the skeleton this model uses (must exist!)", default="models/players/_humanoid/_humanoid")  # pyright: ignore [reportInvalidTypeForm]
+    profile: bpy.props.EnumProperty(name="Profiling", description="Measure where the time goes, to find performance problems", default='OFF', items=PROFILE_ITEMS)  # pyright: ignore [reportInvalidTypeForm, reportArgumentType]
 
+    @profiled
     def execute(self, context: bpy.types.Context) -> Set[OperatorReturnItems]:
         print("\n== GLM Export ==\n")
         # initialize paths
@@ -241,7 +378,11 @@ class GLAExport(bpy.types.Operator):
         name="gla name", description="The relative path of this gla. Leave empty to let the exporter guess (needs /GameData/ in filepath).", maxlen=64, default="")  # pyright: ignore [reportInvalidTypeForm]
     glareference: bpy.props.StringProperty(
         name="gla reference", description="Copies the bone indices from this skeleton, if any (e.g. for new animations for existing skeleton; path relative to the Base Path)", maxlen=64, default="")  # pyright: ignore [reportInvalidTypeForm]
+    snapBones: bpy.props.BoolProperty(
+        name="Snap Similar Bones", description="Store bone offsets that differ by at most the smallest step only once, making the file smaller at the cost of some precision", default=False)  # pyright: ignore [reportInvalidTypeForm]
+    profile: bpy.props.EnumProperty(name="Profiling", description="Measure where the time goes, to find performance problems", default='OFF', items=PROFILE_ITEMS)  # pyright: ignore [reportInvalidTypeForm, reportArgumentType]
 
+    @profiled
     def execute(self, context: bpy.types.Context) -> Set[OperatorReturnItems]:
         print("\n== GLA Export ==\n")
         # initialize paths
@@ -258,7 +399,7 @@ class GLAExport(bpy.types.Operator):
         # try to load from Blender's data to my intermediate format
         scene = JAG2Scene.Scene(basepath)
         success, message = scene.loadSkeletonFromBlender(
-            glapath, self.glareference)
+            glapath, self.glareference, self.snapBones)
         if not success:
             self.report({'ERROR'}, message)
             return {'FINISHED'}
@@ -299,55 +440,71 @@ class GLAMetaExport(bpy.types.Operator):
         endFrame = scene.frame_end
         fps = scene.render.fps
 
-        class Marker:
-            def __init__(self, blenderMarker):
-                self.name = blenderMarker.name
-                self.start = blenderMarker.frame - startFrame  # frames start at 0
-                self.len = None  # to be determined
-
-        markers = []
-        maxLen = 23  # maximum name length, default minimum is 24
-        for marker in scene.timeline_markers:
-            if marker.frame >= startFrame and marker.frame <= endFrame:
-                maxLen = max(maxLen, len(marker.name))
-                markers.append(Marker(marker))
+        markers = sorted((marker for marker in scene.timeline_markers if startFrame <= marker.frame <= endFrame),
+                         key=lambda marker: marker.frame)
 
         if len(markers) == 0:
             self.report({'ERROR'}, 'No timeline markers found! Add Markers to label animations.')
+            return {'CANCELLED'}
 
-        # sort by frame
-        markers.sort(key=lambda marker: marker.start)
+        # each animation lasts until the next one starts, the last one until the end.
+        # loop is always false (cannot be set yet), fps always the scene's fps currently.
+        ends = [marker.frame for marker in markers[1:]] + [endFrame]
+        entries = [JAG2AnimationConfig.AnimationConfigEntry(marker.name, marker.frame - startFrame + self.offset, end - marker.frame, 0, fps)  # frames start at 0
+                   for marker, end in zip(markers, ends)]
+        JAG2AnimationConfig.save(self.filepath, entries, "Animation Data generated from Blender Markers")
 
-        # determine length
-        last = None
-        for marker in markers:
-            if last:
-                last.len = marker.start - last.start
-            last = marker
-        assert (last)  # otherwise len(markers) == 0
-        last.len = endFrame - last.start
+        return {'FINISHED'}
 
-        file = open(self.filepath, "w")
+    def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
+        wm = context.window_manager
+        assert wm is not None
+        wm.fileselect_add(self)
+        return {'RUNNING_MODAL'}
 
-        # name, start, length, loop (always false, cannot be set yet), fps (always scene's fps currently)
-        pattern = "{:<" + str(maxLen) + "} {:<7} {:<7} {:<7} {}\n"
 
-        file.write("// Animation Data generated from Blender Markers\n")
-        file.write(pattern.format("// name", "start", "length", "loop", "fps"))
+class GLABakePlayback(bpy.types.Operator):
+    '''Bake Live GLA Playback Operator.'''
+    bl_idname = "object.bake_gla_playback"
+    bl_label = "Bake Live GLA Playback"
+    bl_description = "Keyframes a range of the armature's live GLA playback into a new action"
+    bl_options = {'REGISTER', 'UNDO'}
 
-        for marker in markers:
-            file.write(pattern.format(marker.name, marker.start +
-                       self.offset, marker.len, 0, fps))
+    startFrame: bpy.props.IntProperty(
+        name="Start frame", description="First frame to bake", min=0)  # pyright: ignore [reportInvalidTypeForm]
+    endFrame: bpy.props.IntProperty(
+        name="End frame", description="Last frame to bake", min=0)  # pyright: ignore [reportInvalidTypeForm]
+    reduceKeyframes: bpy.props.BoolProperty(
+        name="Reduce Keyframes", description="Only keyframe what linear interpolation can't reproduce to within the precision of the .gla: still bones get a single keyframe, steady movements just their ends", default=False)  # pyright: ignore [reportInvalidTypeForm]
 
-        file.close()
+    @classmethod
+    def poll(cls, context: bpy.types.Context) -> bool:
+        obj = context.active_object
+        return obj is not None and obj.name in JAG2GLA.livePlaybacks
 
+    def execute(self, context: bpy.types.Context) -> Set[OperatorReturnItems]:
+        # poll() already guarantees the active object has live playback
+        obj = context.active_object
+        assert obj is not None
+        if self.endFrame < self.startFrame:
+            self.report({'ERROR'}, "End frame is before start frame!")
+            return {'CANCELLED'}
+        action = JAG2GLA.livePlaybacks[obj.name].bake(obj, self.startFrame, self.endFrame, self.reduceKeyframes)
+        self.report({'INFO'}, f"Baked frames {self.startFrame}-{self.endFrame} into {action.name}")
         return {'FINISHED'}
 
     def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
+        # default to the scene's frame range
+        scene = context.scene
+        assert scene is not None
+        if not self.properties.is_property_set("startFrame"):
+            self.startFrame = scene.frame_start
+        if not self.properties.is_property_set("endFrame"):
+            self.endFrame = scene.frame_end
         wm = context.window_manager
         assert wm is not None
-        wm.fileselect_add(self)
-        return {'RUNNING_MODAL'}
+        return wm.invoke_props_dialog(self)
+
 
 class OBJECT_OT_AddG2Properties(bpy.types.Operator):
     bl_idname = "object.add_g2_properties"
@@ -431,6 +588,7 @@ def register():
     bpy.utils.register_class(GLAMetaExport)
     bpy.utils.register_class(GLMImport)
     bpy.utils.register_class(GLAImport)
+    bpy.utils.register_class(GLABakePlayback)
 
     bpy.utils.register_class(OBJECT_OT_AddG2Properties)
     bpy.utils.register_class(OBJECT_OT_RemoveG2Properties)
@@ -448,6 +606,8 @@ def unregister():
     bpy.utils.unregister_class(GLAMetaExport)
     bpy.utils.unregister_class(GLMImport)
     bpy.utils.unregister_class(GLAImport)
+    bpy.utils.unregister_class(GLABakePlayback)
+    JAG2GLA.stopLivePlayback()
 
     bpy.utils.unregister_class(OBJECT_OT_AddG2Properties)
     bpy.utils.unregister_class(OBJECT_OT_RemoveG2Properties)
@@ -160,6 +160,8 @@ class G2PropertiesPanel(bpy.types.Panel):
         elif obj.type == "ARMATURE":
             layout.operator("object.remove_g2_properties")
             layout.prop(props, "scale")
+            # only available while the armature plays a GLA live
+            layout.operator("object.bake_gla_playback")
 
 
 # -------------------------------------------------------------
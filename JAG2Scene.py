@@ -19,13 +19,16 @@
 # Main File containing the important definitions
 
 from .mod_reload import reload_modules
-reload_modules(locals(), __package__, ["JAFilesystem", "JAG2Constants", "JAG2GLM", "JAG2GLA"], [".error_types", ".casts"])  # nopep8
+reload_modules(locals(), __package__, ["JAFilesystem", "JAG2Constants", "JAG2GLM", "JAG2GLA", "JAMaterialmanager", "MrwProfiler"], [".error_types", ".casts"])  # nopep8
 
-from typing import Optional, Tuple
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Set, Tuple
 from . import JAFilesystem
 from . import JAG2Constants
 from . import JAG2GLM
 from . import JAG2GLA
+from . import JAMaterialmanager
+from . import MrwProfiler
 from .error_types import ErrorMessage, NoError
 from .casts import optional_cast
 
@@ -40,6 +43,127 @@ def findSceneRootObject() -> Optional[bpy.types.Object]:
     return scene_root
 
 
+# the stubs' bpy.data.scenes.get() only ever returns None
+def _getScene(name: str) -> Optional[bpy.types.Scene]:
+    return bpy.data.scenes.get(name)
+
+
+# The state of the .blend file an import may change, by name
+class _ImportState:
+    def __init__(self, sceneName: str):
+        self.data = {name: {datablock.name for datablock in getattr(bpy.data, name)} for name in ImportRollback.DATA_COLLECTIONS}
+        self.actionFakeUsers = {action.name: action.use_fake_user for action in bpy.data.actions}
+        # object name -> (parent name, action name, action slot handle, number of NLA tracks)
+        self.objectStates: Dict[str, Tuple[Optional[str], Optional[str], Optional[int], int]] = {}
+        for obj in bpy.data.objects:
+            parent = obj.parent.name if obj.parent is not None else None
+            animationData = obj.animation_data
+            if animationData is None:
+                self.objectStates[obj.name] = (parent, None, None, 0)
+            else:
+                action = animationData.action.name if animationData.action is not None else None
+                slot = getattr(animationData, "action_slot", None)
+                self.objectStates[obj.name] = (parent, action, slot.handle if slot is not None else None, len(animationData.nla_tracks))
+        self.linkedObjects: Set[str] = set()
+        self.frames: Optional[Tuple[int, int, int]] = None
+        self.markers: Set[Tuple[str, int]] = set()
+        scene = _getScene(sceneName)
+        if scene is not None:
+            self.linkedObjects = {obj.name for obj in scene.collection.objects}
+            self.frames = (scene.frame_start, scene.frame_end, scene.frame_current)
+            self.markers = {(marker.name, marker.frame) for marker in scene.timeline_markers}
+        self.livePlaybacks = set(JAG2GLA.livePlaybacks)
+        self.pendingTextures = JAMaterialmanager.pendingDeferredTextures()
+
+
+# What an import changes in the .blend file, so a cancelled import can be undone: datablocks it created get removed,
+# the objects that were there get their animation and parent back, the scene its frame range and markers, and
+# textures it requested aren't loaded after all. Only the parts of the import run while recording() count, so what
+# the user does in between while a modal import runs is left alone. Everything is remembered by name, since the user
+# may undo or delete things in the meantime, which leaves Python references dangling.
+class ImportRollback:
+    # the kinds of datablocks imports create
+    DATA_COLLECTIONS = ["actions", "armatures", "images", "materials", "meshes", "node_groups", "objects"]
+
+    def __init__(self):
+        scene = bpy.context.scene
+        assert scene is not None
+        self.sceneName = scene.name
+        self.created: Dict[str, Set[str]] = {name: set() for name in self.DATA_COLLECTIONS}
+        # the states from before the import changed them
+        self.actionFakeUsers: Dict[str, bool] = {}
+        self.objectStates: Dict[str, Tuple[Optional[str], Optional[str], Optional[int], int]] = {}
+        self.frames: Optional[Tuple[int, int, int]] = None
+        self.linkedObjects: Set[str] = set()
+        self.markers: Set[Tuple[str, int]] = set()
+        self.livePlaybacks: Set[str] = set()
+        self.pendingTextures: Set[str] = set()
+
+    # remembers what the import changes within the block
+    @contextmanager
+    def recording(self) -> Iterator[None]:
+        before = _ImportState(self.sceneName)
+        try:
+            yield
+        finally:
+            after = _ImportState(self.sceneName)
+            for name in self.DATA_COLLECTIONS:
+                self.created[name] |= after.data[name] - before.data[name]
+            for actionName, useFakeUser in before.actionFakeUsers.items():
+                if actionName not in self.actionFakeUsers and after.actionFakeUsers.get(actionName, useFakeUser) != useFakeUser:
+                    self.actionFakeUsers[actionName] = useFakeUser
+            for objName, state in before.objectStates.items():
+                if objName not in self.objectStates and after.objectStates.get(objName, state) != state:
+                    self.objectStates[objName] = state
+            if self.frames is None and after.frames != before.frames:
+                self.frames = before.frames
+            self.linkedObjects |= after.linkedObjects - before.linkedObjects
+            self.markers |= after.markers - before.markers
+            self.livePlaybacks |= after.livePlaybacks - before.livePlaybacks
+            self.pendingTextures |= after.pendingTextures - before.pendingTextures
+
+    def restore(self) -> None:
+        if bpy.context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        JAMaterialmanager.dropDeferredTextures(self.pendingTextures)
+        scene = _getScene(self.sceneName)
+        if scene is not None:
+            for objName in self.linkedObjects:
+                obj = scene.collection.objects.get(objName)
+                if obj is not None:
+                    scene.collection.objects.unlink(obj)
+        for objName, (parentName, actionName, slotHandle, numTracks) in self.objectStates.items():
+            obj = bpy.data.objects.get(objName)
+            if obj is None:
+                continue
+            obj.parent = bpy.data.objects.get(parentName) if parentName is not None else None
+            animationData = obj.animation_data
+            if animationData is None:
+                continue
+            while len(animationData.nla_tracks) > numTracks:
+                animationData.nla_tracks.remove(animationData.nla_tracks[-1])
+            action = bpy.data.actions.get(actionName) if actionName is not None else None
+            animationData.action = action
+            if action is not None and slotHandle is not None:
+                slot = next((slot for slot in action.slots if slot.handle == slotHandle), None)  # pyright: ignore [reportGeneralTypeIssues]
+                if slot is not None:
+                    animationData.action_slot = slot
+        for actionName, useFakeUser in self.actionFakeUsers.items():
+            action = bpy.data.actions.get(actionName)
+            if action is not None:
+                action.use_fake_user = useFakeUser
+        if scene is not None:
+            for marker in list(scene.timeline_markers):
+                if (marker.name, marker.frame) in self.markers:
+                    scene.timeline_markers.remove(marker)
+            if self.frames is not None:
+                scene.frame_start, scene.frame_end, scene.frame_current = self.frames
+        for name in self.livePlaybacks:
+            JAG2GLA.livePlaybacks.pop(name, None)
+        created = [datablock for name in self.DATA_COLLECTIONS for datablock in getattr(bpy.data, name) if datablock.name in self.created[name]]
+        bpy.data.batch_remove(created)
+
+
 class Scene:
 
     def __init__(self, basepath: str):
@@ -57,13 +181,14 @@ class Scene:
                   glm_filepath_rel + ".glm", sep="")
             return False, ErrorMessage(f".glm file {glm_filepath_rel} not found in basepath ({self.basepath})")
         self.glm = JAG2GLM.GLM()
-        success, message = self.glm.loadFromFile(glm_filepath_abs)
+        with MrwProfiler.span("loading glm"):
+            success, message = self.glm.loadFromFile(glm_filepath_abs)
         if not success:
             return False, message
         return True, NoError
 
     # Loads scene from on GLA file
-    def loadFromGLA(self, gla_filepath_rel: str, loadAnimations=JAG2GLA.AnimationLoadMode.NONE, startFrame=0, numFrames=1) -> Tuple[bool, ErrorMessage]:
+    def loadFromGLA(self, gla_filepath_rel: str, loadAnimations=JAG2GLA.AnimationLoadMode.NONE, startFrame=0, numFrames=1, animationNames: Sequence[str] = ()) -> Tuple[bool, ErrorMessage]:
         # create default skeleton if necessary (doing it here is a bit of a hack)
         if gla_filepath_rel == "*default":
             self.gla = JAG2GLA.GLA()
@@ -77,8 +202,9 @@ class Scene:
                   gla_filepath_rel + ".gla", sep="")
             return False, ErrorMessage(f".gla file {gla_filepath_rel} not found in basepath ({self.basepath})")
         self.gla = JAG2GLA.GLA()
-        success, message = self.gla.loadFromFile(
-            gla_filepath_abs, loadAnimations, startFrame, numFrames)
+        with MrwProfiler.span("loading gla"):
+            success, message = self.gla.loadFromFile(
+                gla_filepath_abs, loadAnimations, startFrame, numFrames, animationNames)
         if not success:
             return False, message
         return True, NoError
@@ -86,14 +212,15 @@ class Scene:
     # "Loads" model from Blender data
     def loadModelFromBlender(self, glm_filepath_rel, gla_filepath_rel):
         self.glm = JAG2GLM.GLM()
-        success, message = self.glm.loadFromBlender(
-            glm_filepath_rel, gla_filepath_rel, self.basepath)
+        with MrwProfiler.span("loading model from Blender"):
+            success, message = self.glm.loadFromBlender(
+                glm_filepath_rel, gla_filepath_rel, self.basepath)
         if not success:
             return False, message
         return True, ""
 
     # "Loads" skeleton & animation from Blender data
-    def loadSkeletonFromBlender(self, gla_filepath_rel, gla_reference_rel):
+    def loadSkeletonFromBlender(self, gla_filepath_rel, gla_reference_rel, snapBones=False):
         self.gla = JAG2GLA.GLA()
         gla_reference_abs = ""
         if gla_reference_rel != "":
@@ -101,8 +228,9 @@ class Scene:
                 gla_reference_rel, self.basepath, ["gla"])
             if not success:
                 return False, "Could not find reference GLA"
-        success, message = self.gla.loadFromBlender(
-            gla_filepath_rel, gla_reference_abs)
+        with MrwProfiler.span("loading skeleton from Blender"):
+            success, message = self.gla.loadFromBlender(
+                gla_filepath_rel, gla_reference_abs, snapBones)
         if not success:
             return False, message
         return True, ""
@@ -127,7 +255,15 @@ class Scene:
 
     # "saves" the scene to blender
     # skeletonFixes is an enum with possible skeleton fixes - e.g. 'JKA' for connection- and
-    def saveToBlender(self, scale, skin_rel, guessTextures: bool, useAnimation: bool, skeletonFixes: JAG2Constants.SkeletonFixes) -> Tuple[bool, ErrorMessage]:
+    # livePlayback poses the armature from the animation on every frame change instead of baking keyframes,
+    # reduceKeyframes only bakes the keyframes linear interpolation can't stand in for
+    def saveToBlender(self, scale, skin_rel, guessTextures: bool, useAnimation: bool, skeletonFixes: JAG2Constants.SkeletonFixes, deferTextures: bool = False, livePlayback: bool = False,
+                      reduceKeyframes: bool = False) -> Tuple[bool, ErrorMessage]:
+        return JAG2GLA.finishSteps(self.saveToBlenderSteps(scale, skin_rel, guessTextures, useAnimation, skeletonFixes, deferTextures, livePlayback, reduceKeyframes))
+
+    # saveToBlender, a part of the animation at a time (see JAG2GLA.Steps)
+    def saveToBlenderSteps(self, scale, skin_rel, guessTextures: bool, useAnimation: bool, skeletonFixes: JAG2Constants.SkeletonFixes, deferTextures: bool = False,
+                           livePlayback: bool = False, reduceKeyframes: bool = False) -> JAG2GLA.Steps[Tuple[bool, ErrorMessage]]:
         # is there already a scene root in blender?
         scene = bpy.context.scene
         assert scene is not None
@@ -142,13 +278,15 @@ class Scene:
             scene_root.scale = (scale, scale, scale)
             scene.collection.objects.link(scene_root)
         # there's always a skeleton (even if it's *default)
-        success, message = optional_cast(JAG2GLA.GLA, self.gla).saveToBlender(
-            scene_root, useAnimation, skeletonFixes)
+        with MrwProfiler.span("creating skeleton"):
+            success, message = yield from optional_cast(JAG2GLA.GLA, self.gla).saveToBlenderSteps(
+                scene_root, useAnimation, skeletonFixes, livePlayback, reduceKeyframes)
         if not success:
             return False, message
         if self.glm:
-            success, message = self.glm.saveToBlender(
-                self.basepath, optional_cast(JAG2GLA.GLA, self.gla), scene_root, skin_rel, guessTextures)
+            with MrwProfiler.span("creating model"):
+                success, message = self.glm.saveToBlender(
+                    self.basepath, optional_cast(JAG2GLA.GLA, self.gla), scene_root, skin_rel, guessTextures, deferTextures)
             if not success:
                 return False, message
         return True, NoError
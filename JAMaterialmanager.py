@@ -19,7 +19,11 @@
 from .mod_reload import reload_modules
 reload_modules(locals(), __package__, ["JAFilesystem", "JAStringhelper"], [".casts", ".error_types"])  # nopep8
 
-from typing import Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import os
+import struct
 from . import JAFilesystem
 from . import JAStringhelper
 from .casts import downcast
@@ -28,17 +32,335 @@ from .error_types import ErrorMessage, NoError
 import bpy
 
 
+@dataclass
+class _CachedImage:
+    # a name rather than a reference: the image may be deleted behind our back
+    name: str
+    # os.stat() of the file when it was (re)loaded, to notice changes on disk
+    mtime: int
+    size: int
+
+
+# Session-wide caches, shared by every MaterialManager (i.e. across imports) so importing multiple
+# models using the same textures only loads each image (and creates each material) once.
+# Both are keyed on the normalized absolute texture path.
+_imageCache: Dict[str, _CachedImage] = {}
+_materialCache: Dict[str, str] = {}  # -> material name
+# the texture files deferred imports found, keyed on the normalized absolute shader path, so later
+# imports don't need to wait for the texture loader to look for them again
+_resolvedTextures: Dict[str, str] = {}
+
+TEXTURE_EXTENSIONS = ["jpg", "png", "tga"]
+
+
+def _normalizeTexturePath(path: str) -> str:
+    return os.path.normcase(os.path.realpath(path))
+
+
+def _statTexture(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def clearTextureCache() -> None:
+    _imageCache.clear()
+    _materialCache.clear()
+    _resolvedTextures.clear()
+
+
+def _findLoadedImage(key: str) -> Optional[bpy.types.Image]:
+    # images loaded by something other than us (e.g. saved in the .blend) are just as good
+    for image in bpy.data.images:
+        if image.source == 'FILE' and image.filepath != "" and _normalizeTexturePath(bpy.path.abspath(image.filepath)) == key:
+            return image
+    return None
+
+
+# returns the image for the given texture, loading it only if it's not loaded yet or changed on disk
+def getImage(path: str) -> bpy.types.Image:
+    key = _normalizeTexturePath(path)
+    mtime, size = _statTexture(path)
+    cached = _imageCache.get(key)
+    image = bpy.data.images.get(cached.name) if cached is not None else None
+    if cached is None or image is None:
+        image = _findLoadedImage(key)
+        if image is None:
+            image = bpy.data.images.load(path)
+    elif (mtime, size) != (cached.mtime, cached.size):
+        print(f"Texture changed on disk, reloading: {path}")
+        image.reload()
+    _imageCache[key] = _CachedImage(name=image.name, mtime=mtime, size=size)
+    return image
+
+
+def _getImageNode(mat: bpy.types.Material) -> Optional[bpy.types.ShaderNodeTexImage]:
+    if not mat.use_nodes or mat.node_tree is None:
+        return None
+    for node in mat.node_tree.nodes:
+        if node.type == 'TEX_IMAGE':
+            return downcast(bpy.types.ShaderNodeTexImage, node)
+    return None
+
+
+# what a material for a texture that doesn't exist looks like
+def _makeMissingTextureMaterial(mat: bpy.types.Material) -> None:
+    mat.use_nodes = False
+    mat.diffuse_color = (1, 0, 1, 1)
+
+
+# returns the material a previous import created for the given texture, if it still exists
+def _getCachedMaterial(path: str, deferred: bool) -> Optional[bpy.types.Material]:
+    key = _normalizeTexturePath(path)
+    name = _materialCache.get(key)
+    mat = bpy.data.materials.get(name) if name is not None else None
+    if mat is None:
+        return None
+    node = _getImageNode(mat)
+    if node is None:
+        # no longer the material we created
+        del _materialCache[key]
+        return None
+    if deferred and node.image is None:
+        _deferredLoader.request(path, "", mat.name, node.name)
+    else:
+        node.image = getImage(path)
+    return mat
+
+
+#  Deferred texture loading
+# Decoding every texture during surface creation makes up a good part of GLM import time. In
+# deferred mode materials get an empty image node instead, and a thread pool looks for the texture
+# files and checks their headers (pure file I/O, without touching bpy). The actual
+# bpy.data.images.load has to happen on the main thread, so a timer does that in small batches.
+
+# how many images to load per timer tick - keeps the UI responsive in between
+DEFERRED_TEXTURE_BATCH_SIZE = 4
+DEFERRED_TEXTURE_INTERVAL = 0.05  # seconds between timer ticks
+DEFERRED_TEXTURE_THREADS = 4
+# how much of a texture file gets read for probeImageHeader - JPEGs may have metadata before their size
+TEXTURE_HEADER_SIZE = 64 * 1024
+
+
+# returns (width, height) of a TGA, PNG or JPEG file, or None if the header is not recognized
+def probeImageHeader(data: bytes) -> Optional[Tuple[int, int]]:
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        # IHDR is always the first chunk
+        return struct.unpack(">2I", data[16:24])
+    if data[:2] == b"\xff\xd8":
+        # walk the markers up to the first start-of-frame
+        pos = 2
+        while pos + 9 < len(data):
+            if data[pos] != 0xff:
+                return None
+            marker = data[pos + 1]
+            if marker == 0xff:  # fill byte
+                pos += 1
+                continue
+            length, = struct.unpack(">H", data[pos + 2:pos + 4])
+            # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+            if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+                height, width = struct.unpack(">2H", data[pos + 5:pos + 9])
+                return width, height
+            pos += 2 + length
+        return None
+    # TGA has no magic number, so check the header fields for sanity instead
+    if len(data) >= 18:
+        colorMapType, imageType = data[1], data[2]
+        width, height, bpp = struct.unpack("<2HB", data[12:17])
+        if colorMapType in (0, 1) and imageType in (1, 2, 3, 9, 10, 11) and bpp in (8, 15, 16, 24, 32) and width > 0 and height > 0:
+            return width, height
+    return None
+
+
+@dataclass
+class _ResolvedTexture:
+    # "" if there's no such texture
+    path: str
+    size: Optional[Tuple[int, int]] = None
+    error: str = ""
+
+
+def _resolveTexture(shader: str, basepath: str) -> _ResolvedTexture:
+    # runs in a worker thread - must not touch bpy!
+    success, path = JAFilesystem.FindFile(shader, basepath, TEXTURE_EXTENSIONS)
+    if not success:
+        return _ResolvedTexture(path="")
+    try:
+        with open(path, "rb") as file:
+            header = file.read(TEXTURE_HEADER_SIZE)
+    except OSError as e:
+        return _ResolvedTexture(path=path, error=str(e))
+    return _ResolvedTexture(path=path, size=probeImageHeader(header))
+
+
+@dataclass
+class _PendingTexture:
+    shader: str
+    future: "Future[_ResolvedTexture]"
+    # (material name, image node name) to assign the image to once loaded
+    targets: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def _texturePathKey(shader: str, basepath: str) -> str:
+    return _normalizeTexturePath(JAFilesystem.AbsPath(shader, basepath))
+
+
+class DeferredTextureLoader:
+    def __init__(self):
+        self.executor: Optional[ThreadPoolExecutor] = None
+        # normalized path -> pending texture, in request order
+        self.pending: Dict[str, _PendingTexture] = {}
+        self.timerRegistered = False
+        # bpy.app.timers tells callbacks apart by identity, and every self._tick is a new bound method
+        self._tickCallback = self._tick
+
+    # the shader is looked up relative to the basepath like JAFilesystem.FindFile does, but in the background
+    def request(self, shader: str, basepath: str, materialName: str, nodeName: str) -> None:
+        key = _texturePathKey(shader, basepath)
+        pending = self.pending.get(key)
+        if pending is None:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=DEFERRED_TEXTURE_THREADS, thread_name_prefix="JATextureLoader")
+            pending = _PendingTexture(shader=shader, future=self.executor.submit(_resolveTexture, shader, basepath))
+            self.pending[key] = pending
+        pending.targets.append((materialName, nodeName))
+        if not self.timerRegistered:
+            bpy.app.timers.register(self._tickCallback, first_interval=DEFERRED_TEXTURE_INTERVAL)
+            self.timerRegistered = True
+
+    # the still existing material of a pending texture, to share it instead of requesting the texture again
+    def getMaterial(self, key: str) -> Optional[bpy.types.Material]:
+        pending = self.pending.get(key)
+        for materialName, _ in pending.targets if pending is not None else []:
+            mat = bpy.data.materials.get(materialName)
+            if mat is not None:
+                return mat
+        return None
+
+    def _load(self, key: str, pending: _PendingTexture) -> None:
+        resolved = pending.future.result()
+        # the material may have been deleted in the meantime
+        materials = [mat for materialName, _ in pending.targets if (mat := bpy.data.materials.get(materialName)) is not None]
+        if resolved.path == "":
+            print("Texture not found: \"", pending.shader, "\"", sep="")
+            for mat in materials:
+                _makeMissingTextureMaterial(mat)
+            return
+        _resolvedTextures[key] = resolved.path
+        if len(materials) > 0 and _normalizeTexturePath(resolved.path) not in _materialCache:
+            _materialCache[_normalizeTexturePath(resolved.path)] = materials[0].name
+        if resolved.error != "":
+            print(f"Could not read texture {resolved.path}: {resolved.error}")
+            return
+        if resolved.size is None:
+            print(f"Warning: unrecognized image header in {resolved.path}, trying to load anyway")
+        try:
+            image = getImage(resolved.path)
+        except (OSError, RuntimeError) as e:
+            print(f"Could not load texture {resolved.path}: {e}")
+            return
+        for materialName, nodeName in pending.targets:
+            mat = bpy.data.materials.get(materialName)
+            if mat is None or mat.node_tree is None:
+                continue
+            node = mat.node_tree.nodes.get(nodeName)
+            if node is not None and node.type == 'TEX_IMAGE':
+                downcast(bpy.types.ShaderNodeTexImage, node).image = image
+
+    def _tick(self) -> Optional[float]:
+        loaded = 0
+        for key, pending in list(self.pending.items()):
+            if loaded >= DEFERRED_TEXTURE_BATCH_SIZE:
+                break
+            if not pending.future.done():
+                continue
+            del self.pending[key]
+            self._load(key, pending)
+            loaded += 1
+        if len(self.pending) == 0:
+            self.timerRegistered = False
+            return None
+        return DEFERRED_TEXTURE_INTERVAL
+
+    # loads all pending textures right away, waiting for the file reads if necessary
+    def flush(self) -> None:
+        while len(self.pending) > 0:
+            key, pending = next(iter(self.pending.items()))
+            del self.pending[key]
+            self._load(key, pending)
+
+    # drops the pending textures with the given keys without loading them
+    def drop(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            pending = self.pending.pop(key, None)
+            if pending is not None:
+                pending.future.cancel()
+
+    # drops all pending textures without loading them
+    def cancel(self) -> None:
+        self.drop(list(self.pending))
+        if self.timerRegistered:
+            if bpy.app.timers.is_registered(self._tickCallback):
+                bpy.app.timers.unregister(self._tickCallback)
+            self.timerRegistered = False
+
+    def shutdown(self) -> None:
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+
+_deferredLoader = DeferredTextureLoader()
+
+
+# loads all textures of previous deferred imports right away
+def flushDeferredTextures() -> None:
+    _deferredLoader.flush()
+
+
+# the textures deferred imports are still going to load, to drop those requested since with dropDeferredTextures
+def pendingDeferredTextures() -> Set[str]:
+    return set(_deferredLoader.pending)
+
+
+def dropDeferredTextures(keys: Iterable[str]) -> None:
+    _deferredLoader.drop(keys)
+
+
+@bpy.app.handlers.persistent
+def _onLoadPost(_dummy) -> None:
+    # the cached names refer to the previous file's datablocks
+    _deferredLoader.cancel()
+    clearTextureCache()
+
+
+def register():
+    if _onLoadPost not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_onLoadPost)
+
+
+def unregister():
+    if _onLoadPost in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_onLoadPost)
+    _deferredLoader.shutdown()
+    clearTextureCache()
+
+
 class MaterialManager():
     def __init__(self):
         self.basepath = ""
         self.materials = {}
         self.guessTextures = False
         self.useSkin = False
+        self.deferTextures = False
         self.initialized = False
 
-    def init(self, basepath: str, skin_rel: str, guessTextures: bool) -> Tuple[bool, ErrorMessage]:
+    # deferTextures: create materials with empty image nodes and load the images in the background (see DeferredTextureLoader)
+    def init(self, basepath: str, skin_rel: str, guessTextures: bool, deferTextures: bool = False) -> Tuple[bool, ErrorMessage]:
         self.basepath = basepath
         self.guessTextures = guessTextures
+        self.deferTextures = deferTextures
         if skin_rel != "":
             succes, skin_abs = JAFilesystem.FindFile(
                 skin_rel, self.basepath, ["skin"])
@@ -73,19 +395,53 @@ class MaterialManager():
             return
         if shader.lower() in self.materials:
             return self.materials[shader.lower()]
-        # create material, it doesn't exist yet
-        mat = bpy.data.materials.new(shader)
-        self.materials[shader.lower()] = mat
-        # try to find the image
-        success, path = JAFilesystem.FindFile(
-            shader, self.basepath, ["jpg", "png", "tga"])
-        # if it doesn't exist, we're done.
+        # try to find the image - deferred imports leave that to the texture loader, unless an earlier one already did
+        if self.deferTextures:
+            key = _texturePathKey(shader, self.basepath)
+            path = _resolvedTextures.get(key)
+            if path is None:
+                # maybe it's still looking for it for a previous import
+                mat = _deferredLoader.getMaterial(key)
+                if mat is None:
+                    mat, img = self._createMaterial(shader)
+                    if img is not None:
+                        # placeholder, filled in later
+                        _deferredLoader.request(shader, self.basepath, mat.name, img.name)
+                self.materials[shader.lower()] = mat
+                return mat
+            success = True
+        else:
+            success, path = JAFilesystem.FindFile(shader, self.basepath, TEXTURE_EXTENSIONS)
+        # maybe a previous import already created a material for this texture
+        if success and (mat := _getCachedMaterial(path, self.deferTextures)) is not None:
+            self.materials[shader.lower()] = mat
+            return mat
+        # if the image doesn't exist, we're done.
         if not success:
             print("Texture not found: \"", shader, "\"", sep="")
+            mat = bpy.data.materials.new(shader)
             # make it pink though
-            mat.diffuse_color = (1, 0, 1, 1)
+            _makeMissingTextureMaterial(mat)
+            self.materials[shader.lower()] = mat
             return mat
 
+        # create material, it doesn't exist yet
+        mat, img = self._createMaterial(shader)
+        self.materials[shader.lower()] = mat
+        if img is None:
+            return mat
+        if self.deferTextures:
+            # placeholder, filled in later
+            _deferredLoader.request(path, "", mat.name, img.name)
+        else:
+            img.image = getImage(path)
+        _materialCache[_normalizeTexturePath(path)] = mat.name
+
+        return mat
+
+    # a new material with an empty image node for the texture, or without one if that failed
+    def _createMaterial(self, shader: str) -> Tuple[bpy.types.Material, Optional[bpy.types.ShaderNodeTexImage]]:
+        mat = bpy.data.materials.new(shader)
         mat.use_nodes = True
         node_tree = mat.node_tree
         assert node_tree is not None
@@ -100,12 +456,9 @@ class MaterialManager():
         if bsdf == None:
             print("Bug: could not find the Principled BSDF node in new material, please report this")
             # fall back to pink
-            mat.use_nodes = False
-            mat.diffuse_color = (1, 0, 1, 1)
-            return mat
+            _makeMissingTextureMaterial(mat)
+            return mat, None
         img = downcast(bpy.types.ShaderNodeTexImage, node_tree.nodes.new('ShaderNodeTexImage'))
-        img.image = bpy.data.images.load(path)
         node_tree.links.new(
             bsdf.inputs['Base Color'], img.outputs['Color'])
-
-        return mat
+        return mat, img
@@ -1,5 +1,6 @@
 import math
 import struct
+import numpy as np
 
 MAX_QPATH = 64
 
@@ -13,6 +14,97 @@ MD3_MAX_VERTICES = 4096
 MD3_MAX_TRIANGLES = 8192
 MD3_XYZ_SCALE = 64.0
 
+# one vertex of one frame as saved in the file, see md3Vert
+MD3_VERT_DTYPE = np.dtype([("xyz", "<i2", (3,)), ("normal", "<u2")])
+# the same for md3Frame and md3Tag, for reading them in bulk
+MD3_FRAME_DTYPE = np.dtype([("mins", "<f4", (3,)), ("maxs", "<f4", (3,)), ("localOrigin", "<f4", (3,)),
+                            ("radius", "<f4"), ("name", "S16")])
+MD3_TAG_DTYPE = np.dtype([("name", "S%d" % MAX_QPATH), ("origin", "<f4", (3,)), ("axis", "<f4", (9,))])
+
+
+class md3FormatError(Exception):
+    pass
+
+
+# a null terminated string from a fixed size field
+def DecodeString(data):
+    return data.split(b"\0", 1)[0].decode('utf-8', 'replace')
+
+
+# a (count, ...) array read straight from data (bytes or an mmap), copied so it outlives the buffer
+def ReadArray(data, dtype, count, offset):
+    dtype = np.dtype(dtype)
+    if offset < 0 or offset + count * dtype.itemsize > len(data):
+        raise md3FormatError("Unexpected end of file")
+    return np.frombuffer(data, dtype=dtype, count=count, offset=offset).copy()
+
+
+# batched versions of md3Vert.Encode/Decode and the per frame bounds, on whole arrays of vertices
+
+
+# normals (..., 3) -> 16 bit lat/lng (...), like md3Vert.Encode
+def EncodeNormals(normals):
+    normals = np.asarray(normals, dtype=np.float64)
+    x, y, z = normals[..., 0], normals[..., 1], normals[..., 2]
+    # normalize
+    l = np.sqrt((x * x) + (y * y) + (z * z))
+    safe = np.where(l == 0, 1, l)
+    x = x / safe
+    y = y / safe
+    z = z / safe
+    lng = np.arccos(np.clip(z, -1, 1)) * 255 / (2 * math.pi)
+    lat = np.arctan2(y, x) * 255 / (2 * math.pi)
+    # int() truncates towards 0
+    result = ((np.trunc(lat).astype(np.int64) & 0xFF) << 8) | (np.trunc(lng).astype(np.int64) & 0xFF)
+    result = np.where((x == 0.0) & (y == 0.0), np.where(z > 0.0, 0, 128 << 8), result)
+    return np.where(l == 0, 0, result).astype(np.uint16)
+
+
+_normalDecodeTable = None
+
+
+# the normal for each of the 65536 lat/lng values, as a (65536, 3) array
+def GetNormalDecodeTable():
+    global _normalDecodeTable
+    if _normalDecodeTable is None:
+        latlng = np.arange(1 << 16)
+        lat = ((latlng >> 8) & 0xFF) * (math.pi / 128)
+        lng = (latlng & 0xFF) * (math.pi / 128)
+        _normalDecodeTable = np.stack([
+            np.cos(lat) * np.sin(lng),
+            np.sin(lat) * np.sin(lng),
+            np.cos(lng),
+        ], axis=-1).astype(np.float32)
+    return _normalDecodeTable
+
+
+# 16 bit lat/lng (...) -> normals (..., 3), like md3Vert.Decode
+def DecodeNormals(latlng):
+    return GetNormalDecodeTable()[np.asarray(latlng, dtype=np.uint16)]
+
+
+# positions (..., 3) -> fixed point (..., 3), like md3Vert.Save
+def EncodePositions(xyz):
+    scaled = np.trunc(np.asarray(xyz, dtype=np.float64) * MD3_XYZ_SCALE)
+    if scaled.size > 0 and (scaled.min() < -(1 << 15) or scaled.max() >= 1 << 15):
+        raise ValueError("Vertices must be within {} units of the origin!".format((1 << 15) / MD3_XYZ_SCALE))
+    return scaled.astype(np.int16)
+
+
+def DecodePositions(xyz):
+    return np.asarray(xyz, dtype=np.float32) / MD3_XYZ_SCALE
+
+
+# per frame mins, maxs (numFrames, 3) and radius (numFrames) of positions (numFrames, numVerts, 3).
+# the bounds always contain the origin.
+def ComputeFrameBounds(xyz):
+    xyz = np.asarray(xyz, dtype=np.float64)
+    zeros = np.zeros((xyz.shape[0], 3))
+    mins = np.minimum(zeros, xyz.min(axis=1)) if xyz.shape[1] > 0 else zeros
+    maxs = np.maximum(zeros, xyz.max(axis=1)) if xyz.shape[1] > 0 else zeros
+    radius = np.round(np.maximum(np.linalg.norm(mins, axis=1), np.linalg.norm(maxs, axis=1)), 5)
+    return mins, maxs, radius
+
 
 class md3Vert:
     binaryFormat = "<3hH"
@@ -60,14 +152,16 @@ class md3Vert:
         return retval
 
     def Save(self, file):
-        data = struct.pack(
+        file.write(self.Serialize())
+
+    def Serialize(self):
+        return struct.pack(
             self.binaryFormat,
             int(self.xyz[0] * MD3_XYZ_SCALE),
             int(self.xyz[1] * MD3_XYZ_SCALE),
             int(self.xyz[2] * MD3_XYZ_SCALE),
             self.normal
         )
-        file.write(data)
 
 
 class md3TexCoord:
@@ -81,12 +175,14 @@ class md3TexCoord:
         return struct.calcsize(self.binaryFormat)
 
     def Save(self, file):
-        data = struct.pack(
+        file.write(self.Serialize())
+
+    def Serialize(self):
+        return struct.pack(
             self.binaryFormat,
             self.u,
             1.0 - self.v
         )
-        file.write(data)
 
 
 class md3Triangle:
@@ -99,13 +195,15 @@ class md3Triangle:
         return struct.calcsize(self.binaryFormat)
 
     def Save(self, file):
-        data = struct.pack(
+        file.write(self.Serialize())
+
+    def Serialize(self):
+        return struct.pack(
             self.binaryFormat,
             self.indexes[0],
             self.indexes[2],  # reverse
             self.indexes[1]
         )
-        file.write(data)
 
 
 class md3Shader:
@@ -119,12 +217,18 @@ class md3Shader:
         return struct.calcsize(self.binaryFormat)
 
     def Save(self, file):
-        data = struct.pack(
+        file.write(self.Serialize())
+
+    def Serialize(self):
+        return struct.pack(
             self.binaryFormat,
             self.name.encode('utf-8'),
             self.index
         )
-        file.write(data)
+
+    def Deserialize(self, data, offset):
+        name, self.index = struct.unpack_from(self.binaryFormat, data, offset)
+        self.name = DecodeString(name)
 
 
 class md3Surface:
@@ -144,30 +248,38 @@ class md3Surface:
         self.ofsVerts = 0
         self.ofsEnd = 0
         self.shaders = []
-        self.triangles = []
-        self.uv = []
-        self.verts = []
-
+        # (numTriangles, 3) vertex indices, in Blender's winding order - see md3Triangle
+        self.triangles = np.zeros((0, 3), dtype=np.int32)
+        # (numVerts, 2) with v pointing up like in Blender - see md3TexCoord
+        self.uv = np.zeros((0, 2))
+        # (numFrames, numVerts) of MD3_VERT_DTYPE
+        self.verts = np.zeros((0, 0), dtype=MD3_VERT_DTYPE)
+
+    # also fills in the offsets
     def GetSize(self):
         sz = struct.calcsize(self.binaryFormat)
         self.ofsShaders = sz
-        for s in self.shaders:
-            sz += s.GetSize()
+        sz += len(self.shaders) * struct.calcsize(md3Shader.binaryFormat)
         self.ofsTriangles = sz
-        for t in self.triangles:
-            sz += t.GetSize()
+        sz += len(self.triangles) * struct.calcsize(md3Triangle.binaryFormat)
         self.ofsUV = sz
-        for u in self.uv:
-            sz += u.GetSize()
+        sz += len(self.uv) * struct.calcsize(md3TexCoord.binaryFormat)
         self.ofsVerts = sz
-        for v in self.verts:
-            sz += v.GetSize()
+        sz += self.verts.nbytes
         self.ofsEnd = sz
         return self.ofsEnd
 
     def Save(self, file):
+        file.write(self.Serialize())
+
+    # the surface as a list of byte blocks, with the triangles, UVs and vertices as one block each
+    def Serialize(self):
         self.GetSize()
-        data = struct.pack(
+        # see md3Triangle.Save and md3TexCoord.Save
+        triangles = np.asarray(self.triangles, dtype="<i4").reshape(-1, 3)[:, [0, 2, 1]]
+        uvs = np.asarray(self.uv, dtype=np.float64).reshape(-1, 2)
+        uvs = np.stack([uvs[:, 0], 1.0 - uvs[:, 1]], axis=-1).astype("<f4")
+        blocks = [struct.pack(
             self.binaryFormat,
             self.ident.encode('utf-8'),
             self.name.encode('utf-8'),
@@ -181,24 +293,38 @@ class md3Surface:
             self.ofsUV,
             self.ofsVerts,
             self.ofsEnd
-        )
-        file.write(data)
-
-        # save the shader coordinates
-        for s in self.shaders:
-            s.Save(file)
-
-        # write the tri data
-        for t in self.triangles:
-            t.Save(file)
-
-        # save the uv info
-        for u in self.uv:
-            u.Save(file)
-
-        # save the verts
-        for v in self.verts:
-            v.Save(file)
+        )]
+        blocks.extend(s.Serialize() for s in self.shaders)
+        blocks.append(triangles.tobytes())
+        blocks.append(uvs.tobytes())
+        blocks.append(self.verts.astype(MD3_VERT_DTYPE).tobytes())
+        return b"".join(blocks)
+
+    # reads the surface starting at offset, inverse of Serialize
+    def Deserialize(self, data, offset):
+        if offset + struct.calcsize(self.binaryFormat) > len(data):
+            raise md3FormatError("Unexpected end of file")
+        ident, name, self.flags, self.numFrames, self.numShaders, self.numVerts, self.numTriangles, \
+            self.ofsTriangles, self.ofsShaders, self.ofsUV, self.ofsVerts, self.ofsEnd = \
+            struct.unpack_from(self.binaryFormat, data, offset)
+        self.ident = ident.decode('utf-8', 'replace')
+        self.name = DecodeString(name)
+        if self.ident != MD3_IDENT:
+            raise md3FormatError("Surface {} has invalid ident {}".format(self.name, self.ident))
+        self.shaders = []
+        for i in range(self.numShaders):
+            shader = md3Shader()
+            shader.Deserialize(data, offset + self.ofsShaders + i * struct.calcsize(md3Shader.binaryFormat))
+            self.shaders.append(shader)
+        triangles = ReadArray(data, "<i4", self.numTriangles * 3, offset + self.ofsTriangles)
+        self.triangles = triangles.reshape(-1, 3)[:, [0, 2, 1]].astype(np.int32)
+        uvs = ReadArray(data, "<f4", self.numVerts * 2, offset + self.ofsUV).reshape(-1, 2).astype(np.float64)
+        uvs[:, 1] = 1.0 - uvs[:, 1]
+        self.uv = uvs
+        self.verts = ReadArray(data, MD3_VERT_DTYPE, self.numFrames * self.numVerts,
+                               offset + self.ofsVerts).reshape(self.numFrames, self.numVerts)
+        if np.any((self.triangles < 0) | (self.triangles >= self.numVerts)):
+            raise md3FormatError("Surface {} has out of range vertex indices".format(self.name))
 
 
 class md3Tag:
@@ -213,7 +339,10 @@ class md3Tag:
         return struct.calcsize(self.binaryFormat)
 
     def Save(self, file):
-        data = struct.pack(
+        file.write(self.Serialize())
+
+    def Serialize(self):
+        return struct.pack(
             self.binaryFormat,
             self.name.encode('utf-8'),
             float(self.origin[0]),
@@ -229,7 +358,6 @@ class md3Tag:
             float(self.axis[7]),
             float(self.axis[8])
         )
-        file.write(data)
 
 
 class md3Frame:
@@ -246,7 +374,10 @@ class md3Frame:
         return struct.calcsize(self.binaryFormat)
 
     def Save(self, file):
-        data = struct.pack(
+        file.write(self.Serialize())
+
+    def Serialize(self):
+        return struct.pack(
             self.binaryFormat,
             self.mins[0],
             self.mins[1],
@@ -260,7 +391,6 @@ class md3Frame:
             self.radius,
             self.name.encode('utf-8')
         )
-        file.write(data)
 
 
 class md3Object:
@@ -283,30 +413,32 @@ class md3Object:
         self.ofsSurfaces = 0
         self.ofsEnd = 0
         self.frames = []
-        self.tags = []
+        # (numFrames, numTags) of MD3_TAG_DTYPE, so ordered tag1frame1, tag2frame1, ..., tag1frame2, ... - see md3Tag
+        self.tags = np.zeros((0, 0), dtype=MD3_TAG_DTYPE)
         self.surfaces = []
 
+    # also fills in the offsets
     def GetSize(self):
         # frames start after header
         self.ofsFrames = struct.calcsize(self.binaryFormat)
         # tags start after frames
-        self.ofsTags = self.ofsFrames
-        for f in self.frames:
-            self.ofsTags += f.GetSize()
+        self.ofsTags = self.ofsFrames + len(self.frames) * struct.calcsize(md3Frame.binaryFormat)
         # surfaces start after tags
-        self.ofsSurfaces = self.ofsTags
-        for t in self.tags:
-            self.ofsSurfaces += t.GetSize()
+        self.ofsSurfaces = self.ofsTags + self.tags.nbytes
         # end starts after surfaces
         self.ofsEnd = self.ofsSurfaces
         for s in self.surfaces:
             self.ofsEnd += s.GetSize()
         return self.ofsEnd
 
+    # writes the whole file at once
     def Save(self, file):
+        file.write(self.Serialize())
+
+    def Serialize(self):
         self.GetSize()
 
-        data = struct.pack(
+        blocks = [struct.pack(
             self.binaryFormat,
             self.ident.encode('utf-8'),
             self.version,
@@ -322,14 +454,49 @@ class md3Object:
             self.ofsTags,
             self.ofsSurfaces,
             self.ofsEnd
-        )
-        file.write(data)
+        )]
+        blocks.extend(f.Serialize() for f in self.frames)
+        blocks.append(self.tags.astype(MD3_TAG_DTYPE).tobytes())
+        blocks.extend(s.Serialize() for s in self.surfaces)
+        data = b"".join(blocks)
+        assert len(data) == self.ofsEnd
+        return data
+
+    # reads a whole file's contents (bytes or an mmap), inverse of Serialize.
+    # the frames and tags are decoded as one array each.
+    def Deserialize(self, data):
+        if len(data) < struct.calcsize(self.binaryFormat):
+            raise md3FormatError("File too small")
+        ident, self.version, name, self.flags, self.numFrames, self.numTags, self.numSurfaces, self.numSkins, \
+            self.ofsFrames, self.ofsTags, self.ofsSurfaces, self.ofsEnd = struct.unpack_from(self.binaryFormat, data)
+        self.ident = ident.decode('utf-8', 'replace')
+        self.name = DecodeString(name)
+        if self.ident != MD3_IDENT:
+            raise md3FormatError("Not an MD3 file (ident {})".format(self.ident))
+        if self.version != MD3_VERSION:
+            raise md3FormatError("Unsupported MD3 version {}, expected {}".format(self.version, MD3_VERSION))
+        if self.numFrames < 1:
+            raise md3FormatError("File has no frames")
 
-        for f in self.frames:
-            f.Save(file)
+        self.frames = []
+        for frame in ReadArray(data, MD3_FRAME_DTYPE, self.numFrames, self.ofsFrames):
+            nframe = md3Frame()
+            nframe.mins = frame["mins"].tolist()
+            nframe.maxs = frame["maxs"].tolist()
+            nframe.localOrigin = frame["localOrigin"].tolist()
+            nframe.radius = float(frame["radius"])
+            nframe.name = DecodeString(frame["name"])
+            self.frames.append(nframe)
 
-        for t in self.tags:
-            t.Save(file)
+        self.tags = ReadArray(data, MD3_TAG_DTYPE, self.numFrames * self.numTags, self.ofsTags).reshape(self.numFrames, self.numTags)
 
-        for s in self.surfaces:
-            s.Save(file)
+        self.surfaces = []
+        offset = self.ofsSurfaces
+        for _ in range(self.numSurfaces):
+            surface = md3Surface()
+            surface.Deserialize(data, offset)
+            if surface.numFrames != self.numFrames:
+                raise md3FormatError("Surface {} has {} frames, expected {}".format(
+                    surface.name, surface.numFrames, self.numFrames))
+            self.surfaces.append(surface)
+            offset += surface.ofsEnd
@@ -3,10 +3,10 @@ reload_modules(locals(), __package__, ["JAMd3Encode"], [])  # nopep8
 
 import bpy
 from bpy.props import *
-import math
 import time
 import os
 import mathutils
+import numpy as np
 from . import JAMd3Encode
 
 __author__ = ["Xembie", "PhaethonH", "Bob Holcomb",
@@ -71,16 +71,17 @@ def print_md3(log, md3, dumpall):
             message(log, " Name: {}".format(f.name))
 
         message(log, "Tags:")
-        for t in md3.tags:
-            message(log, " Name: " + t.name)
+        for t in md3.tags.ravel():
+            origin, axis = t["origin"].tolist(), t["axis"].tolist()
+            message(log, " Name: " + JAMd3Encode.DecodeString(t["name"]))
             message(
-                log, " Origin: {t.origin[0]} {t.origin[1]} {t.origin[2]}".format(t=t))
+                log, " Origin: {o[0]} {o[1]} {o[2]}".format(o=origin))
             message(
-                log, " Axis[0]: {t.axis[0]} {t.axis[1]} {t.axis[2]}".format(t=t))
+                log, " Axis[0]: {a[0]} {a[1]} {a[2]}".format(a=axis))
             message(
-                log, " Axis[1]: {t.axis[3]} {t.axis[4]} {t.axis[5]}".format(t=t))
+                log, " Axis[1]: {a[3]} {a[4]} {a[5]}".format(a=axis))
             message(
-                log, " Axis[2]: {t.axis[6]} {t.axis[7]} {t.axis[8]}".format(t=t))
+                log, " Axis[2]: {a[6]} {a[7]} {a[8]}".format(a=axis))
 
         message(log, "Surfaces:")
         for s in md3.surfaces:
@@ -100,18 +101,18 @@ def print_md3(log, md3, dumpall):
                 message(log, "    Name: {}".format(shader.name))
                 message(log, "    Index: {}".format(shader.index))
             message(log, " Triangles:")
-            for tri in s.triangles:
+            for tri in s.triangles.tolist():
                 message(
-                    log, "    Indexes: {tri.indexes[0]} {tri.indexes[1]} {tri.indexes[2]}".format(tri=tri))
+                    log, "    Indexes: {tri[0]} {tri[1]} {tri[2]}".format(tri=tri))
             message(log, " UVs:")
-            for uv in s.uv:
-                message(log, "    U: {}".format(uv.u))
-                message(log, "    V: {}".format(uv.v))
+            for u, v in s.uv.tolist():
+                message(log, "    U: {}".format(u))
+                message(log, "    V: {}".format(v))
             message(log, " Verts:")
-            for vert in s.verts:
+            for vert in s.verts.ravel():
                 message(
-                    log, "    XYZ: {xyz[0]} {xyz[1]} {xyz[2]}".format(xyz=vert.xyz))
-                message(log, "    Normal: {}".format(vert.normal))
+                    log, "    XYZ: {xyz[0]} {xyz[1]} {xyz[2]}".format(xyz=JAMd3Encode.DecodePositions(vert["xyz"])))
+                message(log, "    Normal: {}".format(vert["normal"]))
 
     shader_count = 0
     vert_count = 0
@@ -145,11 +146,91 @@ def print_md3(log, md3, dumpall):
     message(log, "Total Vertices: {}".format(vert_count))
 
 
+# an evaluated mesh's vertex positions and normals, as (numVerts, 3) arrays
+def get_mesh_vertices(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    normals = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    mesh.vertices.foreach_get("normal", normals)
+    return co.reshape(-1, 3), normals.reshape(-1, 3)
+
+
+def get_matrix(matrix):
+    return np.array([list(row) for row in matrix], dtype=np.float64)
+
+
+# creates a surface's shader, triangles and UVs from the first frame's mesh.
+# returns the surface and the mesh vertex index of each surface vertex.
+def build_surface(log, settings, obj, mesh):
+    nsurface = JAMd3Encode.md3Surface()
+    nsurface.name = obj.name
+    nsurface.ident = JAMd3Encode.MD3_IDENT
+
+    ignoreuvs = False
+    nshader = JAMd3Encode.md3Shader()
+    # Add only 1 shader per surface/object
+    try:
+        # Using custom properties allows a longer string
+        nshader.name = obj["md3shader"]
+    except:  # we should add a blank as a placeholder
+        ignoreuvs = True
+        nshader.name = "NULL"
+        message(
+            log, "{} has no md3shader property, defaulting to NULL".format(obj.name))
+    nsurface.shaders.append(nshader)
+    nsurface.numShaders = 1
+
+    if len(mesh.uv_layers) == 0:
+        message(log, "{} has no UV map".format(obj.name))
+        ignoreuvs = True
+
+    # per loop vertex indices and UVs, read in bulk
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVerts)
+    loopUVs = np.zeros((len(mesh.loops), 2))
+    if not (settings.ignoreuvs or ignoreuvs):
+        flatUVs = np.empty(len(mesh.loops) * 2, dtype=np.float32)
+        mesh.uv_layers[0].data.foreach_get("uv", flatUVs)
+        loopUVs = np.round(flatUVs.reshape(-1, 2).astype(np.float64), 5)
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+    for _ in range(np.count_nonzero(loopTotals != 3)):
+        message(log, "Found a nontriangle face in object " + obj.name)
+    triangleLoops = loopStarts[loopTotals == 3][:, np.newaxis] + np.arange(3)
+
+    # vertices get duplicated for each distinct UV coordinate they're used with, and numbered
+    # in the order they're first encountered
+    vertlist = []
+    vertexIndices = {}
+    triangles = []
+    uvs = []
+    loopVertList = loopVerts.tolist()
+    loopUVList = loopUVs.tolist()
+    for loops in triangleLoops.tolist():
+        triangle = []
+        for loop in loops:
+            vertIndex = loopVertList[loop]
+            u, v = loopUVList[loop]
+            key = (vertIndex, u, v)
+            index = vertexIndices.get(key)
+            if index is None:
+                # this UV coordinate is not yet used - add it
+                index = vertexIndices[key] = len(vertlist)
+                vertlist.append(vertIndex)
+                uvs.append((u, v))
+            triangle.append(index)
+        triangles.append(triangle)
+    nsurface.triangles = np.array(triangles, dtype=np.int32).reshape(-1, 3)
+    nsurface.uv = np.array(uvs, dtype=np.float64).reshape(-1, 2)
+    nsurface.numTriangles = len(triangles)
+    nsurface.numVerts = len(vertlist)
+    return nsurface, vertlist
+
+
 def save_md3(settings):
-    # TODO: time.clock() was removed in Python 3.8 - this raises AttributeError on any
-    # Python this addon currently supports, so MD3 export is presently broken. Use
-    # time.perf_counter() instead.
-    starttime = time.clock()  # start timer
+    starttime = time.perf_counter()  # start timer
     newlogpath = os.path.splitext(settings.savepath)[0] + ".log"
     if settings.logtype == "append":
         log = open(newlogpath, "a")
@@ -160,144 +241,84 @@ def save_md3(settings):
     message(log, "######################BEGIN######################")
     message(log, "Exporting selected objects...")
     # bpy.ops.object.mode_set(mode='OBJECT')
+    scene = bpy.context.scene
     md3 = JAMd3Encode.md3Object()
     md3.ident = JAMd3Encode.MD3_IDENT
     md3.version = JAMd3Encode.MD3_VERSION
     md3.name = settings.name
-    md3.numFrames = (bpy.context.scene.frame_end + 1) - \
-        bpy.context.scene.frame_start
+    frames = range(scene.frame_start, scene.frame_end + 1)
+    md3.numFrames = len(frames)
 
     # matrix to apply offset & scale - just calculate once and cache
-    offset_scale_mat = mathutils.Matrix.Translation(
-        settings.offset) * mathutils.Matrix.Scale(settings.scale, 4)
-
-    # export all selected meshes, remember empties for later...
-    empties = []
-    for obj in bpy.context.selected_objects:
-        # ...of type mesh
-        if obj.type == 'MESH':
-            bpy.context.scene.frame_set(bpy.context.scene.frame_start)
-            mesh = obj.to_mesh(bpy.context.scene, True, 'PREVIEW')
-
-            nsurface = JAMd3Encode.md3Surface()
-            nsurface.name = obj.name
-            nsurface.ident = JAMd3Encode.MD3_IDENT
-
-            ignoreuvs = False
-            nshader = JAMd3Encode.md3Shader()
-            # Add only 1 shader per surface/object
-            try:
-                # Using custom properties allows a longer string
-                nshader.name = obj["md3shader"]
-            except:  # we should add a blank as a placeholder
-                ignoreuvs = True
-                nshader.name = "NULL"
-                message(
-                    log, "{} has no md3shader property, defaulting to NULL".format(obj.name))
-            nsurface.shaders.append(nshader)
-            nsurface.numShaders = 1
-
-            vertlist = []
-
-            if len(mesh.uv_layers) == 0:
-                message(log, "{} has no UV map".format(obj.name))
-                ignoreuvs = True
-            else:
-                uvLoops = mesh.uv_layers[0].data
-
-            for polyIndex, polygon in enumerate(mesh.polygons):
-                ntri = JAMd3Encode.md3Triangle()
-                if len(polygon.vertices) != 3:
-                    message(log, "Found a nontriangle face in object " + obj.name)
-                    continue
-
-                for indexIndex, (vertIndex, uvLoopIndex) in enumerate(zip(polygon.vertices, polygon.loop_indices)):
-                    if settings.ignoreuvs or ignoreuvs:
-                        uv = [0, 0]
-                    else:
-                        uv = uvLoops[uvLoopIndex].uv.to_tuple()
-                        uv = [round(x, 5) for x in uv]
-
-                    match = False
-                    match_index = 0
-                    # find duplicate UV coordinates, don't add those vertices twice.
-                    for i, vi in enumerate(vertlist):
-                        if vi == vertIndex:
-                            if settings.ignoreuvs or ignoreuvs:
-                                match = True
-                                match_index = i
-                                break
-                            else:
-                                if nsurface.uv[i].u == uv[0] and nsurface.uv[i].v == uv[1]:
-                                    match = True
-                                    match_index = i
-                                    break
-
-                    if not match:
-                        # this UV coordinate is not yet used - add it
-                        vertlist.append(vertIndex)
-                        ntri.indexes[indexIndex] = nsurface.numVerts
-                        ntex = JAMd3Encode.md3TexCoord()
-                        ntex.u = uv[0]
-                        ntex.v = uv[1]
-                        nsurface.uv.append(ntex)
-                        nsurface.numVerts += 1
-                    else:
-                        # this UV coordinate has been previously encountered, use that one.
-                        ntri.indexes[indexIndex] = match_index
-                nsurface.triangles.append(ntri)
-                nsurface.numTriangles += 1
-
-            for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end + 1):
-                bpy.context.scene.frame_set(frame)
-                frame_mesh = obj.to_mesh(bpy.context.scene, True, 'PREVIEW')
-                # fobj.calc_normals()
-                # only add new frames once
-                if len(md3.frames) <= frame - bpy.context.scene.frame_start:
-                    nframe = JAMd3Encode.md3Frame()
-                    nframe.name = str(frame)
-                else:
-                    nframe = md3.frames[frame - bpy.context.scene.frame_start]
-                for vi in vertlist:
-                    vert = frame_mesh.vertices[vi]
-                    nvert = JAMd3Encode.md3Vert()
-                    nvert.normal = nvert.Encode(vert.normal)
-                    nvert.xyz = offset_scale_mat * obj.matrix_world * vert.co
-                    nvert.xyz = [round(x, 5) for x in nvert.xyz]
-                    for i in range(0, 3):
-                        nframe.mins[i] = min(nframe.mins[i], nvert.xyz[i])
-                        nframe.maxs[i] = max(nframe.maxs[i], nvert.xyz[i])
-                    minlength = math.sqrt(sum([x * x for x in nframe.mins]))
-                    maxlength = math.sqrt(sum([x * x for x in nframe.maxs]))
-                    nframe.radius = round(max(minlength, maxlength), 5)
-                    nsurface.verts.append(nvert)
-                # only add if not already there
-                if len(md3.frames) <= frame - bpy.context.scene.frame_start:
-                    md3.frames.append(nframe)
-                nsurface.numFrames += 1
-                bpy.data.meshes.remove(frame_mesh)
-            assert (len(md3.frames) == md3.numFrames)
-            md3.surfaces.append(nsurface)
-            md3.numSurfaces += 1
-
-            # to_mesh creates a copy with modifiers applied - we got to delete that
-            bpy.data.meshes.remove(mesh)
-
-        elif obj.type == 'EMPTY':
-            empties.append(obj)
+    offset_scale_mat = get_matrix(mathutils.Matrix.Translation(
+        settings.offset) @ mathutils.Matrix.Scale(settings.scale, 4))
+
+    # export all selected meshes, remember empties as tags
+    meshes = [obj for obj in bpy.context.selected_objects if obj.type == 'MESH']
+    empties = [obj for obj in bpy.context.selected_objects if obj.type == 'EMPTY']
+
+    # the first frame determines the topology
+    scene.frame_set(scene.frame_start)
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    surfaces = []
+    for obj in meshes:
+        evaluated = obj.evaluated_get(depsgraph)
+        # to_mesh creates a copy with modifiers applied - we got to delete that
+        mesh = evaluated.to_mesh()
+        nsurface, vertlist = build_surface(log, settings, obj, mesh)
+        numMeshVerts = len(mesh.vertices)
+        evaluated.to_mesh_clear()
+        surfaces.append((obj, nsurface, vertlist, np.empty((md3.numFrames, numMeshVerts, 3), dtype=np.float32),
+                         np.empty((md3.numFrames, numMeshVerts, 3), dtype=np.float32)))
+
+    # sweep the timeline once, capturing everything that's animated
+    tagMatrices = np.empty((md3.numFrames, len(empties), 4, 4))
+    for frameIndex, frame in enumerate(frames):
+        scene.frame_set(frame)
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        for obj, nsurface, vertlist, positions, normals in surfaces:
+            evaluated = obj.evaluated_get(depsgraph)
+            frame_mesh = evaluated.to_mesh()
+            if len(frame_mesh.vertices) != positions.shape[1]:
+                evaluated.to_mesh_clear()
+                message(log, "{} changes its vertex count in frame {}, can't export it!".format(obj.name, frame))
+                if log:
+                    log.close()
+                return
+            co, normals[frameIndex] = get_mesh_vertices(frame_mesh)
+            matrix = offset_scale_mat @ get_matrix(evaluated.matrix_world)
+            positions[frameIndex] = co @ matrix[:3, :3].T + matrix[:3, 3]
+            evaluated.to_mesh_clear()
+        for tagIndex, obj in enumerate(empties):
+            tagMatrices[frameIndex, tagIndex] = get_matrix(obj.matrix_world)
+
+    for obj, nsurface, vertlist, positions, normals in surfaces:
+        nsurface.verts = np.empty((md3.numFrames, nsurface.numVerts), dtype=JAMd3Encode.MD3_VERT_DTYPE)
+        nsurface.verts["xyz"] = JAMd3Encode.EncodePositions(np.round(positions[:, vertlist], 5))
+        nsurface.verts["normal"] = JAMd3Encode.EncodeNormals(normals[:, vertlist])
+        nsurface.numFrames = md3.numFrames
+        md3.surfaces.append(nsurface)
+        md3.numSurfaces += 1
+
+    # the frame bounds cover all surfaces
+    allPositions = np.concatenate([np.round(positions[:, vertlist], 5) for _, _, vertlist, positions, _ in surfaces] +
+                                  [np.zeros((md3.numFrames, 0, 3))], axis=1)
+    mins, maxs, radius = JAMd3Encode.ComputeFrameBounds(allPositions)
+    for frameIndex, frame in enumerate(frames):
+        nframe = JAMd3Encode.md3Frame()
+        nframe.name = str(frame)
+        nframe.mins = mins[frameIndex].tolist()
+        nframe.maxs = maxs[frameIndex].tolist()
+        nframe.radius = float(radius[frameIndex])
+        md3.frames.append(nframe)
 
     # write empties(=tags) in correct order - tag1frame1, tag2frame1, ..., tag1frame2, tag2frame2, ...
     md3.numTags = len(empties)
-    for frame in range(bpy.context.scene.frame_start, bpy.context.scene.frame_end + 1):
-        bpy.context.scene.frame_set(frame)
-        for obj in empties:
-            ntag = JAMd3Encode.md3Tag()
-            ntag.name = obj.name
-            ntag.origin = [round(
-                (obj.matrix_world[i][3] * settings.scale) + settings.offset[i], 5) for i in range(3)]
-            ntag.axis = [obj.matrix_world[x][y]
-                         for y in range(3) for x in range(3)]
-            md3.tags.append(ntag)
+    md3.tags = np.zeros((md3.numFrames, md3.numTags), dtype=JAMd3Encode.MD3_TAG_DTYPE)
+    md3.tags["name"] = [obj.name.encode('utf-8') for obj in empties]
+    md3.tags["origin"] = np.round(tagMatrices[..., :3, 3] * settings.scale + settings.offset, 5)
+    # the axes are the matrix' columns
+    md3.tags["axis"] = np.swapaxes(tagMatrices[..., :3, :3], -1, -2).reshape(md3.numFrames, md3.numTags, 9)
 
     if bpy.context.selected_objects:
         file = open(settings.savepath, "wb")
@@ -305,7 +326,7 @@ def save_md3(settings):
         print_md3(log, md3, settings.dumpall)
         file.close()
         message(log, "MD3 saved to " + settings.savepath)
-        elapsedtime = round(time.clock() - starttime, 5)  # TODO: time.clock() removed in Python 3.8, see save_md3()'s starttime
+        elapsedtime = round(time.perf_counter() - starttime, 5)
         message(log, "Elapsed {} seconds".format(elapsedtime))
     else:
         message(log, "Select an object to export!")
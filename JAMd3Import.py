@@ -0,0 +1,154 @@
+from .mod_reload import reload_modules
+reload_modules(locals(), __package__, ["JAAnimationhelper", "JAG2GLAFormat", "JAMd3Encode"], [".casts"])  # nopep8
+
+import bpy
+import mmap
+import struct
+import time
+import numpy as np
+from typing import Set
+from . import JAAnimationhelper
+from . import JAG2GLAFormat
+from . import JAMd3Encode
+from .casts import OperatorReturnItems
+
+
+# parses the file through a memory map, so the vertex arrays get decoded straight from the OS's pages
+def load_md3(filepath):
+    md3 = JAMd3Encode.md3Object()
+    with open(filepath, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            md3.Deserialize(data)
+    return md3
+
+
+def surface_to_blender(md3, surface, frame_start):
+    # (numFrames, numVerts, 3)
+    positions = JAMd3Encode.DecodePositions(surface.verts["xyz"])
+
+    mesh = bpy.data.meshes.new(surface.name)
+    mesh.from_pydata(positions[0], [], surface.triangles)
+
+    shader = surface.shaders[0].name if len(surface.shaders) > 0 else "NULL"
+    material = bpy.data.materials.get(shader)
+    if material is None:
+        material = bpy.data.materials.new(name=shader)
+    mesh.materials.append(material)
+
+    mesh.polygons.foreach_set("use_smooth", np.ones(len(mesh.polygons), dtype=bool))
+    mesh.normals_split_custom_set_from_vertices(JAMd3Encode.DecodeNormals(surface.verts["normal"][0]))
+
+    # per loop
+    uv_layer = mesh.uv_layers.new(do_init=False, name="UVMap")
+    uv_layer.data.foreach_set("uv", surface.uv[surface.triangles.ravel()].astype(np.float32).ravel())
+
+    mesh.validate()
+    mesh.update()
+
+    obj = bpy.data.objects.new(surface.name, mesh)
+    # read by the exporter
+    obj["md3shader"] = shader
+
+    # every frame becomes an absolute shape key, the animation just moves the key's evaluation time along.
+    # a single frame needs no shape keys.
+    if surface.numFrames > 1:
+        obj.shape_key_add(name=md3.frames[0].name or "0", from_mix=False)
+        key = mesh.shape_keys
+        assert key is not None
+        key.use_relative = False
+        for frame in range(1, surface.numFrames):
+            block = obj.shape_key_add(name=md3.frames[frame].name or str(frame), from_mix=False)
+            block.data.foreach_set("co", positions[frame].ravel())
+        times = np.empty(len(key.key_blocks), dtype=np.float32)
+        for i, block in enumerate(key.key_blocks):
+            # the default interpolation smooths out the frames
+            block.interpolation = 'KEY_LINEAR'
+            times[i] = block.frame
+        action = JAAnimationhelper.ensureAction(key, surface.name + "_frames")
+        JAAnimationhelper.setKeyframes(JAAnimationhelper.ensureFCurve(action, key, "eval_time"),
+                                       frame_start + np.arange(surface.numFrames), times)
+    return obj
+
+
+def tags_to_blender(md3, frame_start):
+    # (numFrames, numTags, 3) and (numFrames, numTags, 3, 3), the axes being the rows
+    origins = md3.tags["origin"].astype(np.float64)
+    axes = md3.tags["axis"].astype(np.float64).reshape(md3.numFrames, md3.numTags, 3, 3)
+    # scaled tags have longer axes, only their directions make up the rotation
+    lengths = np.linalg.norm(axes, axis=-1, keepdims=True)
+    axes /= np.where(lengths == 0, 1, lengths)
+    # the axes are the rotation matrices' columns
+    rotations = JAG2GLAFormat.matricesToQuaternions(np.swapaxes(axes, -1, -2))
+    # keep neighbouring frames in the same hemisphere so the interpolation takes the short way
+    flips = np.sum(rotations[1:] * rotations[:-1], axis=-1) < 0
+    signs = np.concatenate([np.ones((1,) + flips.shape[1:]), np.cumprod(np.where(flips, -1, 1), axis=0)])
+    rotations *= signs[..., np.newaxis]
+    frames = frame_start + np.arange(md3.numFrames)
+    objects = []
+    for tagIndex in range(md3.numTags):
+        obj = bpy.data.objects.new(JAMd3Encode.DecodeString(md3.tags[0, tagIndex]["name"]), None)
+        obj.empty_display_type = 'ARROWS'
+        obj.rotation_mode = 'QUATERNION'
+        obj.location = origins[0, tagIndex].tolist()
+        obj.rotation_quaternion = rotations[0, tagIndex].tolist()
+        if md3.numFrames > 1:
+            action = JAAnimationhelper.ensureAction(obj, obj.name + "_frames")
+            for index in range(3):
+                JAAnimationhelper.setKeyframes(JAAnimationhelper.ensureFCurve(action, obj, "location", index),
+                                               frames, origins[:, tagIndex, index])
+            for index in range(4):
+                JAAnimationhelper.setKeyframes(JAAnimationhelper.ensureFCurve(action, obj, "rotation_quaternion", index),
+                                               frames, rotations[:, tagIndex, index])
+        objects.append(obj)
+    return objects
+
+
+def md3_to_blender(md3, context):
+    scene = context.scene
+    frame_start = scene.frame_start
+    objects = [surface_to_blender(md3, surface, frame_start) for surface in md3.surfaces]
+    objects.extend(tags_to_blender(md3, frame_start))
+    for obj in context.selected_objects:
+        obj.select_set(False)
+    for obj in objects:
+        context.collection.objects.link(obj)
+        obj.select_set(True)
+    if len(md3.surfaces) > 0:
+        context.view_layer.objects.active = objects[0]
+    if md3.numFrames > 1:
+        scene.frame_end = frame_start + md3.numFrames - 1
+    return objects
+
+
+### The MD3 Import operator ###
+
+
+class Operator(bpy.types.Operator):
+    bl_idname = "import_scene.ja_md3"
+    bl_label = "Import JA MD3 (.md3)"
+
+    # gets set by the file select window - internal Blender Magic or whatever.
+    filepath: bpy.props.StringProperty(
+        name="File Path", description="File path used for importing the MD3 file", maxlen=1024, default="")  # type: ignore
+
+    def execute(self, context: bpy.types.Context) -> Set[OperatorReturnItems]:
+        starttime = time.perf_counter()
+        try:
+            md3 = load_md3(bpy.path.ensure_ext(self.filepath, ".md3"))
+        except (OSError, ValueError, struct.error, JAMd3Encode.md3FormatError) as e:
+            self.report({'ERROR'}, "Could not read {}: {}".format(self.filepath, e))
+            return {'CANCELLED'}
+        md3_to_blender(md3, context)
+        print("MD3 imported from {} in {:.3f} seconds".format(self.filepath, time.perf_counter() - starttime))
+        return {'FINISHED'}
+
+    def invoke(self, context: bpy.types.Context, event: bpy.types.Event) -> Set[OperatorReturnItems]:
+        windowMan = context.window_manager
+        assert windowMan is not None
+        # sets self.properties.filename and runs self.execute()
+        windowMan.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+
+def menu_func(self, context):
+    self.layout.operator(Operator.bl_idname, text="JA MD3 (.md3)")
@@ -4,6 +4,7 @@ import os
 # blender imports
 import bpy
 import mathutils
+import numpy as np
 
 
 # Patch format - the patch looks like this, where P is a normal point, C is a control point:
@@ -12,156 +13,63 @@ import mathutils
 # c2 c5 c4
 # p3 c3 p4
 #
-# double braces due to str.format()
-patchFormat = """{{
-patchDef2
-{{
-{shader}
-( 3 3 0 0 0 )
-(
-( ( {p2[0]:.3f} {p2[1]:.3f} {p2[2]:.3f} 0 0 ) ( {c1[0]:.3f} {c1[1]:.3f} {c1[2]:.3f} 0 0 ) ( {p1[0]:.3f} {p1[1]:.3f} {p1[2]:.3f} 0 0 ) )
-( ( {c2[0]:.3f} {c2[1]:.3f} {c2[2]:.3f} 0 0 ) ( {c5[0]:.3f} {c5[1]:.3f} {c5[2]:.3f} 0 0 ) ( {c4[0]:.3f} {c4[1]:.3f} {c4[2]:.3f} 0 0 ) )
-( ( {p3[0]:.3f} {p3[1]:.3f} {p3[2]:.3f} 0 0 ) ( {c3[0]:.3f} {c3[1]:.3f} {c3[2]:.3f} 0 0 ) ( {p4[0]:.3f} {p4[1]:.3f} {p4[2]:.3f} 0 0 ) )
-)
-}}
-}}
-"""
-
-
-def mean2(p1, p2):
-    return [(x[0] + x[1]) / 2 for x in zip(p1, p2)]
-
-
-def mean4(p1, p2, p3, p4):
-    return mean2(mean2(p1, p2), mean2(p3, p4))
-
-
-# Converts 3 or 4 vertice coordinates as [x, y, z] to a Patch Definition as in a .map file
-def coordinatesToPatchDef(shader, p1, p2, p3, p4=None):
-    # Triangle?
-    if not p4:
-        p4 = p3
-    return patchFormat.format(
-        shader=shader,
-        # vertices
-        p1=p1,
-        p2=p2,
-        p3=p3,
-        p4=p4,
-        # control points
-        c1=mean2(p1, p2),
-        c2=mean2(p2, p3),
-        c3=mean2(p3, p4),
-        c4=mean2(p4, p1),
-        c5=mean4(p1, p2, p3, p4)
-    )
-
-# same as above, but they're not nicely distributed
-
-
-def coordinatesToPatchDefAlt(shader, p1, p2, p3, p4=None):
-    # Triangle?
-    if not p4:
-        p4 = p3
-    return patchFormat.format(
-        shader=shader,
-        # vertices
-        p1=p1,
-        p2=p2,
-        p3=p3,
-        p4=p4,
-        # control points
-        c1=p1,
-        c2=p3,
-        c3=p4,
-        c4=p4,
-        c5=p4
-    )
+# patchTemplate(shader) % points gives one patch as in a .map file, taking the 9 points' coordinates row by row,
+# i.e. p2 c1 p1 c2 c5 c4 p3 c3 p4
+def patchTemplate(shader):
+    point = "( %.3f %.3f %.3f 0 0 )"
+    row = "( " + " ".join([point] * 3) + " )\n"
+    return "{\npatchDef2\n{\n" + shader.replace("%", "%%") + "\n( 3 3 0 0 0 )\n(\n" + row * 3 + ")\n}\n}\n"
+
+
+# Converts a (numPatches, 4, 3) array of p1 to p4 (p4 = p3 for triangles) into the (numPatches, 9, 3) points patchTemplate takes
+def cornersToPatchPoints(corners, beautiful):
+    p1, p2, p3, p4 = corners[:, 0], corners[:, 1], corners[:, 2], corners[:, 3]
+    if beautiful:
+        c1 = (p1 + p2) / 2
+        c2 = (p2 + p3) / 2
+        c3 = (p3 + p4) / 2
+        c4 = (p4 + p1) / 2
+        c5 = (c1 + c3) / 2
+    else:
+        c1, c2, c3, c4, c5 = p1, p3, p4, p4, p4
+    return np.stack([p2, c1, p1, c2, c5, c4, p3, c3, p4], axis=1)
+
+
+# The corners of the mesh's tris and quads as (numPatches, 4, 3) array, transformed by matrix. N-Gons are split into triangles.
+def meshPatchCorners(mesh, matrix):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    matrix = np.array(matrix, dtype=np.float64)
+    co = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loopVerts)
+    loopStarts = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_start", loopStarts)
+    loopTotals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loopTotals)
+
+    # loop indices of p1 to p4
+    faceLoops = loopStarts[:, np.newaxis] + np.where(loopTotals[:, np.newaxis] == 3, [0, 1, 2, 2], [0, 1, 2, 3])
+    faceLoops = faceLoops[(loopTotals == 3) | (loopTotals == 4)]
+    ngons = loopTotals > 4
+    if ngons.any():
+        mesh.calc_loop_triangles()
+        triLoops = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("loops", triLoops)
+        triPolygons = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get("polygon_index", triPolygons)
+        triLoops = triLoops.reshape(-1, 3)[ngons[triPolygons]]
+        faceLoops = np.concatenate([faceLoops, triLoops[:, [0, 1, 2, 2]]])
+    return co[loopVerts[faceLoops]]
+
+
+# patches get formatted and written this many at a time
+WRITE_CHUNK_PATCHES = 1 << 14
 
 ### The new operator ###
 
 
-class patchmesh_export_operator(bpy.types.Operator):
-    # everything is scaled down by this factor
-    bl_idname = "export_scene.patchmesh_map"
-    bl_label = "Export Patch Mesh (.map)"
-
-    # gets set by the file select window - IBM (Internal Blender Magic) or whatever.
-    filepath = bpy.props.StringProperty(
-        name="File Path", description="File path used for the .map file", maxlen=1024, default="")
-    scale = bpy.props.FloatProperty(
-        name="Scale", description="Factor by which to scale the object up", min=1, default=1)
-    shader = bpy.props.StringProperty(
-        name="Shader", description="Shader to put on the patches", maxlen=64, default="system/physics_clip")
-    beautiful = bpy.props.BoolProperty(
-        name="Even distribution", description="Whether to evenly distribute the patch handles (if disabled, they'll be at the corners)", default=True)
-
-    def execute(self, context):
-        self.ExportStart(context)
-        return {'FINISHED'}
-
-    def invoke(self, context, event):
-        windowMan = context.window_manager
-        # sets self.properties.filename and runs self.execute()
-        windowMan.fileselect_add(self)
-        return {'RUNNING_MODAL'}
-
-    def ExportStart(self, context):
-        filename = self.properties.filepath
-
-        if os.path.exists(filename):
-            # TODO: Overwrite yes/no
-            pass
-
-        if bpy.ops.object.mode_set.poll():
-            bpy.ops.object.mode_set(mode='OBJECT')
-
-        obj = bpy.context.active_object
-        if not obj:
-            self.report({"ERROR"}, "No active object!")
-            return
-
-        if obj.type != 'MESH':
-            self.report({"ERROR"}, "Active object is no mesh!")
-            return
-
-        scaleMat = mathutils.Matrix.Scale(self.scale, 4)
-
-        # if there are any non-quads/tris (n-gons), so we can warn in the end.
-        ngons = False
-        patchDefFunc = coordinatesToPatchDef
-        if not self.beautiful:
-            patchDefFunc = coordinatesToPatchDefAlt
-
-        mesh = obj.to_mesh(bpy.context.scene, True, 'PREVIEW')
-        try:
-            try:
-                file = open(filename, "w")
-
-                file.write("{\n\"classname\" \"worldspawn\"\n")
-
-                for face in mesh.tessfaces:
-                    if len(face.vertices) in (3, 4):
-                        coordinates = [scaleMat * obj.matrix_world *
-                                       mesh.vertices[x].co for x in face.vertices]
-                        file.write(patchDefFunc(self.shader, *coordinates))
-                    else:
-                        ngons = True
-
-                file.write("}\n")
-
-                file.close()
-            except IOError:
-                self.report({"ERROR"}, "Couldn't create file!")
-                return
-        finally:
-            bpy.data.meshes.remove(mesh)
-
-        if ngons:
-            self.report({'WARNING'}, "Some N-Gons could not be exported!")
-            return
-
-
 class Operator(bpy.types.Operator):
     bl_idname = "export_scene.ja_patchmesh_map"
     bl_label = "Export JA Patch Mesh (.map)"
@@ -207,38 +115,23 @@ class Operator(bpy.types.Operator):
 
         scaleMat = mathutils.Matrix.Scale(self.scale, 4)
 
-        # if there are any non-quads/tris (n-gons), so we can warn in the end.
-        ngons = False
-        patchDefFunc = coordinatesToPatchDef
-        if not self.beautiful:
-            patchDefFunc = coordinatesToPatchDefAlt
-
-        mesh = obj.to_mesh(bpy.context.scene, True, 'PREVIEW')
+        evaluated = obj.evaluated_get(context.evaluated_depsgraph_get())
+        mesh = evaluated.to_mesh()
         try:
-            try:
-                file = open(filename, "w")
+            points = cornersToPatchPoints(meshPatchCorners(mesh, scaleMat @ obj.matrix_world), self.beautiful)
+        finally:
+            evaluated.to_mesh_clear()
+        rows = points.reshape(-1, 27)
+        template = patchTemplate(self.shader)
 
+        try:
+            with open(filename, "w") as file:
                 file.write("{\n\"classname\" \"worldspawn\"\n")
-
-                for face in mesh.tessfaces:
-                    if len(face.vertices) in (3, 4):
-                        coordinates = [scaleMat * obj.matrix_world *
-                                       mesh.vertices[x].co for x in face.vertices]
-                        file.write(patchDefFunc(self.shader, *coordinates))
-                    else:
-                        ngons = True
-
+                for start in range(0, len(rows), WRITE_CHUNK_PATCHES):
+                    file.write("".join([template % tuple(row) for row in rows[start:start + WRITE_CHUNK_PATCHES].tolist()]))
                 file.write("}\n")
-
-                file.close()
-            except IOError:
-                self.report({"ERROR"}, "Couldn't create file!")
-                return
-        finally:
-            bpy.data.meshes.remove(mesh)
-
-        if ngons:
-            self.report({'WARNING'}, "Some N-Gons could not be exported!")
+        except IOError:
+            self.report({"ERROR"}, "Couldn't create file!")
             return
 
 
@@ -1,8 +1,11 @@
+from .mod_reload import reload_modules
+reload_modules(locals(), __package__, ["JARoffImport"], [])  # nopep8
 
 import bpy
-import math
 import struct
 import os
+import numpy as np
+from . import JARoffImport
 
 
 ### The ROFF Export operator ###
@@ -15,7 +18,7 @@ class Operator(bpy.types.Operator):
 
     # gets set by the file select window - IBM (Internal Blender Magic) or whatever.
     filepath: bpy.props.StringProperty(
-        name="File Path", description="File path used for the ROFF file", maxlen=1024, default="")  # type: ignore
+        name="File Path", description="File path used for the ROFF file. With several objects selected, each is saved to this directory, named after the object", maxlen=1024, default="")  # type: ignore
 
     def execute(self, context):
         self.ExportStart(context)
@@ -31,16 +34,30 @@ class Operator(bpy.types.Operator):
         print("\nROFF exporter by Mr. Wonko\n")
         filename = bpy.path.ensure_ext(self.filepath, ".rof")
 
-        if os.path.exists(filename):
+        objlist = list(bpy.context.selected_objects)
+        if len(objlist) == 0:
+            self.report({"ERROR"}, "Please select at least one object!")
+            return
+
+        # several objects get saved next to each other, named after the object
+        if len(objlist) == 1:
+            filenames = [filename]
+        else:
+            directory = os.path.dirname(filename)
+            filenames = [os.path.join(directory, bpy.path.clean_name(obj.name) + ".rof") for obj in objlist]
+            # different names can clean up to the same file, which would get silently overwritten
+            seen = {}
+            for obj, name in zip(objlist, filenames):
+                key = os.path.normcase(name)
+                if key in seen:
+                    self.report({"ERROR"}, "\"" + seen[key] + "\" and \"" + obj.name + "\" would both be saved to " + name + ", please rename one of them!")
+                    return
+                seen[key] = obj.name
+
+        if any(os.path.exists(name) for name in filenames):
             # TODO: Overwrite yes/no
             pass
 
-        objlist = bpy.context.selected_objects
-        if len(objlist) != 1:
-            self.report({"ERROR"}, "Please select exactly one object!")
-            return
-        obj = objlist[0]
-
         scn = context.scene
         numframes = scn.frame_end - scn.frame_start
         if numframes == 0:
@@ -48,42 +65,35 @@ class Operator(bpy.types.Operator):
                 {"ERROR"}, "Since relative movement is saved, I need more than 1 frame!")
             return
 
-        print("Exporting movement of "+obj.name)
-
-        try:
-            file = open(filename, "wb")
-            # ident, version, frames, frame duration in ms, unknown
-            file.write(struct.pack("4s4i", b"ROFF", 2, numframes,
-                       round(1000/context.scene.render.fps), 0))
-
-            prevframe = scn.frame_current
-
-            scn.frame_set(scn.frame_start)
-            # init these
-            lastpos = obj.matrix_world.translation.copy()
-            lastrot = obj.matrix_world.to_euler()
-
-            # first frame has no change (roff is relative), hence it is skipped
-            for curFrame in range(scn.frame_start + 1, scn.frame_end + 1):
-                scn.frame_set(curFrame)
-                # print("exporting frame {}".format(scn.frame_current))
-
-                pos = obj.matrix_world.translation
-                rot = obj.matrix_world.to_euler()
-
-                # rotation: y z x
-                file.write(struct.pack("6f2i", (pos[0] - lastpos[0])*self.scale, (pos[1] - lastpos[1])*self.scale, (pos[2] - lastpos[2]) *
-                           self.scale, math.degrees(rot[1] - lastrot[1]), math.degrees(rot[2] - lastrot[2]), math.degrees(rot[0] - lastrot[0]), -1, 0))
-
-                lastpos = pos.copy()
-                lastrot = rot.copy()
-
-            scn.frame_current = prevframe
-
-            file.close()
-        except IOError:
-            self.report({"ERROR"}, "Couldn't create file!")
-            return
+        print("Exporting movement of " + ", ".join(obj.name for obj in objlist))
+
+        # (frames, objects, 3) world positions and rotations, evaluating each frame once for all objects
+        positions = np.empty((numframes + 1, len(objlist), 3))
+        rotations = np.empty((numframes + 1, len(objlist), 3))
+        prevframe = scn.frame_current
+        for frameIndex in range(numframes + 1):
+            scn.frame_set(scn.frame_start + frameIndex)
+            for objIndex, obj in enumerate(objlist):
+                positions[frameIndex, objIndex] = obj.matrix_world.translation
+                rotations[frameIndex, objIndex] = obj.matrix_world.to_euler()
+        scn.frame_set(prevframe)
+
+        # first frame has no change (roff is relative), hence it is skipped
+        frames = np.zeros((numframes, len(objlist)), dtype=JARoffImport.ROFF_FRAME_DTYPE)
+        frames["translation"] = np.diff(positions, axis=0) * self.scale
+        # rotation: y z x
+        frames["rotation"] = np.degrees(np.diff(rotations, axis=0))[:, :, [1, 2, 0]]
+        frames["unknown"] = (-1, 0)
+
+        # ident, version, frames, frame duration in ms, unknown
+        header = struct.pack("4s4i", b"ROFF", 2, numframes, round(1000/context.scene.render.fps), 0)
+        for objIndex, name in enumerate(filenames):
+            try:
+                with open(name, "wb") as file:
+                    file.write(header + frames[:, objIndex].tobytes())
+            except IOError:
+                self.report({"ERROR"}, "Couldn't create file " + name + "!")
+                return
 
 
 def menu_func(self, context):
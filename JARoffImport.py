@@ -1,6 +1,13 @@
+from .mod_reload import reload_modules
+reload_modules(locals(), __package__, ["JAAnimationhelper"], [])  # nopep8
+
 import bpy
-import math
 import struct
+import numpy as np
+from . import JAAnimationhelper
+
+# one frame: translation, rotation (y z x, in degrees), then 8 bytes that always contain 0xFFFFFFFF00000000 (-1 & 0)
+ROFF_FRAME_DTYPE = np.dtype([("translation", "<f4", (3,)), ("rotation", "<f4", (3,)), ("unknown", "<i4", (2,))])
 
 ### The ROFF Import operator ###
 
@@ -33,67 +40,53 @@ class Operator(bpy.types.Operator):
             return
         obj = objlist[0]
         try:
-            file = open(filename, "rb")
-            # I don't know what the last 4 bytes are, they (nearly) always contain (int) 0 (once it was 7, once 8...)
-            ident, version, frames, frameDuration = struct.unpack(
-                "4s3i4x", file.read(20))
-            if ident != b"ROFF":
-                self.report({"ERROR"}, "That's no ROFF file!")
-                return
-            if version != 2:
-                self.report(
-                    {"ERROR"}, "Wrong ROFF version, only 2 is supported! (file is "+str(version)+")")
-                return
-            if obj.rotation_mode != "XYZ":
-                self.report(
-                    {"ERROR"}, "Object's rotation mode is not XYZ, I can't handle that, sorry.! (It's "+obj.rotation_mode+")")
-                return
-
-            scn = bpy.context.scene
-            scn.frame_start = 0
-            scn.frame_end = frames
-            scn.frame_current = 0
-            scn.render.fps = 1000/frameDuration  # supposedly read-only?
-
-            # add keyframe at frame 0 with current position
-
-            obj.keyframe_insert("location")
-            obj.keyframe_insert("rotation_euler")
-
-            for frame in range(frames):
-                # set the current frame
-                scn.frame_current = frame + 1
-                # I don't know what the last 8 bytes are, they always contain 0xFFFFFFFF00000000 (-1 & 0) - I trash them.
-                dx, dy, dz, droty, drotz, drotx = struct.unpack(
-                    "6f8x", file.read(32))
-
-                # translate the object (it's the only selected object so the operators operate on it)
-                bpy.ops.transform.translate(
-                    value=(dx/self.SCALE, dy/self.SCALE, dz/self.SCALE))
-
-                # rotate the object - unsure how to do the rotations using bpy.ops.transform.rotate
-                # (Blender now uses Radians. Deal with it.)
-                drot = drotx, droty, drotz
-                obj.rotation_euler[0] = obj.rotation_euler[0] + \
-                    math.radians(drotx)
-                obj.rotation_euler[1] = obj.rotation_euler[1] + \
-                    math.radians(droty)
-                obj.rotation_euler[2] = obj.rotation_euler[2] + \
-                    math.radians(drotz)
-
-                # save keyframe
-                obj.keyframe_insert("location")
-                obj.keyframe_insert("rotation_euler")
-
-            # back to frame 0
-            scn.frame_current = 0
-            # set the interpolation to linear
-            for curve in obj.animation_data.action.fcurves:
-                for point in curve.keyframe_points:
-                    point.interpolation = "LINEAR"
+            with open(filename, "rb") as file:
+                # I don't know what the last 4 bytes are, they (nearly) always contain (int) 0 (once it was 7, once 8...)
+                ident, version, frames, frameDuration = struct.unpack(
+                    "4s3i4x", file.read(20))
+                if ident != b"ROFF":
+                    self.report({"ERROR"}, "That's no ROFF file!")
+                    return
+                if version != 2:
+                    self.report(
+                        {"ERROR"}, "Wrong ROFF version, only 2 is supported! (file is "+str(version)+")")
+                    return
+                deltas = np.frombuffer(file.read(frames * ROFF_FRAME_DTYPE.itemsize), dtype=ROFF_FRAME_DTYPE)
         except IOError:
             self.report({"ERROR"}, "Couldn't open file!")
             return
+        if len(deltas) != frames:
+            self.report({"ERROR"}, "File is truncated, expected {} frames but found {}!".format(frames, len(deltas)))
+            return
+        if obj.rotation_mode != "XYZ":
+            self.report(
+                {"ERROR"}, "Object's rotation mode is not XYZ, I can't handle that, sorry.! (It's "+obj.rotation_mode+")")
+            return
+
+        scn = bpy.context.scene
+        scn.frame_start = 0
+        scn.frame_end = frames
+        scn.frame_current = 0
+        scn.render.fps = round(1000/frameDuration)
+
+        # absolute values for frame 0 (the current transform) to frames, the ROFF storing the change per frame
+        locations = np.empty((frames + 1, 3))
+        locations[0] = obj.location
+        locations[1:] = locations[0] + np.cumsum(deltas["translation"] / self.SCALE, axis=0)
+        rotations = np.empty((frames + 1, 3))
+        rotations[0] = obj.rotation_euler
+        # y z x -> x y z
+        rotations[1:] = rotations[0] + np.cumsum(np.radians(deltas["rotation"][:, [2, 0, 1]]), axis=0)
+
+        # replace any previous location and rotation animation, with linear interpolation
+        action = JAAnimationhelper.ensureAction(obj, obj.name + "Action")
+        frameNumbers = np.arange(frames + 1)
+        for index in range(3):
+            JAAnimationhelper.setKeyframes(JAAnimationhelper.ensureFCurve(
+                action, obj, "location", index), frameNumbers, locations[:, index])
+            JAAnimationhelper.setKeyframes(JAAnimationhelper.ensureFCurve(
+                action, obj, "rotation_euler", index), frameNumbers, rotations[:, index])
+        scn.frame_set(0)
 
 
 def menu_func(self, context):
@@ -16,8 +16,15 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum
+import json
+import os
+import threading
 import time
-from typing import Dict
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 
 class SimpleProfiler:
@@ -25,9 +32,12 @@ class SimpleProfiler:
         self.startTimes: Dict[str, float] = {}
         self.printOutput = printOutput
 
-    # starts a clock of the given name
+    # starts a clock of the given name (and a span of the same name, if profiling)
     def start(self, name: str):
         self.startTimes[name] = time.perf_counter()
+        profiler = _activeOnThisThread()
+        if profiler is not None:
+            profiler.push(name)
         if self.printOutput:
             print("Start: {}".format(name))
 
@@ -35,8 +45,235 @@ class SimpleProfiler:
     def stop(self, name: str) -> int | float:
         if name not in self.startTimes:
             return -1
+        profiler = _activeOnThisThread()
+        if profiler is not None:
+            profiler.popNamed(name)
         timeTaken = time.perf_counter() - self.startTimes[name]
         del self.startTimes[name]
         if self.printOutput:
             print("Done: {} - time taken: {:.3f}s".format(name, timeTaken))
         return timeTaken
+
+
+#  Hierarchical profiling
+# Code marks interesting regions with `with MrwProfiler.span("name"):` and bumps counters with
+# MrwProfiler.count("name", amount). Both do nothing unless a profiler is active (see profiling()),
+# so they can stay in the code permanently.
+
+PROFILE_ENV_VAR = "JA_PROFILE"
+
+
+class ProfileMode(Enum):
+    OFF = 'OFF'
+    SUMMARY = 'SUMMARY'  # print a table of the spans
+    TRACE = 'TRACE'  # write a Chrome trace (chrome://tracing, ui.perfetto.dev)
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    end: float = 0
+    counters: Dict[str, int] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+    # traced Python memory (bytes) when the span started, and the maximum while it was running
+    memoryStart: int = 0
+    memoryPeak: int = 0
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class HierarchicalProfiler:
+    def __init__(self, traceMemory: bool = True):
+        self.traceMemory = traceMemory
+        self.root = Span("total", time.perf_counter())
+        self.stack = [self.root]
+        # spans and counters from other threads are ignored, the stack only makes sense for one
+        self.threadId = threading.get_ident()
+        self.startedTracing = False
+
+    def begin(self) -> None:
+        if self.traceMemory:
+            self.startedTracing = not tracemalloc.is_tracing()
+            if self.startedTracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            self.root.memoryStart = self.root.memoryPeak = tracemalloc.get_traced_memory()[0]
+        self.root.start = time.perf_counter()
+
+    def finish(self) -> None:
+        # spans left open by an early return get closed here
+        while len(self.stack) > 1:
+            self.pop()
+        self._updatePeak(self.root)
+        self.root.end = time.perf_counter()
+        if self.traceMemory and self.startedTracing:
+            tracemalloc.stop()
+
+    def _updatePeak(self, span: Span) -> None:
+        if self.traceMemory:
+            span.memoryPeak = max(span.memoryPeak, tracemalloc.get_traced_memory()[1])
+
+    def push(self, name: str) -> None:
+        span = Span(name, time.perf_counter())
+        if self.traceMemory:
+            # the parent's peak so far has to be remembered before resetting it for the child
+            self._updatePeak(self.stack[-1])
+            tracemalloc.reset_peak()
+            span.memoryStart = span.memoryPeak = tracemalloc.get_traced_memory()[0]
+        self.stack[-1].children.append(span)
+        self.stack.append(span)
+
+    def pop(self) -> None:
+        span = self.stack.pop()
+        self._updatePeak(span)
+        span.end = time.perf_counter()
+        parent = self.stack[-1]
+        parent.memoryPeak = max(parent.memoryPeak, span.memoryPeak)
+
+    # pops all spans up to and including the innermost one called name, if there is one
+    def popNamed(self, name: str) -> None:
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i].name == name:
+                while len(self.stack) > i:
+                    self.pop()
+                return
+
+    def count(self, name: str, amount: int) -> None:
+        counters = self.stack[-1].counters
+        counters[name] = counters.get(name, 0) + amount
+
+    def toChromeTrace(self) -> Dict[str, Any]:
+        events: List[Dict[str, Any]] = []
+        pid = os.getpid()
+
+        def addEvents(span: Span) -> None:
+            args: Dict[str, Any] = dict(span.counters)
+            if self.traceMemory:
+                args["peak memory (bytes)"] = span.memoryPeak
+                args["memory delta (bytes)"] = span.memoryPeak - span.memoryStart
+            events.append({
+                "name": span.name,
+                "ph": "X",  # complete event
+                "ts": (span.start - self.root.start) * 1e6,
+                "dur": span.duration * 1e6,
+                "pid": pid,
+                "tid": 0,
+                "args": args,
+            })
+            for child in span.children:
+                addEvents(child)
+        addEvents(self.root)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def writeChromeTrace(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.toChromeTrace(), file)
+
+    # returns a table of all spans, with spans of the same name under the same parent merged
+    def summary(self) -> str:
+        lines = [f"{'span':<50} {'calls':>6} {'total s':>9} {'self s':>9} {'peak MiB':>9}  counters"]
+
+        def addLines(spans: List[Span], depth: int) -> None:
+            byName: Dict[str, List[Span]] = {}
+            for span in spans:
+                byName.setdefault(span.name, []).append(span)
+            for name, group in byName.items():
+                total = sum(span.duration for span in group)
+                children = [child for span in group for child in span.children]
+                selfTime = total - sum(child.duration for child in children)
+                peak = f"{max(span.memoryPeak for span in group) / 2**20:9.1f}" if self.traceMemory else f"{'-':>9}"
+                counters: Dict[str, int] = {}
+                for span in group:
+                    for counter, amount in span.counters.items():
+                        counters[counter] = counters.get(counter, 0) + amount
+                counterText = ", ".join(f"{counter}={amount}" for counter, amount in counters.items())
+                label = "  " * depth + name
+                lines.append(f"{label:<50} {len(group):>6} {total:9.3f} {selfTime:9.3f} {peak}  {counterText}")
+                addLines(children, depth + 1)
+        addLines([self.root], 0)
+        return "\n".join(lines)
+
+
+_active: Optional[HierarchicalProfiler] = None
+
+
+def _activeOnThisThread() -> Optional[HierarchicalProfiler]:
+    if _active is not None and _active.threadId == threading.get_ident():
+        return _active
+    return None
+
+
+# whether an operation on this thread is being profiled, which only works if it doesn't return control to Blender halfway
+def isProfiling() -> bool:
+    return _activeOnThisThread() is not None
+
+
+# marks a (nested) region of code; a no-op unless profiling
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    profiler = _activeOnThisThread()
+    if profiler is None:
+        yield
+        return
+    profiler.push(name)
+    try:
+        yield
+    finally:
+        profiler.pop()
+
+
+# adds amount to the counter of the given name in the innermost span; a no-op unless profiling
+def count(name: str, amount: int = 1) -> None:
+    profiler = _activeOnThisThread()
+    if profiler is not None:
+        profiler.count(name, amount)
+
+
+# JA_PROFILE=summary or JA_PROFILE=trace enable profiling for every operation, JA_PROFILE=<file>.json
+# writes the trace there instead of next to the exported/imported file.
+def modeFromEnvironment() -> Tuple[ProfileMode, str]:
+    value = os.environ.get(PROFILE_ENV_VAR, "")
+    if value == "":
+        return ProfileMode.OFF, ""
+    if value.lower() == "summary":
+        return ProfileMode.SUMMARY, ""
+    if value.lower() == "trace":
+        return ProfileMode.TRACE, ""
+    if value.lower().endswith(".json"):
+        return ProfileMode.TRACE, value
+    print(f"Warning: unknown {PROFILE_ENV_VAR} value {value!r}, expected summary, trace or a .json path")
+    return ProfileMode.OFF, ""
+
+
+# profiles everything run inside the with block (on this thread) if mode or the environment says so
+# tracePath: where to write the Chrome trace to, unless the environment specifies a file
+@contextmanager
+def profiling(mode: ProfileMode, tracePath: str) -> Iterator[Optional[HierarchicalProfiler]]:
+    global _active
+    if mode == ProfileMode.OFF:
+        mode, envTracePath = modeFromEnvironment()
+        if envTracePath != "":
+            tracePath = envTracePath
+    if mode == ProfileMode.OFF or _active is not None:
+        # nested operations show up as part of the outer profile
+        yield None
+        return
+    profiler = HierarchicalProfiler()
+    _active = profiler
+    profiler.begin()
+    try:
+        yield profiler
+    finally:
+        _active = None
+        profiler.finish()
+        if mode == ProfileMode.TRACE:
+            try:
+                profiler.writeChromeTrace(tracePath)
+                print(f"Wrote profiling trace to {tracePath}")
+            except OSError as e:
+                print(f"Could not write profiling trace to {tracePath}: {e}")
+        else:
+            print(profiler.summary())
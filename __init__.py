@@ -19,7 +19,7 @@
 #  Imports
 
 from .mod_reload import reload_modules
-reload_modules(locals(), __package__, ["JAAseExport", "JAAseImport", "JAPatchExport", "JARoffImport", "JARoffExport", "JAG2Panels", "JAG2Operators"], [])  # nopep8
+reload_modules(locals(), __package__, ["JAAseExport", "JAAseImport", "JAPatchExport", "JARoffImport", "JARoffExport", "JAMd3Import", "JAG2Panels", "JAG2Operators", "JAMaterialmanager"], [])  # nopep8
 
 #  Blender
 import bpy
@@ -33,14 +33,17 @@ from . import JAPatchExport
 # ROFF
 from . import JARoffImport
 from . import JARoffExport
+# MD3
+from . import JAMd3Import
 # Ghoul 2
 from . import JAG2Panels
 from . import JAG2Operators
+from . import JAMaterialmanager
 
 bl_info = {
     "name": "Jedi Academy Import/Export Tools",
     "author": "mrwonko, Cagelight et al",
-    "description": "Various Jedi Knight: Jedi Academy related tools: Importers for ASE, GLA, GLM, ROFF and Exporters for ASE, GLA, GLM, animation.cfg, ROFF",
+    "description": "Various Jedi Knight: Jedi Academy related tools: Importers for ASE, GLA, GLM, MD3, ROFF and Exporters for ASE, GLA, GLM, animation.cfg, ROFF",
     "version": (2, 0, 0),
     "blender": (4, 1, 0),
     "location": "File > Import-Export",
@@ -57,9 +60,11 @@ def register():
     bpy.utils.register_class(JARoffExport.Operator)
     bpy.utils.register_class(JAAseImport.Operator)
     bpy.utils.register_class(JARoffImport.Operator)
+    bpy.utils.register_class(JAMd3Import.Operator)
 
     JAG2Panels.register()
     JAG2Operators.register()
+    JAMaterialmanager.register()
 
     bpy.types.TOPBAR_MT_file_export.append(JAAseExport.menu_func)
     bpy.types.TOPBAR_MT_file_export.append(JAPatchExport.menu_func)
@@ -67,6 +72,7 @@ def register():
 
     bpy.types.TOPBAR_MT_file_import.append(JAAseImport.menu_func)
     bpy.types.TOPBAR_MT_file_import.append(JARoffImport.menu_func)
+    bpy.types.TOPBAR_MT_file_import.append(JAMd3Import.menu_func)
 
 
 def unregister():
@@ -75,9 +81,11 @@ def unregister():
     bpy.utils.unregister_class(JARoffExport.Operator)
     bpy.utils.unregister_class(JAAseImport.Operator)
     bpy.utils.unregister_class(JARoffImport.Operator)
+    bpy.utils.unregister_class(JAMd3Import.Operator)
 
     JAG2Panels.unregister()
     JAG2Operators.unregister()
+    JAMaterialmanager.unregister()
 
     bpy.types.TOPBAR_MT_file_export.remove(JAAseExport.menu_func)
     bpy.types.TOPBAR_MT_file_export.remove(JAPatchExport.menu_func)
@@ -85,6 +93,7 @@ def unregister():
 
     bpy.types.TOPBAR_MT_file_import.remove(JAAseImport.menu_func)
     bpy.types.TOPBAR_MT_file_import.remove(JARoffImport.menu_func)
+    bpy.types.TOPBAR_MT_file_import.remove(JAMd3Import.menu_func)
 
 
 if __name__ == "__main__":
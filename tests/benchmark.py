@@ -0,0 +1,218 @@
+"""Performance benchmarks on synthetic production-scale Ghoul 2 files.
+
+Run headless, from the repository root:
+
+    blender --background --python-exit-code 1 --python tests/benchmark.py -- [options]
+
+Generates a skeleton (72 bones, 20000 frames) and a multi-LOD model (50000 vertices) in a
+temporary directory, then times each phase separately - parsing, creating Blender data, reading
+it back from Blender, and writing the files - recording wall time and peak RSS. Results are
+written to JSON and compared against a baseline from an earlier --save-baseline run on the same
+machine; the script fails if any phase got slower or bigger than the configured thresholds.
+
+Only the first --import-frames frames get applied to the armature, since importing all 20000
+frames that way takes hours. Use --size small for a quick sanity check.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import synthetic_assets  # noqa: E402 - path must be set up first
+import testutil  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "tests", "benchmark_baseline.json")
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "bench_output.json")
+
+SKELETON_REL = "models/benchmark/skeleton"
+MODEL_REL = "models/benchmark/model"
+EXPORT_SUFFIX = "_export"
+
+SIZES = {
+    "full": (synthetic_assets.SkeletonSpec(), synthetic_assets.ModelSpec()),
+    "small": (synthetic_assets.SkeletonSpec(num_frames=500, pose_steps=32),
+              synthetic_assets.ModelSpec(lod_vertices=(2500, 1500), num_surfaces=8)),
+}
+
+
+def _parse_args() -> argparse.Namespace:
+    # blender passes everything after "--" on to the script
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    parser = argparse.ArgumentParser(prog="benchmark.py", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=sorted(SIZES), default="full", help="size of the generated files")
+    parser.add_argument("--import-frames", type=int, default=100, help="number of frames to apply to the armature")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline instead of comparing")
+    parser.add_argument("--time-threshold", type=float, default=1.25, help="maximum allowed time ratio to the baseline")
+    parser.add_argument("--memory-threshold", type=float, default=1.25, help="maximum allowed peak RSS ratio to the baseline")
+    parser.add_argument("--min-seconds", type=float, default=0.1,
+                        help="ignore slowdowns smaller than this many seconds, so very short phases don't fail on noise")
+    return parser.parse_args(argv)
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the kernel's peak RSS counter (Linux only). Returns whether that worked."""
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # no way to reset this one, so it's the peak of the whole process so far
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == "darwin" else maxrss / 1024
+
+
+class Benchmark:
+    def __init__(self) -> None:
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.per_phase_rss = _reset_peak_rss()
+
+    def run(self, name: str, fn: Callable[[], None]) -> None:
+        print(f"[bench] Running {name}...")
+        _reset_peak_rss()
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+        self.phases[name] = {"seconds": seconds, "peak_rss_mb": _peak_rss_mb()}
+        print(f"[bench] {name}: {seconds:.3f}s, peak RSS {self.phases[name]['peak_rss_mb']:.1f} MiB")
+
+
+def _check(result: Tuple[bool, str], what: str) -> None:
+    success, message = result
+    if not success:
+        raise RuntimeError(f"{what} failed: {message}")
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    import bpy
+    addon = testutil.import_addon()
+    addon.register()
+    AnimationLoadMode = addon.JAG2GLA.AnimationLoadMode
+    skeleton_spec, model_spec = SIZES[args.size]
+
+    basepath = os.path.join(tempfile.mkdtemp(prefix="jediacademy-benchmark-"), "GameData", "base")
+    print(f"[bench] Generating files in {basepath}...")
+    synthetic_assets.write_assets(basepath, SKELETON_REL, MODEL_REL, skeleton_spec, model_spec)
+    testutil.reset_scene()
+
+    bench = Benchmark()
+
+    def parse_gla() -> None:
+        gla = addon.JAG2GLA.GLA()
+        _check(gla.loadFromFile(os.path.join(basepath, SKELETON_REL + ".gla"), AnimationLoadMode.ALL, 0, -1), "gla parse")
+    bench.run("gla_parse", parse_gla)
+
+    def parse_glm() -> None:
+        glm = addon.JAG2GLM.GLM()
+        _check(glm.loadFromFile(os.path.join(basepath, MODEL_REL + ".glm")), "glm parse")
+    bench.run("glm_parse", parse_glm)
+
+    # the Blender phases build on each other
+    scene = addon.JAG2Scene.Scene(basepath)
+    _check(scene.loadFromGLM(MODEL_REL), "glm parse")
+    _check(scene.loadFromGLA(SKELETON_REL, AnimationLoadMode.RANGE, 0, args.import_frames), "gla parse")
+    glm = scene.glm
+    scale = 1.0
+    skeleton_fixes = addon.JAG2Constants.SkeletonFixes.NONE
+
+    def import_gla() -> None:
+        # without the model - that's the next phase
+        scene.glm = None
+        _check(scene.saveToBlender(scale, "", False, True, skeleton_fixes), "gla import")
+    bench.run("gla_import", import_gla)
+
+    def import_glm() -> None:
+        scene_root = addon.JAG2Scene.findSceneRootObject()
+        _check(glm.saveToBlender(basepath, scene.gla, scene_root, "", False), "glm import")
+    bench.run("glm_import", import_glm)
+
+    export_scene = addon.JAG2Scene.Scene(basepath)
+    bench.run("gla_export", lambda: _check(export_scene.loadSkeletonFromBlender(SKELETON_REL + EXPORT_SUFFIX, ""), "gla export"))
+    bench.run("gla_serialize", lambda: _check(export_scene.saveToGLA(SKELETON_REL + EXPORT_SUFFIX), "gla serialize"))
+    bench.run("glm_export", lambda: _check(export_scene.loadModelFromBlender(MODEL_REL + EXPORT_SUFFIX, SKELETON_REL), "glm export"))
+    bench.run("glm_serialize", lambda: _check(export_scene.saveToGLM(MODEL_REL + EXPORT_SUFFIX), "glm serialize"))
+
+    return {
+        "version": 1,
+        "size": args.size,
+        "skeleton": asdict(skeleton_spec),
+        "model": asdict(model_spec),
+        "import_frames": args.import_frames,
+        "blender": bpy.app.version_string,
+        "python": platform.python_version(),
+        "machine": platform.node(),
+        # without a resettable counter, peak RSS can only ever go up over the run
+        "per_phase_rss": bench.per_phase_rss,
+        "phases": bench.phases,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Returns a description of every phase that regressed beyond the thresholds."""
+    for key in ("size", "skeleton", "model", "import_frames"):
+        # round trip through JSON so tuples compare equal to the baseline's lists
+        if json.loads(json.dumps(results[key])) != baseline.get(key):
+            return [f"baseline was recorded with different settings ({key}: {baseline.get(key)} vs. {results[key]}), re-run with --save-baseline"]
+    regressions: List[str] = []
+    for name, current in results["phases"].items():
+        previous: Optional[Dict[str, float]] = baseline["phases"].get(name)
+        if previous is None:
+            print(f"[bench] {name}: not in baseline")
+            continue
+        time_ratio = current["seconds"] / max(previous["seconds"], 1e-9)
+        memory_ratio = current["peak_rss_mb"] / max(previous["peak_rss_mb"], 1e-9)
+        print(f"[bench] {name}: {time_ratio:.2f}x time, {memory_ratio:.2f}x peak RSS")
+        if time_ratio > args.time_threshold and current["seconds"] - previous["seconds"] > args.min_seconds:
+            regressions.append(f"{name} took {current['seconds']:.3f}s, baseline {previous['seconds']:.3f}s ({time_ratio:.2f}x > {args.time_threshold}x)")
+        if memory_ratio > args.memory_threshold:
+            regressions.append(f"{name} peak RSS {current['peak_rss_mb']:.1f} MiB, baseline {previous['peak_rss_mb']:.1f} MiB ({memory_ratio:.2f}x > {args.memory_threshold}x)")
+    return regressions
+
+
+def main() -> None:
+    args = _parse_args()
+    results = run_benchmarks(args)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"[bench] Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"[bench] Saved as baseline {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"[bench] No baseline at {args.baseline}, run with --save-baseline to create one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args)
+    if regressions:
+        raise RuntimeError(f"{len(regressions)} regression(s):\n" + "\n".join(f"  - {r}" for r in regressions))
+    print("[bench] No regressions")
+
+
+main()
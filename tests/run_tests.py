@@ -242,6 +242,1290 @@ def case_roundtrip():
     testutil.check(testutil.compare_glm(actual_glm, expected_glm) + testutil.compare_gla(actual_gla, expected_gla))
 
 
+def _write_test_texture(basepath, rel, pixel):
+    """Saves a 1x1 PNG to `basepath`/`rel`.png, without leaving the generating image behind."""
+    import bpy
+    path = os.path.join(basepath, rel + ".png")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    image = bpy.data.images.new("texture_cache_source", 1, 1)
+    image.pixels[:] = pixel  # pyright: ignore [reportIndexIssue]
+    image.filepath_raw = path
+    image.file_format = "PNG"
+    image.save()
+    bpy.data.images.remove(image)
+    return path
+
+
+def case_texture_cache():
+    """Materials/images created by one import should be reused by the next instead of loading
+    the same texture again, and a texture changed on disk should get reloaded."""
+    import bpy
+    basepath = tempfile.mkdtemp(prefix="jediacademy-test-texture-cache-")
+    texture_rel = "models/testcases/shared/texture"
+    _write_test_texture(basepath, texture_rel, (1, 0, 0, 1))
+
+    def import_material(surface_name, shader):
+        manager = addon.JAMaterialmanager.MaterialManager()
+        success, message = manager.init(basepath, "", False)
+        if not success:
+            raise AssertionError(f"MaterialManager.init failed: {message}")
+        return manager.getMaterial(surface_name, shader)
+
+    mismatches = []
+    first = import_material("a", texture_rel.encode())
+    # different shader spelling, same file
+    second = import_material("b", (texture_rel + ".png").encode())
+    if first is None or second is None:
+        mismatches.append("getMaterial returned no material for an existing texture")
+    elif first != second:
+        mismatches.append(f"second import created a new material {second.name} instead of reusing {first.name}")
+    if len(bpy.data.images) != 1:
+        mismatches.append(f"expected 1 image after importing the same texture twice, got {len(bpy.data.images)}")
+
+    # a deleted material must be recreated, but can still share the loaded image
+    if first is not None:
+        bpy.data.materials.remove(first)
+    third = import_material("c", texture_rel.encode())
+    if third is None or third.name not in bpy.data.materials:
+        mismatches.append("no new material created after the cached one was deleted")
+    if len(bpy.data.images) != 1:
+        mismatches.append(f"expected the image to be reused after material deletion, got {len(bpy.data.images)} images")
+
+    # changing the file on disk must be picked up by the next import
+    # make sure the old pixels are actually loaded, not lazily read later
+    _ = bpy.data.images[0].pixels[0]  # pyright: ignore [reportIndexIssue]
+    _write_test_texture(basepath, texture_rel, (0, 1, 0, 1))
+    import_material("d", texture_rel.encode())
+    image = bpy.data.images[0]
+    if abs(image.pixels[1] - 1) > 1e-3:  # pyright: ignore [reportIndexIssue]
+        mismatches.append(f"changed texture not reloaded: pixel is {tuple(image.pixels)}")  # pyright: ignore [reportArgumentType]
+
+    testutil.check(mismatches)
+
+
+def case_deferred_textures():
+    """With deferred texture loading, materials start out with an empty image node which gets
+    filled in once the pending textures are loaded, and the texture files are looked for in the background."""
+    import bpy
+    import threading
+    basepath = tempfile.mkdtemp(prefix="jediacademy-test-deferred-textures-")
+    texture_rel = "models/testcases/shared/texture"
+    path = _write_test_texture(basepath, texture_rel, (1, 0, 0, 1))
+
+    mismatches = []
+    with open(path, "rb") as file:
+        size = addon.JAMaterialmanager.probeImageHeader(file.read())
+    if size != (1, 1):
+        mismatches.append(f"probed PNG size {size}, expected (1, 1)")
+
+    def import_materials(*shaders):
+        manager = addon.JAMaterialmanager.MaterialManager()
+        success, message = manager.init(basepath, "", False, deferTextures=True)
+        if not success:
+            raise AssertionError(f"MaterialManager.init failed: {message}")
+        return [manager.getMaterial(name, shader.encode()) for name, shader in zip("abcdefgh", shaders)]
+
+    # the file system gets searched by the texture loader's threads, not while creating the materials
+    findFile = addon.JAFilesystem.FindFile
+    searchedOnMainThread = []
+
+    def recordingFindFile(*args):
+        if threading.current_thread() is threading.main_thread():
+            searchedOnMainThread.append(args[0])
+        return findFile(*args)
+    addon.JAFilesystem.FindFile = recordingFindFile
+    try:
+        materials = import_materials(texture_rel, texture_rel, "models/testcases/missing")
+        # a second import while the first one's textures are still pending shares its materials
+        shared = import_materials(texture_rel)[0]
+        addon.JAMaterialmanager.flushDeferredTextures()
+        # and after that, the found file is known without searching again
+        reused = import_materials(texture_rel)[0]
+    finally:
+        addon.JAFilesystem.FindFile = findFile
+    if searchedOnMainThread:
+        mismatches.append(f"looked for {searchedOnMainThread} on the main thread")
+    if any(mat is None for mat in materials):
+        raise AssertionError("getMaterial returned no material")
+    if shared != materials[0] or reused != materials[0]:
+        mismatches.append(f"later imports got materials {shared} and {reused} instead of {materials[0]}")
+    missing = materials[2]
+    if missing.use_nodes or tuple(missing.diffuse_color) != (1, 0, 1, 1):
+        mismatches.append("material of the missing texture not made pink")
+
+    manager = addon.JAMaterialmanager.MaterialManager()
+    success, message = manager.init(basepath, "", False, deferTextures=True)
+    if not success:
+        raise AssertionError(f"MaterialManager.init failed: {message}")
+    bpy.data.materials.remove(materials[0])
+    materials = [manager.getMaterial(name, texture_rel.encode()) for name in ("a", "b")]
+    if any(mat is None for mat in materials):
+        raise AssertionError("getMaterial returned no material for an existing texture")
+    nodes = [node for mat in materials for node in mat.node_tree.nodes if node.type == 'TEX_IMAGE']
+    if any(node.image is not None for node in nodes):
+        mismatches.append("deferred import loaded the texture right away")
+
+    addon.JAMaterialmanager.flushDeferredTextures()
+    if len(bpy.data.images) != 1:
+        mismatches.append(f"expected 1 image after flushing, got {len(bpy.data.images)}")
+    elif any(node.image != bpy.data.images[0] for node in nodes):
+        mismatches.append("image nodes not filled in after flushing")
+
+    # cancelling, as on loading another file, stops the timer instead of leaving it to tick on
+    loader = addon.JAMaterialmanager._deferredLoader
+    loader.request(path, "", materials[0].name, nodes[0].name)
+    registered = bpy.app.timers.is_registered(loader._tickCallback)
+    loader.cancel()
+    if not registered or bpy.app.timers.is_registered(loader._tickCallback) or loader.timerRegistered:
+        mismatches.append(f"texture timer registered after request: {registered}, still registered after cancelling")
+
+    testutil.check(mismatches)
+
+
+def case_profiling():
+    """An import with profile='TRACE' should write a Chrome trace with nested spans and counters."""
+    import bpy
+    import json
+    import shutil
+    basepath = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-profiling-"), "GameData", "base")
+    gla_path = os.path.join(basepath, SKELETON_REL + ".gla")
+    os.makedirs(os.path.dirname(gla_path))
+    shutil.copy(os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"), gla_path)
+
+    result = bpy.ops.import_scene.gla(filepath=gla_path, loadAnimations='ALL', profile='TRACE')  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"import_scene.gla returned {result}")
+    with open(gla_path + ".trace.json") as file:
+        events = json.load(file)["traceEvents"]
+
+    mismatches = []
+    names = {event["name"] for event in events}
+    for expected in ("loading gla", "reading animations", "creating skeleton", "applying animations"):
+        if expected not in names:
+            mismatches.append(f"span {expected!r} missing from trace, got {sorted(names)}")
+    framesRead = sum(event["args"].get("frames read", 0) for event in events)
+    if framesRead == 0:
+        mismatches.append("no 'frames read' counter in trace")
+    if not all("peak memory (bytes)" in event["args"] for event in events):
+        mismatches.append("spans without peak memory")
+    testutil.check(mismatches)
+
+
+def case_codec_without_bpy():
+    """The file format modules load and save files without Blender, byte for byte."""
+    import subprocess
+    script = """
+import filecmp, os, sys, tempfile
+sys.path.insert(0, sys.argv[1])
+import JAG2GLAFormat, JAG2GLMFormat
+assert "bpy" not in sys.modules and "mathutils" not in sys.modules, "codec pulled in Blender modules"
+tmp = tempfile.mkdtemp(prefix="jediacademy-test-codec-")
+for module, cls, path in ((JAG2GLAFormat, "GLAFile", sys.argv[2]), (JAG2GLMFormat, "GLMFile", sys.argv[3])):
+    out = os.path.join(tmp, os.path.basename(path))
+    getattr(module, cls).load(path).save(out)
+    assert filecmp.cmp(path, out, shallow=False), f"{path} changed when re-saved"
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script, REPO_ROOT,
+         os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"), os.path.join(REFERENCE_BASEPATH, MODEL_REL + ".glm")],
+        capture_output=True, text=True)
+    if result.returncode != 0:
+        raise AssertionError(f"codec round trip failed:\n{result.stdout}{result.stderr}")
+
+
+def case_md3_import():
+    """An exported MD3 imports as shape key animated meshes and animated tags matching every frame."""
+    import bpy
+    import importlib
+    import struct
+    import numpy as np
+    md3_export = importlib.import_module(addon.__name__ + ".JAMd3Export")
+    encode = addon.JAMd3Encode
+    scene = bpy.context.scene
+    scene.frame_start, scene.frame_end = 1, 4
+
+    # a wedge that moves and turns, and a tag that moves along
+    mesh = bpy.data.meshes.new("wedge")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1)], [], [(0, 1, 2), (0, 3, 1), (0, 2, 3), (1, 3, 2)])
+    mesh.uv_layers.new(name="UVMap")
+    wedge = bpy.data.objects.new("wedge", mesh)
+    wedge["md3shader"] = "models/testcases/wedge"
+    tag = bpy.data.objects.new("tag_weapon", None)
+    for obj in (wedge, tag):
+        scene.collection.objects.link(obj)
+        obj.select_set(True)
+        obj.location = (0, 0, 0)
+        obj.keyframe_insert("location", frame=1)
+        obj.keyframe_insert("rotation_euler", frame=1)
+        obj.location = (2, 1, 0.5)
+        # more than half a turn, so the tag's quaternions need flipping to stay in one hemisphere
+        obj.rotation_euler = (0, 0.5, 5)
+        obj.keyframe_insert("location", frame=4)
+        obj.keyframe_insert("rotation_euler", frame=4)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-md3-"), "wedge.md3")
+    md3_export.save_md3(md3_export.md3Settings(path, "models/testcases/wedge.md3", "console"))
+    md3 = addon.JAMd3Import.load_md3(path)
+    testutil.reset_scene()
+    result = bpy.ops.import_scene.ja_md3(filepath=path)  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"import_scene.ja_md3 returned {result}")
+
+    mismatches = []
+    scene = bpy.context.scene
+    surface = md3.surfaces[0]
+    imported = bpy.data.objects.get("wedge")
+    if imported is None or imported.get("md3shader") != "models/testcases/wedge":
+        raise AssertionError("surface not imported as object 'wedge' with its shader")
+    if scene.frame_end != scene.frame_start + 3:
+        mismatches.append(f"scene frame range {scene.frame_start}-{scene.frame_end}, expected 4 frames")
+    quaternions = []
+    for frame in range(md3.numFrames):
+        scene.frame_set(scene.frame_start + frame)
+        quaternions.append(bpy.data.objects["tag_weapon"].rotation_quaternion[:])
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        evaluated = imported.evaluated_get(depsgraph)
+        evaluated_mesh = evaluated.to_mesh()
+        co = np.empty(len(evaluated_mesh.vertices) * 3, dtype=np.float32)
+        evaluated_mesh.vertices.foreach_get("co", co)
+        evaluated.to_mesh_clear()
+        expected = encode.DecodePositions(surface.verts["xyz"][frame])
+        if co.shape != expected.ravel().shape or not np.allclose(co.reshape(-1, 3), expected, atol=1e-6):
+            mismatches.append(f"frame {frame}: vertices don't match the file")
+        expected_tag = md3.tags[frame, 0]
+        matrix = bpy.data.objects["tag_weapon"].matrix_world
+        location = matrix.translation.to_tuple()
+        if not np.allclose(location, expected_tag["origin"], atol=1e-5):
+            mismatches.append(f"frame {frame}: tag at {location}, expected {expected_tag['origin'].tolist()}")
+        # the file's axes are the rows, the matrix's the columns
+        rotation = np.array(matrix.to_3x3()).T
+        if not np.allclose(rotation, expected_tag["axis"].reshape(3, 3), atol=1e-5):
+            mismatches.append(f"frame {frame}: tag axes {rotation.tolist()}, expected {expected_tag['axis'].tolist()}")
+    if any(np.dot(a, b) < 0 for a, b in zip(quaternions, quaternions[1:])):
+        mismatches.append(f"tag rotation flips between hemispheres: {quaternions}")
+
+    # a file without frames is malformed, not something to index into - even with no surfaces to disagree
+    with open(path, "rb") as file:
+        data = bytearray(file.read())
+    # numFrames, numTags, numSurfaces
+    struct.pack_into("<3i", data, struct.calcsize("<4si64si"), 0, 1, 0)
+    try:
+        encode.md3Object().Deserialize(bytes(data))
+        mismatches.append("a file without frames was read")
+    except encode.md3FormatError:
+        pass
+    testutil.check(mismatches)
+
+
+def _md3_record_bytes(objects, frames):
+    """The .md3 the exporter should write for the objects, encoded vertex by vertex and record by record with
+    md3Vert.Encode and the records' own Serialize, the way the exporter used to."""
+    import bpy
+    import math
+    import struct
+    import mathutils
+    encode = addon.JAMd3Encode
+    scene = bpy.context.scene
+    md3 = encode.md3Object()
+    md3.ident, md3.version, md3.name, md3.numFrames = encode.MD3_IDENT, encode.MD3_VERSION, "models/testcases/records.md3", len(frames)
+    for frame in frames:
+        nframe = encode.md3Frame()
+        nframe.name = str(frame)
+        md3.frames.append(nframe)
+    surfaces = []
+    for obj in [obj for obj in objects if obj.type == 'MESH']:
+        scene.frame_set(frames[0])
+        mesh = obj.evaluated_get(bpy.context.evaluated_depsgraph_get()).to_mesh()
+        vertlist, uvs, triangles = [], [], []
+        for polygon in mesh.polygons:
+            if len(polygon.vertices) != 3:
+                continue
+            indexes = []
+            for vert_index, loop_index in zip(polygon.vertices, polygon.loop_indices):
+                uv = [round(x, 5) for x in mesh.uv_layers[0].data[loop_index].uv.to_tuple()]
+                # first vertex with the same index and UV, linear search like the old exporter
+                match = next((i for i, vi in enumerate(vertlist) if vi == vert_index and uvs[i].u == uv[0] and uvs[i].v == uv[1]), None)
+                if match is None:
+                    match = len(vertlist)
+                    vertlist.append(vert_index)
+                    ntex = encode.md3TexCoord()
+                    ntex.u, ntex.v = uv
+                    uvs.append(ntex)
+                indexes.append(match)
+            ntri = encode.md3Triangle()
+            ntri.indexes = indexes
+            triangles.append(ntri)
+        obj.evaluated_get(bpy.context.evaluated_depsgraph_get()).to_mesh_clear()
+        verts = []
+        for frame_index, frame in enumerate(frames):
+            scene.frame_set(frame)
+            evaluated = obj.evaluated_get(bpy.context.evaluated_depsgraph_get())
+            frame_mesh = evaluated.to_mesh()
+            nframe = md3.frames[frame_index]
+            for vi in vertlist:
+                vert = frame_mesh.vertices[vi]
+                nvert = encode.md3Vert()
+                nvert.normal = nvert.Encode(vert.normal)
+                nvert.xyz = [round(x, 5) for x in evaluated.matrix_world @ vert.co]
+                for i in range(3):
+                    nframe.mins[i] = min(nframe.mins[i], nvert.xyz[i])
+                    nframe.maxs[i] = max(nframe.maxs[i], nvert.xyz[i])
+                nframe.radius = round(max(math.sqrt(sum(x * x for x in nframe.mins)), math.sqrt(sum(x * x for x in nframe.maxs))), 5)
+                verts.append(nvert)
+            evaluated.to_mesh_clear()
+        shader = encode.md3Shader()
+        shader.name = obj["md3shader"]
+        body = b"".join([shader.Serialize()] + [t.Serialize() for t in triangles] + [uv.Serialize() for uv in uvs] + [v.Serialize() for v in verts])
+        header_size = struct.calcsize(encode.md3Surface.binaryFormat)
+        ofs_triangles = header_size + len(shader.Serialize())
+        ofs_uv = ofs_triangles + 12 * len(triangles)
+        ofs_verts = ofs_uv + 8 * len(uvs)
+        surfaces.append(struct.pack(encode.md3Surface.binaryFormat, encode.MD3_IDENT.encode(), obj.name.encode(), 0, len(frames), 1,
+                                    len(vertlist), len(triangles), ofs_triangles, header_size, ofs_uv, ofs_verts, header_size + len(body)) + body)
+    tags = []
+    for frame in frames:
+        scene.frame_set(frame)
+        for obj in [obj for obj in objects if obj.type == 'EMPTY']:
+            ntag = encode.md3Tag()
+            ntag.name = obj.name
+            ntag.origin = [round(obj.matrix_world[i][3], 5) for i in range(3)]
+            ntag.axis = [obj.matrix_world[x][y] for y in range(3) for x in range(3)]
+            tags.append(ntag)
+    md3.numTags, md3.numSurfaces = len(tags) // len(frames), len(surfaces)
+    md3.ofsFrames = struct.calcsize(md3.binaryFormat)
+    md3.ofsTags = md3.ofsFrames + len(frames) * struct.calcsize(encode.md3Frame.binaryFormat)
+    md3.ofsSurfaces = md3.ofsTags + len(tags) * struct.calcsize(encode.md3Tag.binaryFormat)
+    md3.ofsEnd = md3.ofsSurfaces + sum(len(surface) for surface in surfaces)
+    header = struct.pack(md3.binaryFormat, md3.ident.encode(), md3.version, md3.name.encode(), 0, md3.numFrames, md3.numTags,
+                         md3.numSurfaces, 0, md3.ofsFrames, md3.ofsTags, md3.ofsSurfaces, md3.ofsEnd)
+    return b"".join([header] + [f.Serialize() for f in md3.frames] + [t.Serialize() for t in tags] + surfaces)
+
+
+def case_md3_export_records():
+    """The array based MD3 encoding writes the same bytes as encoding each vertex and record on its own, for normals
+    at the poles and of zero length, vertices split by UV seams and positions on both sides of the origin."""
+    import bpy
+    import importlib
+    import numpy as np
+    md3_export = importlib.import_module(addon.__name__ + ".JAMd3Export")
+    encode = addon.JAMd3Encode
+    mismatches = []
+
+    # the encoders on their own, against md3Vert
+    rng = np.random.default_rng(5)
+    normals = np.concatenate([[(0, 0, 1), (0, 0, -1), (0, 0, 0), (0, 0, 2.5), (1e-30, 0, 0), (-1, 0, 0), (0, -1, 0), (1, 1, 0)],
+                              rng.normal(size=(500, 3))]).astype(np.float32)
+    vert = encode.md3Vert()
+    expected_normals = [vert.Encode(normal) for normal in normals.tolist()]
+    if encode.EncodeNormals(normals).tolist() != expected_normals:
+        mismatches.append("EncodeNormals differs from md3Vert.Encode")
+    positions = np.round(np.concatenate([[(0.01, -0.01, 511.99), (-511.99, 1 / 64, -1 / 64)], rng.uniform(-500, 500, size=(500, 3))]), 5)
+    verts = np.empty(len(positions), dtype=encode.MD3_VERT_DTYPE)
+    verts["xyz"] = encode.EncodePositions(positions)  # pyright: ignore [reportCallIssue, reportArgumentType]
+    verts["normal"] = encode.EncodeNormals(normals[:len(positions)])  # pyright: ignore [reportCallIssue, reportArgumentType]
+    expected_verts = []
+    for xyz, normal in zip(positions.tolist(), expected_normals):
+        vert.xyz, vert.normal = xyz, normal
+        expected_verts.append(vert.Serialize())
+    if verts.tobytes() != b"".join(expected_verts):
+        mismatches.append("EncodePositions differs from md3Vert.Serialize")
+
+    # a triangulated UV sphere, with poles and seams, that moves, and a tag. Blender never gives vertices zero length
+    # normals, those are only covered above.
+    scene = bpy.context.scene
+    scene.frame_start, scene.frame_end = 1, 3
+    bpy.ops.mesh.primitive_uv_sphere_add(segments=8, ring_count=5, radius=3, location=(1, -2, 0.5))
+    sphere = bpy.context.active_object
+    assert sphere is not None
+    sphere.name = "sphere"
+    num_sphere_verts = len(bpy.data.meshes[0].vertices)
+    sphere["md3shader"] = "models/testcases/sphere"
+    sphere.modifiers.new("Triangulate", 'TRIANGULATE')
+    sphere.keyframe_insert("location", frame=1)
+    sphere.location = (-4, 2, -1)
+    sphere.rotation_euler = (0.3, 0, 1)
+    sphere.keyframe_insert("location", frame=3)
+    sphere.keyframe_insert("rotation_euler", frame=3)
+    tag = bpy.data.objects.new("tag_weapon", None)
+    tag.location = (0.5, -0.25, 3)
+    tag.rotation_euler = (0.1, 0.2, 0.3)
+    scene.collection.objects.link(tag)
+    tag.select_set(True)
+
+    path = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-md3-records-"), "records.md3")
+    md3_export.save_md3(md3_export.md3Settings(path, "models/testcases/records.md3", "console"))
+    with open(path, "rb") as file:
+        actual = file.read()
+    # the exporter writes the selection in its own order, the reference the same
+    expected = _md3_record_bytes([obj for obj in bpy.context.selected_objects if obj.type == 'MESH'] +
+                                 [obj for obj in bpy.context.selected_objects if obj.type == 'EMPTY'], range(1, 4))
+    if actual != expected:
+        first = next((i for i, (a, b) in enumerate(zip(actual, expected)) if a != b), min(len(actual), len(expected)))
+        mismatches.append(f"exported {len(actual)} bytes, record by record gives {len(expected)}, first difference at {first}")
+    # the seams must have split vertices, or the test doesn't cover them
+    md3 = addon.JAMd3Import.load_md3(path)
+    num_verts = {surface.name: surface.numVerts for surface in md3.surfaces}
+    if num_verts.get("sphere", 0) <= num_sphere_verts:
+        mismatches.append(f"sphere exported with {num_verts.get('sphere')} of {num_sphere_verts} vertices, expected UV seams to split some")
+    testutil.check(mismatches)
+
+
+def case_roff_import():
+    """A ROFF's relative per frame movement becomes linear location and rotation keyframes."""
+    import bpy
+    import math
+    import struct
+    scene = bpy.context.scene
+    obj = bpy.data.objects.new("mover", None)
+    scene.collection.objects.link(obj)
+    obj.location = (1, 2, 3)
+    obj.select_set(True)
+
+    # 3 frames of 50ms, translation then rotation (y z x) in degrees
+    deltas = [(10, 0, 0, 0, 90, 0), (0, 20, 0, 0, 0, 45), (0, 0, -30, 10, 0, 0)]
+    path = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-roff-"), "mover.rof")
+    with open(path, "wb") as file:
+        file.write(struct.pack("4s4i", b"ROFF", 2, len(deltas), 50, 0))
+        for delta in deltas:
+            file.write(struct.pack("6f2i", *delta, -1, 0))
+    result = bpy.ops.import_scene.ja_roff(filepath=path)  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"import_scene.ja_roff returned {result}")
+
+    mismatches = []
+    expected = {
+        0: ((1, 2, 3), (0, 0, 0)),
+        1: ((2, 2, 3), (0, 0, 90)),
+        3: ((2, 4, 0), (45, 10, 90)),
+    }
+    for frame, (location, rotation) in expected.items():
+        scene.frame_set(frame)
+        actual_location = obj.location.to_tuple()
+        actual_rotation = tuple(math.degrees(angle) for angle in obj.rotation_euler)
+        if any(abs(a - b) > 1e-4 for a, b in zip(actual_location + actual_rotation, location + rotation)):
+            mismatches.append(f"frame {frame}: {actual_location} {actual_rotation}, expected {location} {rotation}")
+    if scene.frame_end != len(deltas) or scene.render.fps != 20:
+        mismatches.append(f"scene has {scene.frame_end} frames at {scene.render.fps} fps, expected 3 at 20")
+    testutil.check(mismatches)
+
+
+def case_roff_export():
+    """Exporting several objects writes one ROFF per object, which imports back to the same movement."""
+    import bpy
+    import numpy as np
+    scene = bpy.context.scene
+    scene.frame_start, scene.frame_end = 1, 5
+    scene.render.fps = 20
+    # name -> total movement and rotation
+    movers = {}
+    for i in range(2):
+        obj = bpy.data.objects.new(f"mover{i}", None)
+        scene.collection.objects.link(obj)
+        obj.select_set(True)
+        obj.keyframe_insert("location", frame=1)
+        obj.keyframe_insert("rotation_euler", frame=1)
+        obj.location = (i + 1, 0, -i)
+        obj.rotation_euler = (0, 0.5 * i, 0.25)
+        obj.keyframe_insert("location", frame=5)
+        obj.keyframe_insert("rotation_euler", frame=5)
+        movers[obj.name] = (obj.location.to_tuple(), obj.rotation_euler[:])
+
+    directory = tempfile.mkdtemp(prefix="jediacademy-test-roff-export-")
+    result = bpy.ops.export_scene.ja_roff(filepath=os.path.join(directory, "unused.rof"), scale=10)  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"export_scene.ja_roff returned {result}")
+
+    mismatches = []
+    for name, (location, rotation) in movers.items():
+        path = os.path.join(directory, name + ".rof")
+        if not os.path.exists(path):
+            mismatches.append(f"no ROFF written for {name}")
+            continue
+        with open(path, "rb") as file:
+            data = file.read()
+        frames = np.frombuffer(data, dtype=np.dtype(addon.JARoffImport.ROFF_FRAME_DTYPE), offset=20)
+        if len(frames) != 4:
+            mismatches.append(f"{name}: {len(frames)} frames, expected 4")
+            continue
+        total = frames["translation"].sum(axis=0) / 10
+        if not np.allclose(total, location, atol=1e-4):
+            mismatches.append(f"{name}: moved by {total}, expected {location}")
+        # y z x
+        total_rotation = np.radians(frames["rotation"].sum(axis=0))[[2, 0, 1]]
+        if not np.allclose(total_rotation, rotation, atol=1e-4):
+            mismatches.append(f"{name}: rotated by {total_rotation}, expected {rotation}")
+
+    # names that clean up to the same file name get refused instead of overwriting each other
+    bpy.data.objects["mover0"].name = "Door.001"
+    bpy.data.objects["mover1"].name = "Door_001"
+    directory = tempfile.mkdtemp(prefix="jediacademy-test-roff-export-")
+    try:
+        bpy.ops.export_scene.ja_roff(filepath=os.path.join(directory, "unused.rof"))  # pyright: ignore [reportAttributeAccessIssue]
+        mismatches.append("exporting clashing file names didn't report an error")
+    except RuntimeError:
+        pass
+    if os.listdir(directory):
+        mismatches.append(f"exporting clashing file names wrote {os.listdir(directory)}")
+    testutil.check(mismatches)
+
+
+# with the third texture coordinate 3ds Max writes
+ASE_QUAD = """*3DSMAX_ASCIIEXPORT\t200
+*MATERIAL_LIST\t{
+\t*MATERIAL_COUNT\t1
+\t*MATERIAL\t0\t{
+\t\t*MATERIAL_NAME\t"textures/test/wall with {braces} and *stars*"
+\t}
+}
+*GEOMOBJECT\t{
+\t*MESH\t{
+\t\t*TIMEVALUE\t0
+\t\t*MESH_VERTEX_LIST\t{
+\t\t\t*MESH_VERTEX\t0\t0.0\t0.0\t0.0
+\t\t\t*MESH_VERTEX\t1\t1.0\t0.0\t0.0
+\t\t\t*MESH_VERTEX\t2\t0.0\t1.0\t0.0
+\t\t\t*MESH_VERTEX\t3\t1.0\t1.0\t0.5
+\t\t}
+\t\t*MESH_FACE_LIST\t{
+\t\t\t*MESH_FACE\t0\tA:\t0\tB:\t1\tC:\t2\tAB:\t1\tBC:\t1\tCA:\t1\t*MESH_SMOOTHING\t0\t*MESH_MTLID\t0
+\t\t\t*MESH_FACE\t1\tA:\t1\tB:\t3\tC:\t2\tAB:\t1\tBC:\t1\tCA:\t1\t*MESH_SMOOTHING\t0\t*MESH_MTLID\t0
+\t\t}
+\t\t*MESH_TVERTLIST\t{
+\t\t\t*MESH_TVERT\t0\t0.0\t0.0\t0.0
+\t\t\t*MESH_TVERT\t1\t1.0\t0.0\t0.0
+\t\t\t*MESH_TVERT\t2\t0.0\t1.0\t0.0
+\t\t\t*MESH_TVERT\t3\t1.0\t1.0\t0.0
+\t\t}
+\t\t*MESH_TFACELIST\t{
+\t\t\t*MESH_TFACE\t0\t0\t1\t2
+\t\t\t*MESH_TFACE\t1\t1\t3\t2
+\t\t}
+\t}
+\t*MATERIAL_REF\t0
+}
+"""
+
+
+def case_ase_import():
+    """An ASE file parses into the expected blocks and imports as a textured mesh."""
+    import bpy
+    mismatches = []
+    blocks = addon.JAAseImport.parseBlocks(ASE_QUAD.encode())
+    names = [block.name for block in blocks]
+    if names != ["3DSMAX_ASCIIEXPORT", "MATERIAL_LIST", "GEOMOBJECT"]:
+        mismatches.append(f"top level blocks {names}")
+    else:
+        # the mesh lists are read straight into arrays
+        lists = {child.name: child for child in blocks[2].children[0].children}
+        faces = lists["MESH_FACE_LIST"].rows
+        tverts = lists["MESH_TVERTLIST"].rows
+        if faces is None or faces.tolist() != [[0, 1, 2], [1, 3, 2]]:
+            mismatches.append(f"faces parsed as {faces}")
+        if tverts is None or tverts.tolist() != [[0, 0], [1, 0], [0, 1], [1, 1]]:
+            mismatches.append(f"texture vertices parsed as {tverts}")
+    # the mesh lists get parsed a chunk at a time, which mustn't split rows
+    chunkSize = addon.JAAseImport.ROW_CHUNK_SIZE
+    addon.JAAseImport.ROW_CHUNK_SIZE = 16
+    try:
+        chunked = addon.JAAseImport.parseBlocks(ASE_QUAD.encode())
+    finally:
+        addon.JAAseImport.ROW_CHUNK_SIZE = chunkSize
+    for whole, parts in zip(blocks[2].children[0].children, chunked[2].children[0].children):
+        if whole.name != parts.name or (whole.rows is not None and (parts.rows is None or whole.rows.tolist() != parts.rows.tolist())):
+            mismatches.append(f"{whole.name} parsed in chunks as {parts.rows}, whole as {whole.rows}")
+
+    path = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-ase-"), "quad.ase")
+    with open(path, "w") as file:
+        file.write(ASE_QUAD)
+    result = bpy.ops.import_scene.ja_ase(filepath=path)  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"import_scene.ja_ase returned {result}")
+    meshes = [obj.data for obj in bpy.data.objects if isinstance(obj.data, bpy.types.Mesh)]
+    if len(meshes) != 1:
+        raise AssertionError(f"expected 1 mesh, got {len(meshes)}")
+    mesh = meshes[0]
+    if len(mesh.vertices) != 4 or len(mesh.polygons) != 2:
+        mismatches.append(f"{len(mesh.vertices)} vertices and {len(mesh.polygons)} faces, expected 4 and 2")
+    uvs = [loop.uv.to_tuple() for loop in mesh.uv_layers[0].data]
+    if uvs != [(0, 0), (1, 0), (0, 1), (1, 0), (1, 1), (0, 1)]:
+        mismatches.append(f"UVs {uvs}")
+    material = mesh.materials[0]
+    if material is None or material.name != "textures/test/wall with {braces} and *stars*":
+        mismatches.append(f"material {material.name if material else None}")
+    testutil.check(mismatches)
+
+
+def case_ase_export():
+    """An exported ASE imports back as the same textured mesh, in world space."""
+    import bpy
+    mismatches = []
+    directory = tempfile.mkdtemp(prefix="jediacademy-test-ase-")
+    source = os.path.join(directory, "quad.ase")
+    with open(source, "w") as file:
+        file.write(ASE_QUAD)
+    bpy.ops.import_scene.ja_ase(filepath=source)  # pyright: ignore [reportAttributeAccessIssue]
+    obj = next(obj for obj in bpy.data.objects if obj.type == 'MESH')
+    obj.location = (1, 2, 3)
+    bpy.context.view_layer.update()
+    assert isinstance(obj.data, bpy.types.Mesh)
+    expected = sorted(set((tuple(round(x, 5) for x in obj.matrix_world @ obj.data.vertices[loop.vertex_index].co), tuple(round(x, 5) for x in uv.uv))
+                          for loop, uv in zip(obj.data.loops, obj.data.uv_layers[0].data)))
+
+    path = os.path.join(directory, "exported.ase")
+    result = bpy.ops.export_scene.ja_ase(filepath=path)  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"export_scene.ja_ase returned {result}")
+    testutil.reset_scene()
+    bpy.ops.import_scene.ja_ase(filepath=path)  # pyright: ignore [reportAttributeAccessIssue]
+    meshes = [obj.data for obj in bpy.data.objects if isinstance(obj.data, bpy.types.Mesh)]
+    if len(meshes) != 1:
+        raise AssertionError(f"expected 1 mesh, got {len(meshes)}")
+    mesh = meshes[0]
+    if len(mesh.vertices) != 4 or len(mesh.polygons) != 2:
+        mismatches.append(f"{len(mesh.vertices)} vertices and {len(mesh.polygons)} faces, expected 4 and 2")
+    actual = sorted(set((tuple(round(x, 5) for x in mesh.vertices[loop.vertex_index].co), tuple(round(x, 5) for x in uv.uv))
+                        for loop, uv in zip(mesh.loops, mesh.uv_layers[0].data)))
+    if actual != expected:
+        mismatches.append(f"vertices {actual}, expected {expected}")
+    material = mesh.materials[0]
+    if material is None or material.name != "textures/test/wall with {braces} and *stars*":
+        mismatches.append(f"material {material.name if material else None}")
+    testutil.check(mismatches)
+
+
+# one patch as the exporter used to write them face by face, with p2 c1 p1 / c2 c5 c4 / p3 c3 p4 as rows
+PATCH_FORMAT = """{{
+patchDef2
+{{
+{shader}
+( 3 3 0 0 0 )
+(
+( ( {p2[0]:.3f} {p2[1]:.3f} {p2[2]:.3f} 0 0 ) ( {c1[0]:.3f} {c1[1]:.3f} {c1[2]:.3f} 0 0 ) ( {p1[0]:.3f} {p1[1]:.3f} {p1[2]:.3f} 0 0 ) )
+( ( {c2[0]:.3f} {c2[1]:.3f} {c2[2]:.3f} 0 0 ) ( {c5[0]:.3f} {c5[1]:.3f} {c5[2]:.3f} 0 0 ) ( {c4[0]:.3f} {c4[1]:.3f} {c4[2]:.3f} 0 0 ) )
+( ( {p3[0]:.3f} {p3[1]:.3f} {p3[2]:.3f} 0 0 ) ( {c3[0]:.3f} {c3[1]:.3f} {c3[2]:.3f} 0 0 ) ( {p4[0]:.3f} {p4[1]:.3f} {p4[2]:.3f} 0 0 ) )
+)
+}}
+}}
+"""
+
+
+def _patch_def(shader, beautiful, p1, p2, p3, p4=None):
+    """A tri or quad as a patch, with the control points between the corners or, if not beautiful, on them."""
+    p4 = p4 or p3
+
+    def mean2(a, b):
+        return [(x + y) / 2 for x, y in zip(a, b)]
+
+    if beautiful:
+        c1, c2, c3, c4, c5 = mean2(p1, p2), mean2(p2, p3), mean2(p3, p4), mean2(p4, p1), mean2(mean2(p1, p2), mean2(p3, p4))
+    else:
+        c1, c2, c3, c4, c5 = p1, p3, p4, p4, p4
+    return PATCH_FORMAT.format(shader=shader, p1=p1, p2=p2, p3=p3, p4=p4, c1=c1, c2=c2, c3=c3, c4=c4, c5=c5)
+
+
+def case_patch_export():
+    """Every tri and quad becomes a patch, n-gons are split into triangles, and the patches match the per-face writer."""
+    import bpy
+    mesh = bpy.data.meshes.new("patches")
+    # a quad, a triangle and a pentagon
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (2, 0, 0), (3, 0, 1), (4, 1, 1), (3, 2, 1), (2, 1, 1)], [],
+                     [(0, 1, 2, 3), (1, 4, 2), (4, 5, 6, 7, 8)])
+    obj = bpy.data.objects.new("patches", mesh)
+    bpy.context.collection.objects.link(obj)
+    obj.location = (10, 0, 0)
+    bpy.context.view_layer.objects.active = obj
+    bpy.context.view_layer.update()
+
+    mismatches = []
+    corners = [[(2 * (x + 10), 2 * y, 2 * z) for x, y, z in (mesh.vertices[i].co for i in face)] for face in [(0, 1, 2, 3), (1, 4, 2)]]
+    for beautiful in (True, False):
+        path = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-patch-"), "patches.map")
+        result = bpy.ops.export_scene.ja_patchmesh_map(filepath=path, scale=2, shader="textures/test/100%", beautiful=beautiful)  # pyright: ignore [reportAttributeAccessIssue]
+        if result != {'FINISHED'}:
+            raise AssertionError(f"export_scene.ja_patchmesh_map returned {result}")
+        with open(path) as file:
+            text = file.read()
+        if text.count("patchDef2") != 5:
+            mismatches.append(f"{text.count('patchDef2')} patches, expected 5")
+        expected = "".join(_patch_def("textures/test/100%", beautiful, *face) for face in corners)
+        if not text.startswith("{\n\"classname\" \"worldspawn\"\n" + expected):
+            mismatches.append(f"patches written as {text[:800]!r}, expected {expected!r}")
+    testutil.check(mismatches)
+
+
+def _import_simpleskel(live_playback):
+    scene = addon.JAG2Scene.Scene(REFERENCE_BASEPATH)
+    success, message = scene.loadFromGLA(SKELETON_REL, loadAnimations=addon.JAG2GLA.AnimationLoadMode.ALL)
+    if not success:
+        raise AssertionError(f"loadFromGLA failed: {message}")
+    success, message = scene.saveToBlender(
+        scale=1.0, skin_rel="", guessTextures=False, useAnimation=True,
+        skeletonFixes=addon.JAG2Constants.SkeletonFixes.NONE, livePlayback=live_playback,
+    )
+    if not success:
+        raise AssertionError(f"saveToBlender failed: {message}")
+    import bpy
+    return bpy.data.objects["skeleton_root"]
+
+
+def _pose_matrices(armature, frames):
+    """Each frame's armature space pose bone matrices, rounded for comparison."""
+    import bpy
+    poses = []
+    for frame in frames:
+        bpy.context.scene.frame_set(frame)
+        poses.append([[round(x, 3) for row in bone.matrix for x in row] for bone in armature.pose.bones])
+    return poses
+
+
+def case_gla_live_playback():
+    """Live playback poses the armature like baked keyframes would, and bakes ranges on request."""
+    import bpy
+    frames = list(range(21))
+    expected = _pose_matrices(_import_simpleskel(False), frames)
+    testutil.reset_scene()
+
+    armature = _import_simpleskel(True)
+    mismatches = []
+    if armature.animation_data is not None and armature.animation_data.action is not None:
+        mismatches.append("live playback created an action")
+    # scrubbing backwards as well as forwards
+    for frame in frames[::-1] + frames:
+        actual = _pose_matrices(armature, [frame])[0]
+        if actual != expected[frame]:
+            mismatches.append(f"frame {frame}: pose {actual}, expected {expected[frame]}")
+            break
+
+    bpy.context.view_layer.objects.active = armature
+    result = bpy.ops.object.bake_gla_playback(startFrame=5, endFrame=10)  # pyright: ignore [reportAttributeAccessIssue]
+    if result != {'FINISHED'}:
+        raise AssertionError(f"object.bake_gla_playback returned {result}")
+    action = armature.animation_data.action if armature.animation_data else None
+    if action is None:
+        raise AssertionError("baking assigned no action")
+    keyed = sorted({point.co[0] for curve in addon.JAAnimationhelper.actionFCurves(action, armature) for point in curve.keyframe_points})
+    if keyed != list(range(5, 11)):
+        mismatches.append(f"baked frames {keyed}")
+    # the baked keyframes now drive the armature
+    for frame in (5, 8, 10):
+        actual = _pose_matrices(armature, [frame])[0]
+        if actual != expected[frame]:
+            mismatches.append(f"baked frame {frame}: pose {actual}, expected {expected[frame]}")
+    # restarting the playback unassigns the armature's own action, which has to survive saving
+    own = bpy.data.actions.new("own")
+    armature.animation_data.action = own  # pyright: ignore [reportOptionalMemberAccess]
+    playback = addon.JAG2GLA.livePlaybacks[armature.name]
+    addon.JAG2GLA.startLivePlayback(playback.skeleton, playback.animation, armature)
+    if armature.animation_data.action is not None:  # pyright: ignore [reportOptionalMemberAccess]
+        mismatches.append("restarting live playback kept the armature's action assigned")
+    if not own.use_fake_user:
+        mismatches.append("restarting live playback left the armature's action without a fake user")
+    testutil.check(mismatches)
+
+
+SIMPLESKEL_ANIMATION_CFG = """// Animation Data generated from Blender Markers
+// name                 start   length  loop    fps
+A_FIRST                 0       5       0       20
+B_POSE                  7       1       -1      20  // a single frame
+C_LAST                  12      6       0       20
+D_SKIPPED               18      3       0       20
+"""
+
+
+def case_gla_named_animations():
+    """Animations picked by their animation.cfg names get read on their own, each into its own NLA strip and marker."""
+    import bpy
+    import shutil
+    expected = _pose_matrices(_import_simpleskel(True), range(21))
+    testutil.reset_scene()
+
+    basepath = os.path.join(tempfile.mkdtemp(prefix="jediacademy-test-named-"), "GameData", "base")
+    os.makedirs(os.path.join(basepath, os.path.dirname(SKELETON_REL)))
+    shutil.copy(os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"), os.path.join(basepath, SKELETON_REL + ".gla"))
+    with open(os.path.join(basepath, os.path.dirname(SKELETON_REL), "animation.cfg"), "w") as file:
+        file.write(SIMPLESKEL_ANIMATION_CFG)
+
+    mismatches = []
+    scene = addon.JAG2Scene.Scene(basepath)
+    success, message = scene.loadFromGLA(SKELETON_REL, addon.JAG2GLA.AnimationLoadMode.NAMED, animationNames=["unknown_anim", "c_last"])
+    if success:
+        mismatches.append("unknown animation names were accepted")
+    scene = addon.JAG2Scene.Scene(basepath)
+    success, message = scene.loadFromGLA(SKELETON_REL, addon.JAG2GLA.AnimationLoadMode.NAMED,
+                                         animationNames=addon.JAG2AnimationConfig.splitNames("c_last, A_FIRST B_POSE"))
+    if not success:
+        raise AssertionError(f"loadFromGLA failed: {message}")
+    # laid out in file order
+    gla = scene.gla
+    layout = [(entry.name, entry.start, entry.length) for entry in gla.animationConfig]
+    if layout != [("A_FIRST", 0, 5), ("B_POSE", 5, 1), ("C_LAST", 6, 6)]:
+        mismatches.append(f"animations laid out as {layout}")
+    full = _load_gla(REFERENCE_BASEPATH).animation
+    originalFrames = list(range(0, 5)) + [7] + list(range(12, 18))
+    decompress = addon.JAG2GLAFormat.decompressBones
+    if gla.animation.numFrames != 12 or not (decompress(gla.animation.bonePool[gla.animation.frames]) == decompress(full.bonePool[full.frames[originalFrames]])).all():
+        mismatches.append("frames read differ from the file's")
+    if len(gla.animation.bonePool) != len(set(full.frames[originalFrames].ravel().tolist())):
+        mismatches.append(f"{len(gla.animation.bonePool)} bone pool entries kept for the selected frames")
+
+    success, message = scene.saveToBlender(
+        scale=1.0, skin_rel="", guessTextures=False, useAnimation=True,
+        skeletonFixes=addon.JAG2Constants.SkeletonFixes.NONE,
+    )
+    if not success:
+        raise AssertionError(f"saveToBlender failed: {message}")
+    armature = bpy.data.objects["skeleton_root"]
+    tracks = armature.animation_data.nla_tracks if armature.animation_data else []
+    strips = [(strip.name, strip.action.name if strip.action else None, strip.frame_start) for track in tracks for strip in track.strips]
+    if strips != [("A_FIRST", "A_FIRST", 0), ("B_POSE", "B_POSE", 5), ("C_LAST", "C_LAST", 6)]:
+        mismatches.append(f"NLA strips {strips}")
+    markers = sorted((marker.frame, marker.name) for marker in bpy.context.scene.timeline_markers)
+    if markers != [(0, "A_FIRST"), (5, "B_POSE"), (6, "C_LAST")]:
+        mismatches.append(f"markers {markers}")
+    actual = _pose_matrices(armature, range(12))
+    for frame, originalFrame in enumerate(originalFrames):
+        if actual[frame] != expected[originalFrame]:
+            mismatches.append(f"frame {frame}: pose {actual[frame]}, expected frame {originalFrame}'s {expected[originalFrame]}")
+    testutil.check(mismatches)
+
+
+def case_gla_merge():
+    """The command line merge tool appends .gla files to one with the same bones in any order, sharing the bone pool."""
+    import subprocess
+    import numpy as np
+    fmt = addon.JAG2GLAFormat
+    tmp = tempfile.mkdtemp(prefix="jediacademy-test-merge-")
+    base = fmt.GLAFile.load(os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"))
+    paths = {}
+    for name in ("base", "appended", "broken", "output"):
+        os.makedirs(os.path.join(tmp, name))
+        paths[name] = os.path.join(tmp, name, name + ".gla")
+    base.save(paths["base"])
+    with open(os.path.join(tmp, "base", "animation.cfg"), "w") as file:
+        file.write(SIMPLESKEL_ANIMATION_CFG)
+    with open(os.path.join(tmp, "appended", "animation.cfg"), "w") as file:
+        file.write("APPENDED 0 21 -1 20\n")
+
+    # the same animation with the bones stored in reverse order
+    appended = fmt.GLAFile.load(paths["base"])
+    order = list(reversed(range(len(base.skeleton.bones))))
+    newIndex = {old: new for new, old in enumerate(order)}
+    appended.skeleton.bones = [appended.skeleton.bones[old] for old in order]
+    for new, bone in enumerate(appended.skeleton.bones):
+        bone.index = new
+        bone.parent = newIndex.get(bone.parent, -1)
+        bone.children = [newIndex[child] for child in bone.children]
+    appended.animation.frames = appended.animation.frames[:, order]
+    appended.save(paths["appended"])
+    broken = fmt.GLAFile.load(paths["base"])
+    broken.skeleton.bones[0].name = "renamed"
+    broken.save(paths["broken"])
+
+    mismatches = []
+    tool = os.path.join(REPO_ROOT, "JAG2GLAMerge.py")
+    result = subprocess.run([sys.executable, tool, paths["base"], paths["broken"], "-o", paths["output"]], capture_output=True, text=True)
+    if result.returncode == 0 or "different bones" not in result.stderr:
+        mismatches.append(f"merging a different skeleton: exit code {result.returncode}, {result.stderr}")
+    result = subprocess.run([sys.executable, tool, paths["base"], paths["appended"], "-o", paths["output"]], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise AssertionError(f"merge failed:\n{result.stdout}{result.stderr}")
+
+    merged = fmt.GLAFile.load(paths["output"])
+    compressed = base.animation.bonePool[base.animation.frames]
+    mergedCompressed = merged.animation.bonePool[merged.animation.frames]
+    if merged.header.numFrames != 42 or not (mergedCompressed[:21] == compressed).all() or not (mergedCompressed[21:] == compressed).all():
+        mismatches.append(f"merged {merged.header.numFrames} frames differ from the inputs'")
+    if len(merged.animation.bonePool) != len(np.unique(compressed.reshape(-1, 7), axis=0)):
+        mismatches.append(f"{len(merged.animation.bonePool)} bone pool entries for the twice appended frames")
+    if [bone.name for bone in merged.skeleton.bones] != [bone.name for bone in base.skeleton.bones]:
+        mismatches.append("the base skeleton was not kept")
+    config = addon.JAG2AnimationConfig.load(os.path.join(tmp, "output", "animation.cfg"))
+    layout = [(entry.name, entry.start, entry.length, entry.loop) for entry in config]
+    if layout != [("A_FIRST", 0, 5, 0), ("B_POSE", 7, 1, -1), ("C_LAST", 12, 6, 0), ("D_SKIPPED", 18, 3, 0), ("APPENDED", 21, 21, -1)]:
+        mismatches.append(f"merged animation.cfg {layout}")
+    testutil.check(mismatches)
+
+
+def case_gla_slice():
+    """The command line slice tool copies frames or named animations into a new .gla, dropping unused compressed bones."""
+    import subprocess
+    import numpy as np
+    fmt = addon.JAG2GLAFormat
+    tmp = tempfile.mkdtemp(prefix="jediacademy-test-slice-")
+    paths = {}
+    for name in ("bloated", "named", "range", "compacted"):
+        os.makedirs(os.path.join(tmp, name))
+        paths[name] = os.path.join(tmp, name, name + ".gla")
+    # the bone pool with an unused entry, and a duplicate of the entry frame 0 uses for the first bone, which frame 1
+    # uses instead of its own
+    bloated = fmt.GLAFile.load(os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"))
+    animation = bloated.animation
+    animation.bonePool = np.concatenate([animation.bonePool, [[1, 2, 3, 4, 5, 6, 7]], animation.bonePool[animation.frames[0, :1]]])
+    animation.frames[1, 0] = len(animation.bonePool) - 1
+    compressed = animation.bonePool[animation.frames]
+    bloated.save(paths["bloated"])
+    with open(os.path.join(tmp, "bloated", "animation.cfg"), "w") as file:
+        file.write(SIMPLESKEL_ANIMATION_CFG)
+
+    def slice(output, *args):
+        result = subprocess.run([sys.executable, os.path.join(REPO_ROOT, "JAG2GLASlice.py"), paths["bloated"], "-o", output, *args],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise AssertionError(f"slicing {args} failed:\n{result.stdout}{result.stderr}")
+        gla = fmt.GLAFile.load(output)
+        config = addon.JAG2AnimationConfig.load(addon.JAG2AnimationConfig.pathForGLA(output))
+        return gla, [(entry.name, entry.start, entry.length) for entry in config]
+
+    mismatches = []
+    for output, args, frames, layout in (
+            (paths["named"], ["--animations", "c_last,B_POSE"], [7] + list(range(12, 18)), [("B_POSE", 0, 1), ("C_LAST", 1, 6)]),
+            (paths["range"], ["--frames", "0", "15"], list(range(0, 15)), [("A_FIRST", 0, 5), ("B_POSE", 7, 1)]),
+            (paths["compacted"], [], list(range(21)), [("A_FIRST", 0, 5), ("B_POSE", 7, 1), ("C_LAST", 12, 6), ("D_SKIPPED", 18, 3)])):
+        gla, actualLayout = slice(output, *args)
+        sliced = gla.animation.bonePool[gla.animation.frames]
+        if sliced.shape != compressed[frames].shape or not (sliced == compressed[frames]).all():
+            mismatches.append(f"{args}: frames differ from the original's")
+        if len(gla.animation.bonePool) != len(np.unique(compressed[frames].reshape(-1, 7), axis=0)):
+            mismatches.append(f"{args}: {len(gla.animation.bonePool)} bone pool entries kept")
+        if actualLayout != layout:
+            mismatches.append(f"{args}: animation.cfg {actualLayout}")
+    testutil.check(mismatches)
+
+
+def case_gla_bone_pool():
+    """Equal rotations compress equally whatever their quaternion's sign, and snapping only merges neighbouring steps."""
+    import numpy as np
+    fmt = addon.JAG2GLAFormat
+    # half turns around x, whose w is rounding noise of either sign
+    halfTurns = fmt.quaternionsToMatrices(np.array([[1e-6, 1, 0, 0], [-1e-6, 1, 0, 0], [1e-6, -1, 0, 0]]), np.zeros(3))
+    mismatches = []
+    if len(np.unique(fmt.compressBones(halfTurns), axis=0)) != 1:
+        mismatches.append(f"half turns compress to {fmt.compressBones(halfTurns).tolist()}")
+    records = np.array([[10] * 7, [11] * 7, [12] * 7, [10] * 6 + [11]], dtype=np.uint16)
+    if fmt.snapCompressedBones(records).tolist() != [[10] * 7, [10] * 7, [12] * 7, [10] * 7]:
+        mismatches.append(f"snapping {records.tolist()} gave {fmt.snapCompressedBones(records).tolist()}")
+    # neighbouring steps get merged whichever pair of steps they fall into
+    records = np.array([[11] * 7, [12] * 7, [13] * 6 + [12]], dtype=np.uint16)
+    if fmt.snapCompressedBones(records).tolist() != [[11] * 7, [11] * 7, [13] * 6 + [12]]:
+        mismatches.append(f"snapping {records.tolist()} gave {fmt.snapCompressedBones(records).tolist()}")
+
+    _import_simpleskel(False)
+    pools = {}
+    for snap in (False, True):
+        scene = addon.JAG2Scene.Scene(REFERENCE_BASEPATH)
+        success, message = scene.loadSkeletonFromBlender(SKELETON_REL, gla_reference_rel="", snapBones=snap)
+        if not success:
+            raise AssertionError(f"loadSkeletonFromBlender failed: {message}")
+        pools[snap] = scene.gla.animation
+        steps = scene.gla.animation.bonePool[:, :4].astype(np.int64) - 2 * fmt.COMPBONE_QUAT_STEPS_PER_UNIT
+        firstNonZero = steps[np.arange(len(steps)), np.argmax(steps != 0, axis=1)]
+        if (firstNonZero < 0).any():
+            mismatches.append(f"snap={snap}: {np.count_nonzero(firstNonZero < 0)} bone pool quaternions with a negative sign")
+    exact, snapped = pools[False], pools[True]
+    difference = np.abs(exact.bonePool[exact.frames].astype(np.int64) - snapped.bonePool[snapped.frames])
+    if len(snapped.bonePool) > len(exact.bonePool) or difference.max() > 1:
+        mismatches.append(f"snapping left {len(snapped.bonePool)} of {len(exact.bonePool)} entries, moving them by up to {difference.max()} steps")
+    testutil.check(mismatches)
+
+
+def case_gla_chain_offsets():
+    """Sharing the transforms of repeated frames and unmoved ancestors gives what multiplying each frame's chain does."""
+    import numpy as np
+    fmt = addon.JAG2GLAFormat
+    skeleton = fmt.GLAFile.load(os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"), loadAnimation=False).skeleton
+    numBones = len(skeleton.bones)
+    root = skeleton.getHierarchyOrder()[0]
+    rng = np.random.default_rng(46)
+    quats = rng.normal(size=(10, 4))
+    poolMatrices = fmt.quaternionsToMatrices(quats / np.linalg.norm(quats, axis=1, keepdims=True), rng.uniform(-8, 8, (10, 3)))
+
+    def chainProducts(frames):
+        result = np.empty(frames.shape + (4, 4))
+        for frame in range(len(frames)):
+            for index in range(numBones):
+                matrix, ancestor = np.eye(4), index
+                while ancestor != -1:
+                    matrix = poolMatrices[frames[frame, ancestor]] @ matrix
+                    ancestor = skeleton.bones[ancestor].parent
+                result[frame, index] = matrix
+        return result
+
+    rows = rng.integers(0, 3, (4, numBones))
+    # an unmoved root, repeated rows and few distinct indices further down
+    shared = rows[[0, 1, 0, 2, 3, 1, 1, 0]]
+    shared[:, root] = 0
+    # a root moving every frame, so no chain is shared at all
+    distinct = shared.copy()
+    distinct[:, root] = np.arange(len(distinct))
+    mismatches = []
+    for name, frames in (("shared", shared), ("distinct", distinct)):
+        frames = frames.astype(np.uint32)
+        expected = chainProducts(frames)
+        if not np.allclose(fmt.MdxaAnimation.computeAbsoluteOffsets(frames, skeleton, poolMatrices), expected, atol=1e-9):
+            mismatches.append(f"{name}: absolute offsets differ from the chain products")
+        if not np.allclose(fmt.MdxaAnimation.computeBoneTransforms(frames, skeleton, poolMatrices), expected @ skeleton.getBasePoses(), atol=1e-9):
+            mismatches.append(f"{name}: bone transforms differ from the chain products")
+
+    # posing repeated frames at once matches posing each on its own
+    armature = _import_simpleskel(True)
+    solver = addon.JAG2GLA.livePlaybacks[armature.name]
+    frames = np.array([7, 3, 3, 0, 12, 3, 0, 7])
+    locations, rotations = solver.computePoses(frames)
+    for position, frame in enumerate(frames):
+        location, rotation = solver.computePoses(frames[position:position + 1])
+        if not (np.allclose(locations[position], location[0]) and np.allclose(rotations[position], rotation[0])):
+            mismatches.append(f"frame {frame} at position {position} posed differently together with the others")
+    testutil.check(mismatches)
+
+
+def case_gla_reduce_keyframes():
+    """Reduced keyframes stay within tolerance of every frame, keeping one key for still channels and the ends of straight runs."""
+    import bpy
+    import numpy as np
+    helper = addon.JAAnimationhelper
+    frames = np.arange(50)
+    samples = np.stack([np.full(50, 0.25), np.abs(frames - 20) * 0.1, np.sin(frames / 5)], axis=1)
+    tolerance = 0.01
+    keep, values = helper.reduceKeyframes(samples, tolerance)
+    mismatches = []
+    if keep.sum(axis=0).tolist()[:2] != [1, 3] or values[0, 0] != 0.25:
+        mismatches.append(f"kept {keep.sum(axis=0).tolist()} keys of constant, bent and curved channels")
+    for channel in range(1, 3):
+        kept = np.nonzero(keep[:, channel])[0]
+        error = np.abs(np.interp(frames, kept, values[kept, channel]) - samples[:, channel]).max()
+        if error > tolerance * (1 + 1e-9):
+            mismatches.append(f"channel {channel} is off by {error}")
+
+    expected = _pose_matrices(_import_simpleskel(False), range(21))
+    testutil.reset_scene()
+    scene = addon.JAG2Scene.Scene(REFERENCE_BASEPATH)
+    success, message = scene.loadFromGLA(SKELETON_REL, loadAnimations=addon.JAG2GLA.AnimationLoadMode.ALL)
+    if not success:
+        raise AssertionError(f"loadFromGLA failed: {message}")
+    success, message = scene.saveToBlender(
+        scale=1.0, skin_rel="", guessTextures=False, useAnimation=True,
+        skeletonFixes=addon.JAG2Constants.SkeletonFixes.NONE, reduceKeyframes=True,
+    )
+    if not success:
+        raise AssertionError(f"saveToBlender failed: {message}")
+    armature = bpy.data.objects["skeleton_root"]
+    assert armature.animation_data is not None and armature.animation_data.action is not None
+    numKeys = sum(len(fcurve.keyframe_points) for fcurve in helper.actionFCurves(armature.animation_data.action, armature))
+    # 3 bones, 7 channels, 21 frames
+    if not 21 <= numKeys < 3 * 7 * 21:
+        mismatches.append(f"{numKeys} keyframes")
+    difference = np.abs(np.array(_pose_matrices(armature, range(21))) - np.array(expected)).max()
+    # the allowed location error, a little more as it adds up along the hierarchy
+    if difference > 3 * addon.JAG2GLA.KEYFRAME_LOCATION_TOLERANCE:
+        mismatches.append(f"poses are off by up to {difference}")
+    testutil.check(mismatches)
+
+
+def case_gla_bone_connections():
+    """The connection analysis finds the head drift of every bone that the per-frame check of each pair would."""
+    import numpy as np
+    fmt = addon.JAG2GLAFormat
+    gla_module = addon.JAG2GLA
+    gla = _load_gla(REFERENCE_BASEPATH)
+    skeleton = gla.skeleton
+    # the middle bone, which only rotates relative to its parent, slides along in the second half of the animation
+    middle = skeleton.getBoneIndexByName()["Bone.001"]
+    compressed = gla.animation.bonePool[gla.animation.frames]
+    numFrames = len(compressed)
+    offsets = fmt.decompressBones(compressed[numFrames // 2:, middle])
+    offsets[:, :3, 3] += np.linspace(0.0, 2.0, len(offsets))[:, np.newaxis]
+    compressed[numFrames // 2:, middle] = fmt.compressBones(offsets)
+    sliding = fmt.MdxaAnimation.fromCompressedFrames(compressed)
+
+    mismatches = []
+    for animation in (gla.animation, sliding):
+        connections = gla_module.analyzeBoneConnections(skeleton, addon.JAG2Constants.SkeletonFixes.NONE, animation)
+        transforms = fmt.MdxaAnimation.computeBoneTransforms(animation.frames, skeleton, fmt.decompressBones(animation.bonePool)) @ gla_module.GLA_TO_BLENDER_BONE
+        for bone in skeleton.bones:
+            if connections.parents[bone.index] != bone.parent or connections.numChildren[bone.index] != len(bone.children):
+                mismatches.append(f"bone {bone.name}: parent {connections.parents[bone.index]}, {connections.numChildren[bone.index]} children")
+            if bone.parent == -1:
+                continue
+            rest = np.linalg.inv(skeleton.bones[bone.parent].getBasePose() @ gla_module.GLA_TO_BLENDER_BONE) @ (bone.getBasePose() @ gla_module.GLA_TO_BLENDER_BONE)[:, 3]
+            drift = max(np.linalg.norm(np.linalg.inv(frame[bone.parent]) @ frame[bone.index][:, 3] - rest) for frame in transforms)
+            if not np.isclose(connections.headDrift[bone.index], drift, atol=1e-9):
+                mismatches.append(f"bone {bone.name}: drift {connections.headDrift[bone.index]}, expected {drift}")
+        if connections.canConnect(middle) != (animation is gla.animation):
+            mismatches.append(f"middle bone may connect: {connections.canConnect(middle)}, drifting by {connections.headDrift[middle]}")
+    testutil.check(mismatches)
+
+
+def case_gla_action_import():
+    """Imported animations become an action reproducing the poses bone matrices would be set to, one per imported file."""
+    import bpy
+    import numpy as np
+    armature = _import_simpleskel(False)
+    animationData, pose = armature.animation_data, armature.pose
+    assert animationData is not None and pose is not None
+    action = animationData.action
+    mismatches = []
+    if action is None or action.name != "simpleskel":
+        mismatches.append(f"imported into action {action.name if action else None}")
+    actual = np.array(_pose_matrices(armature, range(21)))
+
+    # the way the animation used to be imported: setting each pose bone's matrix, parents first
+    gla = _load_gla(REFERENCE_BASEPATH)
+    transforms = addon.JAG2GLAFormat.MdxaAnimation.computeBoneTransforms(
+        gla.animation.frames, gla.skeleton, addon.JAG2GLAFormat.decompressBones(gla.animation.bonePool)) @ addon.JAG2GLA.GLA_TO_BLENDER_BONE
+    animationData.action = None
+    expected = []
+    for frame in range(21):
+        for index in gla.skeleton.getHierarchyOrder():
+            pose.bones[gla.skeleton.bones[index].name].matrix = addon.JAG2GLA.toBlenderMatrix(transforms[frame, index])
+            bpy.context.view_layer.update()
+        expected.append([[x for row in bone.matrix for x in row] for bone in pose.bones])
+    difference = np.abs(actual - np.array(expected)).max()
+    if difference > 1e-3:
+        mismatches.append(f"poses are off by up to {difference}")
+
+    # importing onto the same armature again keeps the first action
+    animationData.action = action
+    _import_simpleskel(False)
+    second = animationData.action
+    if second is None or second == action or action is None or not action.use_fake_user:
+        mismatches.append(f"second import into {second.name if second else None}, first kept: {action is not None and action.use_fake_user}")
+    testutil.check(mismatches)
+
+
+def case_gla_import_rollback():
+    """An import stopped part way reports rising progress, and its rollback undoes what the import did, even if the user
+    deleted things in the meantime, but keeps what the user did. Another import can't start while a modal one runs."""
+    import bpy
+    mismatches = []
+
+    def import_part_way(meanwhile=lambda: None, during=lambda: None):
+        scene = addon.JAG2Scene.Scene(REFERENCE_BASEPATH)
+        success, message = scene.loadFromGLA(SKELETON_REL, loadAnimations=addon.JAG2GLA.AnimationLoadMode.ALL)
+        if not success:
+            raise AssertionError(f"loadFromGLA failed: {message}")
+        rollback = addon.JAG2Scene.ImportRollback()
+        num_actions = len(bpy.data.actions)
+        steps = scene.saveToBlenderSteps(1.0, "", False, True, addon.JAG2Constants.SkeletonFixes.NONE)
+        # a part at a time, like ModalImport, with the user at work in between
+        with rollback.recording():
+            progress = [next(steps)]
+            # until the animation is being put into an action
+            while len(bpy.data.actions) == num_actions:
+                progress.append(next(steps))
+            during()
+        meanwhile()
+        with rollback.recording():
+            progress.append(next(steps))
+        if any(b < a for a, b in zip(progress, progress[1:])) or not 0 <= progress[0] <= progress[-1] <= 1:
+            mismatches.append(f"progress {progress}")
+        steps.close()
+        rollback.restore()
+
+    frames = (bpy.context.scene.frame_start, bpy.context.scene.frame_end)
+    import_part_way()
+    left = [obj.name for obj in bpy.data.objects] + [action.name for action in bpy.data.actions] + [armature.name for armature in bpy.data.armatures]
+    if left or (bpy.context.scene.frame_start, bpy.context.scene.frame_end) != frames:
+        mismatches.append(f"fresh scene: left {left}, frames {bpy.context.scene.frame_start}-{bpy.context.scene.frame_end}")
+
+    # cancelling an import onto an animated armature gives it its action back
+    armature = _import_simpleskel(False)
+    animation_data = armature.animation_data
+    assert animation_data is not None
+    action = animation_data.action
+    num_actions = len(bpy.data.actions)
+    import_part_way()
+    if animation_data.action != action or len(bpy.data.actions) != num_actions or action is None or action.use_fake_user:
+        mismatches.append(f"existing armature: action {animation_data.action}, {len(bpy.data.actions)} of {num_actions} actions")
+
+    # deleting an object the rollback remembers, and textures requested during the import aren't loaded after all,
+    # but what the user made in the meantime stays
+    bystander = bpy.data.objects.new("bystander", None)
+    bpy.context.scene.collection.objects.link(bystander)
+    basepath = tempfile.mkdtemp(prefix="jediacademy-test-rollback-")
+    before = _write_test_texture(basepath, "before", (1, 0, 0, 1))
+    during = _write_test_texture(basepath, "during", (0, 1, 0, 1))
+    loader = addon.JAMaterialmanager._deferredLoader
+    loader.request(before, "", "before", "Image Texture")
+
+    def meanwhile():
+        bpy.data.objects.remove(bystander)
+        newcomer = bpy.data.objects.new("newcomer", None)
+        bpy.context.scene.collection.objects.link(newcomer)
+        bpy.context.scene.timeline_markers.new("newcomer", frame=3)
+
+    import_part_way(meanwhile, lambda: loader.request(during, "", "during", "Image Texture"))
+    pending = addon.JAMaterialmanager.pendingDeferredTextures()
+    if pending != {addon.JAMaterialmanager._normalizeTexturePath(before)}:
+        mismatches.append(f"textures pending after rollback: {pending}")
+    loader.cancel()
+    if "newcomer" not in bpy.context.scene.collection.objects or "newcomer" not in bpy.context.scene.timeline_markers:
+        mismatches.append("the rollback removed the object or marker made during the import")
+
+    # while a modal import runs, others are refused instead of mixing their changes into its rollback
+    names = {obj.name for obj in bpy.data.objects}
+    addon.JAG2Operators.ModalImport._running = True
+    try:
+        # the reported error becomes an exception outside of the user interface
+        bpy.ops.import_scene.gla(filepath=os.path.join(REFERENCE_BASEPATH, SKELETON_REL + ".gla"), loadAnimations='ALL')  # pyright: ignore [reportAttributeAccessIssue]
+        refusal = "none"
+    except RuntimeError as e:
+        refusal = str(e)
+    finally:
+        addon.JAG2Operators.ModalImport._running = False
+    if "Another import is still running" not in refusal or {obj.name for obj in bpy.data.objects} != names:
+        mismatches.append(f"import during a modal import: {refusal}, objects {[obj.name for obj in bpy.data.objects]}")
+    testutil.check(mismatches)
+
+
+def case_gla_import_onto_rig():
+    """Importing onto an armature whose GLA bones hang off extra bones, like a rig's control bones, poses the GLA
+    bones as if their matrices had been set, with the extra bones keeping their pose."""
+    import bpy
+    import numpy as np
+    armature = _import_simpleskel(False)
+    animation_data, pose = armature.animation_data, armature.pose
+    assert animation_data is not None and pose is not None
+    data = armature.data
+    assert isinstance(data, bpy.types.Armature)
+    child = next(bone.name for bone in data.bones if bone.parent is not None and bone.children)
+    bpy.context.view_layer.objects.active = armature
+    bpy.ops.object.mode_set(mode='EDIT')
+    edit_bones = data.edit_bones
+    control = edit_bones.new("control")
+    control.head, control.tail = (0.5, -1, 0.25), (0.5, -1, 1.25)
+    control.roll = 0.3
+    control.parent = edit_bones[child].parent
+    edit_bones[child].use_connect = False
+    edit_bones[child].parent = control
+    bpy.ops.object.mode_set(mode='OBJECT')
+    pose.bones["control"].rotation_mode = 'XYZ'
+    pose.bones["control"].rotation_euler = (0.4, -0.2, 0.7)
+    pose.bones["control"].location = (0.1, 0.2, -0.3)
+
+    _import_simpleskel(False)
+    actual = np.array(_pose_matrices(armature, range(21)))
+
+    # setting each pose bone's matrix, parents first
+    gla = _load_gla(REFERENCE_BASEPATH)
+    transforms = addon.JAG2GLAFormat.MdxaAnimation.computeBoneTransforms(
+        gla.animation.frames, gla.skeleton, addon.JAG2GLAFormat.decompressBones(gla.animation.bonePool)) @ addon.JAG2GLA.GLA_TO_BLENDER_BONE
+    animation_data.action = None
+    expected = []
+    for frame in range(21):
+        for index in gla.skeleton.getHierarchyOrder():
+            pose.bones[gla.skeleton.bones[index].name].matrix = addon.JAG2GLA.toBlenderMatrix(transforms[frame, index])
+            bpy.context.view_layer.update()
+        expected.append([[x for row in bone.matrix for x in row] for bone in pose.bones])
+    mismatches = []
+    difference = np.abs(actual - np.array(expected)).max()
+    if difference > 1e-3:
+        mismatches.append(f"poses are off by up to {difference}")
+    control_rotation = pose.bones["control"].rotation_euler[:]
+    if not np.allclose(control_rotation, (0.4, -0.2, 0.7)):
+        mismatches.append(f"control bone rotated to {control_rotation}")
+    testutil.check(mismatches)
+
+
 runner = testutil.TestRunner()
 runner.run("smoke", case_smoke)
 testutil.reset_scene()
@@ -256,4 +1540,48 @@ testutil.reset_scene()
 runner.run("roundtrip", case_roundtrip)
 testutil.reset_scene()
 runner.run("no_passive_materialization", case_no_passive_materialization)
+testutil.reset_scene()
+runner.run("texture_cache", case_texture_cache)
+testutil.reset_scene()
+runner.run("deferred_textures", case_deferred_textures)
+testutil.reset_scene()
+runner.run("profiling", case_profiling)
+testutil.reset_scene()
+runner.run("codec_without_bpy", case_codec_without_bpy)
+testutil.reset_scene()
+runner.run("md3_import", case_md3_import)
+testutil.reset_scene()
+runner.run("md3_export_records", case_md3_export_records)
+testutil.reset_scene()
+runner.run("roff_import", case_roff_import)
+testutil.reset_scene()
+runner.run("roff_export", case_roff_export)
+testutil.reset_scene()
+runner.run("ase_import", case_ase_import)
+testutil.reset_scene()
+runner.run("ase_export", case_ase_export)
+testutil.reset_scene()
+runner.run("patch_export", case_patch_export)
+testutil.reset_scene()
+runner.run("gla_live_playback", case_gla_live_playback)
+testutil.reset_scene()
+runner.run("gla_named_animations", case_gla_named_animations)
+testutil.reset_scene()
+runner.run("gla_merge", case_gla_merge)
+testutil.reset_scene()
+runner.run("gla_slice", case_gla_slice)
+testutil.reset_scene()
+runner.run("gla_bone_pool", case_gla_bone_pool)
+testutil.reset_scene()
+runner.run("gla_chain_offsets", case_gla_chain_offsets)
+testutil.reset_scene()
+runner.run("gla_reduce_keyframes", case_gla_reduce_keyframes)
+testutil.reset_scene()
+runner.run("gla_bone_connections", case_gla_bone_connections)
+testutil.reset_scene()
+runner.run("gla_action_import", case_gla_action_import)
+testutil.reset_scene()
+runner.run("gla_import_onto_rig", case_gla_import_onto_rig)
+testutil.reset_scene()
+runner.run("gla_import_rollback", case_gla_import_rollback)
 runner.report()
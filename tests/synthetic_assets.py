@@ -0,0 +1,222 @@
+"""Generators for synthetic Ghoul 2 files at production scale, for benchmarking.
+
+Plain Python (no bpy/mathutils), writing the binary formats directly rather than going through
+the addon's own classes - a benchmark baseline shouldn't shift because the code under test changed
+how it builds its files.
+"""
+import math
+import os
+import struct
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+GLA_IDENT = b"2LGA"
+GLM_IDENT = b"2LGM"
+FORMAT_VERSION = 6
+MAX_QPATH = 64
+# game limits a surface may not exceed
+MAX_SURFACE_VERTICES = 1000
+MAX_SURFACE_BONES = 32
+
+
+@dataclass
+class SkeletonSpec:
+    num_bones: int = 72  # _humanoid-jk2.gla
+    num_frames: int = 20000
+    # distinct rotations per bone - the bone pool ends up with num_bones * pose_steps entries
+    pose_steps: int = 256
+
+
+@dataclass
+class ModelSpec:
+    # vertices per LOD, summed over all surfaces
+    lod_vertices: Tuple[int, ...] = (25000, 15000, 10000)
+    num_surfaces: int = 32
+    weights_per_vertex: int = 2
+
+
+def _bone_positions(num_bones: int) -> List[Tuple[float, float, float]]:
+    # a binary tree of bones spreading out upwards, bone i's parent is (i - 1) // 2
+    positions: List[Tuple[float, float, float]] = []
+    for i in range(num_bones):
+        depth = int(math.log2(i + 1))
+        slot = i + 1 - 2 ** depth
+        positions.append((4.0 * (slot - (2 ** depth - 1) / 2), 0.0, 8.0 * depth))
+    return positions
+
+
+def _compress_bone(angle: float, axis: int) -> bytes:
+    # rotation about one axis, no translation - see JAG2GLAFormat.compressBones for the encoding
+    quat = [math.cos(angle / 2), 0.0, 0.0, 0.0]
+    quat[1 + axis] = math.sin(angle / 2)
+    return struct.pack("7H", *(round((q + 2) * 16383) for q in quat), 512 * 64, 512 * 64, 512 * 64)
+
+
+def write_gla(path: str, name: str, spec: SkeletonSpec) -> None:
+    num_bones = spec.num_bones
+    positions = _bone_positions(num_bones)
+    children: Dict[int, List[int]] = {i: [] for i in range(num_bones)}
+    for i in range(1, num_bones):
+        children[(i - 1) // 2].append(i)
+
+    # skeleton
+    header_size = 2 * 4 + MAX_QPATH + 7 * 4
+    bones: List[bytes] = []
+    for i in range(num_bones):
+        x, y, z = positions[i]
+        base_pose = (1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z)
+        base_pose_inv = (1, 0, 0, -x, 0, 1, 0, -y, 0, 0, 1, -z)
+        bones.append(struct.pack(f"64sIi12f12fi{len(children[i])}i", f"bone{i}".encode(), 0,
+                                 (i - 1) // 2 if i > 0 else -1, *base_pose, *base_pose_inv,
+                                 len(children[i]), *children[i]))
+    bone_offsets: List[int] = []
+    offset = 4 * num_bones
+    for bone in bones:
+        bone_offsets.append(offset)
+        offset += len(bone)
+    ofs_skel = header_size + bone_offsets[0]
+    ofs_frames = header_size + offset
+
+    # bone pool: every bone swings back and forth about its own axis through pose_steps rotations
+    pool = b"".join(_compress_bone(math.pi / 4 * math.sin(2 * math.pi * step / spec.pose_steps), bone % 3)
+                    for bone in range(num_bones) for step in range(spec.pose_steps))
+
+    # frames: 3-byte pool indices, bones out of phase with each other
+    frames = bytearray()
+    for frame in range(spec.num_frames):
+        for bone in range(num_bones):
+            index = bone * spec.pose_steps + (frame + 7 * bone) % spec.pose_steps
+            frames += index.to_bytes(3, "little")
+    frames += bytes(-len(frames) % 4)
+    ofs_comp_bone_pool = ofs_frames + len(frames)
+    ofs_end = ofs_comp_bone_pool + len(pool)
+
+    with open(path, "wb") as file:
+        file.write(struct.pack("4si64sf6i", GLA_IDENT, FORMAT_VERSION, name.encode(), 1.0,
+                               spec.num_frames, ofs_frames, num_bones, ofs_comp_bone_pool, ofs_skel, ofs_end))
+        file.write(struct.pack(f"{num_bones}i", *bone_offsets))
+        for bone in bones:
+            file.write(bone)
+        file.write(frames)
+        file.write(pool)
+        assert file.tell() == ofs_end
+
+
+def _grid_surface(surface_index: int, num_vertices: int, num_bones: int, weights_per_vertex: int) -> bytes:
+    # a cylinder section made of a width x height grid, weighted to a handful of bones
+    width = max(2, int(math.sqrt(num_vertices)))
+    height = max(2, num_vertices // width)
+    bone_references = [(surface_index * 3 + i) % num_bones for i in range(min(4, num_bones, MAX_SURFACE_BONES))]
+
+    triangles = bytearray()
+    for row in range(height - 1):
+        for col in range(width - 1):
+            a = row * width + col
+            triangles += struct.pack("6i", a, a + 1, a + width, a + 1, a + width + 1, a + width)
+    vertices = bytearray()
+    uvs = bytearray()
+    for row in range(height):
+        for col in range(width):
+            angle = 2 * math.pi * col / width
+            normal = (math.cos(angle), math.sin(angle), 0.0)
+            co = (4 * normal[0] + surface_index, 4 * normal[1], 0.1 * row)
+            # 10 bit weights, the last one gets implied by the game
+            num_weights = min(weights_per_vertex, len(bone_references))
+            packed = (num_weights - 1) << 30
+            weight_bytes = [0, 0, 0, 0]
+            for w in range(num_weights):
+                packed |= ((row + w) % len(bone_references)) << (5 * w)
+                weight = 1023 // num_weights
+                weight_bytes[w] = weight & 0xff
+                packed |= ((weight >> 8) & 0b11) << (20 + 2 * w)
+            vertices += struct.pack("6fI4B", *normal, *co, packed, *weight_bytes)
+            uvs += struct.pack("2f", col / (width - 1), row / (height - 1))
+    num_verts = width * height
+    num_triangles = len(triangles) // 12
+
+    ofs_triangles = 10 * 4
+    ofs_verts = ofs_triangles + len(triangles)
+    ofs_bone_references = ofs_verts + len(vertices) + len(uvs)
+    ofs_end = ofs_bone_references + 4 * len(bone_references)
+    # ofsHeader gets patched in by the caller, since it depends on the surface's position in the file
+    header = struct.pack("10i", 0, surface_index, 0, num_verts, ofs_verts, num_triangles, ofs_triangles,
+                         len(bone_references), ofs_bone_references, ofs_end)
+    return header + triangles + vertices + uvs + struct.pack(f"{len(bone_references)}i", *bone_references)
+
+
+def write_glm(path: str, name: str, anim_name: str, spec: ModelSpec, num_bones: int) -> None:
+    num_surfaces = spec.num_surfaces
+    # the last surface is a tag, the others share the LOD's vertices
+    for lod_vertices in spec.lod_vertices:
+        if lod_vertices / (num_surfaces - 1) > MAX_SURFACE_VERTICES:
+            raise ValueError(f"{lod_vertices} vertices don't fit into {num_surfaces - 1} surfaces of at most {MAX_SURFACE_VERTICES} vertices")
+
+    # surface hierarchy: a flat list below surface 0, with a tag at the end
+    surface_data: List[bytes] = []
+    for i in range(num_surfaces):
+        is_tag = i == num_surfaces - 1
+        surface_children = list(range(1, num_surfaces)) if i == 0 else []
+        surface_name = f"*tag{i}" if is_tag else f"surface{i}"
+        surface_data.append(struct.pack(f"64sI64s3i{len(surface_children)}i", surface_name.encode(), 1 if is_tag else 0,
+                                       b"models/benchmark/texture", 0, 0 if i > 0 else -1,
+                                       len(surface_children), *surface_children))
+    header_size = 2 * 4 + 2 * MAX_QPATH + 7 * 4
+    surface_offsets: List[int] = []
+    offset = 4 * num_surfaces
+    for data in surface_data:
+        surface_offsets.append(offset)
+        offset += len(data)
+    ofs_surf_hierarchy = header_size
+    ofs_lods = header_size + offset
+
+    lods: List[bytes] = []
+    pos = ofs_lods
+    for lod_vertices in spec.lod_vertices:
+        surfaces_start = pos + 4 + 4 * num_surfaces
+        surfaces: List[bytes] = []
+        lod_surface_offsets: List[int] = []
+        surface_pos = surfaces_start
+        for i in range(num_surfaces):
+            if i == num_surfaces - 1:
+                surface = _tag_surface(i)
+            else:
+                surface = _grid_surface(i, lod_vertices // (num_surfaces - 1), num_bones, spec.weights_per_vertex)
+            # patch ofsHeader = -(offset in file)
+            surface = surface[:8] + struct.pack("i", -surface_pos) + surface[12:]
+            lod_surface_offsets.append(surface_pos - (pos + 4))
+            surfaces.append(surface)
+            surface_pos += len(surface)
+        ofs_end = surface_pos - pos
+        lods.append(struct.pack(f"i{num_surfaces}i", ofs_end, *lod_surface_offsets) + b"".join(surfaces))
+        pos += ofs_end
+
+    with open(path, "wb") as file:
+        file.write(struct.pack("4si64s64s7i", GLM_IDENT, FORMAT_VERSION, name.encode(), anim_name.encode(),
+                               0, num_bones, len(spec.lod_vertices), ofs_lods, num_surfaces, ofs_surf_hierarchy, pos))
+        file.write(struct.pack(f"{num_surfaces}i", *surface_offsets))
+        for data in surface_data:
+            file.write(data)
+        for lod in lods:
+            file.write(lod)
+        assert file.tell() == pos
+
+
+def _tag_surface(surface_index: int) -> bytes:
+    # a single right triangle, weighted fully to the root bone
+    corners = [(0.0, 0.0, 0.0), (0.0, 2.0, 0.0), (1.0, 0.0, 0.0)]
+    vertices = b"".join(struct.pack("6fI4B", 0.0, 0.0, 1.0, *co, 0, 255, 0, 0, 0) for co in corners)
+    uvs = struct.pack("6f", 0, 0, 0, 1, 1, 0)
+    ofs_triangles = 10 * 4
+    ofs_verts = ofs_triangles + 12
+    ofs_bone_references = ofs_verts + len(vertices) + len(uvs)
+    ofs_end = ofs_bone_references + 4
+    header = struct.pack("10i", 0, surface_index, 0, 3, ofs_verts, 1, ofs_triangles, 1, ofs_bone_references, ofs_end)
+    return header + struct.pack("3i", 0, 1, 2) + vertices + uvs + struct.pack("i", 0)
+
+
+# writes <basepath>/<skeleton_rel>.gla and <basepath>/<model_rel>.glm, the latter referencing the former
+def write_assets(basepath: str, skeleton_rel: str, model_rel: str, skeleton: SkeletonSpec, model: ModelSpec) -> None:
+    for rel in (skeleton_rel, model_rel):
+        os.makedirs(os.path.dirname(os.path.join(basepath, rel)), exist_ok=True)
+    write_gla(os.path.join(basepath, skeleton_rel + ".gla"), skeleton_rel, skeleton)
+    write_glm(os.path.join(basepath, model_rel + ".glm"), model_rel, skeleton_rel, model, skeleton.num_bones)
@@ -2,13 +2,14 @@ import importlib.util
 import sys
 import os
 from types import ModuleType
-from typing import TYPE_CHECKING, Callable, List, Optional, Set, Tuple, cast
+from typing import TYPE_CHECKING, Callable, List, Optional, Set, Tuple
 
 if TYPE_CHECKING:
     import JAG2GLA
+    import JAG2GLAFormat
     import JAG2GLM
-    import JAG2Math
-    import mathutils
+    import JAG2GLMFormat
+    import numpy
 
 
 def import_addon() -> ModuleType:
@@ -72,7 +73,7 @@ def _decode(bs: bytes) -> str:
     return import_addon().JAStringhelper.decode(bs)
 
 
-def _surface_name(surface_data_collection: "JAG2GLM.MdxmSurfaceDataCollection", index: int) -> str:
+def _surface_name(surface_data_collection: "JAG2GLMFormat.MdxmSurfaceDataCollection", index: int) -> str:
     return _decode(surface_data_collection.surfaces[index].name)
 
 
@@ -94,7 +95,7 @@ def compare_glm(actual: "JAG2GLM.GLM", expected: "JAG2GLM.GLM") -> List[str]:
             f"extra={actual_names - expected_names}"
         )
 
-    def resolve_names(coll: "JAG2GLM.MdxmSurfaceDataCollection", indices: List[int]) -> Set[str]:
+    def resolve_names(coll: "JAG2GLMFormat.MdxmSurfaceDataCollection", indices: List[int]) -> Set[str]:
         return {_surface_name(coll, i) for i in indices}
 
     for name in sorted(actual_names & expected_names):
@@ -122,8 +123,8 @@ def compare_glm(actual: "JAG2GLM.GLM", expected: "JAG2GLM.GLM") -> List[str]:
     if actual.header.numBones != expected.header.numBones:
         mismatches.append(f"numBones differs: actual={actual.header.numBones} expected={expected.header.numBones}")
 
-    actual_lods = actual.LODCollection.LODs
-    expected_lods = expected.LODCollection.LODs
+    actual_lods = actual.LODs
+    expected_lods = expected.LODs
     if len(actual_lods) != len(expected_lods):
         mismatches.append(f"LOD count differs: actual={len(actual_lods)} expected={len(expected_lods)}")
 
@@ -143,7 +144,7 @@ def compare_glm(actual: "JAG2GLM.GLM", expected: "JAG2GLM.GLM") -> List[str]:
     return mismatches
 
 
-def _bone_name(bones: List["JAG2GLA.MdxaBone"], index: int) -> Optional[str]:
+def _bone_name(bones: List["JAG2GLAFormat.MdxaBone"], index: int) -> Optional[str]:
     return bones[index].name if index != -1 else None
 
 
@@ -204,8 +205,7 @@ def compare_gla(
     return mismatches
 
 
-def _bone_offset_matrix(gla: "JAG2GLA.GLA", frame_index: int, bone_name: str) -> "mathutils.Matrix":
+def _bone_offset_matrix(gla: "JAG2GLA.GLA", frame_index: int, bone_name: str) -> "numpy.ndarray":
     bone_index = gla.boneIndexByName[bone_name]
-    pool_index = gla.animation.frames[frame_index].boneIndices[bone_index]
-    bone = cast("JAG2Math.CompBone", gla.animation.bonePool.bones[pool_index])
-    return bone.matrix
+    pool_index = gla.animation.frames[frame_index, bone_index]
+    return import_addon().JAG2GLAFormat.decompressBones(gla.animation.bonePool[pool_index])